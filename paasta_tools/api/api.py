@@ -20,14 +20,18 @@ import logging
 import os
 import sys
 
-import requests_cache
 import service_configuration_lib
 from gevent.wsgi import WSGIServer
 from pyramid.config import Configurator
+from pyramid.events import NewRequest
 from pyramid.scripts.pserve import watch_file
 
 from paasta_tools import marathon_tools
 from paasta_tools.api import settings
+from paasta_tools.api.marathon_state import MarathonStateRefresher
+from paasta_tools.api.soa_dir_watcher import SoaDirWatcher
+from paasta_tools.api.soa_dir_watcher import SoaDirWatchError
+from paasta_tools.api.views.instance import get_marathon_state
 from paasta_tools.utils import load_system_paasta_config
 
 
@@ -50,6 +54,14 @@ def parse_paasta_api_args():
         dest="soa_dir",
         help="define a different soa config directory"
     )
+    parser.add_argument(
+        '--state-refresh-interval',
+        dest="state_refresh_interval",
+        type=float,
+        default=settings.marathon_state_refresh_interval,
+        help="how often, in seconds, to refresh the Marathon and Mesos state statuses are computed from. "
+             "0 fetches them for every request instead. Defaults to %(default)s"
+    )
     args = parser.parse_args()
     return args
 
@@ -67,6 +79,13 @@ def make_app(global_config=None):
     })
 
     config.include('pyramid_swagger')
+    config.add_subscriber(process_soa_dir_changes, NewRequest)
+    config.add_request_method(get_marathon_state, 'marathon_state', reify=True)
+    # Over pyramid_swagger's tween, so cached responses aren't validated again
+    config.add_tween('paasta_tools.api.response_cache.response_cache_tween_factory',
+                     over='pyramid_swagger.tween.validation_tween_factory')
+    config.add_route('status', '/v1/status')
+    config.add_route('service.status', '/v1/services/{service}/status')
     config.add_route('service.instance.status', '/v1/services/{service}/{instance}/status')
     config.add_route('service.instance.tasks', '/v1/services/{service}/{instance}/tasks')
     config.add_route('service.instance.tasks.task', '/v1/services/{service}/{instance}/tasks/{task_id}')
@@ -78,9 +97,20 @@ def make_app(global_config=None):
     return config.make_wsgi_app()
 
 
+def process_soa_dir_changes(event):
+    if settings.soa_dir_watcher is not None:
+        settings.soa_dir_watcher.process_pending_events()
+
+
 def setup_paasta_api():
-    # pyinotify is a better solution than turning off file caching completely
-    service_configuration_lib.disable_yaml_cache()
+    # Cache the service configs and deployments.json files we parse, forgetting
+    # them when they change. Without inotify, there's no knowing when they do.
+    try:
+        settings.soa_dir_watcher = SoaDirWatcher(settings.soa_dir)
+        settings.soa_dir_watcher.start_caching()
+    except SoaDirWatchError as e:
+        log.warning("Not caching %s: %s" % (settings.soa_dir, e))
+        service_configuration_lib.disable_yaml_cache()
 
     # Exit on exceptions while loading settings
     settings.cluster = load_system_paasta_config().get_cluster()
@@ -92,10 +122,16 @@ def setup_paasta_api():
         marathon_config.get_password()
     )
 
-    # Set up transparent cache for http API calls. With expire_after, responses
-    # are removed only when the same request is made. Expired storage is not a
-    # concern here. Thus remove_expired_responses is not needed.
-    requests_cache.install_cache("paasta-api", backend="memory", expire_after=30)
+    # Keep the Marathon and Mesos state that statuses are computed from up to
+    # date in the background, so requests don't wait for Marathon and Mesos.
+    # This is a thread rather than a greenlet since calls to Marathon and Mesos
+    # block, and would otherwise block serving requests.
+    if settings.marathon_state_refresh_interval:
+        settings.marathon_state_refresher = MarathonStateRefresher(
+            settings.marathon_client,
+            refresh_interval=settings.marathon_state_refresh_interval,
+        )
+        settings.marathon_state_refresher.start()
 
 
 def main(argv=None):
@@ -106,7 +142,8 @@ def main(argv=None):
         logging.basicConfig(level=logging.WARNING)
 
     if args.soa_dir:
-        settings.soa_dir = args.soa_dir
+        settings.soa_dir = os.path.abspath(args.soa_dir)
+    settings.marathon_state_refresh_interval = args.state_refresh_interval
 
     server = WSGIServer(('', int(args.port)), make_app())
     log.info("paasta-api started on port %d with soa_dir %s" % (args.port, settings.soa_dir))
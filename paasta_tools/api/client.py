@@ -14,20 +14,135 @@
 # limitations under the License.
 """
 Client interface for the Paasta rest api.
+
+Building a client parses and validates the swagger spec and builds its models,
+which is slow, so clients are cached per api server for the life of the process.
+Each client keeps a pool of HTTP connections to its api server, and makes its
+GETs conditional, so unchanged responses aren't sent (or rendered) again.
 """
+import copy
 import json
 import logging
 import os
 import sys
+import threading
+from collections import OrderedDict
 from urlparse import urlparse
 
 from bravado.client import SwaggerClient
+from bravado.requests_client import RequestsClient
+from requests.adapters import HTTPAdapter
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
 
 from paasta_tools.utils import load_system_paasta_config
 
 
 log = logging.getLogger(__name__)
 
+# How many connections to keep open to each api server, enough for the
+# concurrent requests of paasta status and mark-for-deployment
+HTTP_POOL_SIZE = 16
+# How many responses with ETags to remember per api server
+ETAG_CACHE_SIZE = 128
+
+_clients = {}
+_clients_lock = threading.Lock()
+_swagger_spec = {}
+
+
+def get_swagger_spec():
+    """Returns a copy of the api's swagger spec, which is read and validated
+    (by building the first client with it) only once per process"""
+    with _clients_lock:
+        if 'spec_dict' not in _swagger_spec:
+            paasta_api_path = os.path.dirname(sys.modules['paasta_tools.api'].__file__)
+            swagger_file = os.path.join(paasta_api_path, 'api_docs/swagger.json')
+            if not os.path.isfile(swagger_file):
+                log.error('paasta-api swagger spec %s does not exist', swagger_file)
+                return None
+            with open(swagger_file) as f:
+                _swagger_spec['spec_dict'] = json.load(f)
+            _swagger_spec['validated'] = False
+        return copy.deepcopy(_swagger_spec['spec_dict'])
+
+
+class ConditionalHTTPAdapter(HTTPAdapter):
+    """An HTTPAdapter that remembers the responses to GETs that came with an
+    ETag, and asks with If-None-Match whether they changed rather than for them
+    again. A 304 Not Modified is turned back into the response it stands for,
+    so callers never see one."""
+
+    def __init__(self, cache_size=ETAG_CACHE_SIZE, **kwargs):
+        super(ConditionalHTTPAdapter, self).__init__(**kwargs)
+        self.cache_size = cache_size
+        self.responses = OrderedDict()
+        self.responses_lock = threading.Lock()
+
+    def send(self, request, **kwargs):
+        if request.method != 'GET':
+            return super(ConditionalHTTPAdapter, self).send(request, **kwargs)
+
+        with self.responses_lock:
+            cached = self.responses.get(request.url)
+        if cached is not None:
+            request.headers['If-None-Match'] = cached['etag']
+        response = super(ConditionalHTTPAdapter, self).send(request, **kwargs)
+
+        if response.status_code == 304 and cached is not None:
+            response.close()
+            return self.build_cached_response(request, cached)
+        with self.responses_lock:
+            self.responses.pop(request.url, None)
+            if response.status_code == 200 and 'ETag' in response.headers:
+                self.responses[request.url] = {
+                    'etag': response.headers['ETag'],
+                    'headers': dict(response.headers),
+                    'content': response.content,
+                    'encoding': response.encoding,
+                }
+                while len(self.responses) > self.cache_size:
+                    self.responses.popitem(last=False)
+        return response
+
+    def build_cached_response(self, request, cached):
+        response = Response()
+        response.status_code = 200
+        response.reason = 'OK'
+        response.headers = CaseInsensitiveDict(cached['headers'])
+        response._content = cached['content']
+        response.encoding = cached['encoding']
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        return response
+
+
+def get_pooled_http_client():
+    http_client = RequestsClient()
+    adapter = ConditionalHTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_SIZE)
+    http_client.session.mount('http://', adapter)
+    http_client.session.mount('https://', adapter)
+    return http_client
+
+
+def build_paasta_api_client(api_server):
+    spec_dict = get_swagger_spec()
+    if spec_dict is None:
+        return None
+    # replace localhost in swagger.json with actual api server
+    spec_dict['host'] = api_server
+    config = {'validate_swagger_spec': not _swagger_spec['validated']}
+    api_client = SwaggerClient.from_spec(spec_dict=spec_dict, http_client=get_pooled_http_client(), config=config)
+    _swagger_spec['validated'] = True
+    return api_client
+
+
+def clear_api_client_cache():
+    with _clients_lock:
+        _clients.clear()
+        _swagger_spec.clear()
+
 
 def get_paasta_api_client(cluster=None, system_paasta_config=None):
     if not system_paasta_config:
@@ -48,15 +163,13 @@ def get_paasta_api_client(cluster=None, system_paasta_config=None):
         return None
     api_server = parsed.netloc
 
-    # Get swagger spec from file system instead of the api server
-    paasta_api_path = os.path.dirname(sys.modules['paasta_tools.api'].__file__)
-    swagger_file = os.path.join(paasta_api_path, 'api_docs/swagger.json')
-    if not os.path.isfile(swagger_file):
-        log.error('paasta-api swagger spec %s does not exist', swagger_file)
-        return None
-
-    with open(swagger_file) as f:
-        spec_dict = json.load(f)
-    # replace localhost in swagger.json with actual api server
-    spec_dict['host'] = api_server
-    return SwaggerClient.from_spec(spec_dict=spec_dict)
+    with _clients_lock:
+        api_client = _clients.get(api_server)
+    if api_client is None:
+        # Built outside the lock, so clients for different servers are built concurrently
+        api_client = build_paasta_api_client(api_server)
+        if api_client is None:
+            return None
+        with _clients_lock:
+            api_client = _clients.setdefault(api_server, api_client)
+    return api_client
@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+# Copyright 2015-2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Snapshots of the Marathon and Mesos state that instance statuses are computed
+from, and a background thread that keeps one up to date so that requests don't
+have to wait for Marathon and Mesos.
+"""
+import itertools
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from paasta_tools import marathon_tools
+from paasta_tools.mesos_tools import get_running_tasks_from_active_frameworks
+
+
+log = logging.getLogger(__name__)
+
+DEFAULT_REFRESH_INTERVAL = 10  # seconds
+# Past this age, a snapshot is considered too stale to use, which happens if
+# refreshing it keeps failing
+MAX_STATE_AGE = 60  # seconds
+
+_versions = itertools.count(1)
+
+
+class MarathonState(object):
+    """What the statuses of marathon instances are computed from: every app, the
+    launch queue and every running mesos task in the cluster. Each of them is
+    fetched the first time it's needed, or all at once by fetch(), so however
+    many instances' statuses are computed from one MarathonState, each is only
+    fetched once.
+
+    Each MarathonState has its own version, so anything computed from one can
+    be cached for as long as it's the state in use."""
+
+    def __init__(self, client):
+        self.client = client
+        self.version = next(_versions)
+        self.fetched_at = time.time()
+        self._apps = None
+        self._app_queue = None
+        self._running_tasks = None
+
+    def fetch(self):
+        """Fetches everything now, rather than when it's first needed"""
+        self.fetched_at = time.time()
+        self.get_apps()
+        self._get_app_queue()
+        for tasks in self._get_running_tasks_by_app_id().values():
+            for task in tasks:
+                # Looking up a task's slave fetches the mesos state, so do it
+                # now too. The slave is cached on the task.
+                task.slave
+        return self
+
+    def get_age(self):
+        """Returns how many seconds ago this state was fetched"""
+        return time.time() - self.fetched_at
+
+    def get_apps(self):
+        if self._apps is None:
+            apps = self.client.list_apps(embed_counts=True, embed_deployments=True)
+            self._apps = dict((app.id.lstrip('/'), app) for app in apps)
+        return self._apps
+
+    def get_app(self, app_id):
+        """Returns the app with app_id, or None if it isn't running"""
+        return self.get_apps().get(app_id.lstrip('/'))
+
+    def get_matching_app_ids(self, service, instance):
+        return [app.id for app in marathon_tools.get_matching_apps_from_list(service, instance,
+                                                                             self.get_apps().values())]
+
+    def _get_app_queue(self):
+        if self._app_queue is None:
+            self._app_queue = self.client.list_queue()
+        return self._app_queue
+
+    def get_app_queue_status(self, app_id):
+        return marathon_tools.get_app_queue_status_from_queue(self._get_app_queue(), app_id)
+
+    def _get_running_tasks_by_app_id(self):
+        if self._running_tasks is None:
+            # Marathon's task ids are the app id, a '.' and a uuid
+            self._running_tasks = defaultdict(list)
+            for task in get_running_tasks_from_active_frameworks():
+                self._running_tasks[task['id'].rsplit('.', 1)[0]].append(task)
+        return self._running_tasks
+
+    def get_running_tasks(self, app_id):
+        return self._get_running_tasks_by_app_id().get(app_id.lstrip('/'), [])
+
+
+class MarathonStateRefresher(threading.Thread):
+    """Fetches a new MarathonState every refresh_interval seconds. Since a state is
+    only shared once it's been fetched completely, requests reading it never
+    make calls to Marathon or Mesos."""
+
+    def __init__(self, client, refresh_interval=DEFAULT_REFRESH_INTERVAL, max_age=MAX_STATE_AGE):
+        super(MarathonStateRefresher, self).__init__(name='marathon-state-refresher')
+        self.daemon = True
+        self.client = client
+        self.refresh_interval = refresh_interval
+        self.max_age = max_age
+        self.state = None
+        self.stopping = threading.Event()
+
+    def refresh(self):
+        try:
+            self.state = MarathonState(self.client).fetch()
+        except Exception:
+            log.exception("Couldn't refresh the Marathon state")
+
+    def run(self):
+        while not self.stopping.is_set():
+            self.refresh()
+            self.stopping.wait(self.refresh_interval)
+
+    def stop(self):
+        self.stopping.set()
+
+    def get_state(self):
+        """Returns the latest state, or a new one (which is fetched as it's
+        used) if there isn't one younger than max_age"""
+        state = self.state
+        if state is None or state.get_age() > self.max_age:
+            log.warning("No fresh Marathon state, fetching it for this request")
+            return MarathonState(self.client)
+        return state
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+# Copyright 2015-2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+ETags and cached responses for the status and tasks endpoints.
+
+Their responses are computed only from the MarathonState a request uses and
+from the soa_dir, so while neither changes (see MarathonState.version and
+SoaDirWatcher.generation) a response doesn't either. The tween answers
+If-None-Match with 304 Not Modified, and serves responses it rendered before
+without calling the view, or having pyramid_swagger validate them again.
+"""
+import logging
+import uuid
+from collections import OrderedDict
+
+from pyramid.httpexceptions import HTTPNotModified
+from pyramid.interfaces import IRoutesMapper
+from pyramid.response import Response
+
+from paasta_tools.api import settings
+
+
+log = logging.getLogger(__name__)
+
+CACHED_ROUTES = set([
+    'status',
+    'service.status',
+    'service.instance.status',
+    'service.instance.tasks',
+    'service.instance.tasks.task',
+])
+MAX_CACHED_RESPONSES = 1000
+
+# Versions start over when paasta-api restarts, so ETags from another process
+# mustn't match ours
+_etag_prefix = uuid.uuid4().hex[:8]
+
+
+def get_etag(request, route_mapper):
+    """Returns the ETag of the response to request, or None if its response
+    can't be cached"""
+    if request.method != 'GET':
+        return None
+    route = route_mapper(request)['route']
+    if route is None or route.name not in CACHED_ROUTES:
+        return None
+    # Verbose tasks include what the mesos slaves report right now
+    if request.GET.get('verbose', 'false').lower() != 'false':
+        return None
+    # Without inotify there's no knowing when the soa_dir changes
+    soa_dir_watcher = settings.soa_dir_watcher
+    if soa_dir_watcher is None or not soa_dir_watcher.watching:
+        return None
+    return '%s-%d-%d' % (_etag_prefix, request.marathon_state.version, soa_dir_watcher.generation)
+
+
+class ResponseCache(object):
+    """The most recently rendered response of each url, with its ETag"""
+
+    def __init__(self, max_size=MAX_CACHED_RESPONSES):
+        self.max_size = max_size
+        self.responses = OrderedDict()
+
+    def get(self, url, etag):
+        cached = self.responses.get(url)
+        if cached is None or cached['etag'] != etag:
+            return None
+        return Response(body=cached['body'], content_type=cached['content_type'],
+                        charset=cached['charset'], etag=etag)
+
+    def store(self, url, etag, response):
+        self.responses.pop(url, None)
+        self.responses[url] = {
+            'etag': etag,
+            'body': response.body,
+            'content_type': response.content_type,
+            'charset': response.charset,
+        }
+        while len(self.responses) > self.max_size:
+            self.responses.popitem(last=False)
+
+
+def response_cache_tween_factory(handler, registry):
+    route_mapper = registry.queryUtility(IRoutesMapper)
+    response_cache = ResponseCache()
+
+    def response_cache_tween(request):
+        etag = get_etag(request, route_mapper)
+        if etag is None:
+            return handler(request)
+        if etag in request.if_none_match:
+            return HTTPNotModified(etag=etag)
+        response = response_cache.get(request.path_qs, etag)
+        if response is not None:
+            return response
+        response = handler(request)
+        if response.status_code == 200:
+            response.etag = etag
+            response_cache.store(request.path_qs, etag, response)
+        return response
+
+    return response_cache_tween
@@ -14,8 +14,12 @@
 """
 Settings of the paasta-api server.
 """
+from paasta_tools.api.marathon_state import DEFAULT_REFRESH_INTERVAL
 from paasta_tools.utils import DEFAULT_SOA_DIR
 
 soa_dir = DEFAULT_SOA_DIR
 cluster = None
 marathon_client = None
+marathon_state_refresh_interval = DEFAULT_REFRESH_INTERVAL
+marathon_state_refresher = None
+soa_dir_watcher = None
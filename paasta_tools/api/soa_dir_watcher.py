@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# Copyright 2015-2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Lets paasta-api keep the soa_dir files it parses (service configs and
+deployments.json) cached, by watching the soa_dir with inotify and forgetting
+exactly the files that change.
+
+Events are processed at the start of each request, in the thread that serves
+it, rather than by a thread of their own. That way a file that changes while a
+request is reading it can't be forgotten before the request caches what it
+read: the change is processed, and the stale copy forgotten, by the next
+request.
+
+Every change also bumps the watcher's generation, so paasta-api can tell
+whether anything in the soa_dir changed since a response was computed.
+"""
+import logging
+import os
+
+import service_configuration_lib
+
+from paasta_tools import utils
+
+try:
+    import pyinotify
+except ImportError:
+    # pyinotify only works on Linux. paasta-api doesn't cache the soa_dir without it.
+    pyinotify = None
+
+
+log = logging.getLogger(__name__)
+
+
+class SoaDirWatchError(Exception):
+    pass
+
+
+def get_caches():
+    """Returns the caches of parsed soa_dir files, which are keyed by path.
+    service_configuration_lib keys its cache by whatever path it was given, so
+    with a relative soa_dir those paths are relative too."""
+    return [service_configuration_lib._yaml_cache, utils._deployments_json_cache]
+
+
+def clear_caches():
+    for cache in get_caches():
+        cache.clear()
+
+
+def forget_path(path):
+    """Forgets the parsed contents of the file at path, or of every file under
+    path if it's a directory"""
+    path = os.path.abspath(path)
+    dir_prefix = path.rstrip(os.sep) + os.sep
+    for cache in get_caches():
+        for cached_path in list(cache):
+            absolute_path = os.path.abspath(cached_path)
+            if absolute_path == path or absolute_path.startswith(dir_prefix):
+                cache.pop(cached_path, None)
+
+
+class SoaDirWatcher(object):
+
+    def __init__(self, soa_dir):
+        if pyinotify is None:
+            raise SoaDirWatchError("pyinotify isn't available")
+        self.soa_dir = os.path.abspath(soa_dir)
+        self.watch_manager = pyinotify.WatchManager()
+        self.notifier = pyinotify.Notifier(self.watch_manager, default_proc_fun=self.process_event, timeout=0)
+        mask = (pyinotify.IN_CLOSE_WRITE | pyinotify.IN_CREATE | pyinotify.IN_DELETE | pyinotify.IN_MOVED_FROM |
+                pyinotify.IN_MOVED_TO | pyinotify.IN_DELETE_SELF | pyinotify.IN_MOVE_SELF)
+        watches = self.watch_manager.add_watch(self.soa_dir, mask, rec=True, auto_add=True)
+        # A directory that isn't watched (say, past fs.inotify.max_user_watches)
+        # would have its files cached forever
+        unwatched = [path for path, wd in watches.items() if wd < 0]
+        if unwatched:
+            self.notifier.stop()
+            raise SoaDirWatchError("Couldn't watch %d directories, like %s" % (len(unwatched), unwatched[0]))
+        self.watching = True
+        self.generation = 0
+
+    def start_caching(self):
+        """Turns on caching of the files we watch. The watches are already in
+        place, so every change from now on is noticed."""
+        clear_caches()
+        service_configuration_lib.enable_yaml_cache()
+        utils.enable_deployments_json_cache()
+
+    def stop_caching(self):
+        service_configuration_lib.disable_yaml_cache()
+        utils.disable_deployments_json_cache()
+        clear_caches()
+
+    def process_event(self, event):
+        self.generation += 1
+        if event.mask & pyinotify.IN_Q_OVERFLOW:
+            log.warning("Missed some changes to %s, forgetting every file" % self.soa_dir)
+            clear_caches()
+        elif event.mask & (pyinotify.IN_DELETE_SELF | pyinotify.IN_MOVE_SELF) and \
+                os.path.abspath(event.pathname) == self.soa_dir:
+            # Whatever replaces it isn't watched
+            log.error("%s was moved or deleted, not caching it any more" % self.soa_dir)
+            self.watching = False
+            self.stop_caching()
+        else:
+            log.debug("%s changed" % event.pathname)
+            forget_path(event.pathname)
+
+    def process_pending_events(self):
+        """Forgets the files that changed since the last call"""
+        while self.notifier.check_events(timeout=0):
+            self.notifier.read_events()
+            self.notifier.process_events()
@@ -15,29 +15,42 @@
 """
 PaaSTA service instance status/start/stop etc.
 """
+import copy
 import traceback
+from collections import defaultdict
 
 from pyramid.view import view_config
 
 from paasta_tools import marathon_tools
 from paasta_tools.api import settings
+from paasta_tools.api.marathon_state import MarathonState
 from paasta_tools.api.views.exception import ApiFailure
 from paasta_tools.cli.cmds.status import get_actual_deployments
-from paasta_tools.mesos_tools import get_running_tasks_from_active_frameworks
-from paasta_tools.mesos_tools import get_task
-from paasta_tools.mesos_tools import get_tasks_from_app_id
-from paasta_tools.mesos_tools import TaskNotFound
+from paasta_tools.mesos_tools import filter_task_by_hostname
+from paasta_tools.mesos_tools import filter_task_by_task_id
 from paasta_tools.paasta_serviceinit import get_deployment_version
+from paasta_tools.utils import get_service_instance_list
+from paasta_tools.utils import get_services_for_cluster
 from paasta_tools.utils import NoDockerImageError
 from paasta_tools.utils import validate_service_instance
 
 
+def get_marathon_state(request):
+    """Returns the MarathonState to compute a request's statuses from: the one
+    kept up to date in the background if there is one, or else a new one.
+    Requests have it as request.marathon_state, so every status in a request
+    is computed from the same one."""
+    if settings.marathon_state_refresher is None:
+        return MarathonState(settings.marathon_client)
+    return settings.marathon_state_refresher.get_state()
+
+
 def chronos_instance_status(instance_status, service, instance, verbose):
     cstatus = {}
     return cstatus
 
 
-def marathon_job_status(mstatus, client, job_config):
+def marathon_job_status(mstatus, marathon_state, job_config):
     try:
         app_id = job_config.format_marathon_app_dict()['id']
     except NoDockerImageError:
@@ -46,10 +59,16 @@ def marathon_job_status(mstatus, client, job_config):
         return
 
     mstatus['app_id'] = app_id
-    mstatus['slaves'] = list({task.slave['hostname'] for task in get_running_tasks_from_active_frameworks(app_id)})
+    mstatus['state_fetched_at'] = int(marathon_state.fetched_at)
+    mstatus['slaves'] = list({task.slave['hostname'] for task in marathon_state.get_running_tasks(app_id)})
     mstatus['expected_instance_count'] = job_config.get_instances()
 
-    deploy_status = marathon_tools.get_marathon_app_deploy_status(client, app_id)
+    app = marathon_state.get_app(app_id)
+    if app is None:
+        deploy_status = marathon_tools.MarathonDeployStatus.NotRunning
+    else:
+        is_overdue, backoff_seconds = marathon_state.get_app_queue_status(app_id)
+        deploy_status = marathon_tools.get_marathon_app_deploy_status_from_app(app, is_overdue, backoff_seconds)
     mstatus['deploy_status'] = marathon_tools.MarathonDeployStatus.tostring(deploy_status)
 
     # by comparing running count with expected count, callers can figure
@@ -57,16 +76,15 @@ def marathon_job_status(mstatus, client, job_config):
     if deploy_status == marathon_tools.MarathonDeployStatus.NotRunning:
         mstatus['running_instance_count'] = 0
     else:
-        mstatus['running_instance_count'] = client.get_app(app_id).tasks_running
+        mstatus['running_instance_count'] = app.tasks_running
 
     if deploy_status == marathon_tools.MarathonDeployStatus.Delayed:
-        _, backoff_seconds = marathon_tools.get_app_queue_status(client, app_id)
         mstatus['backoff_seconds'] = backoff_seconds
 
 
-def marathon_instance_status(instance_status, service, instance, verbose):
+def marathon_instance_status(instance_status, service, instance, verbose, marathon_state):
     mstatus = {}
-    apps = marathon_tools.get_matching_appids(service, instance, settings.marathon_client)
+    apps = marathon_state.get_matching_app_ids(service, instance)
     job_config = marathon_tools.load_marathon_service_config(
         service, instance, settings.cluster, soa_dir=settings.soa_dir)
 
@@ -74,26 +92,16 @@ def marathon_instance_status(instance_status, service, instance, verbose):
     mstatus['app_count'] = len(apps)
     mstatus['desired_state'] = job_config.get_desired_state()
     mstatus['bounce_method'] = job_config.get_bounce_method()
-    marathon_job_status(mstatus, settings.marathon_client, job_config)
+    marathon_job_status(mstatus, marathon_state, job_config)
     return mstatus
 
 
-@view_config(route_name='service.instance.status', request_method='GET', renderer='json')
-def instance_status(request):
-    service = request.swagger_data.get('service')
-    instance = request.swagger_data.get('instance')
-    verbose = request.matchdict.get('verbose', False)
-
+def get_instance_status(service, instance, actual_deployments, marathon_state, verbose=False):
+    """Returns the status of service.instance, or raises ApiFailure if it can't"""
     instance_status = {}
     instance_status['service'] = service
     instance_status['instance'] = instance
 
-    try:
-        actual_deployments = get_actual_deployments(service, settings.soa_dir)
-    except Exception:
-        error_message = traceback.format_exc()
-        raise ApiFailure(error_message, 500)
-
     version = get_deployment_version(actual_deployments, settings.cluster, instance)
     # exit if the deployment key is not found
     if not version:
@@ -105,7 +113,8 @@ def instance_status(request):
     try:
         instance_type = validate_service_instance(service, instance, settings.cluster, settings.soa_dir)
         if instance_type == 'marathon':
-            instance_status['marathon'] = marathon_instance_status(instance_status, service, instance, verbose)
+            instance_status['marathon'] = marathon_instance_status(
+                instance_status, service, instance, verbose, marathon_state)
         elif instance_type == 'chronos':
             instance_status['chronos'] = chronos_instance_status(instance_status, service, instance, verbose)
         else:
@@ -118,6 +127,77 @@ def instance_status(request):
     return instance_status
 
 
+def get_service_status(service, instances, marathon_state):
+    """Returns the statuses of instances of service. Rather than failing the
+    whole batch, the status of an instance that can't be had is just its
+    error_code and error_message."""
+    try:
+        actual_deployments = get_actual_deployments(service, settings.soa_dir)
+        deployments_error = None
+    except Exception:
+        actual_deployments = None
+        deployments_error = ApiFailure(traceback.format_exc(), 500)
+
+    instance_statuses = []
+    for instance in instances:
+        try:
+            if deployments_error:
+                raise deployments_error
+            instance_statuses.append(get_instance_status(service, instance, actual_deployments, marathon_state))
+        except ApiFailure as e:
+            instance_statuses.append({
+                'service': service,
+                'instance': instance,
+                'error_code': e.err,
+                'error_message': e.msg,
+            })
+    return {'service': service, 'instances': instance_statuses}
+
+
+@view_config(route_name='service.instance.status', request_method='GET', renderer='json')
+def instance_status(request):
+    service = request.swagger_data.get('service')
+    instance = request.swagger_data.get('instance')
+    verbose = request.matchdict.get('verbose', False)
+
+    try:
+        actual_deployments = get_actual_deployments(service, settings.soa_dir)
+    except Exception:
+        error_message = traceback.format_exc()
+        raise ApiFailure(error_message, 500)
+
+    return get_instance_status(service, instance, actual_deployments, request.marathon_state,
+                               verbose=verbose)
+
+
+@view_config(route_name='service.status', request_method='GET', renderer='json')
+def service_status(request):
+    service = request.swagger_data.get('service')
+    instances = sorted(instance for _, instance in get_service_instance_list(
+        service, cluster=settings.cluster, soa_dir=settings.soa_dir))
+    return get_service_status(service, instances, request.marathon_state)
+
+
+@view_config(route_name='status', request_method='GET', renderer='json')
+def cluster_status(request):
+    """The statuses of the given services' instances, or of every service's
+    instances if none are given"""
+    services = request.swagger_data.get('services')
+    instances_by_service = defaultdict(list)
+    if services:
+        for service in services:
+            instances_by_service[service] = [instance for _, instance in get_service_instance_list(
+                service, cluster=settings.cluster, soa_dir=settings.soa_dir)]
+    else:
+        for service, instance in get_services_for_cluster(cluster=settings.cluster, soa_dir=settings.soa_dir):
+            instances_by_service[service].append(instance)
+
+    return {'services': [
+        get_service_status(service, sorted(instances), request.marathon_state)
+        for service, instances in sorted(instances_by_service.items())
+    ]}
+
+
 @view_config(route_name='service.instance.tasks.task', request_method='GET', renderer='json')
 def instance_task(request):
     status = instance_status(request)
@@ -128,14 +208,16 @@ def instance_task(request):
     except KeyError:
         raise ApiFailure("Only marathon tasks supported", 400)
     try:
-        task = get_task(task_id, app_id=mstatus['app_id'])
-    except TaskNotFound:
-        raise ApiFailure("Task with id {0} not found".format(task_id), 404)
+        tasks = [task for task in request.marathon_state.get_running_tasks(mstatus['app_id'])
+                 if filter_task_by_task_id(task, task_id)]
     except Exception:
         error_message = traceback.format_exc()
         raise ApiFailure(error_message, 500)
+    if not tasks:
+        raise ApiFailure("Task with id {0} not found".format(task_id), 404)
+    task = tasks[0]
     if verbose:
-        task = add_slave_info(task)
+        task = add_slave_info(copy_task(task))
         task = add_executor_info(task)
     return task._Task__items
 
@@ -149,13 +231,23 @@ def instance_tasks(request):
         mstatus = status['marathon']
     except KeyError:
         raise ApiFailure("Only marathon tasks supported", 400)
-    tasks = get_tasks_from_app_id(mstatus['app_id'], slave_hostname=slave_hostname)
+    tasks = request.marathon_state.get_running_tasks(mstatus['app_id'])
+    if slave_hostname:
+        tasks = [task for task in tasks if filter_task_by_hostname(task, slave_hostname)]
     if verbose:
-        tasks = [add_executor_info(task) for task in tasks]
+        tasks = [add_executor_info(copy_task(task)) for task in tasks]
         tasks = [add_slave_info(task) for task in tasks]
     return [task._Task__items for task in tasks]
 
 
+def copy_task(task):
+    """Returns a copy of a task from the shared MarathonState, which info can be
+    added to without the next request's tasks getting it too"""
+    task = copy.copy(task)
+    task._Task__items = task._Task__items.copy()
+    return task
+
+
 def add_executor_info(task):
     task._Task__items['executor'] = task.executor.copy()
     task._Task__items['executor'].pop('tasks', None)
@@ -0,0 +1,264 @@
+#!/usr/bin/env python
+# Copyright 2015-2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Usage: ./autoscale_backtest.py [options] TIMESERIES_CSV
+
+Replays a recorded utilization time series through the service autoscaler's
+decision policies without touching Marathon or Zookeeper, and reports how
+each policy would have scaled the service.
+
+The time series is a CSV file with a header and the columns
+``timestamp,utilization,instances``: a unix timestamp, the mean utilization
+the metrics provider reported (0 to 1) and the number of instances that were
+running when it was recorded. Each row is replayed as one autoscaler run.
+
+Recorded utilization only holds for the recorded instance count, so each row
+is first turned into a load (utilization * instances, i.e. the number of fully
+utilized instances' worth of work) and the simulated utilization is that load
+spread over the simulated instance count.
+"""
+import argparse
+import csv
+import logging
+import sys
+from math import ceil
+
+from paasta_tools.autoscaling.autoscaling_service_lib import AutoscalerState
+from paasta_tools.autoscaling.autoscaling_service_lib import DECISION_POLICY_KEY
+from paasta_tools.autoscaling.autoscaling_service_lib import get_decision_policy
+from paasta_tools.autoscaling.autoscaling_service_lib import get_decision_policy_names
+from paasta_tools.autoscaling.autoscaling_service_lib import get_error_from_utilization
+from paasta_tools.autoscaling.autoscaling_service_lib import SERVICE_METRICS_PROVIDER_KEY
+from paasta_tools.marathon_tools import load_marathon_service_config
+from paasta_tools.marathon_tools import MarathonServiceConfig
+from paasta_tools.utils import DEFAULT_SOA_DIR
+from paasta_tools.utils import load_system_paasta_config
+
+
+log = logging.getLogger(__name__)
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description='Replays recorded utilization through the service autoscaler decision policies')
+    parser.add_argument('timeseries', metavar='TIMESERIES_CSV',
+                        help="CSV file with timestamp,utilization,instances columns")
+    parser.add_argument('-s', '--service', help="Load autoscaling settings from this service's config")
+    parser.add_argument('-i', '--instance', help="Load autoscaling settings from this instance's config")
+    parser.add_argument('-c', '--cluster', help="Cluster to load the service config for. "
+                                                "Defaults to the local cluster")
+    parser.add_argument('-d', '--soa-dir', dest="soa_dir", metavar="SOA_DIR", default=DEFAULT_SOA_DIR,
+                        help="define a different soa config directory")
+    parser.add_argument('-p', '--decision-policy', dest='decision_policies', action='append',
+                        choices=get_decision_policy_names(),
+                        help="Decision policy to replay. May be given more than once to compare policies. "
+                             "Defaults to the policy in the service config, or pid")
+    parser.add_argument('--setpoint', type=float, help="Override the target utilization")
+    parser.add_argument('--min-instances', type=int, help="Override min_instances")
+    parser.add_argument('--max-instances', type=int, help="Override max_instances")
+    parser.add_argument('--initial-instances', type=int,
+                        help="Instance count to start the replay at. Defaults to the first recorded count")
+    parser.add_argument('--trajectory', action='store_true',
+                        help="Print the simulated instance count after every replayed run")
+    parser.add_argument('-v', '--verbose', action='store_true', help="Increase logging verboseness")
+    return parser.parse_args(argv)
+
+
+def read_timeseries(fd):
+    """Reads a recorded utilization time series.
+
+    :param fd: a file-like object containing a CSV with timestamp,utilization,instances columns
+    :returns: a list of (timestamp, load, recorded instances) tuples, sorted by timestamp
+    """
+    samples = []
+    for row in csv.DictReader(fd):
+        instances = int(row['instances'])
+        samples.append((float(row['timestamp']), float(row['utilization']) * instances, instances))
+    return sorted(samples)
+
+
+def build_service_config(args):
+    """Builds the MarathonServiceConfig whose autoscaling settings are replayed, applying
+    any command line overrides on top of the service's config (if one was given)."""
+    if args.service and args.instance:
+        cluster = args.cluster or load_system_paasta_config().get_cluster()
+        service_config = load_marathon_service_config(
+            service=args.service,
+            instance=args.instance,
+            cluster=cluster,
+            load_deployments=False,
+            soa_dir=args.soa_dir,
+        )
+        config_dict = dict(service_config.config_dict)
+    else:
+        config_dict = {}
+    config_dict['autoscaling'] = dict(config_dict.get('autoscaling', {}))
+    if args.setpoint is not None:
+        config_dict['autoscaling']['setpoint'] = args.setpoint
+    if args.min_instances is not None:
+        config_dict['min_instances'] = args.min_instances
+    if args.max_instances is not None:
+        config_dict['max_instances'] = args.max_instances
+    if not config_dict.get('max_instances'):
+        raise ValueError("No max_instances set. Pass --max-instances or an autoscaled --service/--instance")
+    return MarathonServiceConfig(
+        service=args.service or 'backtest',
+        cluster=args.cluster or 'backtest',
+        instance=args.instance or 'backtest',
+        config_dict=config_dict,
+        branch_dict={},
+    )
+
+
+def get_initial_instances(marathon_service_config, samples, initial_instances=None):
+    """Returns the instance count a replay starts at: initial_instances, or else the
+    first recorded count, within the config's limits"""
+    return marathon_service_config.limit_instance_count(initial_instances or samples[0][2])
+
+
+def backtest_decision_policy(marathon_service_config, samples, decision_policy=None, initial_instances=None):
+    """Replays a load time series through one decision policy, the same way
+    autoscale_marathon_instance would have handled it run by run. Policy state is kept
+    in an in-memory AutoscalerState instead of Zookeeper.
+
+    :param marathon_service_config: the MarathonServiceConfig holding the autoscaling settings
+    :param samples: a list of (timestamp, load, recorded instances) tuples, as returned by read_timeseries
+    :param decision_policy: the name of the decision policy to use. Defaults to the config's
+    :param initial_instances: the instance count to start at. Defaults to the first recorded count
+    :returns: a list of (timestamp, utilization, instances) tuples, one per replayed run, where
+              instances is the count the autoscaler picked in that run
+    """
+    autoscaling_params = marathon_service_config.get_autoscaling_params()
+    autoscaling_params.pop(SERVICE_METRICS_PROVIDER_KEY)
+    decision_policy = decision_policy or autoscaling_params[DECISION_POLICY_KEY]
+    autoscaling_params.pop(DECISION_POLICY_KEY)
+    autoscaling_decision_policy = get_decision_policy(decision_policy)
+    setpoint = autoscaling_params.pop('setpoint')
+
+    autoscaler_state = AutoscalerState(path=None)
+    current_instances = get_initial_instances(marathon_service_config, samples, initial_instances)
+    trajectory = []
+    for timestamp, load, _ in samples:
+        utilization = float(load) / current_instances
+        error = get_error_from_utilization(
+            utilization=utilization,
+            setpoint=setpoint,
+            current_instances=current_instances,
+        )
+        autoscaling_amount = autoscaling_decision_policy(
+            error=error,
+            min_instances=marathon_service_config.get_min_instances(),
+            max_instances=marathon_service_config.get_max_instances(),
+            current_instances=current_instances,
+            autoscaler_state=autoscaler_state,
+            current_time=timestamp,
+            **autoscaling_params
+        )
+        current_instances = marathon_service_config.limit_instance_count(current_instances + autoscaling_amount)
+        trajectory.append((timestamp, utilization, current_instances))
+    return trajectory
+
+
+def summarize_trajectory(samples, trajectory, setpoint, initial_instances):
+    """Scores a replayed trajectory.
+
+    The instance count picked in one run is held until the next sample. It is compared
+    against the ideal count for the next sample's load, which is the smallest count that
+    keeps utilization at or under the setpoint.
+
+    :param initial_instances: the instance count the replay started at, so that a
+                              change in the first run counts as a scaling event
+    :returns: a dict with the number of scaling events, the total number of instances
+              added and removed, the instance-seconds used, and the instance-seconds
+              spent over and under the ideal count
+    """
+    summary = {
+        'scaling_events': 0,
+        'instances_churned': 0,
+        'instance_seconds': 0.0,
+        'overprovisioned_instance_seconds': 0.0,
+        'underprovisioned_instance_seconds': 0.0,
+    }
+    previous_instances = initial_instances
+    for i, (timestamp, _, instances) in enumerate(trajectory):
+        if instances != previous_instances:
+            summary['scaling_events'] += 1
+            summary['instances_churned'] += abs(instances - previous_instances)
+        previous_instances = instances
+
+        if i + 1 >= len(samples):
+            break
+        next_timestamp, next_load, _ = samples[i + 1]
+        duration = next_timestamp - timestamp
+        ideal_instances = max(1, int(ceil(next_load / setpoint)))
+        summary['instance_seconds'] += instances * duration
+        if instances > ideal_instances:
+            summary['overprovisioned_instance_seconds'] += (instances - ideal_instances) * duration
+        else:
+            summary['underprovisioned_instance_seconds'] += (ideal_instances - instances) * duration
+    return summary
+
+
+def format_summary(decision_policy, summary):
+    return '\n'.join([
+        "%s:" % decision_policy,
+        "  scaling events: %d (%d instances added or removed)" % (
+            summary['scaling_events'], summary['instances_churned']),
+        "  instance hours: %.1f" % (summary['instance_seconds'] / 3600),
+        "  overprovisioned instance hours: %.1f" % (summary['overprovisioned_instance_seconds'] / 3600),
+        "  underprovisioned instance hours: %.1f" % (summary['underprovisioned_instance_seconds'] / 3600),
+    ])
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.verbose:
+        logging.basicConfig(level=logging.DEBUG)
+    else:
+        logging.basicConfig(level=logging.WARNING)
+
+    marathon_service_config = build_service_config(args)
+    with open(args.timeseries) as fd:
+        samples = read_timeseries(fd)
+    if not samples:
+        print("No samples found in %s" % args.timeseries)
+        sys.exit(1)
+
+    setpoint = marathon_service_config.get_autoscaling_params()['setpoint']
+    decision_policies = args.decision_policies or [
+        marathon_service_config.get_autoscaling_params()[DECISION_POLICY_KEY]]
+    for decision_policy in decision_policies:
+        if decision_policy not in get_decision_policy_names():
+            # Like bespoke, which the service does itself
+            print("Can't replay the %s decision policy. Pass --decision-policy with one of %s" % (
+                decision_policy, ', '.join(get_decision_policy_names())))
+            sys.exit(1)
+    initial_instances = get_initial_instances(marathon_service_config, samples, args.initial_instances)
+    for decision_policy in decision_policies:
+        trajectory = backtest_decision_policy(
+            marathon_service_config=marathon_service_config,
+            samples=samples,
+            decision_policy=decision_policy,
+            initial_instances=initial_instances,
+        )
+        if args.trajectory:
+            print("%s trajectory (timestamp,utilization,instances):" % decision_policy)
+            for timestamp, utilization, instances in trajectory:
+                print("%d,%.3f,%d" % (timestamp, utilization, instances))
+        print(format_summary(decision_policy, summarize_trajectory(samples, trajectory, setpoint, initial_instances)))
+
+
+if __name__ == '__main__':
+    main()
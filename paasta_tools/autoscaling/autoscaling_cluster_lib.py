@@ -28,7 +28,7 @@ from paasta_tools.mesos_maintenance import undrain
 from paasta_tools.mesos_tools import get_mesos_master
 from paasta_tools.mesos_tools import get_mesos_task_count_by_slave
 from paasta_tools.mesos_tools import slave_pid_to_ip
-from paasta_tools.paasta_maintenance import is_safe_to_kill
+from paasta_tools.paasta_maintenance import get_hosts_safe_to_kill
 from paasta_tools.paasta_metastatus import get_resource_utilization_by_grouping
 from paasta_tools.utils import load_system_paasta_config
 from paasta_tools.utils import Timeout
@@ -38,6 +38,8 @@ from paasta_tools.utils import TimeoutError
 CLUSTER_METRICS_PROVIDER_KEY = 'cluster_metrics_provider'
 DEFAULT_TARGET_UTILIZATION = 0.8  # decimal fraction
 DEFAULT_DRAIN_TIMEOUT = 600  # seconds
+DEFAULT_MAX_CONCURRENT_DRAINS = 10
+DRAIN_POLL_INTERVAL = 5  # seconds
 SCALER_KEY = 'scaler'
 
 AWS_SPOT_MODIFY_TIMEOUT = 30
@@ -203,50 +205,71 @@ def get_spot_fleet_delta(resource, error):
     return current_capacity, new_capacity
 
 
-def wait_and_terminate(slave, drain_timeout, dry_run, region=None):
-    """Waits for slave to be drained and then terminate
+def terminate_slave(ec2_client, slave, dry_run):
+    """Terminates the instance backing a slave
 
+    :param ec2_client: boto3 ec2 client
     :param slave: dict of slave to kill
-    :param dry_run: Don't drain or make changes to spot fleet if True"""
-    ec2_client = boto3.client('ec2', region_name=region)
+    :param dry_run: Don't make changes to spot fleet if True"""
+    log.info("TERMINATING: {0} (Hostname = {1}, IP = {2})".format(
+        slave['instance_id'],
+        slave['hostname'],
+        slave['ip'],
+    ))
     try:
-        # This loop should always finish because the maintenance window should trigger is_ready_to_kill
-        # being true. Just in case though we set a timeout and terminate anyway
-        with Timeout(seconds=drain_timeout + 300):
-            while True:
-                instance_id = slave['instance_id']
-                if not instance_id:
-                    log.warning("Didn't find instance ID for slave: {0}. Skipping terminating".format(slave['pid']))
-                    continue
-                # Check if no tasks are running or we have reached the maintenance window
-                if is_safe_to_kill(slave['hostname']) or dry_run:
-                    log.info("TERMINATING: {0} (Hostname = {1}, IP = {2})".format(
-                        instance_id,
-                        slave['hostname'],
-                        slave['ip'],
-                    ))
-                    try:
-                        ec2_client.terminate_instances(InstanceIds=[instance_id], DryRun=dry_run)
-                    except ClientError as e:
-                        if e.response['Error'].get('Code') == 'DryRunOperation':
-                            pass
-                        else:
-                            raise
-                    break
-                else:
-                    log.info("Instance {0}: NOT ready to kill".format(instance_id))
-                log.debug("Waiting 5 seconds and then checking again")
-                time.sleep(5)
-    except TimeoutError:
-        log.error("Timed out after {0} waiting to drain {1}, now terminating anyway".format(drain_timeout,
-                                                                                            slave['pid']))
-        try:
-            ec2_client.terminate_instances(InstanceIds=instance_id, DryRun=dry_run)
-        except ClientError as e:
-            if e.response['Error'].get('Code') == 'DryRunOperation':
-                pass
-            else:
-                raise
+        ec2_client.terminate_instances(InstanceIds=[slave['instance_id']], DryRun=dry_run)
+    except ClientError as e:
+        if e.response['Error'].get('Code') == 'DryRunOperation':
+            pass
+        else:
+            raise
+
+
+def wait_and_terminate(slaves, drain_timeout, dry_run, region=None):
+    """Waits for a batch of draining slaves to be safe to kill and terminates
+    each one as soon as it is. All of the slaves are checked together in one
+    poll every DRAIN_POLL_INTERVAL seconds.
+
+    :param slaves: list of dicts of slaves to kill
+    :param drain_timeout: seconds to wait for the slaves to drain. Once this
+                          (plus a grace period) has passed we terminate anyway
+    :param dry_run: Don't drain or make changes to spot fleet if True
+    :returns: list of the slaves we failed to terminate"""
+    ec2_client = boto3.client('ec2', region_name=region)
+    failed_slaves = []
+    pending_slaves = {}
+    for slave in slaves:
+        if not slave['instance_id']:
+            log.warning("Didn't find instance ID for slave: {0}. Skipping terminating".format(slave['pid']))
+            failed_slaves.append(slave)
+        else:
+            pending_slaves[slave['hostname']] = slave
+
+    # This loop should always finish because the maintenance window should make the slaves
+    # safe to kill. Just in case though we set a deadline and terminate anyway
+    deadline = time.time() + drain_timeout + 300
+    while pending_slaves:
+        if dry_run:
+            ready_hostnames = set(pending_slaves)
+        elif time.time() > deadline:
+            log.error("Timed out after {0} waiting to drain {1}, now terminating anyway".format(
+                drain_timeout, [pending['pid'] for pending in pending_slaves.values()]))
+            ready_hostnames = set(pending_slaves)
+        else:
+            ready_hostnames = get_hosts_safe_to_kill(pending_slaves.keys())
+        for hostname in sorted(ready_hostnames):
+            slave = pending_slaves.pop(hostname)
+            try:
+                terminate_slave(ec2_client, slave, dry_run)
+            except ClientError as e:
+                log.error("Failure when terminating: {0}: {1}".format(slave['pid'], e))
+                failed_slaves.append(slave)
+        if pending_slaves:
+            log.info("Instances {0}: NOT ready to kill".format(
+                [pending['instance_id'] for pending in pending_slaves.values()]))
+            log.debug("Waiting {0} seconds and then checking again".format(DRAIN_POLL_INTERVAL))
+            time.sleep(DRAIN_POLL_INTERVAL)
+    return failed_slaves
 
 
 def sort_slaves_to_kill(slaves):
@@ -371,7 +394,21 @@ def scale_aws_spot_fleet_request(resource, current_capacity, target_capacity, po
                                      dry_run=dry_run)
 
 
-def gracefully_terminate_slave(resource, slave_to_kill, pool_settings, current_capacity, new_capacity, dry_run):
+def get_drain_host_string(slave):
+    return "{0}|{1}".format(slave['hostname'], slave['ip'])
+
+
+def gracefully_terminate_slaves(resource, slaves_to_kill, pool_settings, current_capacity, dry_run):
+    """Drains a batch of slaves at once, lowers the spot fleet capacity by their
+    combined weight and terminates each slave as soon as it has drained. If a
+    slave fails to terminate, its weight is added back to the spot fleet capacity.
+
+    :param resource: resource to scale
+    :param slaves_to_kill: list of slave dicts to kill, in order of preference
+    :param pool_settings: pool settings dict with timeout settings
+    :param current_capacity: current SFR capacity
+    :param dry_run: Don't drain or make changes to spot fleet if True
+    :returns: the SFR capacity once the batch has been handled"""
     sfr_id = resource['id']
     drain_timeout = pool_settings.get('drain_timeout', DEFAULT_DRAIN_TIMEOUT)
     # The start time of the maintenance window is the point at which
@@ -380,71 +417,81 @@ def gracefully_terminate_slave(resource, slave_to_kill, pool_settings, current_c
     # Set the duration to an hour, this is fairly arbitrary as mesos doesn't actually
     # do anything at the end of the maintenance window.
     duration = 600 * 1000000000  # nanoseconds
-    log.info("Draining {0}".format(slave_to_kill['pid']))
-    if not dry_run:
-        try:
-            drain_host_string = "{0}|{1}".format(slave_to_kill['hostname'], slave_to_kill['ip'])
-            drain([drain_host_string], start, duration)
-        except HTTPError as e:
-            log.error("Failed to start drain "
-                      "on {0}: {1}\n Trying next host".format(slave_to_kill['hostname'], e))
-            raise
+    draining_slaves = []
+    for slave in slaves_to_kill:
+        log.info("Draining {0}".format(slave['pid']))
+        if not dry_run:
+            try:
+                drain([get_drain_host_string(slave)], start, duration)
+            except HTTPError as e:
+                log.error("Failed to start drain "
+                          "on {0}: {1}\n Trying next host".format(slave['hostname'], e))
+                continue
+        draining_slaves.append(slave)
+    if not draining_slaves:
+        return current_capacity
+
+    new_capacity = current_capacity - sum(slave['instance_weight'] for slave in draining_slaves)
     log.info("Decreasing spot fleet capacity from {0} to: {1}".format(current_capacity, new_capacity))
     # Instance weights can be floats but the target has to be an integer
     # because this is all AWS allows on the API call to set target capacity
-    new_capacity = int(floor(new_capacity))
     try:
-        set_spot_fleet_request_capacity(sfr_id, new_capacity, dry_run, region=resource['region'])
+        set_spot_fleet_request_capacity(sfr_id, int(floor(new_capacity)), dry_run, region=resource['region'])
     except FailSetSpotCapacity:
         log.error("Couldn't update spot fleet, stopping autoscaler")
-        log.info("Undraining {0}".format(slave_to_kill['pid']))
+        log.info("Undraining {0}".format([slave['pid'] for slave in draining_slaves]))
         if not dry_run:
-            undrain([drain_host_string])
+            undrain([get_drain_host_string(slave) for slave in draining_slaves])
         raise
-    log.info("Waiting for instance to drain before we terminate")
+    log.info("Waiting for instances to drain before we terminate")
     try:
-        wait_and_terminate(slave_to_kill, drain_timeout, dry_run, region=resource['region'])
-    except ClientError as e:
-        log.error("Failure when terminating: {0}: {1}".format(slave_to_kill['pid'], e))
-        log.error("Setting spot fleet capacity back to {0}".format(current_capacity))
-        set_spot_fleet_request_capacity(sfr_id, current_capacity, dry_run, region=resource['region'])
+        failed_slaves = wait_and_terminate(draining_slaves, drain_timeout, dry_run, region=resource['region'])
+        if failed_slaves:
+            new_capacity += sum(slave['instance_weight'] for slave in failed_slaves)
+            log.error("Setting spot fleet capacity back to {0}".format(new_capacity))
+            set_spot_fleet_request_capacity(sfr_id, int(floor(new_capacity)), dry_run, region=resource['region'])
     finally:
-        log.info("Undraining {0}".format(slave_to_kill['pid']))
+        log.info("Undraining {0}".format([slave['pid'] for slave in draining_slaves]))
         if not dry_run:
-            undrain([drain_host_string])
+            undrain([get_drain_host_string(slave) for slave in draining_slaves])
+    return new_capacity
 
 
 def downscale_spot_fleet_request(resource, filtered_slaves, current_capacity, target_capacity, pool_settings, dry_run):
+    max_concurrent_drains = pool_settings.get('max_concurrent_drains', DEFAULT_MAX_CONCURRENT_DRAINS)
     while True:
         filtered_sorted_slaves = sort_slaves_to_kill(filtered_slaves)
         if len(filtered_sorted_slaves) == 0:
             break
         log.info("SFR slave kill preference: {0}".format([slave['hostname'] for slave in filtered_sorted_slaves]))
-        filtered_sorted_slaves.reverse()
-        slave_to_kill = filtered_sorted_slaves.pop()
-        instance_capacity = slave_to_kill['instance_weight']
-        new_capacity = current_capacity - instance_capacity
-        if new_capacity < target_capacity:
-            log.info("Terminating instance {0} with weight {1} would take us below our target of {2}, so this is as"
-                     " close to our target as we can get".format(slave_to_kill['instance_id'],
-                                                                 slave_to_kill['instance_weight'],
-                                                                 target_capacity))
+        slaves_to_kill = []
+        new_capacity = current_capacity
+        for slave in filtered_sorted_slaves:
+            if len(slaves_to_kill) >= max_concurrent_drains:
+                break
+            if new_capacity - slave['instance_weight'] < target_capacity:
+                log.info("Terminating instance {0} with weight {1} would take us below our target of {2}, so this is"
+                         " as close to our target as we can get".format(slave['instance_id'],
+                                                                        slave['instance_weight'],
+                                                                        target_capacity))
+                break
+            slaves_to_kill.append(slave)
+            new_capacity -= slave['instance_weight']
+        if not slaves_to_kill:
             break
         try:
-            gracefully_terminate_slave(resource=resource,
-                                       slave_to_kill=slave_to_kill,
-                                       pool_settings=pool_settings,
-                                       current_capacity=current_capacity,
-                                       new_capacity=new_capacity,
-                                       dry_run=dry_run)
-        except HTTPError:
-            # Something wrong draining host so try next host
-            continue
+            current_capacity = gracefully_terminate_slaves(resource=resource,
+                                                           slaves_to_kill=slaves_to_kill,
+                                                           pool_settings=pool_settings,
+                                                           current_capacity=current_capacity,
+                                                           dry_run=dry_run)
         except FailSetSpotCapacity:
             break
-        current_capacity = new_capacity
+        remaining_slaves = filtered_sorted_slaves[len(slaves_to_kill):]
+        if not remaining_slaves:
+            break
         mesos_state = get_mesos_master().state_summary()
-        filtered_slaves = get_mesos_task_count_by_slave(mesos_state, slaves_list=filtered_sorted_slaves)
+        filtered_slaves = get_mesos_task_count_by_slave(mesos_state, slaves_list=remaining_slaves)
 
 
 class ClusterAutoscalingError(Exception):
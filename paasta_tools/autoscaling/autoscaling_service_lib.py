@@ -12,6 +12,7 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import json
 import logging
 from contextlib import contextmanager
 from datetime import datetime
@@ -20,6 +21,7 @@ from math import floor
 
 import requests
 from kazoo.client import KazooClient
+from kazoo.exceptions import KazooException
 from kazoo.exceptions import NoNodeError
 
 from paasta_tools.autoscaling.utils import _autoscaling_components
@@ -52,6 +54,13 @@ DECISION_POLICY_KEY = 'decision_policy'
 
 AUTOSCALING_DELAY = 300
 
+AUTOSCALER_STATE_NODE = 'autoscaler_state'
+# Bound each multi-op request. Zookeeper drops the connection of a client whose
+# request is larger than jute.maxbuffer (1MB by default), so the bytes written
+# in one transaction are capped too, not just the number of states.
+ZK_TRANSACTION_MAX_OPS = 100
+ZK_TRANSACTION_MAX_BYTES = 512 * 1024
+
 log = logging.getLogger(__name__)
 log.addHandler(logging.NullHandler())
 
@@ -75,6 +84,11 @@ def get_decision_policy(name):
     return _autoscaling_components[DECISION_POLICY_KEY][name]
 
 
+def get_decision_policy_names():
+    """Returns the names of the decision policies there are, sorted"""
+    return sorted(_autoscaling_components[DECISION_POLICY_KEY])
+
+
 class MetricsProviderNoDataError(ValueError):
     pass
 
@@ -95,12 +109,17 @@ def threshold_decision_policy(current_instances, error, **kwargs):
 
 
 @register_autoscaling_component('pid', DECISION_POLICY_KEY)
-def pid_decision_policy(zookeeper_path, current_instances, min_instances, max_instances, error, **kwargs):
+def pid_decision_policy(autoscaler_state, current_instances, min_instances, max_instances, error,
+                        current_time=None, **kwargs):
     """
     Uses a PID to determine when to autoscale a service.
     See https://en.wikipedia.org/wiki/PID_controller for more information on PIDs.
     Kp, Ki and Kd are the canonical PID constants, where the output of the PID is:
     Kp * error + Ki * integral(error * dt) + Kd * (d(error) / dt)
+
+    The integral term, last error and last time are kept in (and updated in place on)
+    the service instance's AutoscalerState. current_time defaults to now and is only
+    passed explicitly when replaying recorded data (see autoscale_backtest).
     """
     min_delta = min_instances - current_instances
     max_delta = max_instances - current_instances
@@ -112,41 +131,21 @@ def pid_decision_policy(zookeeper_path, current_instances, min_instances, max_in
     Ki = 4 / AUTOSCALING_DELAY
     Kd = 1 * AUTOSCALING_DELAY
 
-    zk_iterm_path = '%s/pid_iterm' % zookeeper_path
-    zk_last_error_path = '%s/pid_last_error' % zookeeper_path
-    zk_last_time_path = '%s/pid_last_time' % zookeeper_path
-
-    with ZookeeperPool() as zk:
-        try:
-            iterm, _ = zk.get(zk_iterm_path)
-            last_error, _ = zk.get(zk_last_error_path)
-            last_time, _ = zk.get(zk_last_time_path)
-            iterm = float(iterm)
-            last_error = float(last_error)
-            last_time = float(last_time)
-        except NoNodeError:
-            iterm = 0.0
-            last_error = 0.0
-            last_time = 0.0
+    iterm = float(autoscaler_state.get('pid_iterm', 0.0))
+    last_error = float(autoscaler_state.get('pid_last_error', 0.0))
+    last_time = float(autoscaler_state.get('pid_last_time', 0.0))
 
-    with ZookeeperPool() as zk:
-        zk.ensure_path(zk_iterm_path)
-        zk.ensure_path(zk_last_error_path)
-        zk.set(zk_iterm_path, str(iterm))
-        zk.set(zk_last_error_path, str(error))
-
-    current_time = int(datetime.now().strftime('%s'))
+    if current_time is None:
+        current_time = int(datetime.now().strftime('%s'))
     time_delta = current_time - last_time
 
     iterm = clamp_value(iterm + (Ki * error) * time_delta)
 
-    with ZookeeperPool() as zk:
-        zk.ensure_path(zk_iterm_path)
-        zk.ensure_path(zk_last_error_path)
-        zk.ensure_path(zk_last_time_path)
-        zk.set(zk_iterm_path, str(iterm))
-        zk.set(zk_last_error_path, str(error))
-        zk.set(zk_last_time_path, str(current_time))
+    autoscaler_state.update(
+        pid_iterm=iterm,
+        pid_last_error=error,
+        pid_last_time=current_time,
+    )
 
     return int(round(clamp_value(Kp * error + iterm + Kd * (error - last_error) / time_delta)))
 
@@ -237,33 +236,21 @@ def http_metrics_provider(marathon_service_config, marathon_tasks, endpoint='sta
 
 
 @register_autoscaling_component('mesos_cpu', SERVICE_METRICS_PROVIDER_KEY)
-def mesos_cpu_metrics_provider(marathon_service_config, marathon_tasks, mesos_tasks, **kwargs):
+def mesos_cpu_metrics_provider(marathon_service_config, marathon_tasks, mesos_tasks, autoscaler_state, **kwargs):
     """
     Gets the mean cpu utilization of a service across all of its tasks.
 
     :param marathon_service_config: the MarathonServiceConfig to get data from
     :param marathon_tasks: Marathon tasks to get data from
     :param mesos_tasks: Mesos tasks to get data from
+    :param autoscaler_state: the service instance's AutoscalerState, which holds the
+                             previous run's cpu samples and is updated in place
 
     :returns: the service's mean utilization, from 0 to 1
     """
 
-    autoscaling_root = compose_autoscaling_zookeeper_root(
-        service=marathon_service_config.service,
-        instance=marathon_service_config.instance,
-    )
-    zk_last_time_path = '%s/cpu_last_time' % autoscaling_root
-    zk_last_cpu_data = '%s/cpu_data' % autoscaling_root
-
-    with ZookeeperPool() as zk:
-        try:
-            last_time, _ = zk.get(zk_last_time_path)
-            last_cpu_data, _ = zk.get(zk_last_cpu_data)
-            last_time = float(last_time)
-            last_cpu_data = (datum for datum in last_cpu_data.split(',') if datum)
-        except NoNodeError:
-            last_time = 0.0
-            last_cpu_data = []
+    last_time = float(autoscaler_state.get('cpu_last_time', 0.0))
+    last_cpu_data = autoscaler_state.get('cpu_data', {})
 
     mesos_tasks = {task['id']: task.stats for task in mesos_tasks}
     current_time = int(datetime.now().strftime('%s'))
@@ -275,17 +262,13 @@ def mesos_cpu_metrics_provider(marathon_service_config, marathon_tasks, mesos_ta
     if not mesos_cpu_data:
         raise MetricsProviderNoDataError("Couldn't get any cpu data from Mesos")
 
-    cpu_data_csv = ','.join('%s:%s' % (cpu_seconds, task_id) for task_id, cpu_seconds in mesos_cpu_data.items())
-
-    with ZookeeperPool() as zk:
-        zk.ensure_path(zk_last_cpu_data)
-        zk.ensure_path(zk_last_time_path)
-        zk.set(zk_last_cpu_data, str(cpu_data_csv))
-        zk.set(zk_last_time_path, str(current_time))
+    autoscaler_state.update(
+        cpu_data=mesos_cpu_data,
+        cpu_last_time=current_time,
+    )
 
     utilization = {}
-    for datum in last_cpu_data:
-        last_cpu_seconds, task_id = datum.split(':')
+    for task_id, last_cpu_seconds in last_cpu_data.items():
         if task_id in mesos_cpu_data:
             utilization[task_id] = (mesos_cpu_data[task_id] - float(last_cpu_seconds)) / time_delta
 
@@ -315,7 +298,7 @@ def get_error_from_utilization(utilization, setpoint, current_instances):
         return 0.0
 
 
-def autoscale_marathon_instance(marathon_service_config, marathon_tasks, mesos_tasks):
+def autoscale_marathon_instance(marathon_service_config, marathon_tasks, mesos_tasks, autoscaler_state):
     current_instances = marathon_service_config.get_instances()
     if len(marathon_tasks) != current_instances:
         write_to_log(config=marathon_service_config,
@@ -326,23 +309,19 @@ def autoscale_marathon_instance(marathon_service_config, marathon_tasks, mesos_t
     autoscaling_decision_policy = get_decision_policy(autoscaling_params.pop(DECISION_POLICY_KEY))
 
     utilization = autoscaling_metrics_provider(marathon_service_config, marathon_tasks,
-                                               mesos_tasks, **autoscaling_params)
+                                               mesos_tasks, autoscaler_state=autoscaler_state, **autoscaling_params)
     error = get_error_from_utilization(
         utilization=utilization,
         setpoint=autoscaling_params.pop('setpoint'),
         current_instances=current_instances,
     )
 
-    zookeeper_path = compose_autoscaling_zookeeper_root(
-        service=marathon_service_config.service,
-        instance=marathon_service_config.instance,
-    )
     autoscaling_amount = autoscaling_decision_policy(
         error=error,
         min_instances=marathon_service_config.get_min_instances(),
         max_instances=marathon_service_config.get_max_instances(),
         current_instances=current_instances,
-        zookeeper_path=zookeeper_path,
+        autoscaler_state=autoscaler_state,
         **autoscaling_params
     )
 
@@ -402,6 +381,149 @@ def get_configs_of_services_to_scale(cluster, soa_dir=DEFAULT_SOA_DIR):
     return configs
 
 
+class AutoscalerState(dict):
+    """The state the autoscaler keeps between runs for one service instance (PID terms,
+    cpu samples, ...). It is stored as a single compact JSON znode so that the state of
+    every autoscaled service instance can be read in bulk and written back in batches."""
+
+    def __init__(self, path, data=None, exists=False):
+        super(AutoscalerState, self).__init__(data or {})
+        self.path = path
+        self.exists = exists
+        # What the znode holds, so that states which didn't change aren't written back
+        self.saved_data = self.serialize() if exists else None
+
+    def serialize(self):
+        return json.dumps(self, separators=(',', ':'), sort_keys=True)
+
+
+def get_autoscaler_state_path(service, instance):
+    return '%s/%s' % (compose_autoscaling_zookeeper_root(service, instance), AUTOSCALER_STATE_NODE)
+
+
+def load_autoscaler_states(configs):
+    """Reads the AutoscalerState of every given service instance. The reads are
+    issued asynchronously so they are pipelined over a single zookeeper connection.
+
+    :param configs: a list of MarathonServiceConfigs
+    :returns: a dict of (service, instance) to AutoscalerState
+    """
+    with ZookeeperPool() as zk:
+        pending = []
+        for config in configs:
+            path = get_autoscaler_state_path(config.service, config.instance)
+            pending.append(((config.service, config.instance), path, zk.get_async(path)))
+
+        states = {}
+        for key, path, async_result in pending:
+            try:
+                data, _ = async_result.get()
+            except NoNodeError:
+                states[key] = AutoscalerState(path)
+                continue
+            try:
+                states[key] = AutoscalerState(path, json.loads(data), exists=True)
+            except ValueError:
+                log.warning("Ignoring unparseable autoscaler state at %s" % path)
+                states[key] = AutoscalerState(path, exists=True)
+    return states
+
+
+def batch_autoscaler_state_writes(writes):
+    """Splits (AutoscalerState, serialized data) pairs into batches of at most
+    ZK_TRANSACTION_MAX_OPS states and ZK_TRANSACTION_MAX_BYTES bytes. A state
+    bigger than ZK_TRANSACTION_MAX_BYTES gets a batch of its own."""
+    batch = []
+    batch_bytes = 0
+    for state, data in writes:
+        write_bytes = len(state.path) + len(data)
+        if batch and (len(batch) == ZK_TRANSACTION_MAX_OPS or batch_bytes + write_bytes > ZK_TRANSACTION_MAX_BYTES):
+            yield batch
+            batch = []
+            batch_bytes = 0
+        batch.append((state, data))
+        batch_bytes += write_bytes
+    if batch:
+        yield batch
+
+
+def save_autoscaler_states(states):
+    """Writes back the AutoscalerStates that changed since they were loaded, using
+    zookeeper multi-op transactions so that each round trip commits a batch of
+    states. If a transaction fails, the states in it are written one at a time
+    instead.
+
+    :param states: a list of AutoscalerStates
+    """
+    writes = [(state, state.serialize()) for state in states]
+    writes = [(state, data) for state, data in writes if data != state.saved_data]
+    with ZookeeperPool() as zk:
+        for state, _ in writes:
+            if not state.exists:
+                zk.ensure_path(state.path.rsplit('/', 1)[0])
+
+        for batch in batch_autoscaler_state_writes(writes):
+            transaction = zk.transaction()
+            for state, data in batch:
+                if state.exists:
+                    transaction.set_data(state.path, data)
+                else:
+                    transaction.create(state.path, data)
+            try:
+                results = transaction.commit()
+            except KazooException as e:
+                log.warning("Autoscaler state transaction failed (%s), "
+                            "falling back to writing states one at a time" % e)
+            else:
+                if not any(isinstance(result, Exception) for result in results):
+                    for state, data in batch:
+                        state.exists = True
+                        state.saved_data = data
+                    continue
+                log.warning("Autoscaler state transaction failed, falling back to writing states one at a time")
+
+            for state, data in batch:
+                try:
+                    zk.ensure_path(state.path)
+                    zk.set(state.path, data)
+                except KazooException as e:
+                    log.error("Couldn't save autoscaler state to %s: %s" % (state.path, e))
+                    continue
+                state.exists = True
+                state.saved_data = data
+
+
+def get_autoscaling_task_indexes(marathon_client, all_marathon_tasks, all_mesos_tasks):
+    """Indexes the cluster's tasks by short job id in one pass so that each autoscaled
+    config can look up its tasks without scanning every task in the cluster.
+
+    Only healthy marathon tasks are indexed. We assume tasks with no healthcheck defined
+    are healthy and tasks with a defined healthcheck but no results to be unhealthy.
+    Healthcheck definitions come from a single list_apps call rather than one get_app
+    call per unhealthy task.
+
+    :param marathon_client: the marathon client to fetch app definitions with
+    :param all_marathon_tasks: every marathon task in the cluster
+    :param all_mesos_tasks: every running mesos task in the cluster
+    :returns: a tuple of (dict of job id to a dict of task id to healthy marathon task,
+              dict of job id to the list of mesos tasks backing those marathon tasks)
+    """
+    apps_with_healthchecks = {app.id for app in marathon_client.list_apps() if app.health_checks}
+
+    marathon_tasks_by_job_id = {}
+    for task in all_marathon_tasks:
+        if is_task_healthy(task) or task.app_id not in apps_with_healthchecks:
+            marathon_tasks_by_job_id.setdefault(get_short_job_id(task.id), {})[task.id] = task
+
+    mesos_tasks_by_job_id = {}
+    for task in all_mesos_tasks:
+        job_id = get_short_job_id(task['id'])
+        if task['id'] in marathon_tasks_by_job_id.get(job_id, {}):
+            mesos_tasks_by_job_id.setdefault(job_id, []).append(task)
+
+    return marathon_tasks_by_job_id, mesos_tasks_by_job_id
+
+
 @use_requests_cache('service_autoscaler')
 def autoscale_services(soa_dir=DEFAULT_SOA_DIR):
     try:
@@ -416,24 +538,29 @@ def autoscale_services(soa_dir=DEFAULT_SOA_DIR):
                     passwd=marathon_config.get_password())
                 all_marathon_tasks = marathon_client.list_tasks()
                 all_mesos_tasks = get_running_tasks_from_active_frameworks('')  # empty string matches all app ids
+                marathon_tasks_by_job_id, mesos_tasks_by_job_id = get_autoscaling_task_indexes(
+                    marathon_client=marathon_client,
+                    all_marathon_tasks=all_marathon_tasks,
+                    all_mesos_tasks=all_mesos_tasks,
+                )
                 with ZookeeperPool():
+                    autoscaler_states = load_autoscaler_states(configs)
                     for config in configs:
                         try:
                             job_id = format_job_id(config.service, config.instance)
-                            # Get a dict of healthy tasks, we assume tasks with no healthcheck defined
-                            # are healthy. We assume tasks with no healthcheck results but a defined
-                            # healthcheck to be unhealthy.
                             log.info("Inspecting %s for autoscaling" % job_id)
-                            marathon_tasks = {task.id: task for task in all_marathon_tasks
-                                              if job_id == get_short_job_id(task.id) and
-                                              (is_task_healthy(task) or not
-                                               marathon_client.get_app(task.app_id).health_checks)}
+                            marathon_tasks = marathon_tasks_by_job_id.get(job_id)
                             if not marathon_tasks:
                                 raise MetricsProviderNoDataError("Couldn't find any healthy marathon tasks")
-                            mesos_tasks = [task for task in all_mesos_tasks if task['id'] in marathon_tasks]
-                            autoscale_marathon_instance(config, list(marathon_tasks.values()), mesos_tasks)
+                            mesos_tasks = mesos_tasks_by_job_id.get(job_id, [])
+                            autoscale_marathon_instance(config, list(marathon_tasks.values()), mesos_tasks,
+                                                        autoscaler_states[(config.service, config.instance)])
                         except Exception as e:
                             write_to_log(config=config, line='Caught Exception %s' % e)
+                    try:
+                        save_autoscaler_states([state for state in autoscaler_states.values() if state])
+                    except KazooException as e:
+                        log.error("Couldn't save autoscaler states: %s" % e)
     except LockHeldException:
         log.warning("Skipping autoscaling run for services because the lock is held")
         pass
@@ -97,21 +97,17 @@ def build_service_job_mapping(client, configured_jobs):
         where the chronos job is any with a matching (service, instance) in its
         name and disabled == False
     """
+    # fetch and index all the jobs once, rather than listing every job in
+    # chronos for each configured job
+    jobs_by_service_instance = chronos_tools.lookup_chronos_jobs_by_service_instance(
+        client=client,
+        include_disabled=True,
+    )
     service_job_mapping = {}
     for job in configured_jobs:
-        # find all the jobs belonging to each service
-        matching_jobs = chronos_tools.lookup_chronos_jobs(
-            service=job[0],
-            instance=job[1],
-            client=client,
-            include_disabled=True,
-        )
-        matching_jobs = chronos_tools.sort_jobs(matching_jobs)
+        matching_jobs = chronos_tools.sort_jobs(jobs_by_service_instance.get(tuple(job), []))
         # Only consider the most recent one
-        if len(matching_jobs) > 0:
-            matching_jobs = [matching_jobs[0]]
-        with_states = last_run_state_for_jobs(matching_jobs)
-        service_job_mapping[job] = with_states
+        service_job_mapping[job] = last_run_state_for_jobs(matching_jobs[:1])
     return service_job_mapping
 
 
@@ -163,6 +163,12 @@ def _format_parents_summary(parents):
     return " %s" % ",".join(parents)
 
 
+def _format_dependents(dependents):
+    if not dependents:
+        return none_formatter()
+    return " %s" % ",".join(dependents)
+
+
 def _format_parents_verbose(job):
     parents = job.get('parents', [])
     # create (service,instance) pairs for the parent names
@@ -258,7 +264,7 @@ def modify_string_for_rerun_status(string, launched_by_rerun):
         return string
 
 
-def format_chronos_job_status(client, job, running_tasks, verbose=0):
+def format_chronos_job_status(client, job, running_tasks, verbose=0, scheduler_graph=None):
     """Given a job, returns a pretty-printed human readable output regarding
     the status of the job.
 
@@ -266,13 +272,19 @@ def format_chronos_job_status(client, job, running_tasks, verbose=0):
     :param running_tasks: a list of Mesos tasks associated with ``job``, e.g. the
                           result of ``mesos_tools.get_running_tasks_from_active_frameworks()``.
     :param verbose: int verbosity level
+    :param scheduler_graph: a ChronosSchedulerGraph to look the job's state up in.
+                            It is fetched from Chronos if not given.
     """
     job_name = _format_job_name(job)
     is_temporary = chronos_tools.is_temporary_job(job) if 'name' in job else 'UNKNOWN'
     job_name = modify_string_for_rerun_status(job_name, is_temporary)
     disabled_state = _format_disabled_status(job)
     service, instance = chronos_tools.decompose_job_id(job['name'])
-    chronos_state = chronos_tools.get_chronos_status_for_job(client, service, instance)
+    if scheduler_graph is None and verbose > 0:
+        # the dependents are read from the same graph as the state
+        scheduler_graph = chronos_tools.get_chronos_scheduler_graph(client)
+    chronos_state = chronos_tools.get_chronos_status_for_job(
+        client, service, instance, scheduler_graph=scheduler_graph)
 
     (last_result, formatted_time) = _format_last_result(job)
 
@@ -291,11 +303,15 @@ def format_chronos_job_status(client, job, running_tasks, verbose=0):
             tail_lines=tail_lines,
         )
         mesos_status = "%s\n%s" % (mesos_status, mesos_status_verbose)
+        dependents = "  Dependents: %s\n" % _format_dependents(scheduler_graph.get_descendants(job['name']))
+    else:
+        dependents = ""
     return (
         "Job:     %(job_name)s\n"
         "  Status:   %(disabled_state)s (%(chronos_state)s)"
         "  Last:     %(last_result)s (%(formatted_time)s)\n"
         "  %(schedule_type)s: %(schedule_value)s\n"
+        "%(dependents)s"
         "  Command:  %(command)s\n"
         "  Mesos:    %(mesos_status)s" % {
             "job_name": job_name,
@@ -306,6 +322,7 @@ def format_chronos_job_status(client, job, running_tasks, verbose=0):
             "last_result": last_result,
             "formatted_time": formatted_time,
             "schedule_value": schedule_value,
+            "dependents": dependents,
             "command": command,
             "mesos_status": mesos_status,
         }
@@ -327,9 +344,11 @@ def status_chronos_jobs(client, jobs, job_config, verbose):
         output = []
         desired_state = job_config.get_desired_state_human()
         output.append("Desired:    %s" % desired_state)
+        # fetch the scheduler graph once rather than once per job
+        scheduler_graph = chronos_tools.get_chronos_scheduler_graph(client)
         for job in jobs:
             running_tasks = get_running_tasks_from_active_frameworks(job["name"])
-            output.append(format_chronos_job_status(client, job, running_tasks, verbose))
+            output.append(format_chronos_job_status(client, job, running_tasks, verbose, scheduler_graph))
         return "\n".join(output)
 
 
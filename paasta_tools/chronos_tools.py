@@ -12,6 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 import argparse
+import collections
 import csv
 import datetime
 import logging
@@ -183,6 +184,30 @@ def load_chronos_job_config(service, instance, cluster, load_deployments=True, s
     )
 
 
+def load_chronos_job_configs(service, cluster, load_deployments=True, soa_dir=DEFAULT_SOA_DIR):
+    """Loads the config of every chronos job a service has in a cluster, reading
+    its chronos-<cluster>.yaml and deployments.json only once.
+
+    :returns: a dict of instance name to ChronosJobConfig
+    """
+    service_chronos_jobs = read_chronos_jobs_for_service(service, cluster, soa_dir=soa_dir)
+    deployments_json = load_deployments_json(service, soa_dir=soa_dir) if load_deployments else None
+    job_configs = {}
+    for instance, config_dict in service_chronos_jobs.items():
+        branch_dict = {}
+        if load_deployments:
+            branch = get_paasta_branch(cluster=cluster, instance=instance)
+            branch_dict = deployments_json.get_branch_dict(service, branch)
+        job_configs[instance] = ChronosJobConfig(
+            service=service,
+            cluster=cluster,
+            instance=instance,
+            config_dict=config_dict,
+            branch_dict=branch_dict,
+        )
+    return job_configs
+
+
 class ChronosJobConfig(InstanceConfig):
 
     def __init__(self, service, instance, cluster, config_dict, branch_dict):
@@ -483,6 +508,12 @@ def create_complete_config(service, job_name, soa_dir=DEFAULT_SOA_DIR):
     system_paasta_config = load_system_paasta_config()
     chronos_job_config = load_chronos_job_config(
         service, job_name, system_paasta_config.get_cluster(), soa_dir=soa_dir)
+    return format_complete_config(service, job_name, chronos_job_config, system_paasta_config)
+
+
+def format_complete_config(service, job_name, chronos_job_config, system_paasta_config):
+    """Generates a complete dictionary to be POST'ed to create a job on Chronos
+    from an already loaded ChronosJobConfig"""
     docker_url = get_docker_url(
         system_paasta_config.get_docker_registry(), chronos_job_config.get_docker_image())
     docker_volumes = system_paasta_config.get_volumes() + chronos_job_config.get_extra_volumes()
@@ -651,25 +682,71 @@ def sort_jobs(jobs):
     )
 
 
-def get_chronos_status_for_job(client, service, instance):
-    """
-    Returns the status (queued, idle, running, etc.) for a specific job from
-    the undocumented Chronos csv api that has the following format:
+class ChronosSchedulerGraph(object):
+    """The undocumented Chronos csv scheduler graph, parsed once so that job
+    states and dependencies can be looked up without refetching it. The csv
+    api has the following format:
 
     node,example_job,success,queued
     node,parent_job,success,idle
     node,child_job,success,idle
     link,parent_job,child_job
+    """
+
+    def __init__(self, csv_graph):
+        self.states = {}
+        self.children = {}
+        for line in csv.reader(csv_graph.splitlines()):
+            if not line:
+                continue
+            if line[0] == "node":
+                self.states[line[1]] = line[3]
+            elif line[0] == "link":
+                self.children.setdefault(line[1], []).append(line[2])
+
+    def get_state(self, job_name):
+        """:returns: the state (queued, idle, running, etc.) of a job, or None if it is not in the graph"""
+        return self.states.get(job_name)
+
+    def get_descendants(self, job_name):
+        """:returns: the names of every job that depends on a job, directly or
+            transitively, closest first"""
+        descendants = []
+        seen = {job_name}
+        queue = collections.deque([job_name])
+        while queue:
+            for child in self.children.get(queue.popleft(), []):
+                if child not in seen:
+                    seen.add(child)
+                    descendants.append(child)
+                    queue.append(child)
+        return descendants
+
+
+def get_chronos_scheduler_graph(client):
+    """Fetches and parses the Chronos scheduler graph.
+
+    :param client: Chronos client object
+    :returns: a ChronosSchedulerGraph
+    """
+    return ChronosSchedulerGraph(client.scheduler_graph())
+
+
+def get_chronos_status_for_job(client, service, instance, scheduler_graph=None):
+    """
+    Returns the status (queued, idle, running, etc.) for a specific job from
+    the Chronos scheduler graph.
 
     :param client: Chronos client object
     :param service: service name
     :param instance: instance name
+    :param scheduler_graph: an already fetched ChronosSchedulerGraph. When
+        looking up several jobs, fetch the graph once with
+        ``get_chronos_scheduler_graph()`` and pass it in here.
     """
-    resp = client.scheduler_graph()
-    lines = csv.reader(resp.splitlines())
-    for line in lines:
-        if line[0] == "node" and line[1] == compose_job_id(service, instance):
-            return line[3]
+    if scheduler_graph is None:
+        scheduler_graph = get_chronos_scheduler_graph(client)
+    return scheduler_graph.get_state(compose_job_id(service, instance))
 
 
 def lookup_chronos_jobs(client, service=None, instance=None, include_disabled=False, include_temporary=False):
@@ -692,6 +769,48 @@ def lookup_chronos_jobs(client, service=None, instance=None, include_disabled=Fa
     )
 
 
+def lookup_chronos_jobs_by_service_instance(client, include_disabled=False, include_temporary=False):
+    """Discovers Chronos jobs with a single ``client.list()`` call and indexes
+    them with ``index_chronos_jobs()``. Prefer this over calling
+    ``lookup_chronos_jobs()`` once per service instance.
+
+    :param client: Chronos client object
+    :param include_disabled: passed on to ``index_chronos_jobs()``
+    :param include_temporary: passed on to ``index_chronos_jobs()``
+    :returns: dict of (service, instance) to the list of job dicts for it
+    """
+    return index_chronos_jobs(
+        jobs=client.list(),
+        include_disabled=include_disabled,
+        include_temporary=include_temporary,
+    )
+
+
+def index_chronos_jobs(jobs, include_disabled=False, include_temporary=False):
+    """Indexes a list of Chronos jobs by (service, instance), filtering them
+    the same way as ``filter_chronos_jobs()`` does.
+
+    :param jobs: a list of jobs, as returned by the chronos client
+    :param include_disabled: boolean indicating if disabled jobs should be
+        included in the index
+    :param include_temporary: boolean indicating if temporary jobs should be
+        included in the index
+    :returns: dict of (service, instance) to the list of job dicts for it
+    """
+    index = {}
+    for job in jobs:
+        if job['disabled'] and not include_disabled:
+            continue
+        if not include_temporary and is_temporary_job(job):
+            continue
+        try:
+            service_instance = decompose_job_id(job['name'])
+        except InvalidJobNameError:
+            continue
+        index.setdefault(service_instance, []).append(job)
+    return index
+
+
 def filter_non_temporary_chronos_jobs(jobs):
     """
     Given a list of Chronos jobs, as pulled from the API, remove those
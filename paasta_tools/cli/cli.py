@@ -15,15 +15,15 @@
 # PYTHON_ARGCOMPLETE_OK
 """A command line tool for viewing information from the PaaSTA stack."""
 import argparse
+import importlib
 import logging
+import os
 import sys
 
 import argcomplete
-import pkg_resources
 
-from paasta_tools.cli import cmds
-from paasta_tools.cli.utils import load_method
-from paasta_tools.cli.utils import modules_in_pkg as paasta_commands_dir
+from paasta_tools import __version__
+from paasta_tools.cli.cmds import PAASTA_COMMANDS
 
 
 class ThrowingArgumentParser(argparse.ArgumentParser):
@@ -50,11 +50,23 @@ def add_subparser(command, subparsers):
     :param command: a simple string - e.g. 'list'
     :param subparsers: an ArgumentParser object"""
     module_name = 'paasta_tools.cli.cmds.%s' % command
-    add_subparser_fn = load_method(module_name, 'add_subparser')
+    add_subparser_fn = getattr(importlib.import_module(module_name), 'add_subparser')
     add_subparser_fn(subparsers)
 
 
-def get_argparser():
+def add_placeholder_subparser(command, help_text, subparsers):
+    """Adds a subparser that only lists command in 'paasta --help', for commands
+    whose modules aren't needed to parse the arguments at hand."""
+    subparsers.add_parser(command, help=help_text, add_help=False)
+
+
+def get_argparser(commands=None):
+    """Builds the paasta argument parser.
+
+    :param commands: names of the commands to load the modules of. The other
+                     commands get placeholder subparsers that are only good for
+                     'paasta --help'. Every command is loaded if this is None.
+    """
     parser = ThrowingArgumentParser(
         description=(
             "The PaaSTA command line tool. The 'paasta' command is the entry point "
@@ -75,9 +87,7 @@ def get_argparser():
     parser.add_argument(
         '-V', '--version',
         action='version',
-        version='paasta-tools {0}'.format(
-            pkg_resources.get_distribution('paasta-tools').version
-        )
+        version='paasta-tools {0}'.format(__version__),
     )
 
     subparsers = parser.add_subparsers(help="[-h, --help] for subcommand help")
@@ -85,19 +95,55 @@ def get_argparser():
     help_parser = subparsers.add_parser('help', add_help=False)
     help_parser.set_defaults(command=None)
 
-    for command in sorted(paasta_commands_dir(cmds)):
-        add_subparser(command, subparsers)
+    if commands is None:
+        modules_to_load = set(module for _, module, _ in PAASTA_COMMANDS)
+    else:
+        modules_to_load = set(module for command, module, _ in PAASTA_COMMANDS if command in commands)
+    loaded_modules = set()
+    for command, module, help_text in PAASTA_COMMANDS:
+        if module not in modules_to_load:
+            add_placeholder_subparser(command, help_text, subparsers)
+        elif module not in loaded_modules:
+            # A module may add more than one command (like start_stop_restart)
+            add_subparser(module, subparsers)
+            loaded_modules.add(module)
 
     return parser
 
 
+def get_command_from_args(args):
+    """Returns the paasta command args run, or None if there isn't one. No
+    top-level option takes a value, so that's the first non-option argument."""
+    for arg in args:
+        if not arg.startswith('-'):
+            return arg
+    return None
+
+
+def get_command_being_completed():
+    """Returns the paasta command in the line argcomplete is completing, or None
+    if the command itself is what's being completed."""
+    comp_line = os.environ.get('COMP_LINE', '')
+    comp_point = int(os.environ.get('COMP_POINT', len(comp_line)))
+    words = comp_line[:comp_point].split()
+    if not comp_line[:comp_point][-1:].isspace():
+        # The last word is the one being completed
+        words = words[:-1]
+    return get_command_from_args(words[1:])
+
+
 def parse_args(argv):
-    """Initialize autocompletion and configure the argument parser.
+    """Initialize autocompletion and configure the argument parser. Only the
+    module of the command being run (or completed) is loaded.
 
     :return: an argparse.Namespace object mapping parameter names to the inputs
              from sys.argv
     """
-    parser = get_argparser()
+    if '_ARGCOMPLETE' in os.environ:
+        command = get_command_being_completed()
+    else:
+        command = get_command_from_args(sys.argv[1:] if argv is None else argv)
+    parser = get_argparser(commands=[command] if command else [])
     argcomplete.autocomplete(parser)
 
     return parser.parse_args(argv), parser
@@ -11,3 +11,62 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+"""The paasta commands, one module each. This package is imported by
+'paasta --help' and by tab completion, before any command's module is, so it
+must stay cheap to import."""
+
+
+# Every paasta command: its name, the module in this package that implements
+# it and its one line help. The paasta CLI only imports the module of the
+# command being run (or completed), and lists the others in 'paasta --help'
+# from this table.
+PAASTA_COMMANDS = [
+    ('check', 'check', (
+        "Determine whether service in pwd is 'paasta ready', checking for common mistakes in the soa-configs "
+        "directory and the local service directory. This command is designed to be run from the 'root' of a "
+        "service directory."
+    )),
+    ('cook-image', 'cook_image', (
+        "'paasta cook-image' calls 'make cook-image' as part of the PaaSTA contract.\n\n"
+        "The PaaSTA contract specifies that a service MUST respond to 'cook-image' and produce a docker image as "
+        "a result. This command is often run as part of the normal build pipeline ('paasta itest'), or via a "
+        "'paasta local-run --build'."
+    )),
+    ('docker_exec', 'docker_exec', 'Docker exec against a container running your service'),
+    ('docker_inspect', 'docker_inspect', 'Docker inspect against a container running your service'),
+    ('docker_stop', 'docker_stop', 'Docker stop a container running your service'),
+    ('emergency-restart', 'emergency_restart', 'Restarts a PaaSTA service instance in an emergency'),
+    ('emergency-start', 'emergency_start', 'Kicks off a chronos job run. Not implemented for Marathon instances.'),
+    ('emergency-stop', 'emergency_stop', 'Stop a PaaSTA service instance in an emergency'),
+    ('fsm', 'fsm', 'Generate boilerplate configs for a new PaaSTA Service'),
+    ('generate-pipeline', 'generate_pipeline',
+     "Configures a Yelp-specific Jenkins build pipeline to match the 'deploy.yaml'"),
+    ('get-latest-deployment', 'get_latest_deployment', 'Gets the Git SHA for the latest deployment of a service'),
+    ('info', 'info', 'Prints the general information about a service.'),
+    ('itest', 'itest', "Runs 'make itest' as part of the PaaSTA contract."),
+    ('list', 'list', 'Display a list of PaaSTA services'),
+    ('list-clusters', 'list_clusters', 'Display a list of all PaaSTA clusters'),
+    ('local-run', 'local_run', "Run service's Docker image locally"),
+    ('logs', 'logs', 'Streams logs relevant to a service across the PaaSTA components'),
+    ('mark-for-deployment', 'mark_for_deployment', 'Mark a docker image for deployment in git'),
+    ('metastatus', 'metastatus', 'Display the status for an entire PaaSTA cluster'),
+    ('performance-check', 'performance_check', 'Performs a performance check'),
+    ('push-to-registry', 'push_to_registry', 'Uploads a docker image to a registry'),
+    ('rerun', 'rerun', 'Re-run a scheduled PaaSTA job'),
+    ('rollback', 'rollback', 'Rollback a docker image to a previous deploy'),
+    ('security-check', 'security_check', 'Performs a security check (not implemented)'),
+    ('start', 'start_stop_restart', 'Start or restarts a PaaSTA service in a graceful way.'),
+    ('restart', 'start_stop_restart', 'Start or restarts a PaaSTA service in a graceful way.'),
+    ('stop', 'start_stop_restart', 'Stops a PaaSTA service in a graceful way.'),
+    ('status', 'status', 'Display the status of a PaaSTA service.'),
+    ('sysdig', 'sysdig', 'Run sysdig on a remote host and filter to a service and instance'),
+    ('validate', 'validate', 'Validate that all paasta config files in pwd are correct'),
+]
+
+
+def get_command_help(command):
+    """Returns the help a command's subparser should be added with"""
+    for name, _, help_text in PAASTA_COMMANDS:
+        if name == command:
+            return help_text
+    raise KeyError(command)
@@ -20,11 +20,12 @@ import re
 from service_configuration_lib import read_service_configuration
 
 from paasta_tools.chronos_tools import load_chronos_job_config
+from paasta_tools.cli.cmds import get_command_help
 from paasta_tools.cli.cmds.validate import paasta_validate_soa_configs
+from paasta_tools.cli.utils import cached_choices_completer
 from paasta_tools.cli.utils import figure_out_service_name
 from paasta_tools.cli.utils import get_file_contents
 from paasta_tools.cli.utils import is_file_in_dir
-from paasta_tools.cli.utils import lazy_choices_completer
 from paasta_tools.cli.utils import list_services
 from paasta_tools.cli.utils import NoSuchService
 from paasta_tools.cli.utils import PaastaCheckMessages
@@ -49,11 +50,7 @@ def get_pipeline_config(service, soa_dir):
 
 
 def add_subparser(subparsers):
-    help_text = (
-        "Determine whether service in pwd is 'paasta ready', checking for common "
-        "mistakes in the soa-configs directory and the local service directory. This "
-        "command is designed to be run from the 'root' of a service directory."
-    )
+    help_text = get_command_help('check')
     check_parser = subparsers.add_parser(
         'check',
         description=help_text,
@@ -62,7 +59,7 @@ def add_subparser(subparsers):
     check_parser.add_argument(
         '-s', '--service',
         help='The name of the service you wish to inspect. Defaults to autodetect.'
-    ).completer = lazy_choices_completer(list_services)
+    ).completer = cached_choices_completer(list_services)
     check_parser.add_argument(
         '-y', '--yelpsoa-config-root',
         dest='yelpsoa_config_root',
@@ -16,6 +16,7 @@
 import os
 import sys
 
+from paasta_tools.cli.cmds import get_command_help
 from paasta_tools.cli.cmds.check import makefile_responds_to
 from paasta_tools.cli.utils import validate_service_name
 from paasta_tools.utils import _log
@@ -27,12 +28,7 @@ def add_subparser(subparsers):
     list_parser = subparsers.add_parser(
         'cook-image',
         description="Calls 'make cook-image' as part of the PaaSTA contract",
-        help=(
-            "'paasta cook-image' calls 'make cook-image' as part of the PaaSTA contract.\n\n"
-            "The PaaSTA contract specifies that a service MUST respond to 'cook-image' and produce "
-            "a docker image as a result. This command is often run as part of the normal build pipeline "
-            "('paasta itest'), or via a 'paasta local-run --build'."
-        ),
+        help=get_command_help('cook-image'),
         epilog="This command assumes that the Makefile is in the current working directory.",
     )
     list_parser.add_argument(
@@ -15,6 +15,7 @@
 import subprocess
 import sys
 
+from paasta_tools.cli.cmds import get_command_help
 from paasta_tools.cli.utils import get_container_name
 from paasta_tools.cli.utils import get_subparser
 from paasta_tools.cli.utils import get_task_from_instance
@@ -25,7 +26,7 @@ def add_subparser(subparsers):
     new_parser = get_subparser(description="'paasta docker_exec' works by picking a container running your service "
                                            "at random. It then runs docker exec -ti <container_id> <commands> "
                                            "where commands are those that you specify",
-                               help_text="Docker exec against a container running your service",
+                               help_text=get_command_help('docker_exec'),
                                command='docker_exec',
                                function=paasta_docker_exec,
                                subparsers=subparsers)
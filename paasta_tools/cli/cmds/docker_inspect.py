@@ -15,6 +15,7 @@
 import subprocess
 import sys
 
+from paasta_tools.cli.cmds import get_command_help
 from paasta_tools.cli.utils import get_container_name
 from paasta_tools.cli.utils import get_subparser
 from paasta_tools.cli.utils import get_task_from_instance
@@ -24,7 +25,7 @@ from paasta_tools.cli.utils import PaastaTaskNotFound
 def add_subparser(subparsers):
     get_subparser(description="'paasta docker_inspect' works by picking a container running your service "
                               "at random. It then runs docker docker_inspect <container_id> ",
-                  help_text="Docker inspect against a container running your service",
+                  help_text=get_command_help('docker_inspect'),
                   command='docker_inspect',
                   function=paasta_docker_inspect,
                   subparsers=subparsers)
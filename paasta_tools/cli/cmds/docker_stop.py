@@ -15,6 +15,7 @@
 import subprocess
 import sys
 
+from paasta_tools.cli.cmds import get_command_help
 from paasta_tools.cli.utils import get_container_name
 from paasta_tools.cli.utils import get_subparser
 from paasta_tools.cli.utils import get_task_from_instance
@@ -26,7 +27,7 @@ def add_subparser(subparsers):
                               "at random. It then runs docker stop <container_id> to stop the container. "
                               "You should expect marathon to then replace the dead container. "
                               "Note this doesn't do any draining of the connections to this container!",
-                  help_text="Docker stop a container running your service",
+                  help_text=get_command_help('docker_stop'),
                   command='docker_stop',
                   function=paasta_docker_stop,
                   subparsers=subparsers)
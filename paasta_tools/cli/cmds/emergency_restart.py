@@ -12,9 +12,10 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+from paasta_tools.cli.cmds import get_command_help
+from paasta_tools.cli.utils import cached_choices_completer
 from paasta_tools.cli.utils import execute_paasta_serviceinit_on_remote_master
 from paasta_tools.cli.utils import figure_out_service_name
-from paasta_tools.cli.utils import lazy_choices_completer
 from paasta_tools.cli.utils import list_instances
 from paasta_tools.cli.utils import list_services
 from paasta_tools.utils import compose_job_id
@@ -26,7 +27,7 @@ from paasta_tools.utils import load_system_paasta_config
 def add_subparser(subparsers):
     status_parser = subparsers.add_parser(
         'emergency-restart',
-        help="Restarts a PaaSTA service instance in an emergency",
+        help=get_command_help('emergency-restart'),
         description=(
             "'paasta emergency-restart' is useful in situations where the operator "
             "needs to bypass the normal git-based control plan, and needs to interact "
@@ -40,17 +41,17 @@ def add_subparser(subparsers):
     status_parser.add_argument(
         '-s', '--service',
         help="Service that you want to restart. Like 'example_service'.",
-    ).completer = lazy_choices_completer(list_services)
+    ).completer = cached_choices_completer(list_services)
     status_parser.add_argument(
         '-i', '--instance',
         help="Instance of the service that you want to restart. Like 'main' or 'canary'.",
         required=True,
-    ).completer = lazy_choices_completer(list_instances)
+    ).completer = cached_choices_completer(list_instances, per_service=True)
     status_parser.add_argument(
         '-c', '--cluster',
         help="The PaaSTA cluster that has the service you want to restart. Like 'norcal-prod'.",
         required=True,
-    ).completer = lazy_choices_completer(list_clusters)
+    ).completer = cached_choices_completer(list_clusters)
     status_parser.add_argument(
         '-d', '--soa-dir',
         dest="soa_dir",
@@ -12,9 +12,10 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+from paasta_tools.cli.cmds import get_command_help
+from paasta_tools.cli.utils import cached_choices_completer
 from paasta_tools.cli.utils import execute_paasta_serviceinit_on_remote_master
 from paasta_tools.cli.utils import figure_out_service_name
-from paasta_tools.cli.utils import lazy_choices_completer
 from paasta_tools.cli.utils import list_instances
 from paasta_tools.cli.utils import list_services
 from paasta_tools.utils import compose_job_id
@@ -27,7 +28,7 @@ from paasta_tools.utils import PaastaColors
 def add_subparser(subparsers):
     status_parser = subparsers.add_parser(
         'emergency-start',
-        help="Kicks off a chronos job run. Not implemented for Marathon instances.",
+        help=get_command_help('emergency-start'),
         description=(
             "Chronos Jobs: Forces a job to run outside of its normal schedule.\n"
             "Marathon Apps: Not implemented.\n"
@@ -36,17 +37,17 @@ def add_subparser(subparsers):
     status_parser.add_argument(
         '-s', '--service',
         help="Service that you want to start. Like 'example_service'.",
-    ).completer = lazy_choices_completer(list_services)
+    ).completer = cached_choices_completer(list_services)
     status_parser.add_argument(
         '-i', '--instance',
         help="Instance of the service that you want to start. Like 'main' or 'canary'.",
         required=True,
-    ).completer = lazy_choices_completer(list_instances)
+    ).completer = cached_choices_completer(list_instances, per_service=True)
     status_parser.add_argument(
         '-c', '--cluster',
         help="The PaaSTA cluster that has the service instance you want to start. Like 'norcal-prod'.",
         required=True,
-    ).completer = lazy_choices_completer(list_clusters)
+    ).completer = cached_choices_completer(list_clusters)
     status_parser.add_argument(
         '-d', '--soa-dir',
         dest="soa_dir",
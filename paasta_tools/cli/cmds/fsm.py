@@ -19,6 +19,7 @@ from shutil import copymode
 
 from cookiecutter.main import cookiecutter
 
+from paasta_tools.cli.cmds import get_command_help
 from paasta_tools.cli.fsm.autosuggest import suggest_smartstack_proxy_port
 from paasta_tools.utils import load_system_paasta_config
 from paasta_tools.utils import PaastaColors
@@ -51,7 +52,7 @@ shutil.copymode = symlink_aware_copymode
 def add_subparser(subparsers):
     fsm_parser = subparsers.add_parser(
         "fsm",
-        help="Generate boilerplate configs for a new PaaSTA Service",
+        help=get_command_help('fsm'),
         description=(
             "'paasta fsm' is used to generate example soa-configs, which is useful during initial "
             "service creation. Currently 'fsm' generates 'yelp-specific' configuration, but can still "
@@ -16,8 +16,9 @@
 pipeline."""
 import re
 
+from paasta_tools.cli.cmds import get_command_help
+from paasta_tools.cli.utils import cached_choices_completer
 from paasta_tools.cli.utils import guess_service_name
-from paasta_tools.cli.utils import lazy_choices_completer
 from paasta_tools.cli.utils import list_services
 from paasta_tools.cli.utils import NoSuchService
 from paasta_tools.cli.utils import validate_service_name
@@ -31,7 +32,7 @@ from paasta_tools.utils import get_git_url
 def add_subparser(subparsers):
     list_parser = subparsers.add_parser(
         'generate-pipeline',
-        help="Configures a Yelp-specific Jenkins build pipeline to match the 'deploy.yaml'",
+        help=get_command_help('generate-pipeline'),
         description=(
             "'paasta generate-pipeline' is a Yelp-specific tool to interact with Jenkins "
             "to build a build pipeline that matches what is declared in the 'deploy.yaml' "
@@ -42,7 +43,7 @@ def add_subparser(subparsers):
     list_parser.add_argument(
         '-s', '--service',
         help='Name of service for which you wish to generate a Jenkins pipeline',
-    ).completer = lazy_choices_completer(list_services)
+    ).completer = cached_choices_completer(list_services)
     list_parser.add_argument(
         '-d', '--soa-dir',
         dest="soa_dir",
@@ -12,7 +12,8 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-from paasta_tools.cli.utils import lazy_choices_completer
+from paasta_tools.cli.cmds import get_command_help
+from paasta_tools.cli.utils import cached_choices_completer
 from paasta_tools.cli.utils import list_deploy_groups
 from paasta_tools.cli.utils import list_services
 from paasta_tools.cli.utils import PaastaColors
@@ -26,18 +27,18 @@ from paasta_tools.utils import get_git_url
 def add_subparser(subparsers):
     list_parser = subparsers.add_parser(
         'get-latest-deployment',
-        help='Gets the Git SHA for the latest deployment of a service',
+        help=get_command_help('get-latest-deployment'),
     )
     list_parser.add_argument(
         '-s', '--service',
         help='Name of the service which you want to get the latest deployment for.',
         required=True,
-    ).completer = lazy_choices_completer(list_services)
+    ).completer = cached_choices_completer(list_services)
     list_parser.add_argument(
         '-i', '-l', '--deploy-group',
         help='Name of the deploy group which you want to get the latest deployment for.',
         required=True,
-    ).completer = lazy_choices_completer(list_deploy_groups)
+    ).completer = cached_choices_completer(list_deploy_groups, per_service=True)
     list_parser.add_argument(
         '-d', '--soa-dir',
         help='A directory from which soa-configs should be read from',
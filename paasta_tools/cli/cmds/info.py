@@ -14,9 +14,10 @@
 # limitations under the License.
 from service_configuration_lib import read_service_configuration
 
+from paasta_tools.cli.cmds import get_command_help
 from paasta_tools.cli.cmds.status import get_actual_deployments
+from paasta_tools.cli.utils import cached_choices_completer
 from paasta_tools.cli.utils import figure_out_service_name
-from paasta_tools.cli.utils import lazy_choices_completer
 from paasta_tools.cli.utils import list_services
 from paasta_tools.marathon_tools import get_all_namespaces_for_service
 from paasta_tools.marathon_tools import load_service_namespace_config
@@ -39,7 +40,7 @@ NO_EXTERNAL_LINK_MESSAGE = (
 def add_subparser(subparsers):
     list_parser = subparsers.add_parser(
         'info',
-        help="Prints the general information about a service.",
+        help=get_command_help('info'),
         description=(
             "'paasta info' gathers information about a service from soa-configs "
             "and prints it in a human-friendly way. It does no API calls, it "
@@ -49,7 +50,7 @@ def add_subparser(subparsers):
     list_parser.add_argument(
         '-s', '--service',
         help='The name of the service you wish to inspect'
-    ).completer = lazy_choices_completer(list_services)
+    ).completer = cached_choices_completer(list_services)
     list_parser.add_argument(
         '-d', '--soa-dir',
         dest="soa_dir",
@@ -14,8 +14,9 @@
 # limitations under the License.
 import os
 
+from paasta_tools.cli.cmds import get_command_help
+from paasta_tools.cli.utils import cached_choices_completer
 from paasta_tools.cli.utils import get_jenkins_build_output_url
-from paasta_tools.cli.utils import lazy_choices_completer
 from paasta_tools.cli.utils import list_services
 from paasta_tools.cli.utils import validate_service_name
 from paasta_tools.utils import _log
@@ -28,7 +29,7 @@ from paasta_tools.utils import DEFAULT_SOA_DIR
 def add_subparser(subparsers):
     list_parser = subparsers.add_parser(
         'itest',
-        help="Runs 'make itest' as part of the PaaSTA contract.",
+        help=get_command_help('itest'),
         description=(
             "'paasta itest' runs 'make itest' in the root of a service directory. "
             "It is designed to be used in conjection with the 'Jenkins' workflow: "
@@ -52,7 +53,7 @@ def add_subparser(subparsers):
         dest='soa_dir',
         help='A directory from which soa-configs should be read from',
         default=DEFAULT_SOA_DIR,
-    ).completer = lazy_choices_completer(list_services)
+    ).completer = cached_choices_completer(list_services)
     list_parser.set_defaults(command=paasta_itest)
 
 
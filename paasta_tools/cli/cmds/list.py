@@ -12,6 +12,7 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+from paasta_tools.cli.cmds import get_command_help
 from paasta_tools.cli.utils import list_paasta_services
 from paasta_tools.cli.utils import list_service_instances
 from paasta_tools.cli.utils import list_services
@@ -21,7 +22,7 @@ from paasta_tools.utils import SPACER
 def add_subparser(subparsers):
     list_parser = subparsers.add_parser(
         'list',
-        help="Display a list of PaaSTA services",
+        help=get_command_help('list'),
         description=(
             "'paasta list' inspects the soa-configs directory and lists all of the "
             "PaaSTA services that are declared."
@@ -12,6 +12,7 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+from paasta_tools.cli.cmds import get_command_help
 from paasta_tools.utils import DEFAULT_SOA_DIR
 from paasta_tools.utils import list_clusters
 
@@ -19,7 +20,7 @@ from paasta_tools.utils import list_clusters
 def add_subparser(subparsers):
     list_parser = subparsers.add_parser(
         'list-clusters',
-        help="Display a list of all PaaSTA clusters",
+        help=get_command_help('list-clusters'),
         description=(
             "'paasta list' inspects all of the PaaSTA services declared in the soa-configs "
             "directory, and prints the set of unique clusters that are used.\n\n"
@@ -30,13 +30,14 @@ import requests
 from docker import errors
 
 from paasta_tools.chronos_tools import parse_time_variables
+from paasta_tools.cli.cmds import get_command_help
 from paasta_tools.cli.cmds.check import makefile_responds_to
 from paasta_tools.cli.cmds.cook_image import paasta_cook_image
+from paasta_tools.cli.utils import cached_choices_completer
 from paasta_tools.cli.utils import figure_out_service_name
 from paasta_tools.cli.utils import get_instance_config
 from paasta_tools.cli.utils import guess_cluster
 from paasta_tools.cli.utils import guess_instance
-from paasta_tools.cli.utils import lazy_choices_completer
 from paasta_tools.cli.utils import list_instances
 from paasta_tools.cli.utils import list_services
 from paasta_tools.marathon_tools import CONTAINER_PORT
@@ -244,7 +245,7 @@ def read_local_dockerfile_lines():
 def add_subparser(subparsers):
     list_parser = subparsers.add_parser(
         'local-run',
-        help="Run service's Docker image locally",
+        help=get_command_help('local-run'),
         description=(
             "'paasta local-run' is useful for simulating how a PaaSTA service would be "
             "executed on a real cluster. It analyzes the local soa-configs and constructs "
@@ -262,11 +263,11 @@ def add_subparser(subparsers):
     list_parser.add_argument(
         '-s', '--service',
         help='The name of the service you wish to inspect',
-    ).completer = lazy_choices_completer(list_services)
+    ).completer = cached_choices_completer(list_services)
     list_parser.add_argument(
         '-c', '--cluster',
         help='The name of the cluster you wish to simulate. If omitted, attempts to guess a cluster to simulate',
-    ).completer = lazy_choices_completer(list_clusters)
+    ).completer = cached_choices_completer(list_clusters)
     list_parser.add_argument(
         '-y', '--yelpsoa-config-root',
         dest='yelpsoa_config_root',
@@ -321,7 +322,7 @@ def add_subparser(subparsers):
         help='Simulate a docker run for a particular instance of the service, like "main" or "canary"',
         required=False,
         default=None,
-    ).completer = lazy_choices_completer(list_instances)
+    ).completer = cached_choices_completer(list_instances, per_service=True)
     list_parser.add_argument(
         '-v', '--verbose',
         help='Show Docker commands output',
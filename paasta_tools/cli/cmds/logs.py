@@ -14,8 +14,13 @@
 # limitations under the License.
 """PaaSTA log reader for humans"""
 import argparse
+import calendar
 import datetime
+import glob
+import heapq
 import logging
+import mmap
+import os
 import re
 import sys
 from collections import namedtuple
@@ -23,6 +28,8 @@ from contextlib import contextmanager
 from multiprocessing import Process
 from multiprocessing import Queue
 from Queue import Empty
+from Queue import Queue as ThreadQueue
+from threading import Thread
 from time import sleep
 
 import dateutil
@@ -39,8 +46,12 @@ except ImportError:
 from pytimeparse.timeparse import timeparse
 
 from paasta_tools import chronos_tools
+from paasta_tools.cli.cmds import get_command_help
+from paasta_tools.log_archive import LogArchive
 from paasta_tools.marathon_tools import format_job_id
+from paasta_tools.cli.utils import cached_choices_completer
 from paasta_tools.cli.utils import figure_out_service_name
+from paasta_tools.cli.utils import get_cached_choices
 from paasta_tools.cli.utils import guess_service_name
 from paasta_tools.cli.utils import lazy_choices_completer
 from paasta_tools.cli.utils import list_services
@@ -49,11 +60,14 @@ from paasta_tools.utils import datetime_convert_timezone
 from paasta_tools.utils import datetime_from_utc_to_local
 from paasta_tools.utils import DEFAULT_LOGLEVEL
 from paasta_tools.utils import DEFAULT_SOA_DIR
+from paasta_tools.utils import format_epoch_as_local
 from paasta_tools.utils import format_log_line
 from paasta_tools.utils import load_system_paasta_config
 from paasta_tools.utils import list_clusters
+from paasta_tools.utils import log_timestamp_to_epoch
 from paasta_tools.utils import LOG_COMPONENTS
 from paasta_tools.utils import PaastaColors
+from paasta_tools.utils import parse_log_timestamp
 from paasta_tools.utils import get_log_name_for_service
 
 
@@ -65,7 +79,7 @@ log = logging.getLogger(__name__)
 def add_subparser(subparsers):
     status_parser = subparsers.add_parser(
         'logs',
-        help="Streams logs relevant to a service across the PaaSTA components",
+        help=get_command_help('logs'),
         description=(
             "'paasta logs' works by streaming PaaSTA-related event messages "
             "in a human-readable way."
@@ -75,7 +89,7 @@ def add_subparser(subparsers):
     status_parser.add_argument(
         '-s', '--service',
         help='The name of the service you wish to inspect. Defaults to autodetect.',
-    ).completer = lazy_choices_completer(list_services)
+    ).completer = cached_choices_completer(list_services)
     components_help = 'A comma separated list of the components you want logs for.'
     status_parser.add_argument(
         '-C', '--components',
@@ -150,10 +164,10 @@ def add_subparser(subparsers):
 
 def completer_clusters(prefix, parsed_args, **kwargs):
     service = parsed_args.service or guess_service_name()
-    if service in list_services():
-        return list_clusters(service)
+    if service in get_cached_choices(list_services):
+        return get_cached_choices(list_clusters, service=service)
     else:
-        return list_clusters()
+        return get_cached_choices(list_clusters)
 
 
 def build_component_descriptions(components):
@@ -192,65 +206,302 @@ def check_timestamp_in_range(timestamp, start_time, end_time):
         return True
 
 
-def paasta_log_line_passes_filter(line, levels, service, components, clusters, start_time=None, end_time=None):
-    """Given a (JSON-formatted) log line, return True if the line should be
-    displayed given the provided levels, components, and clusters; return False
-    otherwise.
-    """
+def check_epoch_in_range(timestamp, start_time, end_time):
+    """Like check_timestamp_in_range, for timestamps and bounds in seconds since the epoch"""
+    if timestamp is not None and start_time is not None and end_time is not None:
+        return start_time < timestamp < end_time
+    else:
+        return True
+
+
+def datetime_to_epoch(dt):
+    """Converts a datetime to seconds since the epoch. Naive datetimes are taken to be UTC."""
+    if dt is None:
+        return None
+    return calendar.timegm(dt.utctimetuple()) + dt.microsecond / 1e6
+
+
+# A log line decoded once, so that filtering, sorting and rendering it don't
+# each have to parse the JSON and the timestamp again. timestamp is in seconds
+# since the epoch and raw_line is the line exactly as it was read.
+LogRecord = namedtuple('LogRecord', 'timestamp, level, component, cluster, instance, message, raw_line')
+
+
+def parse_log_record(line):
+    """Decodes a (JSON-formatted) log line into a LogRecord. Fields missing from
+    the line are None. Returns None if the line is not a JSON object."""
     try:
         parsed_line = json.loads(line)
     except ValueError:
         log.debug('Trouble parsing line as json. Skipping. Line: %r' % line)
+        return None
+    if not isinstance(parsed_line, dict):
+        log.debug('Line is not a JSON object. Skipping. Line: %r' % line)
+        return None
+
+    timestamp = parsed_line.get('timestamp')
+    if timestamp is not None:
+        try:
+            timestamp = log_timestamp_to_epoch(timestamp)
+        except (ValueError, TypeError):
+            log.debug('Trouble parsing timestamp. Line: %r' % line)
+            timestamp = None
+    return LogRecord(
+        timestamp=timestamp,
+        level=parsed_line.get('level'),
+        component=parsed_line.get('component'),
+        cluster=parsed_line.get('cluster'),
+        instance=parsed_line.get('instance'),
+        message=parsed_line.get('message'),
+        raw_line=line,
+    )
+
+
+def log_record_sort_key(record):
+    return record.timestamp or 0.0
+
+
+def merge_log_record_streams(streams):
+    """Lazily merges iterables of LogRecords that are each already in timestamp
+    order into one iterator in timestamp order. Only the next record of each
+    stream is held, so memory is bounded by the number of streams rather than
+    the number of records. Records with equal timestamps come out in stream order.
+    """
+    heap = []
+    for index, stream in enumerate(streams):
+        iterator = iter(stream)
+        for record in iterator:
+            heap.append((log_record_sort_key(record), index, record, iterator))
+            break
+    heapq.heapify(heap)
+    while heap:
+        _, index, record, iterator = heap[0]
+        yield record
+        for next_record in iterator:
+            heapq.heapreplace(heap, (log_record_sort_key(next_record), index, next_record, iterator))
+            break
+        else:
+            heapq.heappop(heap)
+
+
+# How many records a stream may be fetched ahead of the one being printed
+STREAM_BUFFER_SIZE = 1000
+_END_OF_STREAM = object()
+
+
+def _fill_stream_buffer(stream_fn, buffer):
+    try:
+        for record in stream_fn():
+            buffer.put((record, None))
+    except Exception:
+        buffer.put((_END_OF_STREAM, sys.exc_info()))
+    else:
+        buffer.put((_END_OF_STREAM, None))
+
+
+def _drain_stream_buffer(buffer):
+    while True:
+        try:
+            # Block with a timeout so the main thread still sees KeyboardInterrupt
+            record, exc_info = buffer.get(True, 0.1)
+        except Empty:
+            continue
+        if record is _END_OF_STREAM:
+            if exc_info is not None:
+                raise exc_info[0], exc_info[1], exc_info[2]
+            return
+        yield record
+
+
+def fetch_streams_concurrently(stream_fns, buffer_size=STREAM_BUFFER_SIZE):
+    """Calls each of stream_fns in its own thread and iterates over what it
+    returns into a bounded buffer, so that all the streams are fetched at once.
+
+    :param stream_fns: a list of functions that take no arguments and return an iterable
+    :param buffer_size: how many items each thread may read ahead before it blocks
+    :returns: one iterator per stream_fn, in the same order. An exception raised
+              while fetching a stream is re-raised from its iterator.
+    """
+    streams = []
+    for stream_fn in stream_fns:
+        buffer = ThreadQueue(maxsize=buffer_size)
+        thread = Thread(target=_fill_stream_buffer, args=(stream_fn, buffer))
+        thread.daemon = True
+        thread.start()
+        streams.append(_drain_stream_buffer(buffer))
+    return streams
+
+
+# The record filters below take their start_time and end_time in seconds since
+# the epoch, so the caller only has to convert them once. The *_line_* versions
+# take a line and datetimes, and decode the line themselves.
+def paasta_log_record_passes_filter(record, levels, service, components, clusters, start_time=None, end_time=None):
+    """Given a LogRecord, return True if it should be displayed given the provided
+    levels, components, and clusters; return False otherwise.
+    """
+    if not check_epoch_in_range(record.timestamp, start_time, end_time):
         return False
+    return (
+        record.level in levels and
+        record.component in components and (
+            record.cluster in clusters or
+            record.cluster == ANY_CLUSTER
+        )
+    )
+
 
-    timestamp = isodate.parse_datetime(parsed_line.get('timestamp'))
-    if not check_timestamp_in_range(timestamp, start_time, end_time):
+def paasta_app_output_record_passes_filter(record, levels, service, components, clusters,
+                                           start_time=None, end_time=None):
+    if not check_epoch_in_range(record.timestamp, start_time, end_time):
         return False
     return (
-        parsed_line.get('level') in levels and
-        parsed_line.get('component') in components and (
-            parsed_line.get('cluster') in clusters or
-            parsed_line.get('cluster') == ANY_CLUSTER
+        record.component in components and (
+            record.cluster in clusters or
+            record.cluster == ANY_CLUSTER
         )
     )
 
 
-def paasta_app_output_passes_filter(line, levels, service, components, clusters, start_time=None, end_time=None):
-    try:
-        parsed_line = json.loads(line)
-    except ValueError:
-        log.debug('Trouble parsing line as json. Skipping. Line: %r' % line)
+def marathon_log_record_passes_filter(record, levels, service, components, clusters, start_time=None, end_time=None):
+    """Given a LogRecord where the message is a Marathon log line, return True
+    if it should be displayed given the provided service; return False otherwise."""
+    if not check_epoch_in_range(record.timestamp, start_time, end_time):
         return False
+    return format_job_id(service, '') in (record.message or '')
+
 
-    timestamp = isodate.parse_datetime(parsed_line.get('timestamp'))
-    if not check_timestamp_in_range(timestamp, start_time, end_time):
+def chronos_log_record_passes_filter(record, levels, service, components, clusters, start_time=None, end_time=None):
+    """Given a LogRecord where the message is a Chronos log line, return True
+    if it should be displayed given the provided service; return False otherwise."""
+    if not check_epoch_in_range(record.timestamp, start_time, end_time):
         return False
-    return (
-        parsed_line.get('component') in components and (
-            parsed_line.get('cluster') in clusters or
-            parsed_line.get('cluster') == ANY_CLUSTER
-        )
+    return chronos_tools.compose_job_id(service, '') in (record.message or '')
+
+
+def line_filter_for(record_filter):
+    """Wraps a record filter into one that takes a (JSON-formatted) log line and
+    datetime start_time and end_time, as the filters used to."""
+    def line_passes_filter(line, levels, service, components, clusters, start_time=None, end_time=None):
+        record = parse_log_record(line)
+        if record is None:
+            return False
+        return record_filter(record, levels, service, components, clusters,
+                             start_time=datetime_to_epoch(start_time), end_time=datetime_to_epoch(end_time))
+    line_passes_filter.__name__ = record_filter.__name__.replace('_record_', '_line_')
+    line_passes_filter.__doc__ = record_filter.__doc__
+    return line_passes_filter
+
+
+paasta_log_line_passes_filter = line_filter_for(paasta_log_record_passes_filter)
+paasta_app_output_passes_filter = line_filter_for(paasta_app_output_record_passes_filter)
+marathon_log_line_passes_filter = line_filter_for(marathon_log_record_passes_filter)
+chronos_log_line_passes_filter = line_filter_for(chronos_log_record_passes_filter)
+
+
+class LogLinePrefilter(object):
+    """A cheap check on a raw log line, run before it is parsed or decoded, that
+    rejects lines the matching record filter would certainly reject.
+
+    It is built from sets of needles: a line is only let through if it contains
+    at least one needle from every set. Lines containing any of the fallback
+    substrings are always let through, because they may hold an escaped form of
+    a needle that a substring search can't see. A line that is let through still
+    goes through the record filter, so false positives are fine.
+    """
+
+    def __init__(self, needle_sets, fallback_substrings=()):
+        self.patterns = [re.compile('|'.join(re.escape(needle) for needle in needles))
+                         for needles in needle_sets if needles]
+        self.fallback_substrings = fallback_substrings
+
+    def __call__(self, line):
+        for fallback_substring in self.fallback_substrings:
+            if fallback_substring in line:
+                return True
+        for pattern in self.patterns:
+            if not pattern.search(line):
+                return False
+        return True
+
+
+_SAFE_JSON_VALUE_RE = re.compile(r'^[\x20-\x7e]*$')
+
+
+def json_string_needles(values):
+    """Returns the ways each of values can appear as a JSON string literal, or an
+    empty list (meaning: don't check this field) if some value could be encoded
+    in a way we don't anticipate. ujson escapes forward slashes, json doesn't.
+    Any other escaping of a plain value needs a \u escape, which makes
+    LogLinePrefilter let the line through."""
+    needles = []
+    for value in values:
+        if not isinstance(value, basestring) or not _SAFE_JSON_VALUE_RE.match(value) or \
+                '"' in value or '\\' in value:
+            return []
+        needles.append('"%s"' % value)
+        if '/' in value:
+            needles.append('"%s"' % value.replace('/', '\\/'))
+    return needles
+
+
+JSON_PREFILTER_FALLBACK_SUBSTRINGS = ('\\u',)
+
+
+def build_paasta_log_prefilter(levels, service, components, clusters):
+    return LogLinePrefilter(
+        needle_sets=[
+            json_string_needles(levels),
+            json_string_needles(components),
+            json_string_needles(list(clusters) + [ANY_CLUSTER]),
+        ],
+        fallback_substrings=JSON_PREFILTER_FALLBACK_SUBSTRINGS,
     )
 
 
+def build_paasta_app_output_prefilter(levels, service, components, clusters):
+    return LogLinePrefilter(
+        needle_sets=[
+            json_string_needles(components),
+            json_string_needles(list(clusters) + [ANY_CLUSTER]),
+        ],
+        fallback_substrings=JSON_PREFILTER_FALLBACK_SUBSTRINGS,
+    )
+
+
+# Marathon and chronos lines are plain text, run through parse_*_log_line before
+# they are filtered. That strips ANSI escape sequences, which could join up a job
+# id split by one, so lines with escape sequences are always let through.
+def build_marathon_log_prefilter(levels, service, components, clusters):
+    return LogLinePrefilter(needle_sets=[[format_job_id(service, '')]], fallback_substrings=('\x1b',))
+
+
+def build_chronos_log_prefilter(levels, service, components, clusters):
+    return LogLinePrefilter(needle_sets=[[chronos_tools.compose_job_id(service, '')]],
+                            fallback_substrings=('\x1b',))
+
+
+# Extract ISO 8601 date per http://www.pelagodesign.com/blog/2009/05/20/iso-8601-date-validation-that-doesnt-suck/
+ISO_8601_PREFIX_RE = re.compile(
+    r'^([\+-]?\d{4}(?!\d{2}\b))((-?)((0[1-9]|1[0-2])(\3([12]\d|0[1-9]|3[01]))?|W([0-4]\d|5[0-2])(-?[1-7])?|'
+    r'(00[1-9]|0[1-9]\d|[12]\d{2}|3([0-5]\d|6[1-6])))([T\s]((([01]\d|2[0-3])((:?)[0-5]\d)?|24\:?00)([\.,]\d+'
+    r'(?!:))?)?(\17[0-5]\d([\.,]\d+)?)?([zZ]|([\+-])([01]\d|2[0-3]):?([0-5]\d)?)?)?)? '
+)
+TZ_UTC = dateutil.tz.tzutc()
+
+
 def extract_utc_timestamp_from_log_line(line):
     """
     Extracts the timestamp from a log line of the format "<timestamp> <other data>" and returns a UTC datetime object
     or None if it could not parse the line
     """
-    # Extract ISO 8601 date per http://www.pelagodesign.com/blog/2009/05/20/iso-8601-date-validation-that-doesnt-suck/
-    iso_re = r'^([\+-]?\d{4}(?!\d{2}\b))((-?)((0[1-9]|1[0-2])(\3([12]\d|0[1-9]|3[01]))?|W([0-4]\d|5[0-2])(-?[1-7])?|' \
-        r'(00[1-9]|0[1-9]\d|[12]\d{2}|3([0-5]\d|6[1-6])))([T\s]((([01]\d|2[0-3])((:?)[0-5]\d)?|24\:?00)([\.,]\d+' \
-        r'(?!:))?)?(\17[0-5]\d([\.,]\d+)?)?([zZ]|([\+-])([01]\d|2[0-3]):?([0-5]\d)?)?)?)? '
-
-    tokens = re.match(iso_re, line)
+    tokens = ISO_8601_PREFIX_RE.match(line)
 
     if not tokens:
         # Could not parse line
         return None
     timestamp = tokens.group(0).strip()
     dt = isodate.parse_datetime(timestamp)
-    utc_timestamp = datetime_convert_timezone(dt, dt.tzinfo, dateutil.tz.tzutc())
+    utc_timestamp = datetime_convert_timezone(dt, dt.tzinfo, TZ_UTC)
     return utc_timestamp
 
 
@@ -286,38 +537,6 @@ def parse_chronos_log_line(line, clusters, service):
         )
 
 
-def marathon_log_line_passes_filter(line, levels, service, components, clusters, start_time=None, end_time=None):
-    """Given a (JSON-formatted) log line where the message is a Marathon log line,
-    return True if the line should be displayed given the provided service; return False
-    otherwise."""
-    try:
-        parsed_line = json.loads(line)
-    except ValueError:
-        log.debug('Trouble parsing line as json. Skipping. Line: %r' % line)
-        return False
-
-    timestamp = isodate.parse_datetime(parsed_line.get('timestamp'))
-    if not check_timestamp_in_range(timestamp, start_time, end_time):
-        return False
-    return format_job_id(service, '') in parsed_line.get('message', '')
-
-
-def chronos_log_line_passes_filter(line, levels, service, components, clusters, start_time=None, end_time=None):
-    """Given a (JSON-formatted) log line where the message is a Marathon log line,
-    return True if the line should be displayed given the provided service; return False
-    otherwise."""
-    try:
-        parsed_line = json.loads(line)
-    except ValueError:
-        log.debug('Trouble parsing line as json. Skipping. Line: %r' % line)
-        return False
-
-    timestamp = isodate.parse_datetime(parsed_line.get('timestamp'))
-    if not check_timestamp_in_range(timestamp, start_time, end_time):
-        return False
-    return chronos_tools.compose_job_id(service, '') in parsed_line.get('message', '')
-
-
 def print_log(line, requested_levels, raw_mode=False):
     """Mostly a stub to ease testing. Eventually this may do some formatting or
     something.
@@ -328,15 +547,28 @@ def print_log(line, requested_levels, raw_mode=False):
         print prettify_log_line(line, requested_levels)
 
 
+def print_log_record(record, requested_levels, raw_mode=False):
+    """Like print_log, for an already decoded LogRecord"""
+    if raw_mode:
+        print record.raw_line,  # suppress trailing newline since scribereader already attached one
+    else:
+        print prettify_log_record(record, requested_levels)
+
+
 def prettify_timestamp(timestamp):
     """Returns more human-friendly form of 'timestamp' without microseconds and
     in local time.
     """
-    dt = isodate.parse_datetime(timestamp)
+    dt = parse_log_timestamp(timestamp)
     pretty_timestamp = datetime_from_utc_to_local(dt)
     return pretty_timestamp.strftime("%Y-%m-%d %H:%M:%S")
 
 
+def prettify_epoch(timestamp):
+    """Like prettify_timestamp, for a timestamp in seconds since the epoch"""
+    return format_epoch_as_local(timestamp)
+
+
 def prettify_component(component):
     try:
         return LOG_COMPONENTS[component]['color']('[%s]' % component)
@@ -366,25 +598,27 @@ def prettify_log_line(line, requested_levels):
     """Given a line from the log, which is expected to be JSON and have all the
     things we expect, return a pretty formatted string containing relevant values.
     """
-    try:
-        parsed_line = json.loads(line)
-    except ValueError:
-        log.debug('Trouble parsing line as json. Skipping. Line: %r' % line)
+    record = parse_log_record(line)
+    if record is None:
         return "Invalid JSON: %s" % line
+    return prettify_log_record(record, requested_levels)
 
-    try:
-        pretty_level = prettify_level(parsed_line['level'], requested_levels)
-        return "%(timestamp)s %(component)s %(cluster)s %(instance)s - %(level)s%(message)s" % ({
-            'timestamp': prettify_timestamp(parsed_line['timestamp']),
-            'component': prettify_component(parsed_line['component']),
-            'cluster': '[%s]' % parsed_line['cluster'],
-            'instance': '[%s]' % parsed_line['instance'],
-            'level': '%s' % pretty_level,
-            'message': parsed_line['message'],
-        })
-    except KeyError:
-        log.debug('JSON parsed correctly but was missing a key. Skipping. Line: %r' % line)
-        return "JSON missing keys: %s" % line
+
+def prettify_log_record(record, requested_levels):
+    """Given a LogRecord, return a pretty formatted string containing relevant values."""
+    if None in (record.timestamp, record.level, record.component, record.cluster, record.instance, record.message):
+        log.debug('JSON parsed correctly but was missing a key. Skipping. Line: %r' % record.raw_line)
+        return "JSON missing keys: %s" % record.raw_line
+
+    pretty_level = prettify_level(record.level, requested_levels)
+    return "%(timestamp)s %(component)s %(cluster)s %(instance)s - %(level)s%(message)s" % ({
+        'timestamp': prettify_epoch(record.timestamp),
+        'component': prettify_component(record.component),
+        'cluster': '[%s]' % record.cluster,
+        'instance': '[%s]' % record.instance,
+        'level': '%s' % pretty_level,
+        'message': record.message,
+    })
 
 
 # The map of name -> LogReader subclasses, used by configure_log.
@@ -438,7 +672,10 @@ class LogReader(object):
         raise NotImplementedError("print_logs_by_offset is not implemented")
 
 
-ScribeComponentStreamInfo = namedtuple('ScribeComponentStreamInfo', 'per_cluster, stream_name_fn, filter_fn, parse_fn')
+ScribeComponentStreamInfo = namedtuple(
+    'ScribeComponentStreamInfo',
+    'per_cluster, stream_name_fn, filter_fn, parse_fn, prefilter_fn',
+)
 
 
 @register_log_reader('scribereader')
@@ -451,31 +688,36 @@ class ScribeLogReader(LogReader):
         'default': ScribeComponentStreamInfo(
             per_cluster=False,
             stream_name_fn=get_log_name_for_service,
-            filter_fn=paasta_log_line_passes_filter,
+            filter_fn=paasta_log_record_passes_filter,
+            prefilter_fn=build_paasta_log_prefilter,
             parse_fn=None
         ),
         'stdout': ScribeComponentStreamInfo(
             per_cluster=False,
             stream_name_fn=lambda service: get_log_name_for_service(service, prefix='app_output'),
-            filter_fn=paasta_app_output_passes_filter,
+            filter_fn=paasta_app_output_record_passes_filter,
+            prefilter_fn=build_paasta_app_output_prefilter,
             parse_fn=None
         ),
         'stderr': ScribeComponentStreamInfo(
             per_cluster=False,
             stream_name_fn=lambda service: get_log_name_for_service(service, prefix='app_output'),
-            filter_fn=paasta_app_output_passes_filter,
+            filter_fn=paasta_app_output_record_passes_filter,
+            prefilter_fn=build_paasta_app_output_prefilter,
             parse_fn=None
         ),
         'marathon': ScribeComponentStreamInfo(
             per_cluster=True,
             stream_name_fn=lambda service, cluster: 'stream_marathon_%s' % cluster,
-            filter_fn=marathon_log_line_passes_filter,
+            filter_fn=marathon_log_record_passes_filter,
+            prefilter_fn=build_marathon_log_prefilter,
             parse_fn=parse_marathon_log_line
         ),
         'chronos': ScribeComponentStreamInfo(
             per_cluster=True,
             stream_name_fn=lambda service, cluster: 'stream_chronos_%s' % cluster,
-            filter_fn=chronos_log_line_passes_filter,
+            filter_fn=chronos_log_record_passes_filter,
+            prefilter_fn=build_chronos_log_prefilter,
             parse_fn=parse_chronos_log_line
         )
     }
@@ -565,6 +807,7 @@ class ScribeLogReader(LogReader):
                 'clusters': clusters,
                 'queue': queue,
                 'filter_fn': stream_info.filter_fn,
+                'prefilter_fn': stream_info.prefilter_fn,
             }
 
             if stream_info.per_cluster:
@@ -648,34 +891,38 @@ class ScribeLogReader(LogReader):
                 break
 
     def print_logs_by_time(self, service, start_time, end_time, levels, components, clusters, raw_mode):
-        aggregated_logs = []
-
         if 'marathon' in components or 'chronos' in components:
             sys.stderr.write(PaastaColors.red("Warning, you have chosen to get marathon or chronos logs based "
                                               "on time. This command may take a dozen minutes or so to run "
                                               "because marathon and chronos are on shared streams.\n"))
 
+        stream_fns = []
+
         def callback(component, stream_info, scribe_env, cluster):
             if stream_info.per_cluster:
                 stream_name = stream_info.stream_name_fn(service, cluster)
             else:
                 stream_name = stream_info.stream_name_fn(service)
 
-            ctx = self.scribe_get_from_time(scribe_env, stream_name, start_time, end_time)
-            self.filter_and_aggregate_scribe_logs(ctx, scribe_env, stream_name, levels, service,
-                                                  components, clusters, aggregated_logs,
-                                                  filter_fn=stream_info.filter_fn,
-                                                  parser_fn=stream_info.parse_fn,
-                                                  start_time=start_time, end_time=end_time)
+            def fetch_stream():
+                ctx = self.scribe_get_from_time(scribe_env, stream_name, start_time, end_time)
+                return self.filter_scribe_logs(ctx, scribe_env, stream_name, levels, service,
+                                               components, clusters,
+                                               filter_fn=stream_info.filter_fn,
+                                               prefilter_fn=stream_info.prefilter_fn,
+                                               parser_fn=stream_info.parse_fn,
+                                               start_time=start_time, end_time=end_time)
+            stream_fns.append(fetch_stream)
 
         self.run_code_over_scribe_envs(clusters=clusters, components=components, callback=callback)
 
-        aggregated_logs.sort(key=lambda log_line: log_line['sort_key'])
-        for line in aggregated_logs:
-            print_log(line['raw_line'], levels, raw_mode)
+        # Each stream is in time order already, so they are fetched at the same
+        # time and merged as they come in rather than collected and sorted.
+        for record in merge_log_record_streams(fetch_streams_concurrently(stream_fns)):
+            print_log_record(record, levels, raw_mode)
 
     def print_last_n_logs(self, service, line_count, levels, components, clusters, raw_mode):
-        aggregated_logs = []
+        stream_fns = []
 
         def callback(component, stream_info, scribe_env, cluster):
             stream_info = self.get_stream_info(component)
@@ -685,39 +932,42 @@ class ScribeLogReader(LogReader):
             else:
                 stream_name = stream_info.stream_name_fn(service)
 
-            ctx = self.scribe_get_last_n_lines(scribe_env, stream_name, line_count)
-            self.filter_and_aggregate_scribe_logs(ctx, scribe_env, stream_name, levels, service,
-                                                  components, clusters, aggregated_logs,
-                                                  filter_fn=stream_info.filter_fn,
-                                                  parser_fn=stream_info.parse_fn)
+            def fetch_stream():
+                ctx = self.scribe_get_last_n_lines(scribe_env, stream_name, line_count)
+                return self.filter_scribe_logs(ctx, scribe_env, stream_name, levels, service,
+                                               components, clusters,
+                                               filter_fn=stream_info.filter_fn,
+                                               prefilter_fn=stream_info.prefilter_fn,
+                                               parser_fn=stream_info.parse_fn)
+            stream_fns.append(fetch_stream)
 
         self.run_code_over_scribe_envs(clusters=clusters, components=components, callback=callback)
-        aggregated_logs.sort(key=lambda log_line: log_line['sort_key'])
-        for line in aggregated_logs:
-            print_log(line['raw_line'], levels, raw_mode)
-
-    def filter_and_aggregate_scribe_logs(self, scribe_reader_ctx, scribe_env, stream_name,
-                                         levels, service, components, clusters,
-                                         aggregated_logs, parser_fn=None, filter_fn=None,
-                                         start_time=None, end_time=None):
+
+        for record in merge_log_record_streams(fetch_streams_concurrently(stream_fns)):
+            print_log_record(record, levels, raw_mode)
+
+    def filter_scribe_logs(self, scribe_reader_ctx, scribe_env, stream_name,
+                           levels, service, components, clusters,
+                           parser_fn=None, filter_fn=None, prefilter_fn=None,
+                           start_time=None, end_time=None):
+        """Yields the LogRecords read from a scribe stream that pass filter_fn, in stream order.
+        Lines rejected by the prefilter prefilter_fn builds are skipped before being parsed."""
+        start_time = datetime_to_epoch(start_time)
+        end_time = datetime_to_epoch(end_time)
+        prefilter = prefilter_fn(levels, service, components, clusters) if prefilter_fn else None
         with scribe_reader_ctx as scribe_reader:
             try:
                 for line in scribe_reader:
+                    if prefilter is not None and not prefilter(line):
+                        continue
                     if parser_fn:
                         line = parser_fn(line, clusters, service)
                     if filter_fn:
-                        if filter_fn(line, levels, service, components, clusters,
-                                     start_time=start_time, end_time=end_time):
-                            try:
-                                parsed_line = json.loads(line)
-                                timestamp = isodate.parse_datetime(parsed_line.get('timestamp'))
-                                if not timestamp.tzinfo:
-                                    timestamp = pytz.utc.localize(timestamp)
-                            except ValueError:
-                                timestamp = pytz.utc.localize(datetime.datetime.min())
-
-                            line = {'raw_line': line, 'sort_key': timestamp}
-                            aggregated_logs.append(line)
+                        # Each line is decoded once, and the record is what gets filtered, sorted and printed
+                        record = parse_log_record(line)
+                        if record is not None and filter_fn(record, levels, service, components, clusters,
+                                                            start_time=start_time, end_time=end_time):
+                            yield record
             except StreamTailerSetupError as e:
                 if 'No data in stream' in e.message:
                     log.warning("Scribe stream %s is empty on %s" % (stream_name, scribe_env))
@@ -768,7 +1018,7 @@ class ScribeLogReader(LogReader):
         return fake_context()
 
     def scribe_tail(self, scribe_env, stream_name, service, levels, components, clusters, queue, filter_fn,
-                    parse_fn=None):
+                    parse_fn=None, prefilter_fn=None):
         """Creates a scribetailer for a particular environment.
 
         When it encounters a line that it should report, it sticks it into the
@@ -782,10 +1032,14 @@ class ScribeLogReader(LogReader):
             host = host_and_port['host']
             port = host_and_port['port']
             tailer = scribereader.get_stream_tailer(stream_name, host, port)
+            prefilter = prefilter_fn(levels, service, components, clusters) if prefilter_fn else None
             for line in tailer:
+                if prefilter is not None and not prefilter(line):
+                    continue
                 if parse_fn:
                     line = parse_fn(line, clusters, service)
-                if filter_fn(line, levels, service, components, clusters):
+                record = parse_log_record(line)
+                if record is not None and filter_fn(record, levels, service, components, clusters):
                     queue.put(line)
         except KeyboardInterrupt:
             # Die peacefully rather than printing N threads worth of stack
@@ -837,6 +1091,340 @@ class ScribeLogReader(LogReader):
             return env
 
 
+def parse_log_line_timestamp(line):
+    """Returns the timezone aware timestamp of a (JSON-formatted) paasta log line,
+    or None if the line or its timestamp could not be parsed"""
+    try:
+        timestamp = parse_log_timestamp(json.loads(line)['timestamp'])
+    except (ValueError, KeyError, TypeError):
+        return None
+    if timestamp.tzinfo is None:
+        timestamp = pytz.utc.localize(timestamp)
+    return timestamp
+
+
+class LogFileIndex(object):
+    """A sparse timestamp -> byte offset index of a JSON-lines log file, as
+    written by utils.FileLogWriter.
+
+    Every ``interval`` bytes we record the offset and timestamp of the first
+    line starting after that point. The index is built by seeking, so it only
+    reads one line per interval rather than the whole file, and it is kept in a
+    sidecar file next to the log so that later runs only have to index what was
+    appended since. Lines are appended roughly in timestamp order, so the index
+    can be binary searched for the region of the file covering a time range.
+    """
+    SUFFIX = '.idx'
+    VERSION = 1
+
+    def __init__(self, path, interval):
+        self.path = path
+        self.index_path = path + self.SUFFIX
+        self.interval = interval
+        self.inode = None
+        # The offset of the next sample point we haven't indexed yet
+        self.indexed_until = 0
+        # A list of (offset, timestamp) for each sample point, in file order
+        self.entries = []
+
+    def load(self):
+        """Reads the sidecar index file, if there is a usable one"""
+        try:
+            with open(self.index_path) as f:
+                saved = json.load(f)
+        except (IOError, OSError, ValueError):
+            return
+        if saved.get('version') != self.VERSION or saved.get('interval') != self.interval:
+            return
+        self.inode = saved['inode']
+        self.indexed_until = saved['indexed_until']
+        self.entries = [tuple(entry) for entry in saved['entries']]
+
+    def save(self):
+        try:
+            with open(self.index_path, 'w') as f:
+                json.dump({
+                    'version': self.VERSION,
+                    'interval': self.interval,
+                    'inode': self.inode,
+                    'indexed_until': self.indexed_until,
+                    'entries': self.entries,
+                }, f)
+        except (IOError, OSError) as e:
+            log.debug("Could not save log index %s: %s" % (self.index_path, e))
+
+    def reset(self, inode):
+        self.inode = inode
+        self.indexed_until = 0
+        self.entries = []
+
+    def update(self, fd):
+        """Indexes whatever has been appended to the open log file fd since the
+        index was last updated, starting over if the file was rotated or truncated.
+        The sidecar file is rewritten if anything changed."""
+        stat = os.fstat(fd.fileno())
+        if stat.st_ino != self.inode or stat.st_size < self.indexed_until:
+            self.reset(stat.st_ino)
+        changed = False
+        while self.indexed_until < stat.st_size:
+            fd.seek(self.indexed_until)
+            if self.indexed_until > 0:
+                # skip to the start of the next full line
+                fd.readline()
+            line_start = fd.tell()
+            line = fd.readline()
+            if not line.endswith('\n'):
+                # We are at the end of the file. Look at this sample point again next time.
+                break
+            timestamp = parse_log_line_timestamp(line)
+            if timestamp is not None:
+                self.entries.append((line_start, timestamp.isoformat()))
+            self.indexed_until += self.interval
+            changed = True
+        if changed:
+            self.save()
+
+    def _timestamp(self, i):
+        return isodate.parse_datetime(self.entries[i][1])
+
+    def find_start_offset(self, start_time):
+        """Returns an offset at or before the first line logged at start_time.
+        Entries are only roughly ordered, so we back off by one sample point."""
+        lo, hi = 0, len(self.entries)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._timestamp(mid) < start_time:
+                lo = mid + 1
+            else:
+                hi = mid
+        # lo is the first entry at or after start_time
+        return self.entries[lo - 2][0] if lo >= 2 else 0
+
+    def find_end_offset(self, end_time):
+        """Returns an offset after the last line logged at end_time, or None if
+        the rest of the file has to be read"""
+        lo, hi = 0, len(self.entries)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._timestamp(mid) <= end_time:
+                lo = mid + 1
+            else:
+                hi = mid
+        # lo is the first entry after end_time
+        return self.entries[lo + 1][0] if lo + 1 < len(self.entries) else None
+
+
+@register_log_reader('file')
+class FileLogReader(LogReader):
+    """Reads the JSON-lines files written by utils.FileLogWriter.
+
+    path_format should be the same template given to the file log writer. Its
+    {service}, {component}, {level} and {cluster} fields are filled in from the
+    request and {instance} is globbed.
+    """
+    SUPPORTS_TAILING = True
+    SUPPORTS_LINE_COUNT = True
+    SUPPORTS_TIME = True
+
+    DEFAULT_INDEX_INTERVAL = 256 * 1024
+    TAIL_POLL_INTERVAL = 0.5
+
+    def __init__(self, path_format, index_interval=DEFAULT_INDEX_INTERVAL):
+        super(FileLogReader, self).__init__()
+        self.path_format = path_format
+        self.index_interval = index_interval
+
+    def get_log_paths(self, service, levels, components, clusters):
+        """Returns the sorted list of existing log files that may have lines
+        for the given service, levels, components and clusters"""
+        patterns = set()
+        for component in components:
+            for level in levels:
+                for cluster in list(clusters) + [ANY_CLUSTER]:
+                    patterns.add(self.path_format.format(
+                        service=service,
+                        component=component,
+                        level=level,
+                        cluster=cluster,
+                        instance='*',
+                    ))
+        paths = set()
+        for pattern in patterns:
+            paths.update(path for path in glob.glob(pattern) if not path.endswith(LogFileIndex.SUFFIX))
+        return sorted(paths)
+
+    def get_index(self, path, fd):
+        index = LogFileIndex(path, self.index_interval)
+        index.load()
+        index.update(fd)
+        return index
+
+    def read_lines_by_time(self, path, start_time, end_time):
+        with open(path, 'rb') as fd:
+            index = self.get_index(path, fd)
+            end_offset = index.find_end_offset(end_time)
+            fd.seek(index.find_start_offset(start_time))
+            while end_offset is None or fd.tell() < end_offset:
+                line = fd.readline()
+                if not line:
+                    break
+                yield line
+
+    def read_lines_backwards(self, path):
+        with open(path, 'rb') as fd:
+            size = os.fstat(fd.fileno()).st_size
+            if size == 0:
+                return
+            mm = mmap.mmap(fd.fileno(), size, access=mmap.ACCESS_READ)
+            try:
+                end = size
+                if mm[end - 1] == '\n':
+                    end -= 1
+                while end > 0:
+                    start = mm.rfind('\n', 0, end) + 1
+                    yield mm[start:end] + '\n'
+                    end = start - 1
+            finally:
+                mm.close()
+
+    def print_logs_by_time(self, service, start_time, end_time, levels, components, clusters, raw_mode):
+        start_epoch = datetime_to_epoch(start_time)
+        end_epoch = datetime_to_epoch(end_time)
+
+        def read_records(path):
+            for line in self.read_lines_by_time(path, start_time, end_time):
+                record = parse_log_record(line)
+                if record is not None and paasta_log_record_passes_filter(
+                        record, levels, service, components, clusters, start_time=start_epoch, end_time=end_epoch):
+                    yield record
+
+        # Every file is appended to in time order, so they can be merged as they are read
+        paths = self.get_log_paths(service, levels, components, clusters)
+        for record in merge_log_record_streams([read_records(path) for path in paths]):
+            print_log_record(record, levels, raw_mode)
+
+    def print_last_n_logs(self, service, line_count, levels, components, clusters, raw_mode):
+        aggregated_logs = []
+        for path in self.get_log_paths(service, levels, components, clusters):
+            found = 0
+            for line in self.read_lines_backwards(path):
+                if found >= line_count:
+                    break
+                record = parse_log_record(line)
+                if record is not None and paasta_log_record_passes_filter(
+                        record, levels, service, components, clusters):
+                    aggregated_logs.append(record)
+                    found += 1
+
+        aggregated_logs.sort(key=log_record_sort_key)
+        for record in aggregated_logs[-line_count:]:
+            print_log_record(record, levels, raw_mode)
+
+    def tail_logs(self, service, levels, components, clusters, raw_mode=False):
+        """Follows the log files, picking up new files and rotated ones as they
+        appear, until interrupted."""
+        tailed = {}
+        first_poll = True
+        try:
+            while True:
+                for path in self.get_log_paths(service, levels, components, clusters):
+                    try:
+                        inode = os.stat(path).st_ino
+                    except OSError:
+                        continue
+                    fd = tailed.get(path)
+                    if fd is not None and os.fstat(fd.fileno()).st_ino != inode:
+                        # The file was rotated, finish reading the old one and start on the new one
+                        self.print_new_lines(fd, service, levels, components, clusters, raw_mode)
+                        fd.close()
+                        fd = None
+                    if fd is None:
+                        fd = tailed[path] = open(path, 'rb')
+                        if first_poll:
+                            fd.seek(0, os.SEEK_END)
+                    elif os.fstat(fd.fileno()).st_size < fd.tell():
+                        # The file was truncated
+                        fd.seek(0)
+                    self.print_new_lines(fd, service, levels, components, clusters, raw_mode)
+                first_poll = False
+                sleep(self.TAIL_POLL_INTERVAL)
+        except KeyboardInterrupt:
+            log.warn('Terminating.')
+        finally:
+            for fd in tailed.values():
+                fd.close()
+
+    def print_new_lines(self, fd, service, levels, components, clusters, raw_mode):
+        while True:
+            position = fd.tell()
+            line = fd.readline()
+            if not line.endswith('\n'):
+                # Nothing new, or a line that is still being written
+                fd.seek(position)
+                return
+            record = parse_log_record(line)
+            if record is not None and paasta_log_record_passes_filter(record, levels, service, components, clusters):
+                print_log_record(record, levels, raw_mode)
+
+
+@register_log_reader('archive')
+class ArchiveLogReader(LogReader):
+    """Reads the compressed, indexed archives written by paasta_archive_logs
+    (see paasta_tools.log_archive). Only the blocks whose index entry could match
+    the request get decompressed.
+    """
+    SUPPORTS_LINE_COUNT = True
+    SUPPORTS_TIME = True
+
+    def __init__(self, archive_dir):
+        super(ArchiveLogReader, self).__init__()
+        self.archive_dir = archive_dir
+
+    def read_block_records(self, archive, block, service, levels, components, clusters,
+                           start_time=None, end_time=None):
+        for line in archive.read_block(block):
+            record = parse_log_record(line)
+            if record is not None and paasta_log_record_passes_filter(
+                    record, levels, service, components, clusters, start_time=start_time, end_time=end_time):
+                yield record
+
+    def print_logs_by_time(self, service, start_time, end_time, levels, components, clusters, raw_mode):
+        start_epoch = datetime_to_epoch(start_time)
+        end_epoch = datetime_to_epoch(end_time)
+        archives = LogArchive.list_archives(
+            self.archive_dir, service,
+            start_date=datetime.datetime.utcfromtimestamp(start_epoch).date(),
+            end_date=datetime.datetime.utcfromtimestamp(end_epoch).date(),
+        )
+        # Archives are per UTC day, so only the blocks within one need merging
+        for archive in archives:
+            blocks = archive.find_blocks(levels, components, list(clusters) + [ANY_CLUSTER],
+                                         start_time=start_epoch, end_time=end_epoch)
+            streams = [self.read_block_records(archive, block, service, levels, components, clusters,
+                                               start_time=start_epoch, end_time=end_epoch) for block in blocks]
+            for record in merge_log_record_streams(streams):
+                print_log_record(record, levels, raw_mode)
+
+    def print_last_n_logs(self, service, line_count, levels, components, clusters, raw_mode):
+        blocks = []
+        for archive in LogArchive.list_archives(self.archive_dir, service):
+            for block in archive.find_blocks(levels, components, list(clusters) + [ANY_CLUSTER]):
+                blocks.append((archive, block))
+        blocks.sort(key=lambda archive_block: archive_block[1]['end'], reverse=True)
+
+        aggregated_logs = []
+        for archive, block in blocks:
+            # Once we have line_count lines, a block that ends before the oldest of them can't have newer ones
+            if len(aggregated_logs) >= line_count and block['end'] < aggregated_logs[0].timestamp:
+                break
+            aggregated_logs.extend(self.read_block_records(archive, block, service, levels, components, clusters))
+            aggregated_logs.sort(key=log_record_sort_key)
+            aggregated_logs = aggregated_logs[-line_count:]
+
+        for record in aggregated_logs:
+            print_log_record(record, levels, raw_mode)
+
+
 def generate_start_end_time(from_string="30m", to_string=None):
     """Parses the --from and --to command line arguments to create python
     datetime objects representing the start and end times for log retrieval
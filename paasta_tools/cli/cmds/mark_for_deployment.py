@@ -17,15 +17,18 @@ deployment to a cluster.instance.
 """
 import logging
 import sys
+import threading
 import time
 
+import concurrent.futures
 import progressbar
 from bravado.exception import HTTPError
 from requests.exceptions import ConnectionError
 
 from paasta_tools import remote_git
 from paasta_tools.api import client
-from paasta_tools.cli.utils import lazy_choices_completer
+from paasta_tools.cli.cmds import get_command_help
+from paasta_tools.cli.utils import cached_choices_completer
 from paasta_tools.cli.utils import list_deploy_groups
 from paasta_tools.cli.utils import list_services
 from paasta_tools.cli.utils import validate_full_git_sha
@@ -43,6 +46,12 @@ from paasta_tools.utils import TimeoutError
 
 
 DEFAULT_DEPLOYMENT_TIMEOUT = 3600  # seconds
+# Clusters are polled every MIN_POLL_INTERVAL seconds while their instances
+# are changing, backing off to every MAX_POLL_INTERVAL seconds while they aren't
+MIN_POLL_INTERVAL = 1
+MAX_POLL_INTERVAL = 10
+PROGRESS_UPDATE_INTERVAL = 0.5
+MAX_STATUS_CONCURRENCY = 8
 
 
 log = logging.getLogger(__name__)
@@ -51,7 +60,7 @@ log = logging.getLogger(__name__)
 def add_subparser(subparsers):
     list_parser = subparsers.add_parser(
         'mark-for-deployment',
-        help='Mark a docker image for deployment in git',
+        help=get_command_help('mark-for-deployment'),
         description=(
             "'paasta mark-for-deployment' uses Git as the control-plane, to "
             "signal to other PaaSTA components that a particular docker image "
@@ -81,13 +90,13 @@ def add_subparser(subparsers):
              'cluster1.canary, cluster2.main). --clusterinstance is deprecated and '
              'should be replaced with --deploy-group',
         required=True,
-    ).completer = lazy_choices_completer(list_deploy_groups)
+    ).completer = cached_choices_completer(list_deploy_groups, per_service=True)
     list_parser.add_argument(
         '-s', '--service',
         help='Name of the service which you wish to mark for deployment. Leading '
         '"services-" will be stripped.',
         required=True,
-    ).completer = lazy_choices_completer(list_services)
+    ).completer = cached_choices_completer(list_services)
     list_parser.add_argument(
         '--wait-for-deployment',
         help='Set to poll paasta and wait for the deployment to finish, '
@@ -218,29 +227,73 @@ def paasta_mark_for_deployment(args):
     return ret
 
 
-def instances_deployed(cluster, service, instances, git_sha):
-    api = client.get_paasta_api_client(cluster=cluster)
+def log_status_http_error(cluster, service, instance, status_code, text):
+    if status_code == 404:
+        log.warning("Can't get status for instance {0}, service {1} in cluster {2}. "
+                    "This is normally because it is a new service that hasn't been "
+                    "deployed by PaaSTA yet".format(instance, service, cluster))
+    else:
+        log.warning("Error getting service status from PaaSTA API: {0}: {1}".format(status_code, text))
+
+
+def get_instance_status(api, cluster, service, instance):
+    """Returns the status of service.instance from the PaaSTA api of cluster, or
+    None if it couldn't be had"""
+    log.info("Inspecting the deployment status of {}.{} on {}".format(service, instance, cluster))
+    try:
+        return api.service.status_instance(service=service, instance=instance).result()
+    except HTTPError as e:
+        log_status_http_error(cluster, service, instance, e.response.status_code, e.response.text)
+    except ConnectionError as e:
+        log.warning("Error getting service status from PaaSTA API for {0}: {1}".format(cluster, e))
+    return None
+
+
+def get_instance_statuses(api, cluster, service, instances):
+    """Returns the statuses of instances (None for the ones that couldn't be had)
+    from one call to the PaaSTA api of cluster. PaaSTA apis that are too old to
+    return all of a service's statuses at once are asked about each instance
+    concurrently instead."""
+    log.info("Inspecting the deployment status of {} on {}".format(service, cluster))
+    try:
+        service_status = api.service.status_service(service=service).result()
+    except HTTPError as e:
+        if e.response.status_code != 404:
+            log_status_http_error(cluster, service, None, e.response.status_code, e.response.text)
+            return [None for _ in instances]
+    except ConnectionError as e:
+        log.warning("Error getting service status from PaaSTA API for {0}: {1}".format(cluster, e))
+        return [None for _ in instances]
+    else:
+        statuses_by_instance = dict((status.instance, status) for status in service_status.instances)
+        statuses = []
+        for instance in instances:
+            status = statuses_by_instance.get(instance)
+            if status is not None and status.error_code:
+                log_status_http_error(cluster, service, instance, status.error_code, status.error_message)
+                status = None
+            statuses.append(status)
+        return statuses
+
+    max_workers = max(1, min(len(instances), MAX_STATUS_CONCURRENCY))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(
+            lambda instance: get_instance_status(api, cluster, service, instance),
+            instances,
+        ))
+
+
+def instances_deployed(cluster, service, instances, git_sha, api=None):
+    """Returns how many of instances are deployed at git_sha on cluster.
+
+    :param api: a PaaSTA api client for cluster, to save making a new one
+    """
+    if not api:
+        api = client.get_paasta_api_client(cluster=cluster)
     if not api:
         log.warning("Couldn't reach the PaaSTA api for {}! Assuming it is not deployed there yet.".format(cluster))
         return False
-    statuses = []
-    for instance in instances:
-        log.info("Inspecting the deployment status of {}.{} on {}".format(service, instance, cluster))
-        try:
-            status = api.service.status_instance(service=service, instance=instance).result()
-            statuses.append(status)
-        except HTTPError as e:
-            if e.response.status_code == 404:
-                log.warning("Can't get status for instance {0}, service {1} in cluster {2}. "
-                            "This is normally because it is a new service that hasn't been "
-                            "deployed by PaaSTA yet".format(instance, service, cluster))
-            else:
-                log.warning("Error getting service status from PaaSTA API: {0}: {1}".format(e.response.status_code,
-                                                                                            e.response.text))
-            statuses.append(None)
-        except ConnectionError as e:
-            log.warning("Error getting service status from PaaSTA API for {0}: {1}".format(cluster, e))
-            statuses.append(None)
+    statuses = get_instance_statuses(api, cluster, service, instances)
     results = []
     for status in statuses:
         if not status:
@@ -296,26 +349,32 @@ def wait_for_deployment(service, deploy_group, git_sha, soa_dir, timeout):
         raise NoInstancesFound
     for cluster in cluster_map.values():
         cluster['deployed'] = 0
+    stopping = threading.Event()
+    pollers = [
+        ClusterPoller(cluster=cluster, service=service, instances=data['instances'], git_sha=git_sha,
+                      stopping=stopping)
+        for cluster, data in sorted(cluster_map.items())
+    ]
     try:
         with Timeout(seconds=timeout):
+            for poller in pollers:
+                poller.start()
             total_instances = sum([len(v["instances"]) for v in cluster_map.values()])
             with progressbar.ProgressBar(maxval=total_instances) as bar:
                 while True:
-                    for cluster, instances in cluster_map.items():
-                        if cluster_map[cluster]['deployed'] != len(cluster_map[cluster]['instances']):
-                            cluster_map[cluster]['deployed'] = instances_deployed(
-                                cluster=cluster,
-                                service=service,
-                                instances=instances['instances'],
-                                git_sha=git_sha)
-                            if cluster_map[cluster]['deployed'] == len(cluster_map[cluster]['instances']):
-                                instance_csv = ", ".join(cluster_map[cluster]['instances'])
-                                print "Deploy to %s complete! (instances: %s)" % (cluster, instance_csv)
-                        bar.update(sum([v["deployed"] for v in cluster_map.values()]))
+                    for poller in pollers:
+                        poller.reraise()
+                        data = cluster_map[poller.cluster]
+                        if data['deployed'] != poller.deployed:
+                            data['deployed'] = poller.deployed
+                            if data['deployed'] == len(data['instances']):
+                                instance_csv = ", ".join(data['instances'])
+                                print "Deploy to %s complete! (instances: %s)" % (poller.cluster, instance_csv)
+                    bar.update(sum([v["deployed"] for v in cluster_map.values()]))
                     if all([cluster['deployed'] == len(cluster["instances"]) for cluster in cluster_map.values()]):
                         break
                     else:
-                        time.sleep(10)
+                        time.sleep(PROGRESS_UPDATE_INTERVAL)
     except TimeoutError:
         human_status = ["{0}: {1}".format(cluster, data['deployed']) for cluster, data in cluster_map.items()]
         line = "\nCurrent deployment status of {0} per cluster:\n".format(deploy_group) + "\n".join(human_status)
@@ -340,8 +399,63 @@ def wait_for_deployment(service, deploy_group, git_sha, soa_dir, timeout):
             level='event'
         )
         raise
+    finally:
+        stopping.set()
     return True
 
 
+class ClusterPoller(threading.Thread):
+    """Polls how many of a service's instances on one cluster are deployed, until
+    they all are or stopping is set.
+
+    Polls are MIN_POLL_INTERVAL apart while the number of deployed instances is
+    changing, and back off up to MAX_POLL_INTERVAL apart while it isn't.
+    """
+
+    def __init__(self, cluster, service, instances, git_sha, stopping):
+        super(ClusterPoller, self).__init__(name='poll-%s' % cluster)
+        self.daemon = True
+        self.cluster = cluster
+        self.service = service
+        self.instances = instances
+        self.git_sha = git_sha
+        self.stopping = stopping
+        self.deployed = 0
+        self.interval = MIN_POLL_INTERVAL
+        self.exc_info = None
+
+    def get_next_interval(self, changed):
+        if changed:
+            return MIN_POLL_INTERVAL
+        return min(self.interval * 2, MAX_POLL_INTERVAL)
+
+    def poll(self, api):
+        deployed = instances_deployed(
+            cluster=self.cluster,
+            service=self.service,
+            instances=self.instances,
+            git_sha=self.git_sha,
+            api=api,
+        )
+        self.interval = self.get_next_interval(changed=deployed != self.deployed)
+        self.deployed = deployed
+
+    def run(self):
+        try:
+            api = client.get_paasta_api_client(cluster=self.cluster)
+            while not self.stopping.is_set():
+                self.poll(api)
+                if self.deployed == len(self.instances):
+                    return
+                self.stopping.wait(self.interval)
+        except Exception:
+            self.exc_info = sys.exc_info()
+
+    def reraise(self):
+        """Raises whatever stopped the poller in the calling thread"""
+        if self.exc_info:
+            raise self.exc_info[0], self.exc_info[1], self.exc_info[2]
+
+
 class NoInstancesFound(Exception):
     pass
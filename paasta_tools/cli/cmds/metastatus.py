@@ -12,8 +12,9 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+from paasta_tools.cli.cmds import get_command_help
+from paasta_tools.cli.utils import cached_choices_completer
 from paasta_tools.cli.utils import execute_paasta_metastatus_on_remote_master
-from paasta_tools.cli.utils import lazy_choices_completer
 from paasta_tools.utils import DEFAULT_SOA_DIR
 from paasta_tools.utils import list_clusters
 from paasta_tools.utils import load_system_paasta_config
@@ -23,7 +24,7 @@ from paasta_tools.utils import PaastaColors
 def add_subparser(subparsers):
     status_parser = subparsers.add_parser(
         'metastatus',
-        help="Display the status for an entire PaaSTA cluster",
+        help=get_command_help('metastatus'),
         description=(
             "'paasta metastatus' is used to get the vital statistics about a PaaaSTA "
             "cluster as a whole. This tool is helpful when answering the question: 'Is "
@@ -51,7 +52,7 @@ def add_subparser(subparsers):
     status_parser.add_argument(
         '-c', '--clusters',
         help=clusters_help,
-    ).completer = lazy_choices_completer(list_clusters)
+    ).completer = cached_choices_completer(list_clusters)
     status_parser.add_argument(
         '-d', '--soa-dir',
         dest="soa_dir",
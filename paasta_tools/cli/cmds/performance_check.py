@@ -17,6 +17,7 @@ import argparse
 import requests
 from service_configuration_lib import read_extra_service_information
 
+from paasta_tools.cli.cmds import get_command_help
 from paasta_tools.cli.utils import validate_service_name
 from paasta_tools.utils import DEFAULT_SOA_DIR
 from paasta_tools.utils import timeout
@@ -26,7 +27,7 @@ def add_subparser(subparsers):
     list_parser = subparsers.add_parser(
         'performance-check',
         description='Performs a performance check',
-        help='Performs a performance check',
+        help=get_command_help('performance-check'),
     )
     list_parser.add_argument(
         '-s', '--service',
@@ -15,6 +15,7 @@
 """Contains methods used by the paasta client to upload a docker
 image to a registry.
 """
+from paasta_tools.cli.cmds import get_command_help
 from paasta_tools.cli.utils import get_jenkins_build_output_url
 from paasta_tools.cli.utils import validate_full_git_sha
 from paasta_tools.cli.utils import validate_service_name
@@ -27,7 +28,7 @@ from paasta_tools.utils import DEFAULT_SOA_DIR
 def add_subparser(subparsers):
     list_parser = subparsers.add_parser(
         'push-to-registry',
-        help='Uploads a docker image to a registry',
+        help=get_command_help('push-to-registry'),
         description=(
             "'paasta push-to-registry' is a tool to upload a local docker image "
             "to the configured PaaSTA docker registry with a predictable and "
@@ -15,12 +15,13 @@
 import datetime
 
 from paasta_tools import chronos_tools
+from paasta_tools.cli.cmds import get_command_help
 from paasta_tools.cli.cmds.status import get_actual_deployments
 from paasta_tools.cli.cmds.status import get_planned_deployments
 from paasta_tools.cli.cmds.status import list_deployed_clusters
+from paasta_tools.cli.utils import cached_choices_completer
 from paasta_tools.cli.utils import execute_chronos_rerun_on_remote_master
 from paasta_tools.cli.utils import figure_out_service_name
-from paasta_tools.cli.utils import lazy_choices_completer
 from paasta_tools.cli.utils import list_instances
 from paasta_tools.cli.utils import list_services
 from paasta_tools.utils import DEFAULT_SOA_DIR
@@ -37,7 +38,7 @@ def _get_default_execution_date():
 def add_subparser(subparsers):
     rerun_parser = subparsers.add_parser(
         'rerun',
-        help="Re-run a scheduled PaaSTA job",
+        help=get_command_help('rerun'),
         description=(
             "'paasta rerun' creates a copy of the specified PaaSTA scheduled job and executes it immediately. "
             "Parent-dependent relationships are ignored: 'pasta rerun' only executes individual jobs."
@@ -57,17 +58,17 @@ def add_subparser(subparsers):
     rerun_parser.add_argument(
         '-s', '--service',
         help='The name of the service you wish to operate on.',
-    ).completer = lazy_choices_completer(list_services)
+    ).completer = cached_choices_completer(list_services)
     rerun_parser.add_argument(
         '-i', '--instance',
         help='Name of the scheduled job (instance) that you want to rerun.',
         required=True,
-    ).completer = lazy_choices_completer(list_instances)
+    ).completer = cached_choices_completer(list_instances, per_service=True)
     rerun_parser.add_argument(
         '-c', '--clusters',
         help="A comma-separated list of clusters to rerun the job on. Defaults to rerun on all clusters.\n"
              "For example: --clusters norcal-prod,nova-prod"
-    ).completer = lazy_choices_completer(list_clusters)
+    ).completer = cached_choices_completer(list_clusters)
     rerun_parser.add_argument(
         '-d', '--execution_date',
         help="The date the job should be rerun for. Expected in the format %%Y-%%m-%%dT%%H:%%M:%%S .",
@@ -14,7 +14,9 @@
 # limitations under the License.
 from humanize import naturaltime
 
+from paasta_tools.cli.cmds import get_command_help
 from paasta_tools.cli.cmds.mark_for_deployment import mark_for_deployment
+from paasta_tools.cli.utils import cached_choices_completer
 from paasta_tools.cli.utils import extract_tags
 from paasta_tools.cli.utils import figure_out_service_name
 from paasta_tools.cli.utils import lazy_choices_completer
@@ -34,7 +36,7 @@ from paasta_tools.utils import parse_timestamp
 def add_subparser(subparsers):
     list_parser = subparsers.add_parser(
         'rollback',
-        help='Rollback a docker image to a previous deploy',
+        help=get_command_help('rollback'),
         description=(
             "'paasta rollback' is a human-friendly tool for marking a particular "
             "docker image for deployment, which invokes a bounce. While the command "
@@ -61,11 +63,11 @@ def add_subparser(subparsers):
         ' all deploy groups for that service are rolled back',
         default='',
         required=False,
-    ).completer = lazy_choices_completer(list_deploy_groups)
+    ).completer = cached_choices_completer(list_deploy_groups, per_service=True)
     list_parser.add_argument(
         '-s', '--service',
         help='Name of the service to rollback (e.g. "service1")',
-    ).completer = lazy_choices_completer(list_services)
+    ).completer = cached_choices_completer(list_services)
     list_parser.add_argument(
         '-y', '-d', '--soa-dir',
         dest="soa_dir",
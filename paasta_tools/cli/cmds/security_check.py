@@ -12,13 +12,14 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+from paasta_tools.cli.cmds import get_command_help
 
 
 def add_subparser(subparsers):
     list_parser = subparsers.add_parser(
         'security-check',
         description='Performs a security check (not implemented)',
-        help='Performs a security check (not implemented)',
+        help=get_command_help('security-check'),
     )
     list_parser.add_argument(
         '-s', '--service',
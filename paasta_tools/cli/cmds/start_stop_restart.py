@@ -18,9 +18,10 @@ import socket
 from paasta_tools import remote_git
 from paasta_tools import utils
 from paasta_tools.chronos_tools import ChronosJobConfig
+from paasta_tools.cli.cmds import get_command_help
+from paasta_tools.cli.utils import cached_choices_completer
 from paasta_tools.cli.utils import figure_out_service_name
 from paasta_tools.cli.utils import get_instance_config
-from paasta_tools.cli.utils import lazy_choices_completer
 from paasta_tools.cli.utils import list_all_instances_for_service
 from paasta_tools.cli.utils import list_instances
 from paasta_tools.cli.utils import list_services
@@ -38,7 +39,7 @@ def add_subparser(subparsers):
     ]:
         status_parser = subparsers.add_parser(
             command,
-            help="%ss a PaaSTA service in a graceful way." % upper,
+            help=get_command_help(command),
             description=(
                 "%ss a PaaSTA service in a graceful way. This uses the Git control plane." % upper
             ),
@@ -50,18 +51,18 @@ def add_subparser(subparsers):
         status_parser.add_argument(
             '-s', '--service',
             help='Service that you want to %s. Like example_service.' % lower,
-        ).completer = lazy_choices_completer(list_services)
+        ).completer = cached_choices_completer(list_services)
         status_parser.add_argument(
             '-i', '--instances',
             help='A comma-separated list of instances of the service that you '
                  'want to %s. Like --instances main,canary. Defaults to all instances for the service.' % lower
-        ).completer = lazy_choices_completer(list_instances)
+        ).completer = cached_choices_completer(list_instances, per_service=True)
         status_parser.add_argument(
             '-c', '--clusters',
             help="A comma-separated list of clusters to view. "
             "For example: --clusters norcal-prod,nova-prod",
             required=True
-        ).completer = lazy_choices_completer(list_clusters)
+        ).completer = cached_choices_completer(list_clusters)
 
         status_parser.add_argument(
             '-d', '--soa-dir',
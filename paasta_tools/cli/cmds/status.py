@@ -14,18 +14,23 @@
 # limitations under the License.
 import os
 import sys
+import time
 from distutils.util import strtobool
+from StringIO import StringIO
 from subprocess import CalledProcessError
 
+import concurrent.futures
 from bravado.exception import HTTPError
 from service_configuration_lib import read_deploy
 
 from paasta_tools.api.client import get_paasta_api_client
+from paasta_tools.cli.cmds import get_command_help
+from paasta_tools.cli.utils import cached_choices_completer
 from paasta_tools.cli.utils import execute_paasta_serviceinit_on_remote_master
 from paasta_tools.cli.utils import figure_out_service_name
-from paasta_tools.cli.utils import lazy_choices_completer
 from paasta_tools.cli.utils import list_services
 from paasta_tools.cli.utils import PaastaCheckMessages
+from paasta_tools.cli.utils import shutdown_executor_without_waiting
 from paasta_tools.marathon_serviceinit import bouncing_status_human
 from paasta_tools.marathon_serviceinit import desired_state_human
 from paasta_tools.marathon_serviceinit import marathon_app_deploy_status_human
@@ -39,10 +44,17 @@ from paasta_tools.utils import load_system_paasta_config
 from paasta_tools.utils import PaastaColors
 
 
+# How many clusters (or, using the paasta API, instances) to get the status of at once
+MAX_STATUS_CONCURRENCY = 8
+# Leave time for the remote paasta_serviceinit status, which times out after 240s (960s with -v)
+CLUSTER_STATUS_TIMEOUT = 300
+VERBOSE_CLUSTER_STATUS_TIMEOUT = 1000
+
+
 def add_subparser(subparsers):
     status_parser = subparsers.add_parser(
         'status',
-        help="Display the status of a PaaSTA service.",
+        help=get_command_help('status'),
         description=(
             "'paasta status' works by SSH'ing to remote PaaSTA masters and "
             "inspecting the local APIs, and reports on the overal health "
@@ -63,12 +75,12 @@ def add_subparser(subparsers):
     status_parser.add_argument(
         '-s', '--service',
         help='The name of the service you wish to inspect'
-    ).completer = lazy_choices_completer(list_services)
+    ).completer = cached_choices_completer(list_services)
     status_parser.add_argument(
         '-c', '--clusters',
         help="A comma-separated list of clusters to view. Defaults to view all clusters.\n"
              "For example: --clusters norcal-prod,nova-prod"
-    ).completer = lazy_choices_completer(list_clusters)
+    ).completer = cached_choices_completer(list_clusters)
     status_parser.add_argument(
         '-i', '--instances',
         help="A comma-separated list of instances to view. Defaults to view all instances.\n"
@@ -134,34 +146,35 @@ def get_actual_deployments(service, soa_dir):
     return actual_deployments
 
 
-def paasta_status_on_api_endpoint(cluster, service, instance, system_paasta_config, verbose):
+def paasta_status_on_api_endpoint(cluster, service, instance, system_paasta_config, verbose, output=None):
+    output = output or sys.stdout
     client = get_paasta_api_client(cluster, system_paasta_config)
     if not client:
-        print 'Cannot get a paasta-api client'
+        print >>output, 'Cannot get a paasta-api client'
         exit(1)
 
     try:
         status = client.service.status_instance(service=service, instance=instance).result()
     except HTTPError as exc:
-        print exc.response.text
+        print >>output, exc.response.text
         return
 
-    print 'instance: %s' % PaastaColors.blue(instance)
-    print 'Git sha:    %s (desired)' % status.git_sha
+    print >>output, 'instance: %s' % PaastaColors.blue(instance)
+    print >>output, 'Git sha:    %s (desired)' % status.git_sha
 
     marathon_status = status.marathon
     if marathon_status is None:
-        print "Not implemented: Looks like %s is not a Marathon instance" % instance
+        print >>output, "Not implemented: Looks like %s is not a Marathon instance" % instance
         return
     elif marathon_status.error_message:
-        print marathon_status.error_message
+        print >>output, marathon_status.error_message
         return
 
     bouncing_status = bouncing_status_human(marathon_status.app_count,
                                             marathon_status.bounce_method)
     desired_state = desired_state_human(marathon_status.desired_state,
                                         marathon_status.expected_instance_count)
-    print "State:      %s - Desired state: %s" % (bouncing_status, desired_state)
+    print >>output, "State:      %s - Desired state: %s" % (bouncing_status, desired_state)
 
     status = MarathonDeployStatus.fromstring(marathon_status.deploy_status)
     if status != MarathonDeployStatus.NotRunning:
@@ -172,18 +185,46 @@ def paasta_status_on_api_endpoint(cluster, service, instance, system_paasta_conf
     else:
         deploy_status = 'NotRunning'
 
-    print status_marathon_job_human(service, instance, deploy_status,
-                                    marathon_status.app_id,
-                                    marathon_status.running_instance_count,
-                                    marathon_status.expected_instance_count)
+    print >>output, status_marathon_job_human(service, instance, deploy_status,
+                                              marathon_status.app_id,
+                                              marathon_status.running_instance_count,
+                                              marathon_status.expected_instance_count)
+
+
+def paasta_status_on_api_endpoints(cluster, service, instances, system_paasta_config, verbose, output=None):
+    """Asks the paasta API for the status of all of instances at once, printing
+    them in order."""
+    output = output or sys.stdout
+    instance_outputs = [StringIO() for _ in instances]
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=min(len(instances), MAX_STATUS_CONCURRENCY))
+    futures = []
+    try:
+        futures = [
+            executor.submit(paasta_status_on_api_endpoint, cluster, service, instance, system_paasta_config,
+                            verbose=verbose, output=instance_output)
+            for instance, instance_output in zip(instances, instance_outputs)
+        ]
+        for future, instance_output in zip(futures, instance_outputs):
+            future.result()
+            output.write(instance_output.getvalue())
+    finally:
+        # If one instance failed, don't wait for the others
+        shutdown_executor_without_waiting(executor, futures)
 
 
 def report_status_for_cluster(service, cluster, deploy_pipeline, actual_deployments, instance_whitelist,
-                              system_paasta_config, verbose=0, use_api_endpoint=False):
+                              system_paasta_config, verbose=0, use_api_endpoint=False, output=None, stream=True):
     """With a given service and cluster, prints the status of the instances
-    in that cluster"""
-    print
-    print "cluster: %s" % cluster
+    in that cluster
+
+    :param output: a file to print to. Defaults to stdout.
+    :param stream: whether to print the remote status as it comes in. When
+                   False it is printed once it is all there, so that output can
+                   be a buffer.
+    """
+    output = output or sys.stdout
+    print >>output
+    print >>output, "cluster: %s" % cluster
     seen_instances = []
     deployed_instances = []
 
@@ -202,24 +243,28 @@ def report_status_for_cluster(service, cluster, deploy_pipeline, actual_deployme
 
         # Case: service NOT deployed to cluster.instance
         else:
-            print '  instance: %s' % PaastaColors.red(instance)
-            print '    Git sha:    None (not deployed yet)'
+            print >>output, '  instance: %s' % PaastaColors.red(instance)
+            print >>output, '    Git sha:    None (not deployed yet)'
 
     if len(deployed_instances) > 0:
         if use_api_endpoint:
-            for instance in deployed_instances:
-                paasta_status_on_api_endpoint(cluster, service, instance, system_paasta_config, verbose=verbose)
+            paasta_status_on_api_endpoints(cluster, service, deployed_instances, system_paasta_config,
+                                           verbose=verbose, output=output)
         else:
             status = execute_paasta_serviceinit_on_remote_master(
                 'status', cluster, service, ','.join(deployed_instances),
-                system_paasta_config, stream=True, verbose=verbose,
+                system_paasta_config, stream=stream, verbose=verbose,
                 ignore_ssh_output=True)
-            # Status results are streamed. This print is for possible error messages.
+            # Streamed status results are already printed, so this is for possible error messages.
             if status is not None:
                 for line in status.rstrip().split('\n'):
-                    print '    %s' % line
+                    # Indented like streamed status results are
+                    if not stream and 'instance: ' in line:
+                        print >>output, '  %s' % line
+                    else:
+                        print >>output, '    %s' % line
 
-    print report_invalid_whitelist_values(instance_whitelist, seen_instances, 'instance')
+    print >>output, report_invalid_whitelist_values(instance_whitelist, seen_instances, 'instance')
 
 
 def report_invalid_whitelist_values(whitelist, items, item_type):
@@ -240,25 +285,75 @@ def report_invalid_whitelist_values(whitelist, items, item_type):
 
 
 def report_status(service, deploy_pipeline, actual_deployments, cluster_whitelist, instance_whitelist,
-                  system_paasta_config, verbose=0, use_api_endpoint=False):
-
+                  system_paasta_config, verbose=0, use_api_endpoint=False,
+                  max_concurrency=MAX_STATUS_CONCURRENCY, cluster_timeout=None):
+    """Prints the status of the service in every cluster it is deployed to.
+    Clusters are looked at concurrently and their output is buffered, so that
+    it comes out in deploy pipeline order all the same.
+
+    :param cluster_timeout: how many seconds to wait for one cluster's status,
+                            counting from when we start getting it. Defaults to
+                            a bit more than the remote status command may take.
+    """
     deployed_clusters = list_deployed_clusters(deploy_pipeline, actual_deployments)
-    for cluster in deployed_clusters:
-        if not cluster_whitelist or cluster in cluster_whitelist:
-            report_status_for_cluster(
-                service=service,
-                cluster=cluster,
-                deploy_pipeline=deploy_pipeline,
-                actual_deployments=actual_deployments,
-                instance_whitelist=instance_whitelist,
-                system_paasta_config=system_paasta_config,
-                verbose=verbose,
-                use_api_endpoint=use_api_endpoint
-            )
+    clusters = [cluster for cluster in deployed_clusters if not cluster_whitelist or cluster in cluster_whitelist]
+    if cluster_timeout is None:
+        cluster_timeout = VERBOSE_CLUSTER_STATUS_TIMEOUT if verbose else CLUSTER_STATUS_TIMEOUT
+    report_kwargs = dict(
+        service=service,
+        deploy_pipeline=deploy_pipeline,
+        actual_deployments=actual_deployments,
+        instance_whitelist=instance_whitelist,
+        system_paasta_config=system_paasta_config,
+        verbose=verbose,
+        use_api_endpoint=use_api_endpoint,
+    )
+
+    if len(clusters) == 1:
+        # Nothing to wait for, so stream the status as it comes in
+        report_status_for_cluster(cluster=clusters[0], **report_kwargs)
+    elif clusters:
+        report_status_for_clusters_concurrently(clusters, report_kwargs, max_concurrency, cluster_timeout)
 
     print report_invalid_whitelist_values(cluster_whitelist, deployed_clusters, 'cluster')
 
 
+def report_status_for_clusters_concurrently(clusters, report_kwargs, max_concurrency, cluster_timeout):
+    """Runs report_status_for_cluster for each of clusters in a thread pool and
+    prints their output in the order of clusters. A cluster whose status takes
+    more than cluster_timeout seconds is reported as timed out."""
+    started_at = {}
+
+    def report(cluster, output):
+        started_at[cluster] = time.time()
+        report_status_for_cluster(cluster=cluster, output=output, stream=False, **report_kwargs)
+
+    outputs = [StringIO() for _ in clusters]
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=min(len(clusters), max_concurrency))
+    futures = []
+    try:
+        futures = [executor.submit(report, cluster, output) for cluster, output in zip(clusters, outputs)]
+        for cluster, future, output in zip(clusters, futures, outputs):
+            while True:
+                # Clusters waiting for a worker haven't started their timeout yet
+                deadline = started_at.get(cluster, time.time()) + cluster_timeout
+                try:
+                    future.result(timeout=max(deadline - time.time(), 0))
+                except concurrent.futures.TimeoutError:
+                    if cluster in started_at and time.time() >= started_at[cluster] + cluster_timeout:
+                        print
+                        print "cluster: %s" % cluster
+                        print "    ERROR: timed out after %s seconds getting the status of %s" % (
+                            cluster_timeout, cluster)
+                        break
+                else:
+                    sys.stdout.write(output.getvalue())
+                    break
+    finally:
+        # Don't wait for clusters that timed out, or for the rest after one failed
+        shutdown_executor_without_waiting(executor, futures)
+
+
 def paasta_status(args):
     """Print the status of a Yelp service running on PaaSTA.
     :param args: argparse.Namespace obj created from sys.args by cli"""
@@ -17,6 +17,7 @@ import subprocess
 import sys
 from urlparse import urlparse
 
+from paasta_tools.cli.cmds import get_command_help
 from paasta_tools.cli.utils import calculate_remote_masters
 from paasta_tools.cli.utils import find_connectable_master
 from paasta_tools.cli.utils import get_status_for_instance
@@ -31,7 +32,7 @@ from paasta_tools.utils import load_system_paasta_config
 def add_subparser(subparsers):
     new_parser = get_subparser(description="'paasta sysdig' works by SSH'ing to remote PaaSTA masters and "
                                            "running sysdig with the neccessary filters",
-                               help_text="Run sysdig on a remote host and filter to a service and instance",
+                               help_text=get_command_help('sysdig'),
                                command='sysdig',
                                function=paasta_sysdig,
                                subparsers=subparsers)
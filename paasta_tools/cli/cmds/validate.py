@@ -27,9 +27,10 @@ import paasta_tools.chronos_tools
 from paasta_tools.chronos_tools import check_parent_format
 from paasta_tools.chronos_tools import load_chronos_job_config
 from paasta_tools.chronos_tools import TMP_JOB_IDENTIFIER
+from paasta_tools.cli.cmds import get_command_help
+from paasta_tools.cli.utils import cached_choices_completer
 from paasta_tools.cli.utils import failure
 from paasta_tools.cli.utils import get_file_contents
-from paasta_tools.cli.utils import lazy_choices_completer
 from paasta_tools.cli.utils import list_services
 from paasta_tools.cli.utils import PaastaColors
 from paasta_tools.cli.utils import success
@@ -143,12 +144,12 @@ def add_subparser(subparsers):
     validate_parser = subparsers.add_parser(
         'validate',
         description="Execute 'paasta validate' from service repo root",
-        help="Validate that all paasta config files in pwd are correct")
+        help=get_command_help('validate'))
     validate_parser.add_argument(
         '-s', '--service',
         required=False,
         help="Service that you want to validate. Like 'example_service'.",
-    ).completer = lazy_choices_completer(list_services)
+    ).completer = cached_choices_completer(list_services)
     validate_parser.add_argument(
         '-y', '--yelpsoa-config-root',
         dest='yelpsoa_config_root',
@@ -0,0 +1,119 @@
+# Copyright 2015-2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""A cache of tab completion choices, so that completing a service, cluster
+or instance doesn't have to walk and parse the whole soa_dir on every TAB.
+
+Each cached list of choices records the mtimes of the paths it was built from
+(like the soa_dir and a service's directory). When those change, or the
+choices get older than max_age, the cached choices are still returned but are
+rebuilt by a detached background process, so the next TAB sees fresh ones.
+"""
+import json
+import logging
+import os
+import time
+
+
+log = logging.getLogger(__name__)
+
+# Editing a file in place doesn't change its directory's mtime, so choices are
+# also refreshed once they are this old
+DEFAULT_MAX_AGE = 60 * 60
+
+
+def get_default_cache_dir():
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'paasta')
+
+
+def get_signature(paths):
+    """Returns the mtimes of paths, with None for the ones that don't exist"""
+    signature = []
+    for path in paths:
+        try:
+            signature.append(os.stat(path).st_mtime)
+        except OSError:
+            signature.append(None)
+    return signature
+
+
+class CompletionCache(object):
+
+    def __init__(self, cache_dir=None, max_age=DEFAULT_MAX_AGE):
+        self.path = os.path.join(cache_dir or get_default_cache_dir(), 'completions.json')
+        self.max_age = max_age
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError):
+            return {}
+
+    def store(self, key, signature, choices):
+        """Saves choices for key. Failing to write the cache isn't an error, it
+        just makes the next completion slow again."""
+        entries = self.load()
+        entries[key] = {'signature': signature, 'computed_at': time.time(), 'choices': choices}
+        tmp_path = '%s.%d.tmp' % (self.path, os.getpid())
+        try:
+            if not os.path.isdir(os.path.dirname(self.path)):
+                os.makedirs(os.path.dirname(self.path))
+            with open(tmp_path, 'w') as f:
+                json.dump(entries, f)
+            os.rename(tmp_path, self.path)
+        except (IOError, OSError) as e:
+            log.debug("Couldn't write the completion cache %s: %s" % (self.path, e))
+
+    def refresh(self, key, compute_fn, paths):
+        # Take the signature first, so changes made while computing trigger another refresh
+        signature = get_signature(paths)
+        self.store(key, signature, list(compute_fn()))
+
+    def refresh_in_background(self, key, compute_fn, paths):
+        """Refreshes key in a detached grandchild process, which doesn't hold on to
+        our file descriptors (bash waits for argcomplete's output pipe to close)."""
+        try:
+            pid = os.fork()
+        except OSError:
+            return
+        if pid != 0:
+            os.waitpid(pid, 0)
+            return
+        try:
+            if os.fork() == 0:
+                devnull = os.open(os.devnull, os.O_RDWR)
+                for fd in (0, 1, 2):
+                    os.dup2(devnull, fd)
+                os.closerange(3, os.sysconf('SC_OPEN_MAX'))
+                self.refresh(key, compute_fn, paths)
+        finally:
+            os._exit(0)
+
+    def get(self, key, compute_fn, paths):
+        """Returns the cached choices for key, calling compute_fn to build them if
+        there aren't any yet.
+
+        :param compute_fn: returns the choices for key
+        :param paths: the files or directories the choices are built from
+        """
+        entry = self.load().get(key)
+        if entry is None:
+            signature = get_signature(paths)
+            choices = list(compute_fn())
+            self.store(key, signature, choices)
+            return choices
+        if entry['signature'] != get_signature(paths) or time.time() - entry['computed_at'] > self.max_age:
+            self.refresh_in_background(key, compute_fn, paths)
+        return entry['choices']
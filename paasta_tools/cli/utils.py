@@ -12,22 +12,27 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 import argparse
+import errno
 import fnmatch
 import logging
 import os
 import pkgutil
 import re
+import stat
 import sys
+import tempfile
 from socket import gaierror
 from socket import gethostbyname_ex
 from subprocess import CalledProcessError
 
+import concurrent.futures
 from bravado.exception import HTTPError
 from bravado.exception import HTTPNotFound
 from service_configuration_lib import read_services_configuration
 
 from paasta_tools.api import client
 from paasta_tools.chronos_tools import load_chronos_job_config
+from paasta_tools.cli.completion_cache import CompletionCache
 from paasta_tools.marathon_tools import load_marathon_service_config
 from paasta_tools.monitoring_tools import _load_sensu_team_data
 from paasta_tools.utils import _run
@@ -383,13 +388,13 @@ def list_service_instances():
     return the_list
 
 
-def list_instances(**kwargs):
+def list_instances(service=None, **kwargs):
     """Returns a sorted list of all possible instance names
     for tab completion. We try to guess what service you might be
     operating on, otherwise we just provide *all* of them
     """
     all_instances = set()
-    service = guess_service_name()
+    service = service or guess_service_name()
     try:
         validate_service_name(service)
         all_instances = set(list_all_instances_for_service(service))
@@ -425,33 +430,96 @@ def calculate_remote_masters(cluster, system_paasta_config):
     return (ips, output)
 
 
-def find_connectable_master(masters):
-    """For each host in the iterable 'masters', try various connectivity
-    checks. For each master that fails, emit an error message about which check
-    failed and move on to the next master.
+def get_ssh_control_dir():
+    """Returns a directory that only the current user can use for ssh control
+    sockets, creating it if needed, or None if one can't be had safely."""
+    control_dir = os.path.join(tempfile.gettempdir(), 'paasta-ssh-%d' % os.getuid())
+    try:
+        os.mkdir(control_dir, 0o700)
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            log.warning("Couldn't create the ssh control socket directory %s: %s" % (control_dir, e))
+            return None
+    dir_stat = os.lstat(control_dir)
+    if not stat.S_ISDIR(dir_stat.st_mode) or dir_stat.st_uid != os.getuid() or dir_stat.st_mode & 0o077:
+        log.warning("Not sharing ssh connections, as %s isn't a directory only you can use" % control_dir)
+        return None
+    return control_dir
+
+
+def get_ssh_flags(system_paasta_config):
+    """Returns the flags to ssh to masters with. If ssh_control_persist is set in
+    the system paasta config, ssh connections to a master are shared by all of
+    the commands run on it, and kept open for that many seconds after the last
+    one exits, so that only the first command pays for connecting and
+    authenticating."""
+    control_persist = system_paasta_config.get_ssh_control_persist()
+    if not control_persist:
+        return ''
+    control_dir = get_ssh_control_dir()
+    if control_dir is None:
+        return ''
+    return '-o ControlMaster=auto -o ControlPath=%s -o ControlPersist=%d' % (
+        os.path.join(control_dir, '%r@%h:%p'),
+        control_persist,
+    )
 
-    If a master passes all checks, return a tuple of the connectable master and
-    None. If no masters pass all checks, return a tuple of None and the output
-    from the DNS lookup.
-    """
-    timeout = 6.0  # seconds
 
-    connectable_master = None
-    for master in masters:
-        rc, output = check_ssh_and_sudo_on_master(master, timeout=timeout)
-        if rc is True:
-            connectable_master = master
-            output = None
-            break
-    return (connectable_master, output)
+def shutdown_executor_without_waiting(executor, futures):
+    """Shuts a ThreadPoolExecutor down without letting the calls that are still
+    running hold up the process. executor.shutdown(wait=False) alone doesn't:
+    the workers go on to run the calls still queued, and the futures backport
+    joins every worker thread at exit.
 
+    :param futures: the futures submitted to executor. Those that haven't
+                    started are cancelled.
+    """
+    for future in futures:
+        future.cancel()
+    executor.shutdown(wait=False)
+    # The workers are daemon threads, so once they aren't joined at exit,
+    # whatever they're still running is dropped when the process exits
+    for thread in executor._threads:
+        concurrent.futures.thread._threads_queues.pop(thread, None)
+
+
+def find_connectable_master(masters, ssh_flags=''):
+    """Runs connectivity checks against all of the hosts in the iterable
+    'masters' at once.
+
+    If a master passes all checks, return a tuple of the first connectable
+    master and None. If no masters pass all checks, return a tuple of None and
+    the output from the check of the last master.
+    """
+    timeout = 6.0  # seconds
 
-def check_ssh_and_sudo_on_master(master, timeout=10):
+    masters = list(masters)
+    if not masters:
+        return (None, None)
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=len(masters))
+    try:
+        futures = dict(
+            (executor.submit(check_ssh_and_sudo_on_master, master, timeout=timeout, ssh_flags=ssh_flags), master)
+            for master in masters
+        )
+        outputs = {}
+        for future in concurrent.futures.as_completed(futures):
+            rc, output = future.result()
+            if rc is True:
+                return (futures[future], None)
+            outputs[futures[future]] = output
+    finally:
+        # Don't wait for the checks of the masters we didn't need
+        executor.shutdown(wait=False)
+    return (None, outputs[masters[-1]])
+
+
+def check_ssh_and_sudo_on_master(master, timeout=10, ssh_flags=''):
     """Given a master, attempt to ssh to the master and run a simple command
     with sudo to verify that ssh and sudo work properly. Return a tuple of the
     success status (True or False) and any output from attempting the check.
     """
-    check_command = 'ssh -A -n %s sudo paasta_serviceinit -h' % master
+    check_command = ' '.join(filter(None, ['ssh -A -n', ssh_flags, master, 'sudo paasta_serviceinit -h']))
     rc, output = _run(check_command, timeout=timeout)
     if rc == 0:
         return (True, None)
@@ -528,19 +596,19 @@ def execute_paasta_serviceinit_on_remote_master(subcommand, cluster, service, in
     masters, output = calculate_remote_masters(cluster, system_paasta_config)
     if masters == []:
         return 'ERROR: %s' % output
-    master, output = find_connectable_master(masters)
+    ssh_flags = get_ssh_flags(system_paasta_config)
+    master, output = find_connectable_master(masters, ssh_flags=ssh_flags)
     if not master:
         return (
             'ERROR: could not find connectable master in cluster %s\nOutput: %s' % (cluster, output)
         )
     if ignore_ssh_output:
-        return run_paasta_serviceinit(subcommand, master, service, instances, cluster, stream,
-                                      ssh_flags='-o LogLevel=QUIET', **kwargs)
-    else:
-        return run_paasta_serviceinit(subcommand, master, service, instances, cluster, stream, **kwargs)
+        ssh_flags = ' '.join(filter(None, ['-o LogLevel=QUIET', ssh_flags]))
+    return run_paasta_serviceinit(subcommand, master, service, instances, cluster, stream,
+                                  ssh_flags=ssh_flags, **kwargs)
 
 
-def run_paasta_metastatus(master, humanize, groupings, verbose=0):
+def run_paasta_metastatus(master, humanize, groupings, verbose=0, ssh_flags=''):
     if verbose > 0:
         verbose_flag = "-%s" % ('v' * verbose)
         timeout = 120
@@ -550,10 +618,7 @@ def run_paasta_metastatus(master, humanize, groupings, verbose=0):
     humanize_flag = "-H" if humanize else ''
     groupings_flag = "-g %s" % " ".join(groupings) if groupings else ''
     cmd_args = " ".join(filter(None, [verbose_flag, humanize_flag, groupings_flag]))
-    command = ('ssh -A -n %s sudo paasta_metastatus %s' % (
-        master,
-        cmd_args
-    )).strip()
+    command = ' '.join(filter(None, ['ssh -A -n', ssh_flags, master, 'sudo paasta_metastatus', cmd_args]))
     _, output = _run(command, timeout=timeout)
     return output
 
@@ -565,19 +630,20 @@ def execute_paasta_metastatus_on_remote_master(cluster, system_paasta_config, hu
     masters, output = calculate_remote_masters(cluster, system_paasta_config)
     if masters == []:
         return 'ERROR: %s' % output
-    master, output = find_connectable_master(masters)
+    ssh_flags = get_ssh_flags(system_paasta_config)
+    master, output = find_connectable_master(masters, ssh_flags=ssh_flags)
     if not master:
         return (
             'ERROR: could not find connectable master in cluster %s\nOutput: %s' % (cluster, output)
         )
-    return run_paasta_metastatus(master, humanize, groupings, verbose)
+    return run_paasta_metastatus(master, humanize, groupings, verbose, ssh_flags=ssh_flags)
 
 
-def run_chronos_rerun(master, service, instancename, **kwargs):
+def run_chronos_rerun(master, service, instancename, ssh_flags='', **kwargs):
     timeout = 60
     verbose_flags = '-v ' * kwargs['verbose']
     command = 'ssh -A -n %s \'sudo chronos_rerun %s"%s %s" "%s"\'' % (
-        master,
+        ' '.join(filter(None, [ssh_flags, master])),
         verbose_flags,
         service,
         instancename,
@@ -593,13 +659,14 @@ def execute_chronos_rerun_on_remote_master(service, instancename, cluster, syste
     masters, output = calculate_remote_masters(cluster, system_paasta_config)
     if masters == []:
         return (-1, 'ERROR: %s' % output)
-    master, output = find_connectable_master(masters)
+    ssh_flags = get_ssh_flags(system_paasta_config)
+    master, output = find_connectable_master(masters, ssh_flags=ssh_flags)
     if not master:
         return (
             -1,
             'ERROR: could not find connectable master in cluster %s\nOutput: %s' % (cluster, output)
         )
-    return run_chronos_rerun(master, service, instancename, **kwargs)
+    return run_chronos_rerun(master, service, instancename, ssh_flags=ssh_flags, **kwargs)
 
 
 def lazy_choices_completer(list_func):
@@ -609,6 +676,39 @@ def lazy_choices_completer(list_func):
     return inner
 
 
+def get_cached_choices(list_func, service=None, soa_dir=DEFAULT_SOA_DIR):
+    """Returns list_func's choices from the completion cache. They are rebuilt
+    when soa_dir changes, or, if service is given, the service's directory does.
+
+    :param list_func: a function that lists choices from soa_dir. It is passed
+                      service if one is given.
+    """
+    key = ':'.join([soa_dir, list_func.__name__] + ([service] if service else []))
+    if service:
+        paths = [soa_dir, os.path.join(soa_dir, service)]
+        return CompletionCache().get(key, lambda: list_func(service=service), paths)
+    else:
+        return CompletionCache().get(key, list_func, [soa_dir])
+
+
+def cached_choices_completer(list_func, per_service=False):
+    """Like lazy_choices_completer, but for choices read from soa_dir, which are
+    served from the completion cache.
+
+    :param per_service: whether list_func's choices depend on the service being
+                        completed for, which is --service or the current
+                        directory's name
+    """
+    def inner(prefix, parsed_args=None, **kwargs):
+        if per_service:
+            service = getattr(parsed_args, 'service', None) or guess_service_name()
+            options = get_cached_choices(list_func, service=service)
+        else:
+            options = get_cached_choices(list_func)
+        return [o for o in options if o.startswith(prefix)]
+    return inner
+
+
 def figure_out_service_name(args, soa_dir=DEFAULT_SOA_DIR):
     """Figures out and validates the input service name"""
     service = args.service or guess_service_name()
@@ -713,13 +813,13 @@ def get_subparser(subparsers, function, command, help_text, description):
         '-s', '--service',
         help='The name of the service you wish to inspect',
         required=True
-    ).completer = lazy_choices_completer(list_services)
+    ).completer = cached_choices_completer(list_services)
     new_parser.add_argument(
         '-c', '--cluster',
         help="Cluster on which the service is running"
              "For example: --cluster norcal-prod",
         required=True
-    ).completer = lazy_choices_completer(list_clusters)
+    ).completer = cached_choices_completer(list_clusters)
     new_parser.add_argument(
         '-i', '--instance',
         help="The instance that you wish to inspect"
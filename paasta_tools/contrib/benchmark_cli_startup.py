@@ -0,0 +1,55 @@
+#!/usr/bin/env python2.7
+"""Benchmarks how long the paasta CLI takes to start up.
+
+Times fresh interpreters running 'paasta --help', 'paasta list' and tab
+completion (as bash would call it through argcomplete) of a command name and
+of one command's options.
+
+Usage: ./benchmark_cli_startup.py [-n RUNS]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+
+RUN_PAASTA = 'import sys; from paasta_tools.cli.cli import main; sys.argv[0] = "paasta"; main()'
+
+CASES = [
+    ('paasta --help', ['--help'], None),
+    ('paasta list', ['list'], None),
+    ('complete "paasta st"', [], 'paasta st'),
+    ('complete "paasta logs --"', [], 'paasta logs --'),
+]
+
+
+def run_once(args, comp_line):
+    env = dict(os.environ)
+    if comp_line is not None:
+        env.update({
+            '_ARGCOMPLETE': '1',
+            'COMP_LINE': comp_line,
+            'COMP_POINT': str(len(comp_line)),
+            'COMP_WORDBREAKS': ' \t\n"\'><=;|&(:',
+        })
+    with open(os.devnull, 'w') as devnull:
+        start = time.time()
+        # argcomplete writes its completions to fd 8, so point it at stdout
+        subprocess.call([sys.executable, '-c', RUN_PAASTA] + args, env=env, stdout=devnull, stderr=devnull,
+                        preexec_fn=lambda: os.dup2(1, 8))
+        return time.time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-n', '--runs', type=int, default=5, help="Number of runs of each command")
+    args = parser.parse_args()
+
+    for name, paasta_args, comp_line in CASES:
+        timings = sorted(run_once(paasta_args, comp_line) for _ in range(args.runs))
+        print "%-28s median %.3fs, best %.3fs" % (name, timings[len(timings) // 2], timings[0])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python2.7
+"""Benchmarks the paasta logs filter -> sort -> render pipeline.
+
+Compares decoding each log line once into a LogRecord against the old way of
+json-decoding (and parsing the timestamp of) every line separately in the
+filter, the sort key and the renderer.
+
+Usage: ./benchmark_log_pipeline.py [-n LINES]
+"""
+import argparse
+import datetime
+import time
+
+import isodate
+import pytz
+import ujson as json
+
+from paasta_tools.cli.cmds import logs
+from paasta_tools.utils import format_log_line
+
+
+LEVELS = ['event', 'debug']
+COMPONENTS = ['build', 'deploy', 'monitoring']
+CLUSTERS = ['cluster1', 'cluster2']
+
+
+def generate_lines(count):
+    start = datetime.datetime(2016, 7, 26, 22, 0, 0)
+    lines = []
+    for i in range(count):
+        lines.append(format_log_line(
+            level=LEVELS[i % 2],
+            cluster=CLUSTERS[i % 3 % 2],
+            service='fake_service',
+            instance='main',
+            component=COMPONENTS[i % 4 % 3],
+            line='Deploying fake_service.main, this is log line number %d' % i,
+            timestamp=(start + datetime.timedelta(milliseconds=i)).isoformat(),
+        ))
+    return lines
+
+
+def legacy_prettify_log_line(line, requested_levels):
+    parsed_line = json.loads(line)
+    return "%(timestamp)s %(component)s %(cluster)s %(instance)s - %(level)s%(message)s" % ({
+        'timestamp': logs.prettify_timestamp(parsed_line['timestamp']),
+        'component': logs.prettify_component(parsed_line['component']),
+        'cluster': '[%s]' % parsed_line['cluster'],
+        'instance': '[%s]' % parsed_line['instance'],
+        'level': logs.prettify_level(parsed_line['level'], requested_levels),
+        'message': parsed_line['message'],
+    })
+
+
+def legacy_pipeline(lines, start_time, end_time):
+    """The pipeline as it was: three json decodes and up to three timestamp parses per line"""
+    aggregated_logs = []
+    for line in lines:
+        parsed_line = json.loads(line)
+        timestamp = isodate.parse_datetime(parsed_line.get('timestamp'))
+        if not logs.check_timestamp_in_range(timestamp, start_time, end_time):
+            continue
+        if not (parsed_line.get('level') in LEVELS and parsed_line.get('component') in COMPONENTS and
+                parsed_line.get('cluster') in CLUSTERS):
+            continue
+        parsed_line = json.loads(line)
+        timestamp = isodate.parse_datetime(parsed_line.get('timestamp'))
+        if not timestamp.tzinfo:
+            timestamp = pytz.utc.localize(timestamp)
+        aggregated_logs.append({'raw_line': line, 'sort_key': timestamp})
+    aggregated_logs.sort(key=lambda log_line: log_line['sort_key'])
+    return [legacy_prettify_log_line(line['raw_line'], LEVELS) for line in aggregated_logs]
+
+
+def record_pipeline(lines, start_time, end_time):
+    """The pipeline paasta logs uses: one decode per line into a LogRecord"""
+    start_epoch = logs.datetime_to_epoch(start_time)
+    end_epoch = logs.datetime_to_epoch(end_time)
+    aggregated_logs = []
+    for line in lines:
+        record = logs.parse_log_record(line)
+        if record is not None and logs.paasta_log_record_passes_filter(
+                record, LEVELS, 'fake_service', COMPONENTS, CLUSTERS, start_time=start_epoch, end_time=end_epoch):
+            aggregated_logs.append(record)
+    aggregated_logs.sort(key=logs.log_record_sort_key)
+    return [logs.prettify_log_record(log_record, LEVELS) for log_record in aggregated_logs]
+
+
+def timed(fn, *args):
+    start = time.time()
+    result = fn(*args)
+    return time.time() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-n', '--lines', type=int, default=100000, help="Number of log lines to run through")
+    args = parser.parse_args()
+
+    lines = generate_lines(args.lines)
+    start_time = pytz.utc.localize(datetime.datetime(2016, 7, 26, 21, 0, 0))
+    end_time = pytz.utc.localize(datetime.datetime(2016, 7, 27, 22, 0, 0))
+
+    legacy_seconds, legacy_output = timed(legacy_pipeline, lines, start_time, end_time)
+    record_seconds, record_output = timed(record_pipeline, lines, start_time, end_time)
+    assert legacy_output == record_output, "The pipelines disagree"
+
+    print "%d lines, %d printed" % (len(lines), len(record_output))
+    print "legacy pipeline: %.2fs (%d lines/s)" % (legacy_seconds, len(lines) / legacy_seconds)
+    print "record pipeline: %.2fs (%d lines/s)" % (record_seconds, len(lines) / record_seconds)
+    print "speedup: %.2fx" % (legacy_seconds / record_seconds)
+
+
+if __name__ == '__main__':
+    main()
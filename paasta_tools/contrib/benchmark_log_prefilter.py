@@ -0,0 +1,89 @@
+#!/usr/bin/env python2.7
+"""Benchmarks the substring prefilter paasta logs runs before decoding lines.
+
+Runs a synthetic paasta stream and a synthetic shared marathon stream through
+ScribeLogReader.filter_scribe_logs with and without the prefilter, checks that
+both keep the same records, and reports the throughput of each.
+
+Usage: ./benchmark_log_prefilter.py [-n LINES]
+"""
+import argparse
+import datetime
+import time
+from contextlib import contextmanager
+
+from paasta_tools.cli.cmds import logs
+from paasta_tools.marathon_tools import format_job_id
+from paasta_tools.utils import format_log_line
+
+
+SERVICE = 'fake_service'
+LEVELS = ['event']
+COMPONENTS = ['build', 'deploy', 'monitoring', 'marathon']
+CLUSTERS = ['cluster1']
+
+
+def generate_paasta_lines(count):
+    """Mostly debug lines, spread over a few clusters, like a busy service's stream"""
+    start = datetime.datetime(2016, 7, 26, 22, 0, 0)
+    return [format_log_line(
+        level='event' if i % 10 == 0 else 'debug',
+        cluster='cluster%d' % (i // 10 % 4),
+        service=SERVICE,
+        instance='main',
+        component=['build', 'deploy', 'monitoring'][i % 3],
+        line='Deploying fake_service.main, this is log line number %d' % i,
+        timestamp=(start + datetime.timedelta(milliseconds=i)).isoformat(),
+    ) for i in range(count)]
+
+
+def generate_marathon_lines(count):
+    """One line in a hundred is about our service, as in a stream shared by a whole cluster"""
+    start = datetime.datetime(2016, 7, 26, 22, 0, 0)
+    return ['%s-00:00 marathon[1234]: [INFO] Received status update for task %s.%d' % (
+        (start + datetime.timedelta(milliseconds=i)).isoformat(),
+        format_job_id(SERVICE if i % 100 == 0 else 'other_service_%d' % (i % 50), 'main'),
+        i,
+    ) for i in range(count)]
+
+
+def run_stream(lines, stream_info, use_prefilter):
+    @contextmanager
+    def fake_context():
+        yield iter(lines)
+
+    # filter_scribe_logs doesn't need a connection to scribe, so skip the
+    # constructor's check that scribereader is installed
+    reader = logs.ScribeLogReader.__new__(logs.ScribeLogReader)
+    start = time.time()
+    records = list(reader.filter_scribe_logs(
+        fake_context(), 'env', 'stream', LEVELS, SERVICE, COMPONENTS, CLUSTERS,
+        parser_fn=stream_info.parse_fn,
+        filter_fn=stream_info.filter_fn,
+        prefilter_fn=stream_info.prefilter_fn if use_prefilter else None,
+    ))
+    return time.time() - start, records
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-n', '--lines', type=int, default=100000, help="Number of log lines per stream")
+    args = parser.parse_args()
+
+    streams = [
+        ('paasta', generate_paasta_lines(args.lines), logs.ScribeLogReader.COMPONENT_STREAM_INFO['default']),
+        ('marathon', generate_marathon_lines(args.lines), logs.ScribeLogReader.COMPONENT_STREAM_INFO['marathon']),
+    ]
+    for name, lines, stream_info in streams:
+        full_seconds, full_records = run_stream(lines, stream_info, use_prefilter=False)
+        prefiltered_seconds, prefiltered_records = run_stream(lines, stream_info, use_prefilter=True)
+        assert full_records == prefiltered_records, "The prefilter changed the %s results" % name
+
+        print "%s stream: %d lines, %d kept" % (name, len(lines), len(full_records))
+        print "  without prefilter: %.2fs (%d lines/s)" % (full_seconds, len(lines) / full_seconds)
+        print "  with prefilter: %.2fs (%d lines/s)" % (prefiltered_seconds, len(lines) / prefiltered_seconds)
+        print "  speedup: %.2fx" % (full_seconds / prefiltered_seconds)
+
+
+if __name__ == '__main__':
+    main()
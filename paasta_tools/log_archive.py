@@ -0,0 +1,249 @@
+#!/usr/bin/env python
+# Copyright 2015-2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Usage: ./log_archive.py [options] ARCHIVE_DIR [LOG_FILE ...]
+
+Compacts JSON-lines paasta logs, like the ones the file log_writer writes,
+into compressed archives that the archive log_reader can search without
+reading all of them.
+
+Lines are archived per service and per UTC day, in
+ARCHIVE_DIR/<service>/<YYYY-MM-DD>.log.z. Each archive is a series of
+zlib-compressed blocks of up to --block-lines lines, sorted by timestamp, and
+the index next to it (<YYYY-MM-DD>.log.z.idx) records each block's time range
+and the levels, components and clusters of its lines. A reader only has to
+decompress the blocks whose index entry could match what it is looking for.
+
+Archiving appends new blocks to existing archives, so each log file should
+only be archived once. LOG_FILEs default to stdin.
+"""
+import argparse
+import datetime
+import json
+import logging
+import os
+import sys
+import zlib
+
+import ujson
+
+from paasta_tools.utils import log_timestamp_to_epoch
+
+
+log = logging.getLogger(__name__)
+
+DEFAULT_BLOCK_LINES = 10000
+
+
+class LogArchive(object):
+    """The archived log lines of one service for one UTC day"""
+    SUFFIX = '.log.z'
+    INDEX_SUFFIX = '.idx'
+    VERSION = 1
+
+    def __init__(self, archive_dir, service, date):
+        self.service = service
+        self.date = date
+        self.path = os.path.join(archive_dir, service, date.isoformat() + self.SUFFIX)
+        self.index_path = self.path + self.INDEX_SUFFIX
+        # One dict per block, in the order they were written. See append_block.
+        self.blocks = []
+
+    @classmethod
+    def list_archives(cls, archive_dir, service, start_date=None, end_date=None):
+        """Returns the service's archives with their indexes loaded, oldest first.
+
+        :param start_date: if set, leave out archives from before this date
+        :param end_date: if set, leave out archives from after this date
+        """
+        try:
+            names = os.listdir(os.path.join(archive_dir, service))
+        except OSError:
+            return []
+        archives = []
+        for name in sorted(names):
+            if not name.endswith(cls.SUFFIX):
+                continue
+            try:
+                date = datetime.datetime.strptime(name[:-len(cls.SUFFIX)], '%Y-%m-%d').date()
+            except ValueError:
+                continue
+            if (start_date is None or date >= start_date) and (end_date is None or date <= end_date):
+                archive = cls(archive_dir, service, date)
+                archive.load()
+                archives.append(archive)
+        return archives
+
+    def load(self):
+        """Reads the archive's index. An archive without a usable index has no blocks."""
+        try:
+            with open(self.index_path) as f:
+                saved = json.load(f)
+        except (IOError, OSError, ValueError):
+            self.blocks = []
+            return
+        if saved.get('version') != self.VERSION:
+            log.warning("Ignoring %s, which has unknown version %r" % (self.index_path, saved.get('version')))
+            self.blocks = []
+            return
+        self.blocks = saved['blocks']
+
+    def save(self):
+        """Writes the index out atomically, so readers never see a partial one"""
+        tmp_path = self.index_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'version': self.VERSION, 'blocks': self.blocks}, f)
+        os.rename(tmp_path, self.index_path)
+
+    def append_block(self, lines):
+        """Compresses lines into a new block at the end of the archive and indexes
+        it. Call save() afterwards to write the index out.
+
+        :param lines: a list of (timestamp in seconds since the epoch, decoded line, raw line) tuples
+        """
+        lines = sorted(lines, key=lambda line: line[0])
+        data = zlib.compress(''.join(raw_line for _, _, raw_line in lines))
+        archive_dir = os.path.dirname(self.path)
+        if not os.path.isdir(archive_dir):
+            os.makedirs(archive_dir)
+        with open(self.path, 'ab') as f:
+            f.seek(0, os.SEEK_END)
+            offset = f.tell()
+            f.write(data)
+        self.blocks.append({
+            'offset': offset,
+            'length': len(data),
+            'lines': len(lines),
+            'start': lines[0][0],
+            'end': lines[-1][0],
+            'levels': sorted(set(parsed_line.get('level') for _, parsed_line, _ in lines)),
+            'components': sorted(set(parsed_line.get('component') for _, parsed_line, _ in lines)),
+            'clusters': sorted(set(parsed_line.get('cluster') for _, parsed_line, _ in lines)),
+        })
+
+    def find_blocks(self, levels, components, clusters, start_time=None, end_time=None):
+        """Returns the blocks that may have lines at one of levels, components and
+        clusters and, if start_time and end_time (seconds since the epoch) are
+        given, between them"""
+        levels, components, clusters = set(levels), set(components), set(clusters)
+        return [
+            block for block in self.blocks
+            if (start_time is None or block['end'] >= start_time) and
+            (end_time is None or block['start'] <= end_time) and
+            levels.intersection(block['levels']) and
+            components.intersection(block['components']) and
+            clusters.intersection(block['clusters'])
+        ]
+
+    def read_block(self, block):
+        """Returns the raw lines of a block, in timestamp order"""
+        with open(self.path, 'rb') as f:
+            f.seek(block['offset'])
+            data = zlib.decompress(f.read(block['length']))
+        return data.splitlines(True)
+
+
+class LogArchiver(object):
+    """Sorts log lines into per service, per day archives, writing out a block
+    whenever block_lines lines have piled up for one archive"""
+
+    def __init__(self, archive_dir, block_lines=DEFAULT_BLOCK_LINES):
+        self.archive_dir = archive_dir
+        self.block_lines = block_lines
+        # (service, date) -> LogArchive
+        self.archives = {}
+        # (service, date) -> lines that aren't in a block yet
+        self.pending = {}
+        self.skipped_lines = 0
+
+    def add_line(self, line):
+        """Queues a raw JSON log line for archiving. Lines without a service or
+        a parseable timestamp are skipped."""
+        try:
+            parsed_line = ujson.loads(line)
+            service = parsed_line['service']
+            timestamp = log_timestamp_to_epoch(parsed_line['timestamp'])
+        except (ValueError, KeyError, TypeError):
+            self.skipped_lines += 1
+            return
+        if not isinstance(service, basestring) or not service or '/' in service or service.startswith('.'):
+            # The service names a directory under archive_dir
+            self.skipped_lines += 1
+            return
+        key = (service, datetime.datetime.utcfromtimestamp(timestamp).date())
+        pending = self.pending.setdefault(key, [])
+        pending.append((timestamp, parsed_line, line.rstrip('\n') + '\n'))
+        if len(pending) >= self.block_lines:
+            self.write_block(key)
+
+    def get_archive(self, key):
+        archive = self.archives.get(key)
+        if archive is None:
+            service, date = key
+            archive = self.archives[key] = LogArchive(self.archive_dir, service, date)
+            archive.load()
+        return archive
+
+    def write_block(self, key):
+        pending = self.pending.pop(key, None)
+        if pending:
+            self.get_archive(key).append_block(pending)
+
+    def close(self):
+        """Writes out the remaining lines and saves every index that changed"""
+        for key in sorted(self.pending):
+            self.write_block(key)
+        for archive in self.archives.values():
+            archive.save()
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='Compacts JSON-lines paasta logs into compressed, indexed archives')
+    parser.add_argument('archive_dir', metavar='ARCHIVE_DIR', help="Directory to keep the archives in")
+    parser.add_argument('log_files', metavar='LOG_FILE', nargs='*',
+                        help="JSON-lines log files to archive. Defaults to stdin")
+    parser.add_argument('-b', '--block-lines', type=int, default=DEFAULT_BLOCK_LINES,
+                        help="Maximum number of lines per compressed block. Defaults to %(default)s")
+    parser.add_argument('-v', '--verbose', action='store_true', help="Increase logging verboseness")
+    return parser.parse_args(argv)
+
+
+def archive_log_files(archiver, log_files):
+    for log_file in log_files:
+        with open(log_file) as f:
+            for line in f:
+                archiver.add_line(line)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.verbose:
+        logging.basicConfig(level=logging.DEBUG)
+    else:
+        logging.basicConfig(level=logging.WARNING)
+
+    archiver = LogArchiver(args.archive_dir, block_lines=args.block_lines)
+    if args.log_files:
+        archive_log_files(archiver, args.log_files)
+    else:
+        for line in sys.stdin:
+            archiver.add_line(line)
+    archiver.close()
+    if archiver.skipped_lines:
+        log.warning("Skipped %d lines without a service or a valid timestamp" % archiver.skipped_lines)
+
+
+if __name__ == '__main__':
+    main()
@@ -583,7 +583,12 @@ def get_marathon_app_deploy_status(client, app_id):
 
     # Check the launch queue to see if an app is blocked
     is_overdue, backoff_seconds = get_app_queue_status(client, app_id)
+    return get_marathon_app_deploy_status_from_app(app, is_overdue, backoff_seconds)
 
+
+def get_marathon_app_deploy_status_from_app(app, is_overdue, backoff_seconds):
+    """Returns the deploy status of a running app, given its launch queue status
+    (see get_app_queue_status)"""
     # Based on conditions at https://mesosphere.github.io/marathon/docs/marathon-ui.html
     if is_overdue:
         deploy_status = MarathonDeployStatus.Waiting
@@ -895,8 +900,12 @@ def get_app_queue_status(client, app_id):
               if the app cannot be found. If is_overdue is True, then Marathon has
               not received a resource offer that satisfies the requirements for the app
     """
+    return get_app_queue_status_from_queue(client.list_queue(), app_id)
+
+
+def get_app_queue_status_from_queue(app_queue, app_id):
+    """Like get_app_queue_status, but looks in an already fetched launch queue"""
     app_id = "/%s" % app_id
-    app_queue = client.list_queue()
     for app_queue_item in app_queue:
         if app_queue_item.app.id == app_id:
             return (app_queue_item.delay.overdue, app_queue_item.delay.time_left_seconds)
@@ -948,9 +957,14 @@ def get_matching_apps(servicename, instance, client, embed_failures=False):
     """Returns a list of appids given a service and instance.
     Useful for fuzzy matching if you think there are marathon
     apps running but you don't know the full instance id"""
+    return get_matching_apps_from_list(servicename, instance, client.list_apps(embed_failures=embed_failures))
+
+
+def get_matching_apps_from_list(servicename, instance, apps):
+    """Like get_matching_apps, but looks in an already fetched list of apps"""
     jobid = format_job_id(servicename, instance)
     expected_prefix = "/%s%s" % (jobid, MESOS_TASK_SPACER)
-    return [app for app in client.list_apps(embed_failures=embed_failures) if app.id.startswith(expected_prefix)]
+    return [app for app in apps if app.id.startswith(expected_prefix)]
 
 
 def get_healthcheck_for_instance(service, instance, service_manifest, random_port, soa_dir=DEFAULT_SOA_DIR):
@@ -622,18 +622,21 @@ def get_mesos_task_count_by_slave(mesos_state, slaves_list=None, pool=None):
     return slaves
 
 
+def get_count_running_tasks_by_slave_hostname():
+    """Return the number of tasks running on every slave, fetching
+    the mesos state once for all of them.
+    :returns: dict of slave hostname to integer count of mesos tasks"""
+    mesos_state = get_mesos_master().state_summary()
+    task_counts = get_mesos_task_count_by_slave(mesos_state)
+    return {slave['task_counts'].slave['hostname']: slave['task_counts'].count for slave in task_counts}
+
+
 def get_count_running_tasks_on_slave(hostname):
     """Return the number of tasks running on a paticular slave
     or 0 if the slave is not found.
     :param hostname: hostname of the slave
     :returns: integer count of mesos tasks"""
-    mesos_state = get_mesos_master().state_summary()
-    task_counts = get_mesos_task_count_by_slave(mesos_state)
-    counts = [slave['task_counts'].count for slave in task_counts if slave['task_counts'].slave['hostname'] == hostname]
-    if counts:
-        return counts[0]
-    else:
-        return 0
+    return get_count_running_tasks_by_slave_hostname().get(hostname, 0)
 
 
 def slave_pid_to_ip(slave_pid):
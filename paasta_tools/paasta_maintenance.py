@@ -25,6 +25,7 @@ from paasta_tools import utils
 from paasta_tools.marathon_tools import get_expected_instance_count_for_namespace
 from paasta_tools.marathon_tools import marathon_services_running_here
 from paasta_tools.marathon_tools import read_namespace_for_service_instance
+from paasta_tools.mesos_tools import get_count_running_tasks_by_slave_hostname
 from paasta_tools.smartstack_tools import backend_is_up
 from paasta_tools.smartstack_tools import get_backends
 from paasta_tools.smartstack_tools import get_replication_for_services
@@ -94,6 +95,22 @@ def is_safe_to_kill(hostname):
         mesos_maintenance.is_host_past_maintenance_start(hostname)
 
 
+def get_hosts_safe_to_kill(hostnames):
+    """Checks which of a list of hosts have drained or reached their maintenance window.
+    Unlike calling is_safe_to_kill for each host, this fetches the maintenance status,
+    the maintenance schedule and the running task counts once for the whole list.
+    :param hostnames: list of hostnames to check
+    :returns: a set of the hostnames that are safe to kill
+    """
+    hostnames = set(hostnames)
+    safe_hosts = hostnames & set(mesos_maintenance.get_hosts_past_maintenance_start())
+    draining_hosts = (hostnames - safe_hosts) & set(mesos_maintenance.get_draining_hosts())
+    if draining_hosts:
+        running_task_counts = get_count_running_tasks_by_slave_hostname()
+        safe_hosts |= {hostname for hostname in draining_hosts if running_task_counts.get(hostname, 0) == 0}
+    return safe_hosts
+
+
 def is_hostname_local(hostname):
     return hostname == 'localhost' or \
         hostname == getfqdn() or hostname == gethostname()
@@ -14,6 +14,7 @@
 # limitations under the License.
 """
 Usage: ./setup_chronos_job.py <service.instance> [options]
+       ./setup_chronos_job.py --all [options]
 
 Deploy a service instance to Chronos from a configuration file.
 Reads from the soa_dir /nail/etc/services by default.
@@ -35,6 +36,8 @@ when the deployment goes alright.
 
 Command line options:
 
+- -a, --all: Set up every chronos job configured for the cluster in one run
+- -j <N>, --max-concurrency <N>: With --all, the maximum number of Chronos updates in flight
 - -d <SOA_DIR>, --soa-dir <SOA_DIR>: Specify a SOA config dir to read from
 - -v, --verbose: Verbose output
 """
@@ -42,6 +45,7 @@ import argparse
 import logging
 import sys
 
+import concurrent.futures
 import pysensu_yelp
 
 from paasta_tools import chronos_tools
@@ -58,22 +62,31 @@ from paasta_tools.utils import SPACER
 
 log = logging.getLogger(__name__)
 
+DEFAULT_MAX_CONCURRENCY = 10
+
 
 def parse_args():
     parser = argparse.ArgumentParser(description='Creates chronos jobs.')
-    parser.add_argument('service_instance',
+    parser.add_argument('service_instance', nargs='?',
                         help="The chronos instance of the service to create or update",
                         metavar=compose_job_id("SERVICE", "INSTANCE"))
+    parser.add_argument('-a', '--all', action='store_true', dest="all", default=False,
+                        help="create or update every chronos job configured for this cluster")
+    parser.add_argument('-j', '--max-concurrency', dest="max_concurrency", type=int,
+                        default=DEFAULT_MAX_CONCURRENCY,
+                        help="with --all, the maximum number of jobs to update in chronos at once")
     parser.add_argument('-d', '--soa-dir', dest="soa_dir", metavar="SOA_DIR",
                         default=chronos_tools.DEFAULT_SOA_DIR,
                         help="define a different soa config directory")
     parser.add_argument('-v', '--verbose', action='store_true',
                         dest="verbose", default=False)
     args = parser.parse_args()
+    if bool(args.service_instance) == args.all:
+        parser.error("Specify exactly one of a service instance or --all")
     return args
 
 
-def send_event(service, instance, soa_dir, status, output):
+def send_event(service, instance, soa_dir, status, output, job_config=None, cluster=None):
     """Send an event to sensu via pysensu_yelp with the given information.
 
     :param service: The service name the event is about
@@ -81,17 +94,25 @@ def send_event(service, instance, soa_dir, status, output):
     :param soa_dir: The service directory to read monitoring information from
     :param status: The status to emit for this event
     :param output: The output to emit for this event
+    :param job_config: The already loaded ChronosJobConfig of the instance, if any.
+                       It is loaded from the soa_dir if not given.
+    :param cluster: The cluster to load job_config for, read from the system
+                    paasta config if not given
     """
-    cluster = load_system_paasta_config().get_cluster()
-    try:
-        monitoring_overrides = chronos_tools.load_chronos_job_config(
-            service=service,
-            instance=instance,
-            cluster=cluster,
-            soa_dir=soa_dir,
-        ).get_monitoring()
-    except chronos_tools.UnknownChronosJobError:
-        monitoring_overrides = {}
+    if job_config is not None:
+        monitoring_overrides = job_config.get_monitoring()
+    else:
+        if cluster is None:
+            cluster = load_system_paasta_config().get_cluster()
+        try:
+            monitoring_overrides = chronos_tools.load_chronos_job_config(
+                service=service,
+                instance=instance,
+                cluster=cluster,
+                soa_dir=soa_dir,
+            ).get_monitoring()
+        except chronos_tools.UnknownChronosJobError:
+            monitoring_overrides = {}
     # In order to let sensu know how often to expect this check to fire,
     # we need to set the ``check_every`` to the frequency of our cron job, which
     # is 10s.
@@ -130,6 +151,23 @@ def bounce_chronos_job(
     return (0, "All chronos bouncing tasks finished.")
 
 
+def get_job_to_update(complete_job_config, existing_jobs):
+    """Decides whether a job needs to be sent to chronos.
+
+    :param complete_job_config: the complete job config, as returned by
+        chronos_tools.create_complete_config()
+    :param existing_jobs: the jobs chronos already has for the service instance
+    :returns: the job to send to chronos, or None if it is up to date
+    """
+    if len(existing_jobs) > 0:
+        # we store the md5 sum of the config in the description field.
+        if existing_jobs[0]['description'] != complete_job_config['description']:
+            return complete_job_config
+        return None
+    else:
+        return complete_job_config
+
+
 def setup_job(service, instance, complete_job_config, client, cluster):
     # There should only ever be *one* job for a given service_instance
     all_existing_jobs = chronos_tools.lookup_chronos_jobs(
@@ -139,23 +177,136 @@ def setup_job(service, instance, complete_job_config, client, cluster):
         include_disabled=True,
     )
 
-    job_to_update = None
-    if len(all_existing_jobs) > 0:
-        # we store the md5 sum of the config in the description field.
-        if all_existing_jobs[0]['description'] != complete_job_config['description']:
-            job_to_update = complete_job_config
-    else:
-        job_to_update = complete_job_config
-
     return bounce_chronos_job(
         service=service,
         instance=instance,
         cluster=cluster,
-        job_to_update=job_to_update,
+        job_to_update=get_job_to_update(complete_job_config, all_existing_jobs),
         client=client,
     )
 
 
+def load_complete_job_configs(service_instances, system_paasta_config, soa_dir):
+    """Loads the job config and builds the complete job config of many chronos
+    instances, reading each service's soa configs once.
+
+    :param service_instances: a list of (service, instance) tuples
+    :param system_paasta_config: the SystemPaastaConfig of the cluster the jobs run in
+    :returns: a list of (service, instance, job_config, complete_job_config, error_msg)
+        tuples. When the complete job config could not be built it is None and
+        error_msg says why. Instances with a parent that could not be found are
+        skipped, as they are by main(). Unexpected errors are reported the same
+        way, so that one broken service doesn't stop the others being set up.
+    """
+    cluster = system_paasta_config.get_cluster()
+    instances_by_service = {}
+    for service, instance in service_instances:
+        instances_by_service.setdefault(service, []).append(instance)
+
+    results = []
+    for service, instances in sorted(instances_by_service.items()):
+        job_configs = None
+        load_error = None
+        try:
+            job_configs = chronos_tools.load_chronos_job_configs(service, cluster, soa_dir=soa_dir)
+        except NoDeploymentsAvailable:
+            pass
+        except Exception as e:
+            log.exception("Failed to load the chronos configs of %s" % service)
+            load_error = e
+        for instance in instances:
+            service_instance = compose_job_id(service, instance)
+            job_config = None
+            complete_job_config = None
+            error_msg = None
+            try:
+                if load_error is not None:
+                    raise load_error
+                if job_configs is None:
+                    raise NoDeploymentsAvailable
+                if instance not in job_configs:
+                    raise chronos_tools.UnknownChronosJobError(
+                        'No job named "%s" in config file chronos-%s.yaml' % (instance, cluster))
+                job_config = job_configs[instance]
+                complete_job_config = chronos_tools.format_complete_config(
+                    service, instance, job_config, system_paasta_config)
+            except (NoDeploymentsAvailable, NoDockerImageError):
+                error_msg = "No deployment found for %s in cluster %s. Has Jenkins run for it?" % (
+                    service_instance, cluster)
+            except chronos_tools.UnknownChronosJobError as e:
+                error_msg = (
+                    "Could not read chronos configuration file for %s in cluster %s\n" % (service_instance, cluster) +
+                    "Error was: %s" % str(e))
+            except chronos_tools.InvalidChronosConfigError as e:
+                error_msg = (
+                    "Invalid chronos configuration for %s in cluster %s\n" % (service_instance, cluster) +
+                    "Error was: %s" % str(e))
+            except chronos_tools.InvalidParentError:
+                log.warn("Skipping %s.%s: Parent job could not be found" % (service, instance))
+                continue
+            except Exception as e:
+                error_msg = (
+                    "Failed to build the chronos job for %s in cluster %s\n" % (service_instance, cluster) +
+                    "Error was: %s" % str(e))
+            results.append((service, instance, job_config, complete_job_config, error_msg))
+    return results
+
+
+def setup_all_jobs(client, system_paasta_config, soa_dir, max_concurrency=DEFAULT_MAX_CONCURRENCY):
+    """Creates or updates every chronos job configured for a cluster, and sends
+    a sensu event for each of them.
+
+    Instead of listing chronos' jobs once per instance like setup_job() does,
+    the existing jobs are fetched once and compared against the configs in
+    memory. Only the jobs that changed are sent to chronos, with at most
+    max_concurrency requests in flight.
+    """
+    cluster = system_paasta_config.get_cluster()
+    service_instances = chronos_tools.get_chronos_jobs_for_cluster(cluster=cluster, soa_dir=soa_dir)
+    loaded = load_complete_job_configs(service_instances, system_paasta_config, soa_dir)
+    existing_jobs = chronos_tools.lookup_chronos_jobs_by_service_instance(client=client, include_disabled=True)
+
+    def setup_one(service, instance, complete_job_config):
+        try:
+            return bounce_chronos_job(
+                service=service,
+                instance=instance,
+                cluster=cluster,
+                job_to_update=get_job_to_update(complete_job_config, existing_jobs.get((service, instance), [])),
+                client=client,
+            )
+        except Exception as e:
+            log.exception("Failed to set up %s" % compose_job_id(service, instance))
+            return (1, "Failed to update chronos job: %s" % e)
+
+    results = {}
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_concurrency)
+    try:
+        for service, instance, job_config, complete_job_config, error_msg in loaded:
+            if complete_job_config is not None:
+                results[(service, instance)] = executor.submit(setup_one, service, instance, complete_job_config)
+    finally:
+        executor.shutdown(wait=True)
+
+    for service, instance, job_config, complete_job_config, error_msg in loaded:
+        if error_msg is not None:
+            log.error(error_msg)
+            sensu_status = pysensu_yelp.Status.CRITICAL
+            output = error_msg
+        else:
+            status, output = results[(service, instance)].result()
+            sensu_status = pysensu_yelp.Status.CRITICAL if status else pysensu_yelp.Status.OK
+        send_event(
+            service=service,
+            instance=instance,
+            soa_dir=soa_dir,
+            status=sensu_status,
+            output=output,
+            job_config=job_config,
+            cluster=cluster,
+        )
+
+
 def main():
     args = parse_args()
     soa_dir = args.soa_dir
@@ -164,6 +315,17 @@ def main():
     else:
         logging.basicConfig(level=logging.WARNING)
 
+    if args.all:
+        client = chronos_tools.get_chronos_client(chronos_tools.load_chronos_config())
+        setup_all_jobs(
+            client=client,
+            system_paasta_config=load_system_paasta_config(),
+            soa_dir=soa_dir,
+            max_concurrency=args.max_concurrency,
+        )
+        # We exit 0 because the script finished ok and the events were sent to the right teams.
+        sys.exit(0)
+
     try:
         service, instance, _, __ = decompose_job_id(args.service_instance, spacer=chronos_tools.INTERNAL_SPACER)
     except InvalidJobNameError:
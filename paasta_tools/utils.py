@@ -13,6 +13,8 @@
 # limitations under the License.
 from __future__ import print_function
 
+import atexit
+import calendar
 import contextlib
 import copy
 import datetime
@@ -33,14 +35,18 @@ import signal
 import sys
 import tempfile
 import threading
+import time
 from collections import OrderedDict
 from fnmatch import fnmatch
 from functools import wraps
+from Queue import Full
+from Queue import Queue
 from subprocess import PIPE
 from subprocess import Popen
 from subprocess import STDOUT
 
 import dateutil.tz
+import isodate
 import requests_cache
 import service_configuration_lib
 import yaml
@@ -629,7 +635,17 @@ def _log(*args, **kwargs):
 
 
 class LogWriter(object):
-    def log(self, line, component, level=DEFAULT_LOGLEVEL, cluster=ANY_CLUSTER, instance=ANY_INSTANCE):
+    def log(self, service, line, component, level=DEFAULT_LOGLEVEL, cluster=ANY_CLUSTER, instance=ANY_INSTANCE,
+            timestamp=None):
+        self.echo(line, level)
+        self.write(service, line, component, level, cluster, instance, timestamp)
+
+    def echo(self, line, level):
+        """Shows the line to whoever is running the command, if this writer does that."""
+        pass
+
+    def write(self, service, line, component, level, cluster, instance, timestamp=None):
+        """Writes the line to the log. The timestamp defaults to now."""
         raise NotImplementedError()
 
 
@@ -664,6 +680,53 @@ def format_log_line(level, cluster, service, instance, component, line, timestam
     return message
 
 
+# format_log_line's timestamps are what datetime.isoformat() gives for a naive
+# UTC datetime: microseconds are left off when there are none.
+_LOG_TIMESTAMP_RE = re.compile(r'(\d{4})-(\d\d)-(\d\d)T(\d\d):(\d\d):(\d\d)(?:\.(\d{6}))?$')
+# 'YYYY-MM-DD' -> seconds since the epoch at midnight UTC that day
+_epoch_by_date = {}
+
+
+def parse_log_timestamp(timestamp):
+    """Parses a log line's timestamp into a datetime. Timestamps written by
+    format_log_line become naive UTC datetimes without going through isodate,
+    which handles anything else (and may return a timezone aware datetime).
+
+    :raises ValueError: if the timestamp can't be parsed
+    """
+    match = _LOG_TIMESTAMP_RE.match(timestamp)
+    if match is None:
+        return isodate.parse_datetime(timestamp)
+    year, month, day, hour, minute, second, microsecond = match.groups()
+    return datetime.datetime(int(year), int(month), int(day), int(hour), int(minute), int(second),
+                             int(microsecond or 0))
+
+
+def log_timestamp_to_epoch(timestamp):
+    """Converts a log line's timestamp to seconds since the epoch, like
+    parse_log_timestamp (naive timestamps are UTC) but without building a
+    datetime for the timestamps format_log_line writes.
+
+    :raises ValueError: if the timestamp can't be parsed
+    """
+    match = _LOG_TIMESTAMP_RE.match(timestamp)
+    if match is not None:
+        year, month, day, hour, minute, second, microsecond = match.groups()
+        hour, minute, second = int(hour), int(minute), int(second)
+        if hour < 24 and minute < 60 and second < 60:
+            date = timestamp[:10]
+            midnight = _epoch_by_date.get(date)
+            if midnight is None:
+                # Let datetime.date validate the month and day
+                midnight = calendar.timegm(datetime.date(int(year), int(month), int(day)).timetuple())
+                if len(_epoch_by_date) > 1000:
+                    _epoch_by_date.clear()
+                _epoch_by_date[date] = midnight
+            return midnight + hour * 3600 + minute * 60 + second + int(microsecond or 0) / 1e6
+    dt = isodate.parse_datetime(timestamp)
+    return calendar.timegm(dt.utctimetuple()) + dt.microsecond / 1e6
+
+
 def get_log_name_for_service(service, prefix=None):
     if prefix:
         return 'stream_paasta_%s_%s' % (prefix, service)
@@ -676,18 +739,20 @@ class ScribeLogWriter(LogWriter):
         self.clog = importlib.import_module('clog')
         self.clog.config.configure(scribe_host=scribe_host, scribe_port=scribe_port, scribe_disable=scribe_disable)
 
-    def log(self, service, line, component, level=DEFAULT_LOGLEVEL, cluster=ANY_CLUSTER, instance=ANY_INSTANCE):
-        """This expects someone (currently the paasta cli main()) to have already
-        configured the log object. We'll just write things to it.
-        """
+    def echo(self, line, level):
         if level == 'event':
             print(line, file=sys.stdout)
         elif level == 'debug':
             print(line, file=sys.stderr)
         else:
             raise NoSuchLogLevel
+
+    def write(self, service, line, component, level, cluster, instance, timestamp=None):
+        """This expects someone (currently the paasta cli main()) to have already
+        configured the log object. We'll just write things to it.
+        """
         log_name = get_log_name_for_service(service)
-        formatted_line = format_log_line(level, cluster, service, instance, component, line)
+        formatted_line = format_log_line(level, cluster, service, instance, component, line, timestamp)
         self.clog.log_line(log_name, formatted_line)
 
 
@@ -699,17 +764,44 @@ class NullLogWriter(LogWriter):
     def __init__(self, **kwargs):
         pass
 
-    def log(self, service, line, component, level=DEFAULT_LOGLEVEL, cluster=ANY_CLUSTER, instance=ANY_INSTANCE):
+    def write(self, service, line, component, level, cluster, instance, timestamp=None):
         pass
 
 
 @register_log_writer('file')
 class FileLogWriter(LogWriter):
-    def __init__(self, path_format, mode='a+', line_delimeter='\n', flock=False):
+    """Appends formatted log lines to files named by path_format.
+
+    By default every line opens, writes and closes its file. Setting
+    max_open_files keeps up to that many files open (least recently used ones
+    get closed), and setting flush_interval buffers lines for up to that many
+    seconds, or until max_buffered_bytes have been buffered, before writing
+    them. Either way, each line still goes out whole in a single write, and
+    anything buffered is flushed when the process exits.
+    """
+    # How often, in seconds, an open file is checked against its path in case it has been rotated
+    REOPEN_CHECK_INTERVAL = 1
+    DEFAULT_MAX_BUFFERED_BYTES = 64 * 1024
+
+    def __init__(self, path_format, mode='a+', line_delimeter='\n', flock=False, max_open_files=0,
+                 flush_interval=0, max_buffered_bytes=DEFAULT_MAX_BUFFERED_BYTES):
         self.path_format = path_format
         self.mode = mode
         self.flock = flock
         self.line_delimeter = line_delimeter
+        self.max_open_files = max_open_files
+        self.flush_interval = flush_interval
+        self.max_buffered_bytes = max_buffered_bytes
+
+        # path -> (file, inode, when the inode was last checked), least recently used first
+        self._open_files = OrderedDict()
+        # path -> lines waiting to be written
+        self._buffers = OrderedDict()
+        self._buffered_bytes = 0
+        self._flush_timer = None
+        self._lock = threading.RLock()
+        if self.max_open_files or self.flush_interval:
+            atexit.register(self.close)
 
     @contextlib.contextmanager
     def maybe_flock(self, fd):
@@ -731,21 +823,175 @@ class FileLogWriter(LogWriter):
             instance=instance,
         )
 
-    def log(self, service, line, component, level=DEFAULT_LOGLEVEL, cluster=ANY_CLUSTER, instance=ANY_INSTANCE):
+    def write(self, service, line, component, level, cluster, instance, timestamp=None):
         path = self.format_path(service, component, level, cluster, instance)
-
+        formatted_line = format_log_line(level, cluster, service, instance, component, line, timestamp)
+        to_write = "%s%s" % (formatted_line, self.line_delimeter)
+
+        if not self.flush_interval:
+            self.write_to_path(path, to_write)
+            return
+
+        with self._lock:
+            self._buffers.setdefault(path, []).append(to_write)
+            self._buffered_bytes += len(to_write)
+            if self._buffered_bytes >= self.max_buffered_bytes:
+                self.flush()
+            elif self._flush_timer is None:
+                self._flush_timer = threading.Timer(self.flush_interval, self.flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+
+    def write_to_path(self, path, to_write):
+        """Appends to_write, one or more whole lines, to path in a single write call."""
         # We use io.FileIO here because it guarantees that write() is implemented with a single write syscall,
         # and on Linux, writes to O_APPEND files with a single write syscall are atomic.
         #
         # https://docs.python.org/2/library/io.html#io.FileIO
         # http://article.gmane.org/gmane.linux.kernel/43445
-
-        to_write = "%s%s" % (format_log_line(level, cluster, service, instance, component, line), self.line_delimeter)
-
-        with io.FileIO(path, mode=self.mode, closefd=True) as f:
+        if not self.max_open_files:
+            with io.FileIO(path, mode=self.mode, closefd=True) as f:
+                with self.maybe_flock(f):
+                    f.write(to_write)
+            return
+
+        with self._lock:
+            f = self.get_open_file(path)
             with self.maybe_flock(f):
                 f.write(to_write)
 
+    def get_open_file(self, path):
+        """Returns a cached open file for path, opening it (and closing the least
+        recently used one, if there are too many open) if it isn't open yet or the
+        path now points to a different file, e.g. because it was rotated."""
+        now = time.time()
+        entry = self._open_files.pop(path, None)
+        if entry is not None:
+            f, inode, checked_at = entry
+            if now - checked_at >= self.REOPEN_CHECK_INTERVAL:
+                try:
+                    current_inode = os.stat(path).st_ino
+                except OSError:
+                    current_inode = None
+                if current_inode == inode:
+                    entry = (f, inode, now)
+                else:
+                    f.close()
+                    entry = None
+
+        if entry is None:
+            while self._open_files and len(self._open_files) >= self.max_open_files:
+                _, (evicted, _, _) = self._open_files.popitem(last=False)
+                evicted.close()
+            f = io.FileIO(path, mode=self.mode, closefd=True)
+            entry = (f, os.fstat(f.fileno()).st_ino, now)
+
+        self._open_files[path] = entry
+        return entry[0]
+
+    def flush(self):
+        """Writes out all buffered lines, one write per file. The lines of a file
+        that can't be written stay buffered, and the first error is raised once
+        every other file has been written."""
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            exc_info = None
+            for path, lines in self._buffers.items():
+                try:
+                    self.write_to_path(path, ''.join(lines))
+                except Exception:
+                    exc_info = exc_info or sys.exc_info()
+                    continue
+                del self._buffers[path]
+                self._buffered_bytes -= sum(len(line) for line in lines)
+            if exc_info:
+                raise exc_info[0], exc_info[1], exc_info[2]
+
+    def close(self):
+        """Flushes buffered lines and closes any open files."""
+        with self._lock:
+            self.flush()
+            for f, _, _ in self._open_files.values():
+                f.close()
+            self._open_files.clear()
+
+
+@register_log_writer('async')
+class AsyncLogWriter(LogWriter):
+    """Wraps another log writer, handing its writes to a background thread
+    through a bounded queue so that slow log sinks don't hold up the caller.
+    Lines are still timestamped and echoed in the caller's thread, so they
+    carry the time they were logged and show up in order with the caller's
+    other output.
+
+    The wrapped writer is configured the same way as the log_writer itself,
+    with driver and options. When the queue is full, when_full='block' waits for
+    room and when_full='drop' throws the line away. Queued lines are written out
+    at exit, waiting up to flush_timeout seconds for them.
+    """
+    WHEN_FULL_POLICIES = ('block', 'drop')
+
+    def __init__(self, driver, options=None, max_queue_size=1000, when_full='block', flush_timeout=10):
+        if when_full not in self.WHEN_FULL_POLICIES:
+            raise ValueError("when_full must be one of %s, not %r" % (', '.join(self.WHEN_FULL_POLICIES), when_full))
+        self.log_writer = get_log_writer_class(driver)(**(options or {}))
+        self.when_full = when_full
+        self.flush_timeout = flush_timeout
+        self.dropped_lines = 0
+        self._queue = Queue(maxsize=max_queue_size)
+        self._thread = threading.Thread(target=self._write_queued_lines)
+        self._thread.daemon = True
+        self._thread.start()
+        atexit.register(self.close)
+
+    def log(self, service, line, component, level=DEFAULT_LOGLEVEL, cluster=ANY_CLUSTER, instance=ANY_INSTANCE,
+            timestamp=None):
+        self.log_writer.echo(line, level)
+        item = (service, line, component, level, cluster, instance, timestamp or _now())
+        if self.when_full == 'block':
+            self._queue.put(item)
+            return
+        try:
+            self._queue.put_nowait(item)
+        except Full:
+            if self.dropped_lines == 0:
+                log.warning("Log queue is full, dropping log lines")
+            self.dropped_lines += 1
+
+    def _write_queued_lines(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                self.log_writer.write(*item)
+            except Exception:
+                log.exception("Failed to write a log line for %s" % item[0])
+            finally:
+                self._queue.task_done()
+
+    def flush(self):
+        """Blocks until every queued line has been handed to the wrapped writer."""
+        self._queue.join()
+
+    def close(self):
+        """Writes out queued lines, waiting at most flush_timeout seconds, and stops the background thread."""
+        if not self._thread.is_alive():
+            return
+        deadline = time.time() + self.flush_timeout
+        try:
+            self._queue.put(None, timeout=self.flush_timeout)
+        except Full:
+            log.warning("Timed out writing out queued log lines")
+            return
+        self._thread.join(max(0, deadline - time.time()))
+        if self._thread.is_alive():
+            log.warning("Timed out writing out queued log lines")
+        if self.dropped_lines:
+            log.warning("Dropped %d log lines because the log queue was full" % self.dropped_lines)
+
 
 def _timeout(process):
     """Helper function for _run. It terminates the process.
@@ -943,6 +1189,13 @@ class SystemPaastaConfig(dict):
         :returns: A format string for constructing the FQDN of the masters in a given cluster."""
         return self.get('cluster_fqdn_format', 'paasta-{cluster:s}.yelp')
 
+    def get_ssh_control_persist(self):
+        """Get how many seconds shared ssh connections to masters are kept open
+        for after their last command exits. 0, the default, turns sharing them off.
+
+        :returns: The ssh ControlPersist, in seconds"""
+        return self.get('ssh_control_persist', 0)
+
     def get_chronos_config(self):
         """Get the chronos config
 
@@ -1176,8 +1429,13 @@ def check_docker_image(service, tag):
     return len(result) == 1
 
 
+# Building tzlocal() means looking the local zone up again, so these are only built once
+_TZ_UTC = dateutil.tz.tzutc()
+_TZ_LOCAL = dateutil.tz.tzlocal()
+
+
 def datetime_from_utc_to_local(utc_datetime):
-    return datetime_convert_timezone(utc_datetime, dateutil.tz.tzutc(), dateutil.tz.tzlocal())
+    return datetime_convert_timezone(utc_datetime, _TZ_UTC, _TZ_LOCAL)
 
 
 def datetime_convert_timezone(datetime, from_zone, to_zone):
@@ -1187,6 +1445,38 @@ def datetime_convert_timezone(datetime, from_zone, to_zone):
     return converted_datetime
 
 
+# UTC offsets only ever change on a quarter hour, so the local offset is looked
+# up once per quarter hour of UTC time: bucket -> offset in seconds
+_UTC_OFFSET_BUCKET_SECONDS = 15 * 60
+_local_utc_offsets = {}
+# local day number -> 'YYYY-MM-DD'
+_local_dates = {}
+
+
+def format_epoch_as_local(epoch):
+    """Formats seconds since the epoch as local time in the "%Y-%m-%d %H:%M:%S"
+    format, without a localtime() and strftime() call for every timestamp."""
+    bucket = int(epoch // _UTC_OFFSET_BUCKET_SECONDS)
+    offset = _local_utc_offsets.get(bucket)
+    if offset is None:
+        bucket_start = bucket * _UTC_OFFSET_BUCKET_SECONDS
+        offset = calendar.timegm(time.localtime(bucket_start)) - bucket_start
+        if len(_local_utc_offsets) > 1000:
+            _local_utc_offsets.clear()
+        _local_utc_offsets[bucket] = offset
+    # Truncated to the second, as strftime would be
+    local_seconds = int((epoch + offset) // 1)
+    day, seconds_into_day = divmod(local_seconds, 86400)
+    date = _local_dates.get(day)
+    if date is None:
+        date = time.strftime("%Y-%m-%d", time.gmtime(day * 86400))
+        if len(_local_dates) > 1000:
+            _local_dates.clear()
+        _local_dates[day] = date
+    hours, seconds_into_hour = divmod(seconds_into_day, 3600)
+    return "%s %02d:%02d:%02d" % (date, hours, seconds_into_hour // 60, seconds_into_hour % 60)
+
+
 def get_username():
     """Returns the current username in a portable way. Will use the SUDO_USER
     environment variable if present.
@@ -1378,11 +1668,33 @@ class NoDeploymentsAvailable(Exception):
     pass
 
 
+# Parsed deployments.json files, by absolute path. Like service_configuration_lib's
+# yaml cache, but off by default, since it's only safe to use in processes that
+# forget files when they change (see paasta_tools.api.soa_dir_watcher)
+_deployments_json_cache = {}
+_use_deployments_json_cache = False
+
+
+def enable_deployments_json_cache():
+    global _use_deployments_json_cache
+    _use_deployments_json_cache = True
+
+
+def disable_deployments_json_cache():
+    global _use_deployments_json_cache
+    _use_deployments_json_cache = False
+
+
 def load_deployments_json(service, soa_dir=DEFAULT_SOA_DIR):
-    deployment_file = os.path.join(soa_dir, service, 'deployments.json')
+    deployment_file = os.path.join(os.path.abspath(soa_dir), service, 'deployments.json')
+    if _use_deployments_json_cache and deployment_file in _deployments_json_cache:
+        return DeploymentsJson(copy.deepcopy(_deployments_json_cache[deployment_file]))
     if os.path.isfile(deployment_file):
         with open(deployment_file) as f:
-            return DeploymentsJson(json.load(f)['v1'])
+            deployments = json.load(f)['v1']
+        if _use_deployments_json_cache:
+            _deployments_json_cache[deployment_file] = copy.deepcopy(deployments)
+        return DeploymentsJson(deployments)
     else:
         raise NoDeploymentsAvailable
 
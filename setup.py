@@ -97,6 +97,8 @@ setup(
         'paasta=paasta_tools.cli.cli:main',
         'paasta-api=paasta_tools.api.api:main',
         'paasta_autoscale_cluster=paasta_tools.autoscale_cluster:main',
+        'paasta_autoscale_backtest=paasta_tools.autoscale_backtest:main',
+        'paasta_archive_logs=paasta_tools.log_archive:main',
         'paasta_cleanup_chronos_jobs=paasta_tools.cleanup_chronos_jobs:main',
         'paasta_check_chronos_jobs=paasta_tools.check_chronos_jobs:main',
         'paasta_list_chronos_jobs=paasta_tools.list_chronos_jobs:main',
@@ -12,14 +12,24 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 import mock
+import pytest
+import requests
 from bravado.exception import HTTPError
 from bravado.requests_client import RequestsResponseAdapter
+from requests.structures import CaseInsensitiveDict
 
+from paasta_tools.api import client as api_client
 from paasta_tools.api.client import get_paasta_api_client
 from paasta_tools.cli.cmds.status import paasta_status_on_api_endpoint
 from paasta_tools.utils import SystemPaastaConfig
 
 
+@pytest.fixture(autouse=True)
+def clear_api_client_cache(request):
+    api_client.clear_api_client_cache()
+    request.addfinalizer(api_client.clear_api_client_cache)
+
+
 def test_get_paasta_api_client():
     with mock.patch('paasta_tools.api.client.load_system_paasta_config',
                     autospec=True) as mock_load_system_paasta_config:
@@ -34,6 +44,89 @@ def test_get_paasta_api_client():
         assert client
 
 
+def test_get_paasta_api_client_caches_clients_per_api_server():
+    system_paasta_config = SystemPaastaConfig({
+        'api_endpoints': {
+            'cluster1': "http://cluster1:5054",
+            'cluster1-alias': "http://cluster1:5054",
+            'cluster2': "http://cluster2:5054",
+        },
+    }, 'fake_directory')
+    with mock.patch('paasta_tools.api.client.SwaggerClient', autospec=True) as mock_swagger_client:
+        mock_from_spec = mock_swagger_client.from_spec
+        mock_from_spec.side_effect = lambda spec_dict, **kwargs: mock.Mock(host=spec_dict['host'])
+        client1 = get_paasta_api_client('cluster1', system_paasta_config)
+        assert get_paasta_api_client('cluster1', system_paasta_config) is client1
+        assert get_paasta_api_client('cluster1-alias', system_paasta_config) is client1
+        client2 = get_paasta_api_client('cluster2', system_paasta_config)
+    assert client1.host == 'cluster1:5054'
+    assert client2.host == 'cluster2:5054'
+    # The spec is only validated when building the first client
+    assert [kwargs['config'] for _, kwargs in mock_from_spec.call_args_list] == [
+        {'validate_swagger_spec': True},
+        {'validate_swagger_spec': False},
+    ]
+
+
+def test_get_swagger_spec_reads_the_spec_once():
+    with mock.patch('paasta_tools.api.client.json.load', autospec=True, return_value={'paths': {}}) as mock_load:
+        spec_dict = api_client.get_swagger_spec()
+        spec_dict['host'] = 'cluster1:5054'
+        assert api_client.get_swagger_spec() == {'paths': {}}
+    assert mock_load.call_count == 1
+
+
+def test_get_pooled_http_client():
+    adapter = api_client.get_pooled_http_client().session.get_adapter('http://cluster1:5054/v1/')
+    assert adapter._pool_maxsize == api_client.HTTP_POOL_SIZE
+    assert isinstance(adapter, api_client.ConditionalHTTPAdapter)
+
+
+def make_response(status_code, content='', headers=None):
+    response = requests.models.Response()
+    response.status_code = status_code
+    response._content = content
+    response.headers = CaseInsensitiveDict(headers or {})
+    response.raw = mock.Mock()
+    return response
+
+
+def test_conditional_http_adapter():
+    adapter = api_client.ConditionalHTTPAdapter()
+    url = 'http://cluster1:5054/v1/status'
+    with mock.patch('paasta_tools.api.client.HTTPAdapter.send', autospec=True) as mock_send:
+        mock_send.return_value = make_response(200, '{"a": 1}', {'ETag': '"v1"', 'Content-Type': 'application/json'})
+        assert adapter.send(requests.Request('GET', url).prepare()).json() == {'a': 1}
+        assert 'If-None-Match' not in mock_send.call_args[0][1].headers
+
+        not_modified = make_response(304, headers={'ETag': '"v1"'})
+        mock_send.return_value = not_modified
+        response = adapter.send(requests.Request('GET', url).prepare())
+        assert mock_send.call_args[0][1].headers['If-None-Match'] == '"v1"'
+        assert not_modified.raw.release_conn.call_count == 1
+        assert response.status_code == 200
+        assert response.headers['Content-Type'] == 'application/json'
+        assert response.json() == {'a': 1}
+
+        # Responses without an ETag replace what was remembered
+        mock_send.return_value = make_response(200, '{"a": 2}')
+        assert adapter.send(requests.Request('GET', url).prepare()).json() == {'a': 2}
+        adapter.send(requests.Request('GET', url).prepare())
+        assert 'If-None-Match' not in mock_send.call_args[0][1].headers
+
+        adapter.send(requests.Request('POST', url).prepare())
+        assert url not in adapter.responses
+
+
+def test_conditional_http_adapter_remembers_cache_size_responses():
+    adapter = api_client.ConditionalHTTPAdapter(cache_size=1)
+    with mock.patch('paasta_tools.api.client.HTTPAdapter.send', autospec=True) as mock_send:
+        mock_send.return_value = make_response(200, '{}', {'ETag': '"v1"'})
+        adapter.send(requests.Request('GET', 'http://cluster1:5054/v1/a').prepare())
+        adapter.send(requests.Request('GET', 'http://cluster1:5054/v1/b').prepare())
+    assert adapter.responses.keys() == ['http://cluster1:5054/v1/b']
+
+
 class Struct(object):
     """
     convert a dictionary to an object
@@ -18,12 +18,12 @@ from pytest import raises
 
 from paasta_tools import marathon_tools
 from paasta_tools.api import settings
+from paasta_tools.api.marathon_state import MarathonState
 from paasta_tools.api.views import instance
 from paasta_tools.api.views.exception import ApiFailure
 
 
 @mock.patch('paasta_tools.api.views.instance.marathon_job_status', autospec=True)
-@mock.patch('paasta_tools.api.views.instance.marathon_tools.get_matching_appids', autospec=True)
 @mock.patch('paasta_tools.api.views.instance.marathon_tools.load_marathon_service_config', autospec=True)
 @mock.patch('paasta_tools.api.views.instance.validate_service_instance', autospec=True)
 @mock.patch('paasta_tools.api.views.instance.get_actual_deployments', autospec=True)
@@ -31,7 +31,6 @@ def test_instances_status(
     mock_get_actual_deployments,
     mock_validate_service_instance,
     mock_load_marathon_service_config,
-    mock_get_matching_appids,
     mock_marathon_job_status,
 ):
     settings.cluster = 'fake_cluster'
@@ -41,16 +40,12 @@ def test_instances_status(
                                                 'fake_cluster2.fake_instance2': 'GIT_SHA'}
     mock_validate_service_instance.return_value = 'marathon'
 
-    mock_marathon_config = marathon_tools.MarathonConfig(
-        {'url': 'fake_url', 'user': 'fake_user', 'password': 'fake_password'}
-    )
-    settings.marathon_client = marathon_tools.get_marathon_client(
-        mock_marathon_config.get_url(),
-        mock_marathon_config.get_username(),
-        mock_marathon_config.get_password()
-    )
-
-    mock_get_matching_appids.return_value = ['a', 'b']
+    settings.marathon_client = mock.create_autospec(marathon.MarathonClient)
+    settings.marathon_client.list_apps.return_value = [
+        mock.Mock(id='/fake--service.fake--instance.git1.config1'),
+        mock.Mock(id='/fake--service.fake--instance.git2.config2'),
+        mock.Mock(id='/fake--service.fake--instance2.git1.config1'),
+    ]
     mock_service_config = marathon_tools.MarathonServiceConfig(
         service='fake_service',
         cluster='fake_cluster',
@@ -63,66 +58,163 @@ def test_instances_status(
 
     request = testing.DummyRequest()
     request.swagger_data = {'service': 'fake_service', 'instance': 'fake_instance'}
+    request.marathon_state = MarathonState(settings.marathon_client)
 
     response = instance.instance_status(request)
+    assert response['git_sha'] == 'GIT_SHA'
     assert response['marathon']['bounce_method'] == 'fake_bounce'
     assert response['marathon']['desired_state'] == 'start'
+    assert response['marathon']['app_count'] == 2
+
+
+@mock.patch('paasta_tools.api.views.instance.get_actual_deployments', autospec=True)
+def test_instances_status_not_deployed(mock_get_actual_deployments):
+    settings.cluster = 'fake_cluster'
+    mock_get_actual_deployments.return_value = {'fake_cluster.fake_instance2': 'GIT_SHA'}
+    request = testing.DummyRequest()
+    request.swagger_data = {'service': 'fake_service', 'instance': 'fake_instance'}
+    request.marathon_state = mock.create_autospec(MarathonState)
+    with raises(ApiFailure) as excinfo:
+        instance.instance_status(request)
+    assert excinfo.value.err == 404
 
 
-@mock.patch('paasta_tools.api.views.instance.get_running_tasks_from_active_frameworks', autospec=True)
-@mock.patch('paasta_tools.api.views.instance.marathon_tools.is_app_id_running', autospec=True)
+@mock.patch('paasta_tools.api.marathon_state.get_running_tasks_from_active_frameworks', autospec=True)
 def test_marathon_job_status(
-    mock_is_app_id_running,
     mock_get_running_tasks_from_active_frameworks,
 ):
-    mock_tasks = [mock.Mock(slave={'hostname': 'host1'}),
-                  mock.Mock(slave={'hostname': 'host1'}),
-                  mock.Mock(slave={'hostname': 'host2'})]
+    mock_tasks = [mock_task('mock_app_id.1', 'host1'),
+                  mock_task('mock_app_id.2', 'host1'),
+                  mock_task('mock_app_id.3', 'host2'),
+                  mock_task('other_app_id.1', 'host3')]
     mock_get_running_tasks_from_active_frameworks.return_value = mock_tasks
-    mock_is_app_id_running.return_value = True
 
     app = mock.create_autospec(marathon.models.app.MarathonApp)
+    app.id = '/mock_app_id'
     app.instances = 5
     app.tasks_running = 5
     app.deployments = []
 
     client = mock.create_autospec(marathon.MarathonClient)
-    client.get_app.return_value = app
+    client.list_apps.return_value = [app]
+    client.list_queue.return_value = []
 
     job_config = mock.create_autospec(marathon_tools.MarathonServiceConfig)
     job_config.format_marathon_app_dict.return_value = {'id': 'mock_app_id'}
     job_config.get_instances.return_value = 5
 
     mstatus = {}
-    instance.marathon_job_status(mstatus, client, job_config)
+    marathon_state = MarathonState(client)
+    instance.marathon_job_status(mstatus, marathon_state, job_config)
     expected = {'deploy_status': 'Running',
                 'running_instance_count': 5,
                 'expected_instance_count': 5,
-                'app_id': 'mock_app_id'}
+                'app_id': 'mock_app_id',
+                'state_fetched_at': int(marathon_state.fetched_at)}
     expected_slaves = ['host2', 'host1']
     slaves = mstatus.pop('slaves')
     assert len(slaves) == len(expected_slaves) and sorted(slaves) == sorted(expected_slaves)
     assert mstatus == expected
 
 
+def test_marathon_job_status_not_running():
+    client = mock.create_autospec(marathon.MarathonClient)
+    client.list_apps.return_value = []
+    job_config = mock.create_autospec(marathon_tools.MarathonServiceConfig)
+    job_config.format_marathon_app_dict.return_value = {'id': 'mock_app_id'}
+    job_config.get_instances.return_value = 5
+    marathon_state = MarathonState(client)
+    marathon_state._running_tasks = {}
+
+    mstatus = {}
+    instance.marathon_job_status(mstatus, marathon_state, job_config)
+    assert mstatus['deploy_status'] == 'NotRunning'
+    assert mstatus['running_instance_count'] == 0
+    assert client.list_queue.call_count == 0
+
+
+def mock_task(task_id, hostname):
+    task = mock.MagicMock(slave={'hostname': hostname}, _Task__items={'id': task_id})
+    task.__getitem__.side_effect = {'id': task_id}.__getitem__
+    return task
+
+
+@mock.patch('paasta_tools.api.views.instance.get_instance_status', autospec=True)
+@mock.patch('paasta_tools.api.views.instance.get_actual_deployments', autospec=True)
+def test_get_service_status(mock_get_actual_deployments, mock_get_instance_status):
+    def get_instance_status_side_effect(service, instance, actual_deployments, marathon_state):
+        if instance == 'broken':
+            raise ApiFailure('oops', 500)
+        return {'instance': instance}
+    mock_get_instance_status.side_effect = get_instance_status_side_effect
+    marathon_state = mock.Mock()
+
+    assert instance.get_service_status('fake_service', ['main', 'broken'], marathon_state) == {
+        'service': 'fake_service',
+        'instances': [
+            {'instance': 'main'},
+            {'service': 'fake_service', 'instance': 'broken', 'error_code': 500, 'error_message': 'oops'},
+        ],
+    }
+    mock_get_actual_deployments.assert_called_once_with('fake_service', settings.soa_dir)
+    mock_get_instance_status.assert_any_call('fake_service', 'main', mock_get_actual_deployments.return_value,
+                                             marathon_state)
+
+    mock_get_actual_deployments.side_effect = IOError
+    statuses = instance.get_service_status('fake_service', ['main'], marathon_state)['instances']
+    assert [status['error_code'] for status in statuses] == [500]
+
+
+@mock.patch('paasta_tools.api.views.instance.get_service_status', autospec=True)
+@mock.patch('paasta_tools.api.views.instance.get_service_instance_list', autospec=True)
+def test_service_status(mock_get_service_instance_list, mock_get_service_status):
+    settings.cluster = 'fake_cluster'
+    mock_get_service_instance_list.return_value = [('fake_service', 'main'), ('fake_service', 'canary')]
+    request = testing.DummyRequest()
+    request.swagger_data = {'service': 'fake_service'}
+    request.marathon_state = mock.create_autospec(MarathonState)
+    assert instance.service_status(request) == mock_get_service_status.return_value
+    mock_get_service_status.assert_called_once_with('fake_service', ['canary', 'main'], request.marathon_state)
+
+
+@mock.patch('paasta_tools.api.views.instance.get_service_status', autospec=True)
+@mock.patch('paasta_tools.api.views.instance.get_services_for_cluster', autospec=True)
+@mock.patch('paasta_tools.api.views.instance.get_service_instance_list', autospec=True)
+def test_cluster_status(mock_get_service_instance_list, mock_get_services_for_cluster, mock_get_service_status):
+    settings.cluster = 'fake_cluster'
+    mock_get_service_status.side_effect = lambda service, instances, marathon_state: (service, instances)
+    mock_get_services_for_cluster.return_value = [('b', 'main'), ('a', 'main'), ('b', 'canary')]
+    mock_get_service_instance_list.side_effect = lambda service, cluster, soa_dir: [(service, 'main')]
+
+    request = testing.DummyRequest()
+    request.swagger_data = {}
+    request.marathon_state = mock.create_autospec(MarathonState)
+    assert instance.cluster_status(request) == {'services': [('a', ['main']), ('b', ['canary', 'main'])]}
+    request.swagger_data = {'services': ['c']}
+    assert instance.cluster_status(request) == {'services': [('c', ['main'])]}
+
+
 @mock.patch('paasta_tools.api.views.instance.add_executor_info', autospec=True)
 @mock.patch('paasta_tools.api.views.instance.add_slave_info', autospec=True)
 @mock.patch('paasta_tools.api.views.instance.instance_status', autospec=True)
-@mock.patch('paasta_tools.api.views.instance.get_tasks_from_app_id', autospec=True)
-def test_instance_tasks(mock_get_tasks_from_app_id, mock_instance_status, mock_add_slave_info, mock_add_executor_info):
-    mock_request = mock.Mock(swagger_data={'task_id': '123', 'slave_hostname': 'host1'})
+def test_instance_tasks(mock_instance_status, mock_add_slave_info, mock_add_executor_info):
+    mock_marathon_state = mock.create_autospec(MarathonState)
+    mock_request = mock.Mock(swagger_data={'task_id': '123', 'slave_hostname': 'host1'},
+                             marathon_state=mock_marathon_state)
     mock_instance_status.return_value = {'marathon': {'app_id': 'app1'}}
 
-    mock_task_1 = mock.Mock()
-    mock_task_2 = mock.Mock()
-    mock_get_tasks_from_app_id.return_value = [mock_task_1, mock_task_2]
+    mock_task_1 = mock_task('app1.1', 'host1')
+    mock_task_2 = mock_task('app1.2', 'host2')
+    mock_marathon_state.get_running_tasks.return_value = [mock_task_1, mock_task_2]
     ret = instance.instance_tasks(mock_request)
+    mock_marathon_state.get_running_tasks.assert_called_with('app1')
+    assert ret == [mock_task_1._Task__items]
     assert not mock_add_slave_info.called
     assert not mock_add_executor_info.called
 
-    mock_request = mock.Mock(swagger_data={'task_id': '123', 'slave_hostname': 'host1', 'verbose': True})
+    mock_request = mock.Mock(swagger_data={'task_id': '123', 'verbose': True}, marathon_state=mock_marathon_state)
     ret = instance.instance_tasks(mock_request)
-    mock_add_executor_info.assert_has_calls([mock.call(mock_task_1), mock.call(mock_task_2)])
+    assert mock_add_executor_info.call_count == 2
     mock_add_slave_info.assert_has_calls([mock.call(mock_add_executor_info.return_value),
                                           mock.call(mock_add_executor_info.return_value)])
     expected = [mock_add_slave_info.return_value._Task__items,
@@ -137,30 +229,51 @@ def test_instance_tasks(mock_get_tasks_from_app_id, mock_instance_status, mock_a
 @mock.patch('paasta_tools.api.views.instance.add_executor_info', autospec=True)
 @mock.patch('paasta_tools.api.views.instance.add_slave_info', autospec=True)
 @mock.patch('paasta_tools.api.views.instance.instance_status', autospec=True)
-@mock.patch('paasta_tools.api.views.instance.get_task', autospec=True)
-def test_instance_task(mock_get_task, mock_instance_status, mock_add_slave_info, mock_add_executor_info):
-    mock_request = mock.Mock(swagger_data={'task_id': '123', 'slave_hostname': 'host1'})
+def test_instance_task(mock_instance_status, mock_add_slave_info, mock_add_executor_info):
+    mock_marathon_state = mock.create_autospec(MarathonState)
+    mock_request = mock.Mock(swagger_data={'task_id': 'app1.1', 'slave_hostname': 'host1'},
+                             marathon_state=mock_marathon_state)
     mock_instance_status.return_value = {'marathon': {'app_id': 'app1'}}
 
-    mock_task_1 = mock.Mock()
-    mock_get_task.return_value = mock_task_1
+    mock_task_1 = mock_task('app1.1', 'host1')
+    mock_marathon_state.get_running_tasks.return_value = [mock_task_1, mock_task('app1.2', 'host1')]
     ret = instance.instance_task(mock_request)
     assert not mock_add_slave_info.called
     assert not mock_add_executor_info.called
     assert ret == mock_task_1._Task__items
 
-    mock_request = mock.Mock(swagger_data={'task_id': '123', 'slave_hostname': 'host1', 'verbose': True})
+    mock_request = mock.Mock(swagger_data={'task_id': 'app1.1', 'slave_hostname': 'host1', 'verbose': True},
+                             marathon_state=mock_marathon_state)
     ret = instance.instance_task(mock_request)
-    mock_add_slave_info.assert_called_with(mock_task_1)
+    copied_task = mock_add_slave_info.call_args[0][0]
+    assert copied_task is not mock_task_1
+    assert copied_task._Task__items == mock_task_1._Task__items
+    assert copied_task._Task__items is not mock_task_1._Task__items
     mock_add_executor_info.assert_called_with(mock_add_slave_info.return_value)
     expected = mock_add_executor_info.return_value._Task__items
     assert ret == expected
 
+    mock_request = mock.Mock(swagger_data={'task_id': 'app1.3'}, marathon_state=mock_marathon_state)
+    with raises(ApiFailure) as excinfo:
+        instance.instance_task(mock_request)
+    assert excinfo.value.err == 404
+
     mock_instance_status.return_value = {'chronos': {}}
     with raises(ApiFailure):
         ret = instance.instance_task(mock_request)
 
 
+def test_get_marathon_state():
+    request = testing.DummyRequest()
+    settings.marathon_state_refresher = None
+    assert instance.get_marathon_state(request).client is settings.marathon_client
+    settings.marathon_state_refresher = mock.Mock()
+    try:
+        assert instance.get_marathon_state(request) is settings.marathon_state_refresher.get_state.return_value
+    finally:
+        settings.marathon_state_refresher = None
+
+
 def mock_getitem(key):
     if key == 'id':
         return 'fakeID'
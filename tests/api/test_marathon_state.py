@@ -0,0 +1,102 @@
+# Copyright 2015-2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import marathon
+import mock
+
+from paasta_tools.api import marathon_state
+
+
+def mock_task(task_id, hostname):
+    task = mock.MagicMock(slave={'hostname': hostname})
+    task.__getitem__.side_effect = {'id': task_id}.__getitem__
+    return task
+
+
+def mock_client():
+    client = mock.create_autospec(marathon.MarathonClient)
+    client.list_apps.return_value = [mock.Mock(id='/app1')]
+    queue_item = mock.Mock(app=mock.Mock(id='/app1'), delay=mock.Mock(overdue=False, time_left_seconds=10))
+    client.list_queue.return_value = [queue_item]
+    return client
+
+
+@mock.patch('paasta_tools.api.marathon_state.get_running_tasks_from_active_frameworks', autospec=True)
+def test_marathon_state_fetches_everything_once(mock_get_running_tasks_from_active_frameworks):
+    mock_get_running_tasks_from_active_frameworks.return_value = [mock_task('app1.1', 'host1')]
+    client = mock_client()
+    state = marathon_state.MarathonState(client)
+    for _ in range(2):
+        assert state.get_app('app1') is client.list_apps.return_value[0]
+        assert state.get_app('/app2') is None
+        assert state.get_app_queue_status('app1') == (False, 10)
+        assert state.get_app_queue_status('app2') == (None, None)
+        assert len(state.get_running_tasks('app1')) == 1
+        assert state.get_running_tasks('app2') == []
+    assert client.list_apps.call_count == 1
+    assert client.list_queue.call_count == 1
+    assert mock_get_running_tasks_from_active_frameworks.call_count == 1
+
+
+@mock.patch('paasta_tools.api.marathon_state.get_running_tasks_from_active_frameworks', autospec=True)
+def test_marathon_state_fetch(mock_get_running_tasks_from_active_frameworks):
+    mock_get_running_tasks_from_active_frameworks.return_value = [mock_task('app1.1', 'host1')]
+    client = mock_client()
+    with mock.patch('paasta_tools.api.marathon_state.time.time', autospec=True, return_value=1000):
+        state = marathon_state.MarathonState(client).fetch()
+    assert client.list_apps.call_count == 1
+    assert client.list_queue.call_count == 1
+    assert mock_get_running_tasks_from_active_frameworks.call_count == 1
+    with mock.patch('paasta_tools.api.marathon_state.time.time', autospec=True, return_value=1015):
+        assert state.get_age() == 15
+
+
+def test_marathon_states_have_their_own_versions():
+    client = mock_client()
+    versions = [marathon_state.MarathonState(client).version for _ in range(3)]
+    assert len(set(versions)) == 3
+
+
+def test_marathon_state_refresher_get_state():
+    refresher = marathon_state.MarathonStateRefresher(mock.sentinel.client, max_age=60)
+    # Nothing fetched yet
+    assert refresher.get_state().client is mock.sentinel.client
+
+    refresher.state = mock.Mock(get_age=mock.Mock(return_value=30))
+    assert refresher.get_state() is refresher.state
+
+    refresher.state.get_age.return_value = 90
+    new_state = refresher.get_state()
+    assert new_state is not refresher.state
+    assert new_state.client is mock.sentinel.client
+
+
+def test_marathon_state_refresher_refresh():
+    refresher = marathon_state.MarathonStateRefresher(mock.sentinel.client)
+    with mock.patch('paasta_tools.api.marathon_state.MarathonState', autospec=True) as mock_marathon_state:
+        refresher.refresh()
+        assert refresher.state is mock_marathon_state.return_value.fetch.return_value
+        # A failed refresh keeps the last state
+        mock_marathon_state.return_value.fetch.side_effect = IOError
+        refresher.refresh()
+    assert refresher.state is mock_marathon_state.return_value.fetch.return_value
+
+
+def test_marathon_state_refresher_runs_until_stopped():
+    refresher = marathon_state.MarathonStateRefresher(mock.sentinel.client, refresh_interval=0.01)
+    with mock.patch.object(refresher, 'refresh', autospec=True) as mock_refresh:
+        mock_refresh.side_effect = lambda: mock_refresh.call_count >= 3 and refresher.stop()
+        refresher.start()
+        refresher.join(5)
+    assert not refresher.is_alive()
+    assert mock_refresh.call_count == 3
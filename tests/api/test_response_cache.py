@@ -0,0 +1,118 @@
+# Copyright 2015-2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import mock
+import pytest
+from pyramid.request import Request
+from pyramid.response import Response
+
+from paasta_tools.api import response_cache
+from paasta_tools.api import settings
+
+
+@pytest.fixture(autouse=True)
+def soa_dir_watcher(request):
+    def restore():
+        settings.soa_dir_watcher = None
+    settings.soa_dir_watcher = mock.Mock(watching=True, generation=0)
+    request.addfinalizer(restore)
+    return settings.soa_dir_watcher
+
+
+def make_route_mapper(route_name):
+    route = mock.Mock()
+    route.name = route_name
+    return mock.Mock(return_value={'route': route, 'match': {}})
+
+
+def make_request(path, marathon_state_version=1, **kwargs):
+    request = Request.blank(path, **kwargs)
+    request.marathon_state = mock.Mock(version=marathon_state_version)
+    return request
+
+
+def make_tween(route_name='status'):
+    handler = mock.Mock(side_effect=lambda request: Response(json_body={'path': request.path_qs}))
+    registry = mock.Mock()
+    registry.queryUtility.return_value = make_route_mapper(route_name)
+    return handler, response_cache.response_cache_tween_factory(handler, registry)
+
+
+def test_get_etag(soa_dir_watcher):
+    route_mapper = make_route_mapper('service.instance.tasks')
+    etag = response_cache.get_etag(make_request('/tasks'), route_mapper)
+    assert etag == response_cache.get_etag(make_request('/tasks?verbose=false'), route_mapper)
+    assert etag != response_cache.get_etag(make_request('/tasks', marathon_state_version=2), route_mapper)
+    soa_dir_watcher.generation = 1
+    assert etag != response_cache.get_etag(make_request('/tasks'), route_mapper)
+
+
+def test_get_etag_of_uncacheable_requests(soa_dir_watcher):
+    route_mapper = make_route_mapper('service.instance.tasks')
+    assert response_cache.get_etag(make_request('/tasks', method='POST'), route_mapper) is None
+    assert response_cache.get_etag(make_request('/tasks?verbose=true'), route_mapper) is None
+    assert response_cache.get_etag(make_request('/autoscaler'), make_route_mapper('service.autoscaler.get')) is None
+    soa_dir_watcher.watching = False
+    assert response_cache.get_etag(make_request('/tasks'), route_mapper) is None
+    settings.soa_dir_watcher = None
+    assert response_cache.get_etag(make_request('/tasks'), route_mapper) is None
+
+
+def test_response_cache_tween():
+    handler, tween = make_tween()
+    response = tween(make_request('/v1/status'))
+    assert response.json_body == {'path': '/v1/status'}
+    etag = response.etag
+    assert etag is not None
+
+    # The same version of the same url is only rendered once
+    assert tween(make_request('/v1/status')).json_body == {'path': '/v1/status'}
+    assert tween(make_request('/v1/status?services=a')).json_body == {'path': '/v1/status?services=a'}
+    assert handler.call_count == 2
+
+    response = tween(make_request('/v1/status', headers={'If-None-Match': '"%s"' % etag}))
+    assert response.status_code == 304
+    assert response.etag == etag
+    assert handler.call_count == 2
+
+    response = tween(make_request('/v1/status', marathon_state_version=2,
+                                  headers={'If-None-Match': '"%s"' % etag}))
+    assert response.status_code == 200
+    assert response.etag != etag
+    assert handler.call_count == 3
+
+
+def test_response_cache_tween_doesnt_cache_errors():
+    handler, tween = make_tween()
+    handler.side_effect = lambda request: Response(status=500)
+    for _ in range(2):
+        response = tween(make_request('/v1/status'))
+        assert response.status_code == 500
+        assert response.etag is None
+    assert handler.call_count == 2
+
+
+def test_response_cache_tween_passes_uncacheable_requests_through():
+    handler, tween = make_tween('service.autoscaler.get')
+    for _ in range(2):
+        assert tween(make_request('/v1/services/a/main/autoscaler')).etag is None
+    assert handler.call_count == 2
+
+
+def test_response_cache_forgets_least_recently_stored():
+    cache = response_cache.ResponseCache(max_size=2)
+    for url in ['/a', '/b', '/c']:
+        cache.store(url, 'etag', Response(json_body={}))
+    assert cache.get('/a', 'etag') is None
+    assert cache.get('/b', 'etag').json_body == {}
+    assert cache.get('/c', 'other_etag') is None
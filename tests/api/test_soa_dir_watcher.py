@@ -0,0 +1,144 @@
+# Copyright 2015-2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import contextlib
+import json
+
+import mock
+import pytest
+import service_configuration_lib
+
+from paasta_tools import utils
+from paasta_tools.api import soa_dir_watcher
+
+
+@pytest.fixture(autouse=True)
+def empty_caches(request):
+    def restore():
+        soa_dir_watcher.clear_caches()
+        service_configuration_lib.enable_yaml_cache()
+        utils.disable_deployments_json_cache()
+    soa_dir_watcher.clear_caches()
+    request.addfinalizer(restore)
+
+
+def fake_pyinotify():
+    return mock.Mock(
+        IN_CLOSE_WRITE=0x8, IN_MOVED_FROM=0x40, IN_MOVED_TO=0x80, IN_CREATE=0x100, IN_DELETE=0x200,
+        IN_DELETE_SELF=0x400, IN_MOVE_SELF=0x800, IN_Q_OVERFLOW=0x4000,
+    )
+
+
+def test_forget_path():
+    service_configuration_lib._yaml_cache.update({
+        '/soa/service1/service.yaml': {},
+        '/soa/service1/marathon-cluster.yaml': {},
+        '/soa/service10/service.yaml': {},
+    })
+    utils._deployments_json_cache.update({
+        '/soa/service1/deployments.json': {},
+        '/soa/service2/deployments.json': {},
+    })
+    soa_dir_watcher.forget_path('/soa/service1/service.yaml')
+    assert sorted(service_configuration_lib._yaml_cache) == [
+        '/soa/service1/marathon-cluster.yaml',
+        '/soa/service10/service.yaml',
+    ]
+    soa_dir_watcher.forget_path('/soa/service1/')
+    assert sorted(service_configuration_lib._yaml_cache) == ['/soa/service10/service.yaml']
+    assert sorted(utils._deployments_json_cache) == ['/soa/service2/deployments.json']
+
+
+def test_forget_path_with_relative_soa_dir(tmpdir):
+    with tmpdir.as_cwd():
+        service_configuration_lib._yaml_cache.update({
+            'soa/service1/service.yaml': {},
+            'soa/service2/service.yaml': {},
+        })
+        soa_dir_watcher.forget_path(str(tmpdir.join('soa', 'service1', 'service.yaml')))
+        assert sorted(service_configuration_lib._yaml_cache) == ['soa/service2/service.yaml']
+        soa_dir_watcher.forget_path(str(tmpdir.join('soa')))
+        assert service_configuration_lib._yaml_cache == {}
+
+
+def test_soa_dir_watcher_needs_pyinotify():
+    with mock.patch.object(soa_dir_watcher, 'pyinotify', None):
+        with pytest.raises(soa_dir_watcher.SoaDirWatchError):
+            soa_dir_watcher.SoaDirWatcher('/soa')
+
+
+def test_soa_dir_watcher_needs_every_directory_watched():
+    pyinotify = fake_pyinotify()
+    pyinotify.WatchManager.return_value.add_watch.return_value = {'/soa': 1, '/soa/service1': -1}
+    with mock.patch.object(soa_dir_watcher, 'pyinotify', pyinotify):
+        with pytest.raises(soa_dir_watcher.SoaDirWatchError):
+            soa_dir_watcher.SoaDirWatcher('/soa')
+    assert pyinotify.Notifier.return_value.stop.call_count == 1
+
+
+def test_soa_dir_watcher_process_event():
+    pyinotify = fake_pyinotify()
+    pyinotify.WatchManager.return_value.add_watch.return_value = {'/soa': 1}
+    with contextlib.nested(
+        mock.patch.object(soa_dir_watcher, 'pyinotify', pyinotify),
+        mock.patch('paasta_tools.api.soa_dir_watcher.forget_path', autospec=True),
+        mock.patch('paasta_tools.api.soa_dir_watcher.clear_caches', autospec=True),
+    ) as (
+        _,
+        mock_forget_path,
+        mock_clear_caches,
+    ):
+        watcher = soa_dir_watcher.SoaDirWatcher('/soa')
+        assert watcher.watching
+        watcher.start_caching()
+        assert mock_clear_caches.call_count == 1
+        assert service_configuration_lib._use_yaml_cache
+        assert utils._use_deployments_json_cache
+
+        assert watcher.generation == 0
+        watcher.process_event(mock.Mock(mask=pyinotify.IN_CLOSE_WRITE, pathname='/soa/service1/service.yaml'))
+        mock_forget_path.assert_called_once_with('/soa/service1/service.yaml')
+        assert watcher.generation == 1
+        # Deleting a service's directory forgets its files
+        watcher.process_event(mock.Mock(mask=pyinotify.IN_DELETE_SELF, pathname='/soa/service1'))
+        mock_forget_path.assert_called_with('/soa/service1')
+
+        watcher.process_event(mock.Mock(mask=pyinotify.IN_Q_OVERFLOW, pathname=''))
+        assert mock_clear_caches.call_count == 2
+
+        # Nothing watches whatever replaces the soa_dir
+        watcher.process_event(mock.Mock(mask=pyinotify.IN_MOVE_SELF, pathname='/soa'))
+        assert mock_clear_caches.call_count == 3
+        assert not watcher.watching
+        assert not service_configuration_lib._use_yaml_cache
+        assert not utils._use_deployments_json_cache
+
+
+@pytest.mark.skipif(soa_dir_watcher.pyinotify is None, reason="pyinotify isn't installed")
+def test_soa_dir_watcher_forgets_changed_files(tmpdir):
+    service_dir = tmpdir.mkdir('fake_service')
+    service_dir.join('deployments.json').write(json.dumps({'v1': {'a': 1}}))
+    service_dir.join('marathon-fake_cluster.yaml').write('main: {}')
+    soa_dir = str(tmpdir)
+    watcher = soa_dir_watcher.SoaDirWatcher(soa_dir)
+    watcher.start_caching()
+
+    assert utils.load_deployments_json('fake_service', soa_dir) == {'a': 1}
+    assert service_configuration_lib.read_extra_service_information(
+        'fake_service', 'marathon-fake_cluster', soa_dir=soa_dir) == {'main': {}}
+    service_dir.join('deployments.json').write(json.dumps({'v1': {'a': 2}}))
+    assert utils.load_deployments_json('fake_service', soa_dir) == {'a': 1}
+    watcher.process_pending_events()
+    assert utils.load_deployments_json('fake_service', soa_dir) == {'a': 2}
+    # Only the file that changed is forgotten
+    assert service_configuration_lib._yaml_cache.keys() == [str(service_dir.join('marathon-fake_cluster.yaml'))]
@@ -81,12 +81,12 @@ def test_downscale_spot_fleet_request():
         mock.patch('paasta_tools.autoscaling.autoscaling_cluster_lib.get_mesos_master', autospec=True),
         mock.patch('paasta_tools.autoscaling.autoscaling_cluster_lib.get_mesos_task_count_by_slave', autospec=True),
         mock.patch('paasta_tools.autoscaling.autoscaling_cluster_lib.sort_slaves_to_kill', autospec=True),
-        mock.patch('paasta_tools.autoscaling.autoscaling_cluster_lib.gracefully_terminate_slave', autospec=True)
+        mock.patch('paasta_tools.autoscaling.autoscaling_cluster_lib.gracefully_terminate_slaves', autospec=True)
     ) as (
         mock_get_mesos_master,
         mock_get_mesos_task_count_by_slave,
         mock_sort_slaves_to_kill,
-        mock_gracefully_terminate_slave
+        mock_gracefully_terminate_slaves
     ):
         mock_master = mock.Mock()
         mock_mesos_state = mock.Mock()
@@ -96,118 +96,100 @@ def test_downscale_spot_fleet_request():
                         'instance_weight': 1}
         mock_slave_2 = {'hostname': 'host2', 'instance_id': 'i-blah456',
                         'instance_weight': 2}
+        mock_slave_3 = {'hostname': 'host3', 'instance_id': 'i-blah789',
+                        'instance_weight': 1}
         mock_resource = mock.Mock()
         mock_filtered_slaves = mock.Mock()
-        mock_pool_settings = mock.Mock()
-        mock_sfr_sorted_slaves_1 = [mock_slave_1, mock_slave_2]
-        mock_sfr_sorted_slaves_2 = [mock_slave_2]
-        mock_terminate_call_1 = mock.call(resource=mock_resource,
-                                          slave_to_kill=mock_slave_1,
-                                          pool_settings=mock_pool_settings,
-                                          current_capacity=5,
-                                          dry_run=False,
-                                          new_capacity=4)
-        mock_terminate_call_2 = mock.call(resource=mock_resource,
-                                          slave_to_kill=mock_slave_2,
-                                          pool_settings=mock_pool_settings,
-                                          current_capacity=4,
-                                          dry_run=False,
-                                          new_capacity=2)
-        # for draining slave 1 failure HTTPError scenario
-        mock_terminate_call_3 = mock.call(resource=mock_resource,
-                                          slave_to_kill=mock_slave_2,
-                                          pool_settings=mock_pool_settings,
-                                          current_capacity=5,
-                                          dry_run=False,
-                                          new_capacity=3)
+        mock_pool_settings = {}
 
         # test stop when reach capacity
-        mock_sort_slaves_to_kill.return_value = mock_sfr_sorted_slaves_2
+        mock_sort_slaves_to_kill.return_value = [mock_slave_2]
         autoscaling_cluster_lib.downscale_spot_fleet_request(resource=mock_resource,
                                                              filtered_slaves=mock_filtered_slaves,
                                                              pool_settings=mock_pool_settings,
                                                              current_capacity=5,
                                                              target_capacity=4,
                                                              dry_run=False)
-        assert not mock_gracefully_terminate_slave.called
+        assert not mock_gracefully_terminate_slaves.called
 
         # test stop if FailSetSpotCapacity
-        mock_gracefully_terminate_slave.side_effect = autoscaling_cluster_lib.FailSetSpotCapacity
-        mock_sfr_sorted_slaves_1 = [mock_slave_1, mock_slave_2]
-        mock_sfr_sorted_slaves_2 = [mock_slave_2]
-        mock_sort_slaves_to_kill.side_effect = iter([mock_sfr_sorted_slaves_1,
-                                                     mock_sfr_sorted_slaves_2,
-                                                     []])
+        mock_gracefully_terminate_slaves.side_effect = autoscaling_cluster_lib.FailSetSpotCapacity
+        mock_sort_slaves_to_kill.return_value = [mock_slave_1, mock_slave_2]
         autoscaling_cluster_lib.downscale_spot_fleet_request(resource=mock_resource,
                                                              filtered_slaves=mock_filtered_slaves,
                                                              pool_settings=mock_pool_settings,
                                                              current_capacity=5,
                                                              target_capacity=2,
                                                              dry_run=False)
-        mock_gracefully_terminate_slave.assert_has_calls([mock_terminate_call_1])
-
-        # test continue if HTTPError
-        mock_gracefully_terminate_slave.side_effect = HTTPError
-        mock_gracefully_terminate_slave.reset_mock()
-        mock_sfr_sorted_slaves_1 = [mock_slave_1, mock_slave_2]
-        mock_sfr_sorted_slaves_2 = [mock_slave_2]
-        mock_sort_slaves_to_kill.side_effect = iter([mock_sfr_sorted_slaves_1,
-                                                     mock_sfr_sorted_slaves_2,
-                                                     []])
+        mock_gracefully_terminate_slaves.assert_called_once_with(resource=mock_resource,
+                                                                 slaves_to_kill=[mock_slave_1, mock_slave_2],
+                                                                 pool_settings=mock_pool_settings,
+                                                                 current_capacity=5,
+                                                                 dry_run=False)
+        assert not mock_get_mesos_task_count_by_slave.called
+
+        # test the whole batch is drained at once, keeping the kill preference order,
+        # and we stop at the first slave that would take us below target
+        mock_gracefully_terminate_slaves.side_effect = None
+        mock_gracefully_terminate_slaves.reset_mock()
+        mock_gracefully_terminate_slaves.return_value = 2
+        mock_sort_slaves_to_kill.reset_mock()
+        mock_sort_slaves_to_kill.return_value = [mock_slave_1, mock_slave_2, mock_slave_3]
         autoscaling_cluster_lib.downscale_spot_fleet_request(resource=mock_resource,
                                                              filtered_slaves=mock_filtered_slaves,
                                                              pool_settings=mock_pool_settings,
                                                              current_capacity=5,
                                                              target_capacity=2,
                                                              dry_run=False)
-        mock_gracefully_terminate_slave.assert_has_calls([mock_terminate_call_1, mock_terminate_call_3])
-
-        # test normal scale down
-        mock_gracefully_terminate_slave.side_effect = None
-        mock_gracefully_terminate_slave.reset_mock()
+        mock_gracefully_terminate_slaves.assert_called_once_with(resource=mock_resource,
+                                                                 slaves_to_kill=[mock_slave_1, mock_slave_2],
+                                                                 pool_settings=mock_pool_settings,
+                                                                 current_capacity=5,
+                                                                 dry_run=False)
+        assert mock_sort_slaves_to_kill.call_args_list[0] == mock.call(mock_filtered_slaves)
+
+        # test batches are limited by max_concurrent_drains and task counts are refreshed between batches
+        mock_gracefully_terminate_slaves.reset_mock()
+        mock_gracefully_terminate_slaves.side_effect = iter([4, 3])
         mock_get_mesos_task_count_by_slave.reset_mock()
         mock_sort_slaves_to_kill.reset_mock()
-        mock_sfr_sorted_slaves_1 = [mock_slave_1, mock_slave_2]
-        mock_sfr_sorted_slaves_2 = [mock_slave_2]
-        mock_sort_slaves_to_kill.side_effect = iter([mock_sfr_sorted_slaves_1,
-                                                     mock_sfr_sorted_slaves_2,
-                                                     []])
+        mock_sort_slaves_to_kill.side_effect = iter([[mock_slave_1, mock_slave_3], [mock_slave_3]])
+        mock_get_mesos_task_count_by_slave.return_value = [mock_slave_3]
         autoscaling_cluster_lib.downscale_spot_fleet_request(resource=mock_resource,
                                                              filtered_slaves=mock_filtered_slaves,
-                                                             pool_settings=mock_pool_settings,
+                                                             pool_settings={'max_concurrent_drains': 1},
                                                              current_capacity=5,
-                                                             target_capacity=2,
+                                                             target_capacity=3,
                                                              dry_run=False)
-        mock_sort_slaves_to_kill.assert_has_calls([mock.call(mock_filtered_slaves),
-                                                   mock.call(mock_get_mesos_task_count_by_slave.return_value)])
-        assert mock_get_mesos_master.called
-        mock_gracefully_terminate_slave.assert_has_calls([mock_terminate_call_1, mock_terminate_call_2])
-        mock_get_task_count_calls = [mock.call(mock_mesos_state, slaves_list=[mock_slave_2]),
-                                     mock.call(mock_mesos_state, slaves_list=[])]
-        mock_get_mesos_task_count_by_slave.assert_has_calls(mock_get_task_count_calls)
+        assert mock_gracefully_terminate_slaves.call_args_list == [
+            mock.call(resource=mock_resource, slaves_to_kill=[mock_slave_1],
+                      pool_settings={'max_concurrent_drains': 1}, current_capacity=5, dry_run=False),
+            mock.call(resource=mock_resource, slaves_to_kill=[mock_slave_3],
+                      pool_settings={'max_concurrent_drains': 1}, current_capacity=4, dry_run=False),
+        ]
+        mock_get_mesos_task_count_by_slave.assert_called_once_with(mock_mesos_state, slaves_list=[mock_slave_3])
 
         # test non integer scale down
         # this should result in killing 3 instances,
         # leaving us on 7.1 provisioned of target 7
         mock_slave_1 = {'hostname': 'host1', 'instance_id': 'i-blah123',
                         'instance_weight': 0.3}
-        mock_gracefully_terminate_slave.side_effect = None
-        mock_gracefully_terminate_slave.reset_mock()
-        mock_get_mesos_task_count_by_slave.reset_mock()
-        mock_sort_slaves_to_kill.reset_mock()
-        mock_sfr_sorted_slaves = [mock_slave_1] * 10
-        mock_sort_slaves_to_kill.side_effect = iter([mock_sfr_sorted_slaves] +
-                                                    [mock_sfr_sorted_slaves[x:-1] for x in range(0, 10)])
+        mock_gracefully_terminate_slaves.side_effect = None
+        mock_gracefully_terminate_slaves.reset_mock()
+        mock_gracefully_terminate_slaves.return_value = 7.1
+        mock_sort_slaves_to_kill.side_effect = None
+        mock_sort_slaves_to_kill.return_value = [mock_slave_1] * 10
         autoscaling_cluster_lib.downscale_spot_fleet_request(resource=mock_resource,
                                                              filtered_slaves=mock_filtered_slaves,
                                                              pool_settings=mock_pool_settings,
                                                              current_capacity=8,
                                                              target_capacity=7,
                                                              dry_run=False)
-        assert mock_gracefully_terminate_slave.call_count == 3
+        assert mock_gracefully_terminate_slaves.call_count == 1
+        assert len(mock_gracefully_terminate_slaves.call_args[1]['slaves_to_kill']) == 3
 
 
-def test_gracefully_terminate_slave():
+def test_gracefully_terminate_slaves():
     with contextlib.nested(
         mock.patch('time.time', autospec=True),
         mock.patch('paasta_tools.autoscaling.autoscaling_cluster_lib.drain', autospec=True),
@@ -225,64 +207,76 @@ def test_gracefully_terminate_slave():
         mock_pool_settings = {'drain_timeout': 123}
         mock_time.return_value = int(1)
         mock_start = (1 + 123) * 1000000000
-        mock_slave = {'hostname': 'host1', 'instance_id': 'i-blah123',
-                      'pid': 'slave(1)@10.1.1.1:5051', 'instance_weight': 1,
-                      'ip': '10.1.1.1'}
-        autoscaling_cluster_lib.gracefully_terminate_slave(resource=mock_resource,
-                                                           slave_to_kill=mock_slave,
-                                                           pool_settings=mock_pool_settings,
-                                                           current_capacity=5,
-                                                           new_capacity=4,
-                                                           dry_run=False)
-        mock_drain.assert_called_with(['host1|10.1.1.1'], mock_start, 600 * 1000000000)
-        set_call_1 = mock.call('sfr-blah', 4, False, region='westeros-1')
-        mock_set_spot_fleet_request_capacity.assert_has_calls([set_call_1])
-        mock_wait_and_terminate.assert_called_with(mock_slave, 123, False, region='westeros-1')
-        mock_undrain.assert_called_with(['host1|10.1.1.1'])
-
-        # test we cleanup if a termination fails
-        set_call_2 = mock.call('sfr-blah', 5, False, region='westeros-1')
-        mock_wait_and_terminate.side_effect = ClientError({'Error': {}}, 'blah')
-        autoscaling_cluster_lib.gracefully_terminate_slave(resource=mock_resource,
-                                                           slave_to_kill=mock_slave,
-                                                           pool_settings=mock_pool_settings,
-                                                           current_capacity=5,
-                                                           new_capacity=4,
-                                                           dry_run=False)
-        mock_drain.assert_called_with(['host1|10.1.1.1'], mock_start, 600 * 1000000000)
-        mock_set_spot_fleet_request_capacity.assert_has_calls([set_call_1, set_call_2])
-        mock_wait_and_terminate.assert_called_with(mock_slave, 123, False, region='westeros-1')
-        mock_undrain.assert_called_with(['host1|10.1.1.1'])
+        mock_slave_1 = {'hostname': 'host1', 'instance_id': 'i-blah123',
+                        'pid': 'slave(1)@10.1.1.1:5051', 'instance_weight': 1,
+                        'ip': '10.1.1.1'}
+        mock_slave_2 = {'hostname': 'host2', 'instance_id': 'i-blah456',
+                        'pid': 'slave(1)@10.2.2.2:5051', 'instance_weight': 2,
+                        'ip': '10.2.2.2'}
+        mock_wait_and_terminate.return_value = []
+        ret = autoscaling_cluster_lib.gracefully_terminate_slaves(resource=mock_resource,
+                                                                  slaves_to_kill=[mock_slave_1, mock_slave_2],
+                                                                  pool_settings=mock_pool_settings,
+                                                                  current_capacity=5,
+                                                                  dry_run=False)
+        assert ret == 2
+        mock_drain.assert_has_calls([mock.call(['host1|10.1.1.1'], mock_start, 600 * 1000000000),
+                                     mock.call(['host2|10.2.2.2'], mock_start, 600 * 1000000000)])
+        mock_set_spot_fleet_request_capacity.assert_called_once_with('sfr-blah', 2, False, region='westeros-1')
+        mock_wait_and_terminate.assert_called_with([mock_slave_1, mock_slave_2], 123, False, region='westeros-1')
+        mock_undrain.assert_called_with(['host1|10.1.1.1', 'host2|10.2.2.2'])
+
+        # test we add capacity back if a termination fails
+        mock_set_spot_fleet_request_capacity.reset_mock()
+        mock_wait_and_terminate.return_value = [mock_slave_2]
+        ret = autoscaling_cluster_lib.gracefully_terminate_slaves(resource=mock_resource,
+                                                                  slaves_to_kill=[mock_slave_1, mock_slave_2],
+                                                                  pool_settings=mock_pool_settings,
+                                                                  current_capacity=5,
+                                                                  dry_run=False)
+        assert ret == 4
+        mock_set_spot_fleet_request_capacity.assert_has_calls([
+            mock.call('sfr-blah', 2, False, region='westeros-1'),
+            mock.call('sfr-blah', 4, False, region='westeros-1'),
+        ])
+        mock_undrain.assert_called_with(['host1|10.1.1.1', 'host2|10.2.2.2'])
 
         # test we cleanup if a set spot capacity fails
-        mock_wait_and_terminate.side_effect = None
         mock_wait_and_terminate.reset_mock()
         mock_set_spot_fleet_request_capacity.side_effect = autoscaling_cluster_lib.FailSetSpotCapacity
         with raises(autoscaling_cluster_lib.FailSetSpotCapacity):
-            autoscaling_cluster_lib.gracefully_terminate_slave(resource=mock_resource,
-                                                               slave_to_kill=mock_slave,
-                                                               pool_settings=mock_pool_settings,
-                                                               current_capacity=5,
-                                                               new_capacity=4,
-                                                               dry_run=False)
-        mock_drain.assert_called_with(['host1|10.1.1.1'], mock_start, 600 * 1000000000)
-        mock_set_spot_fleet_request_capacity.assert_has_calls([set_call_1])
+            autoscaling_cluster_lib.gracefully_terminate_slaves(resource=mock_resource,
+                                                                slaves_to_kill=[mock_slave_1],
+                                                                pool_settings=mock_pool_settings,
+                                                                current_capacity=5,
+                                                                dry_run=False)
         mock_undrain.assert_called_with(['host1|10.1.1.1'])
         assert not mock_wait_and_terminate.called
 
-        # test we cleanup if a drain fails
-        mock_wait_and_terminate.side_effect = None
+        # test we skip hosts that fail to drain
         mock_set_spot_fleet_request_capacity.side_effect = None
         mock_set_spot_fleet_request_capacity.reset_mock()
+        mock_wait_and_terminate.return_value = []
+        mock_drain.side_effect = iter([HTTPError, None])
+        ret = autoscaling_cluster_lib.gracefully_terminate_slaves(resource=mock_resource,
+                                                                  slaves_to_kill=[mock_slave_1, mock_slave_2],
+                                                                  pool_settings=mock_pool_settings,
+                                                                  current_capacity=5,
+                                                                  dry_run=False)
+        assert ret == 3
+        mock_set_spot_fleet_request_capacity.assert_called_once_with('sfr-blah', 3, False, region='westeros-1')
+        mock_wait_and_terminate.assert_called_with([mock_slave_2], 123, False, region='westeros-1')
+
+        # test nothing happens if no hosts could be drained
+        mock_set_spot_fleet_request_capacity.reset_mock()
+        mock_wait_and_terminate.reset_mock()
         mock_drain.side_effect = HTTPError
-        with raises(HTTPError):
-            autoscaling_cluster_lib.gracefully_terminate_slave(resource=mock_resource,
-                                                               slave_to_kill=mock_slave,
-                                                               pool_settings=mock_pool_settings,
-                                                               current_capacity=5,
-                                                               new_capacity=4,
-                                                               dry_run=False)
-        mock_drain.assert_called_with(['host1|10.1.1.1'], mock_start, 600 * 1000000000)
+        ret = autoscaling_cluster_lib.gracefully_terminate_slaves(resource=mock_resource,
+                                                                  slaves_to_kill=[mock_slave_1],
+                                                                  pool_settings=mock_pool_settings,
+                                                                  current_capacity=5,
+                                                                  dry_run=False)
+        assert ret == 5
         assert not mock_set_spot_fleet_request_capacity.called
         assert not mock_wait_and_terminate.called
 
@@ -337,25 +331,77 @@ def test_wait_and_terminate():
     with contextlib.nested(
         mock.patch('boto3.client', autospec=True),
         mock.patch('time.sleep', autospec=True),
-        mock.patch('paasta_tools.autoscaling.autoscaling_cluster_lib.is_safe_to_kill', autospec=True),
+        mock.patch('paasta_tools.autoscaling.autoscaling_cluster_lib.get_hosts_safe_to_kill', autospec=True),
     ) as (
         mock_ec2_client,
-        _,
-        mock_is_safe_to_kill,
+        mock_sleep,
+        mock_get_hosts_safe_to_kill,
     ):
         mock_terminate_instances = mock.Mock()
         mock_ec2_client.return_value = mock.Mock(terminate_instances=mock_terminate_instances)
 
-        mock_is_safe_to_kill.return_value = True
-        mock_slave_to_kill = {'ip': '10.1.1.1', 'instance_id': 'i-blah123', 'pid': 'slave(1)@10.1.1.1:5051',
-                              'hostname': 'hostblah'}
-        autoscaling_cluster_lib.wait_and_terminate(mock_slave_to_kill, 600, False, region='westeros-1')
+        mock_slave_1 = {'ip': '10.1.1.1', 'instance_id': 'i-blah123', 'pid': 'slave(1)@10.1.1.1:5051',
+                        'hostname': 'hostblah'}
+        mock_slave_2 = {'ip': '10.2.2.2', 'instance_id': 'i-blah456', 'pid': 'slave(1)@10.2.2.2:5051',
+                        'hostname': 'hostblah2'}
+        mock_get_hosts_safe_to_kill.return_value = {'hostblah'}
+        ret = autoscaling_cluster_lib.wait_and_terminate([mock_slave_1], 600, False, region='westeros-1')
+        assert ret == []
         mock_terminate_instances.assert_called_with(InstanceIds=['i-blah123'], DryRun=False)
-        mock_is_safe_to_kill.assert_called_with('hostblah')
-
-        mock_is_safe_to_kill.side_effect = iter([False, False, True])
-        autoscaling_cluster_lib.wait_and_terminate(mock_slave_to_kill, 600, False, region='westeros-1')
-        assert mock_is_safe_to_kill.call_count == 4
+        mock_get_hosts_safe_to_kill.assert_called_with(['hostblah'])
+        assert not mock_sleep.called
+
+        # test all pending hosts are checked in a single poll and terminated as soon as they are ready
+        mock_terminate_instances.reset_mock()
+        mock_get_hosts_safe_to_kill.reset_mock()
+        mock_get_hosts_safe_to_kill.side_effect = iter([set(), {'hostblah2'}, {'hostblah'}])
+        ret = autoscaling_cluster_lib.wait_and_terminate([mock_slave_1, mock_slave_2], 600, False,
+                                                         region='westeros-1')
+        assert ret == []
+        assert mock_get_hosts_safe_to_kill.call_count == 3
+        assert sorted(mock_get_hosts_safe_to_kill.call_args_list[0][0][0]) == ['hostblah', 'hostblah2']
+        mock_get_hosts_safe_to_kill.assert_called_with(['hostblah'])
+        assert mock_terminate_instances.call_args_list == [
+            mock.call(InstanceIds=['i-blah456'], DryRun=False),
+            mock.call(InstanceIds=['i-blah123'], DryRun=False),
+        ]
+
+        # test failed terminations are returned
+        mock_get_hosts_safe_to_kill.side_effect = None
+        mock_get_hosts_safe_to_kill.return_value = {'hostblah', 'hostblah2'}
+        mock_terminate_instances.side_effect = iter([ClientError({'Error': {}}, 'blah'), None])
+        ret = autoscaling_cluster_lib.wait_and_terminate([mock_slave_1, mock_slave_2], 600, False,
+                                                         region='westeros-1')
+        assert ret == [mock_slave_1]
+
+        # test dry run doesn't wait
+        mock_terminate_instances.side_effect = ClientError({'Error': {'Code': 'DryRunOperation'}}, 'blah')
+        mock_get_hosts_safe_to_kill.reset_mock()
+        ret = autoscaling_cluster_lib.wait_and_terminate([mock_slave_1], 600, True, region='westeros-1')
+        assert ret == []
+        assert not mock_get_hosts_safe_to_kill.called
+
+
+def test_wait_and_terminate_timeout():
+    with contextlib.nested(
+        mock.patch('boto3.client', autospec=True),
+        mock.patch('paasta_tools.autoscaling.autoscaling_cluster_lib.time', autospec=True),
+        mock.patch('paasta_tools.autoscaling.autoscaling_cluster_lib.get_hosts_safe_to_kill', autospec=True,
+                   return_value=set()),
+    ) as (
+        mock_ec2_client,
+        mock_time,
+        mock_get_hosts_safe_to_kill,
+    ):
+        mock_terminate_instances = mock.Mock()
+        mock_ec2_client.return_value = mock.Mock(terminate_instances=mock_terminate_instances)
+        mock_time.time.side_effect = iter([0, 100, 1000])
+        mock_slave = {'ip': '10.1.1.1', 'instance_id': 'i-blah123', 'pid': 'slave(1)@10.1.1.1:5051',
+                      'hostname': 'hostblah'}
+        ret = autoscaling_cluster_lib.wait_and_terminate([mock_slave], 600, False, region='westeros-1')
+        assert ret == []
+        assert mock_get_hosts_safe_to_kill.call_count == 1
+        mock_terminate_instances.assert_called_once_with(InstanceIds=['i-blah123'], DryRun=False)
 
 
 def test_sort_slaves_to_kill():
@@ -16,6 +16,8 @@ from datetime import datetime
 from datetime import timedelta
 
 import mock
+from kazoo.exceptions import ConnectionLoss
+from kazoo.exceptions import NodeExistsError
 from kazoo.exceptions import NoNodeError
 from pytest import raises
 from requests.exceptions import Timeout
@@ -156,37 +158,44 @@ def test_get_decision_policy():
 def test_pid_decision_policy():
     current_time = datetime.now()
 
-    zookeeper_get_payload = {
-        'pid_iterm': 0,
-        'pid_last_error': 0,
-        'pid_last_time': (current_time - timedelta(seconds=600)).strftime('%s'),
-    }
+    fake_autoscaler_state = autoscaling_service_lib.AutoscalerState(
+        path='/autoscaling/fake-service/fake-instance/autoscaler_state',
+        data={
+            'pid_iterm': 0,
+            'pid_last_error': 0,
+            'pid_last_time': (current_time - timedelta(seconds=600)).strftime('%s'),
+        },
+        exists=True,
+    )
 
-    with contextlib.nested(
-            mock.patch('paasta_tools.utils.KazooClient', autospec=True,
-                       return_value=mock.Mock(get=mock.Mock(
-                           side_effect=lambda x: (zookeeper_get_payload[x.split('/')[-1]], None)))),
-            mock.patch('paasta_tools.autoscaling.autoscaling_service_lib.datetime', autospec=True),
-            mock.patch('paasta_tools.utils.load_system_paasta_config', autospec=True,
-                       return_value=mock.Mock(get_zk_hosts=mock.Mock())),
-    ) as (
-        mock_zk_client,
-        mock_datetime,
-        _,
-    ):
+    with mock.patch(
+        'paasta_tools.autoscaling.autoscaling_service_lib.datetime', autospec=True,
+    ) as mock_datetime:
         mock_datetime.now.return_value = current_time
-        assert autoscaling_service_lib.pid_decision_policy('/autoscaling/fake-service/fake-instance',
-                                                           10, 1, 100, 0.0) == 0
-        assert autoscaling_service_lib.pid_decision_policy('/autoscaling/fake-service/fake-instance',
-                                                           10, 1, 100, 0.2) == 1
-        assert autoscaling_service_lib.pid_decision_policy('/autoscaling/fake-service/fake-instance',
-                                                           10, 1, 100, -0.2) == -1
-        mock_zk_client.return_value.set.assert_has_calls([
-            mock.call('/autoscaling/fake-service/fake-instance/pid_iterm', '0.0'),
-            mock.call('/autoscaling/fake-service/fake-instance/pid_last_error', '0.0'),
-            mock.call('/autoscaling/fake-service/fake-instance/pid_last_time',
-                      '%s' % current_time.strftime('%s')),
-        ], any_order=True)
+        assert autoscaling_service_lib.pid_decision_policy(fake_autoscaler_state, 10, 1, 100, 0.0) == 0
+        assert fake_autoscaler_state == {
+            'pid_iterm': 0.0,
+            'pid_last_error': 0.0,
+            'pid_last_time': int(current_time.strftime('%s')),
+        }
+        fake_autoscaler_state['pid_last_time'] -= 600
+        assert autoscaling_service_lib.pid_decision_policy(fake_autoscaler_state, 10, 1, 100, 0.2) == 1
+        fake_autoscaler_state.update(pid_last_time=fake_autoscaler_state['pid_last_time'] - 600, pid_last_error=0)
+        assert autoscaling_service_lib.pid_decision_policy(fake_autoscaler_state, 10, 1, 100, -0.2) == -1
+        assert fake_autoscaler_state['pid_last_error'] == -0.2
+
+
+def test_pid_decision_policy_no_previous_state():
+    current_time = datetime.now()
+    fake_autoscaler_state = autoscaling_service_lib.AutoscalerState(
+        path='/autoscaling/fake-service/fake-instance/autoscaler_state',
+    )
+    with mock.patch(
+        'paasta_tools.autoscaling.autoscaling_service_lib.datetime', autospec=True,
+    ) as mock_datetime:
+        mock_datetime.now.return_value = current_time
+        assert autoscaling_service_lib.pid_decision_policy(fake_autoscaler_state, 10, 1, 100, 0.0) == 0
+        assert fake_autoscaler_state['pid_last_time'] == int(current_time.strftime('%s'))
 
 
 def test_threshold_decision_policy():
@@ -225,23 +234,14 @@ def test_mesos_cpu_metrics_provider():
     fake_mesos_task.__getitem__.return_value = 'fake-service.fake-instance'
 
     fake_marathon_tasks = [mock.Mock(id='fake-service.fake-instance')]
+    fake_autoscaler_state = autoscaling_service_lib.AutoscalerState(
+        path='/autoscaling/fake-service/fake-instance/autoscaler_state',
+    )
 
-    with contextlib.nested(
-            mock.patch('paasta_tools.utils.KazooClient', autospec=True,
-                       return_value=mock.Mock(get=mock.Mock(
-                           side_effect=NoNodeError))),
-            mock.patch('paasta_tools.utils.load_system_paasta_config', autospec=True,
-                       return_value=mock.Mock(get_zk_hosts=mock.Mock())),
-    ) as (
-        mock_zk_client,
-        _,
-    ):
-        with raises(autoscaling_service_lib.MetricsProviderNoDataError):
-            autoscaling_service_lib.mesos_cpu_metrics_provider(
-                fake_marathon_service_config, fake_marathon_tasks, (fake_mesos_task,))
-        mock_zk_client.return_value.set.assert_has_calls([
-            mock.call('/autoscaling/fake-service/fake-instance/cpu_data', '480.0:fake-service.fake-instance'),
-        ], any_order=True)
+    with raises(autoscaling_service_lib.MetricsProviderNoDataError):
+        autoscaling_service_lib.mesos_cpu_metrics_provider(
+            fake_marathon_service_config, fake_marathon_tasks, (fake_mesos_task,), fake_autoscaler_state)
+    assert fake_autoscaler_state['cpu_data'] == {'fake-service.fake-instance': 480.0}
 
 
 def test_mesos_cpu_metrics_provider_no_previous_cpu_data():
@@ -265,30 +265,191 @@ def test_mesos_cpu_metrics_provider_no_previous_cpu_data():
 
     current_time = datetime.now()
 
+    fake_autoscaler_state = autoscaling_service_lib.AutoscalerState(
+        path='/autoscaling/fake-service/fake-instance/autoscaler_state',
+        data={
+            'cpu_last_time': (current_time - timedelta(seconds=600)).strftime('%s'),
+            'cpu_data': {'fake-service.fake-instance': 0},
+        },
+        exists=True,
+    )
+
+    with mock.patch(
+        'paasta_tools.autoscaling.autoscaling_service_lib.datetime', autospec=True,
+    ) as mock_datetime:
+        mock_datetime.now.return_value = current_time
+        assert autoscaling_service_lib.mesos_cpu_metrics_provider(
+            fake_marathon_service_config, fake_marathon_tasks, (fake_mesos_task,), fake_autoscaler_state) == 0.8
+        assert fake_autoscaler_state == {
+            'cpu_last_time': int(current_time.strftime('%s')),
+            'cpu_data': {'fake-service.fake-instance': 480.0},
+        }
+
+
+def test_load_autoscaler_states():
+    fake_configs = [
+        mock.Mock(service='fake-service', instance='fake-instance'),
+        mock.Mock(service='fake-service', instance='new-instance'),
+        mock.Mock(service='fake-service', instance='corrupt-instance'),
+    ]
     zookeeper_get_payload = {
-        'cpu_last_time': (current_time - timedelta(seconds=600)).strftime('%s'),
-        'cpu_data': '0:fake-service.fake-instance',
+        '/autoscaling/fake-service/fake-instance/autoscaler_state': '{"pid_iterm":1.0}',
+        '/autoscaling/fake-service/corrupt-instance/autoscaler_state': 'not json',
     }
 
+    def fake_get_async(path):
+        if path in zookeeper_get_payload:
+            return mock.Mock(get=mock.Mock(return_value=(zookeeper_get_payload[path], None)))
+        return mock.Mock(get=mock.Mock(side_effect=NoNodeError))
+
+    with contextlib.nested(
+        mock.patch('paasta_tools.utils.KazooClient', autospec=True,
+                   return_value=mock.Mock(get_async=mock.Mock(side_effect=fake_get_async))),
+        mock.patch('paasta_tools.utils.load_system_paasta_config', autospec=True,
+                   return_value=mock.Mock(get_zk_hosts=mock.Mock())),
+    ) as (
+        mock_zk_client,
+        _,
+    ):
+        states = autoscaling_service_lib.load_autoscaler_states(fake_configs)
+        assert mock_zk_client.return_value.get_async.call_count == 3
+        assert not mock_zk_client.return_value.get.called
+
+    assert states[('fake-service', 'fake-instance')] == {'pid_iterm': 1.0}
+    assert states[('fake-service', 'fake-instance')].exists
+    assert states[('fake-service', 'new-instance')] == {}
+    assert not states[('fake-service', 'new-instance')].exists
+    assert states[('fake-service', 'corrupt-instance')] == {}
+    assert states[('fake-service', 'corrupt-instance')].exists
+
+
+def test_save_autoscaler_states():
+    existing_state = autoscaling_service_lib.AutoscalerState(
+        path='/autoscaling/fake-service/fake-instance/autoscaler_state',
+        data={'pid_iterm': 0.5},
+        exists=True,
+    )
+    existing_state['pid_iterm'] = 1.0
+    unchanged_state = autoscaling_service_lib.AutoscalerState(
+        path='/autoscaling/fake-service/unchanged-instance/autoscaler_state',
+        data={'pid_iterm': 0.5},
+        exists=True,
+    )
+    new_state = autoscaling_service_lib.AutoscalerState(
+        path='/autoscaling/fake-service/new-instance/autoscaler_state',
+        data={'cpu_last_time': 5},
+    )
+    mock_transaction = mock.Mock(commit=mock.Mock(return_value=[True, True]))
     with contextlib.nested(
-            mock.patch('paasta_tools.utils.KazooClient', autospec=True,
-                       return_value=mock.Mock(get=mock.Mock(
-                           side_effect=lambda x: (zookeeper_get_payload[x.split('/')[-1]], None)))),
-            mock.patch('paasta_tools.autoscaling.autoscaling_service_lib.datetime', autospec=True),
-            mock.patch('paasta_tools.utils.load_system_paasta_config', autospec=True,
-                       return_value=mock.Mock(get_zk_hosts=mock.Mock())),
+        mock.patch('paasta_tools.utils.KazooClient', autospec=True,
+                   return_value=mock.Mock(transaction=mock.Mock(return_value=mock_transaction))),
+        mock.patch('paasta_tools.utils.load_system_paasta_config', autospec=True,
+                   return_value=mock.Mock(get_zk_hosts=mock.Mock())),
     ) as (
         mock_zk_client,
-        mock_datetime,
         _,
     ):
-        mock_datetime.now.return_value = current_time
-        assert autoscaling_service_lib.mesos_cpu_metrics_provider(
-            fake_marathon_service_config, fake_marathon_tasks, (fake_mesos_task,)) == 0.8
-        mock_zk_client.return_value.set.assert_has_calls([
-            mock.call('/autoscaling/fake-service/fake-instance/cpu_last_time', current_time.strftime('%s')),
-            mock.call('/autoscaling/fake-service/fake-instance/cpu_data', '480.0:fake-service.fake-instance'),
-        ], any_order=True)
+        autoscaling_service_lib.save_autoscaler_states([existing_state, unchanged_state, new_state])
+        mock_zk_client.return_value.ensure_path.assert_called_once_with('/autoscaling/fake-service/new-instance')
+        mock_transaction.set_data.assert_called_once_with(
+            '/autoscaling/fake-service/fake-instance/autoscaler_state', '{"pid_iterm":1.0}')
+        mock_transaction.create.assert_called_once_with(
+            '/autoscaling/fake-service/new-instance/autoscaler_state', '{"cpu_last_time":5}')
+        assert mock_transaction.commit.call_count == 1
+        assert not mock_zk_client.return_value.set.called
+    assert new_state.exists
+    assert new_state.saved_data == '{"cpu_last_time":5}'
+
+    # Nothing changed since the last save, so there's nothing to write
+    with contextlib.nested(
+        mock.patch('paasta_tools.utils.KazooClient', autospec=True),
+        mock.patch('paasta_tools.utils.load_system_paasta_config', autospec=True,
+                   return_value=mock.Mock(get_zk_hosts=mock.Mock())),
+    ) as (
+        mock_zk_client,
+        _,
+    ):
+        autoscaling_service_lib.save_autoscaler_states([existing_state, unchanged_state, new_state])
+        assert not mock_zk_client.return_value.transaction.called
+
+
+def test_save_autoscaler_states_batches_transactions():
+    states = [
+        autoscaling_service_lib.AutoscalerState(path='/autoscaling/fake-service/%d/autoscaler_state' % i,
+                                                data={'pid_iterm': i})
+        for i in range(autoscaling_service_lib.ZK_TRANSACTION_MAX_OPS + 1)
+    ]
+    with contextlib.nested(
+        mock.patch('paasta_tools.utils.KazooClient', autospec=True),
+        mock.patch('paasta_tools.utils.load_system_paasta_config', autospec=True,
+                   return_value=mock.Mock(get_zk_hosts=mock.Mock())),
+    ) as (
+        mock_zk_client,
+        _,
+    ):
+        mock_zk_client.return_value.transaction.return_value.commit.return_value = []
+        autoscaling_service_lib.save_autoscaler_states(states)
+        assert mock_zk_client.return_value.transaction.call_count == 2
+
+
+def test_batch_autoscaler_state_writes_limits_bytes():
+    writes = [
+        (autoscaling_service_lib.AutoscalerState(path='/%d' % i), 'x' * data_bytes)
+        for i, data_bytes in enumerate([
+            autoscaling_service_lib.ZK_TRANSACTION_MAX_BYTES / 2,
+            autoscaling_service_lib.ZK_TRANSACTION_MAX_BYTES / 2,
+            autoscaling_service_lib.ZK_TRANSACTION_MAX_BYTES * 2,
+            10,
+        ])
+    ]
+    batches = list(autoscaling_service_lib.batch_autoscaler_state_writes(writes))
+    assert [[state.path for state, _ in batch] for batch in batches] == [['/0'], ['/1'], ['/2'], ['/3']]
+
+
+def test_save_autoscaler_states_falls_back_when_commit_raises():
+    states = [
+        autoscaling_service_lib.AutoscalerState(
+            path='/autoscaling/fake-service/%s/autoscaler_state' % instance,
+            data={'pid_iterm': 1.0},
+        )
+        for instance in ['fake-instance', 'other-instance']
+    ]
+    mock_transaction = mock.Mock(commit=mock.Mock(side_effect=ConnectionLoss))
+    with contextlib.nested(
+        mock.patch('paasta_tools.utils.KazooClient', autospec=True,
+                   return_value=mock.Mock(transaction=mock.Mock(return_value=mock_transaction))),
+        mock.patch('paasta_tools.utils.load_system_paasta_config', autospec=True,
+                   return_value=mock.Mock(get_zk_hosts=mock.Mock())),
+    ) as (
+        mock_zk_client,
+        _,
+    ):
+        mock_zk_client.return_value.set.side_effect = [ConnectionLoss, None]
+        autoscaling_service_lib.save_autoscaler_states(states)
+        assert mock_zk_client.return_value.set.call_count == 2
+    assert not states[0].exists
+    assert states[1].exists
+
+
+def test_save_autoscaler_states_falls_back_when_transaction_fails():
+    state = autoscaling_service_lib.AutoscalerState(
+        path='/autoscaling/fake-service/new-instance/autoscaler_state',
+        data={'pid_iterm': 1.0},
+    )
+    mock_transaction = mock.Mock(commit=mock.Mock(return_value=[NodeExistsError()]))
+    with contextlib.nested(
+        mock.patch('paasta_tools.utils.KazooClient', autospec=True,
+                   return_value=mock.Mock(transaction=mock.Mock(return_value=mock_transaction))),
+        mock.patch('paasta_tools.utils.load_system_paasta_config', autospec=True,
+                   return_value=mock.Mock(get_zk_hosts=mock.Mock())),
+    ) as (
+        mock_zk_client,
+        _,
+    ):
+        autoscaling_service_lib.save_autoscaler_states([state])
+        mock_zk_client.return_value.set.assert_called_once_with(
+            '/autoscaling/fake-service/new-instance/autoscaler_state', '{"pid_iterm":1.0}')
+    assert state.exists
 
 
 def test_get_json_body_from_service():
@@ -402,22 +563,14 @@ def test_mesos_cpu_metrics_provider_no_data_mesos():
         branch_dict={},
     )
     fake_marathon_tasks = [mock.Mock(id='fake-service.fake-instance')]
-    zookeeper_get_payload = {
-        'cpu_last_time': '0',
-        'cpu_data': '',
-    }
-    with contextlib.nested(
-            mock.patch('paasta_tools.utils.KazooClient', autospec=True,
-                       return_value=mock.Mock(get=mock.Mock(
-                           side_effect=lambda x: (zookeeper_get_payload[x.split('/')[-1]], None)))),
-            mock.patch('paasta_tools.utils.load_system_paasta_config', autospec=True,
-                       return_value=mock.Mock(get_zk_hosts=mock.Mock())),
-    ) as (
-        _,
-        _,
-    ):
-        with raises(autoscaling_service_lib.MetricsProviderNoDataError):
-            autoscaling_service_lib.mesos_cpu_metrics_provider(fake_marathon_service_config, fake_marathon_tasks, [])
+    fake_autoscaler_state = autoscaling_service_lib.AutoscalerState(
+        path='/autoscaling/fake-service/fake-instance/autoscaler_state',
+        data={'cpu_last_time': 0, 'cpu_data': {}},
+        exists=True,
+    )
+    with raises(autoscaling_service_lib.MetricsProviderNoDataError):
+        autoscaling_service_lib.mesos_cpu_metrics_provider(
+            fake_marathon_service_config, fake_marathon_tasks, [], fake_autoscaler_state)
 
 
 def test_autoscale_marathon_instance():
@@ -443,7 +596,8 @@ def test_autoscale_marathon_instance():
         _,
         _,
     ):
-        autoscaling_service_lib.autoscale_marathon_instance(fake_marathon_service_config, [mock.Mock()], [mock.Mock()])
+        autoscaling_service_lib.autoscale_marathon_instance(fake_marathon_service_config, [mock.Mock()], [mock.Mock()],
+                                                            mock.sentinel.autoscaler_state)
         mock_set_instances_for_marathon_service.assert_called_once_with(
             service='fake-service', instance='fake-instance', instance_count=2)
 
@@ -471,7 +625,8 @@ def test_autoscale_marathon_instance_aborts_when_task_deploying():
         _,
         _,
     ):
-        autoscaling_service_lib.autoscale_marathon_instance(fake_marathon_service_config, [mock.Mock()], [mock.Mock()])
+        autoscaling_service_lib.autoscale_marathon_instance(fake_marathon_service_config, [mock.Mock()], [mock.Mock()],
+                                                            mock.sentinel.autoscaler_state)
         assert not mock_set_instances_for_marathon_service.called
 
 
@@ -490,7 +645,8 @@ def test_autoscale_services_happy_path():
     with contextlib.nested(
         mock.patch('paasta_tools.autoscaling.autoscaling_service_lib.autoscale_marathon_instance', autospec=True),
         mock.patch('paasta_tools.autoscaling.autoscaling_service_lib.get_marathon_client', autospec=True,
-                   return_value=mock.Mock(list_tasks=mock.Mock(return_value=mock_marathon_tasks))),
+                   return_value=mock.Mock(list_tasks=mock.Mock(return_value=mock_marathon_tasks),
+                                          list_apps=mock.Mock(return_value=[]))),
         mock.patch('paasta_tools.autoscaling.autoscaling_service_lib.get_running_tasks_from_active_frameworks',
                    autospec=True,
                    return_value=mock_mesos_tasks),
@@ -505,6 +661,9 @@ def test_autoscale_services_happy_path():
         mock.patch('paasta_tools.autoscaling.autoscaling_service_lib.load_marathon_config', autospec=True),
         mock.patch('paasta_tools.utils.KazooClient', autospec=True),
         mock.patch('paasta_tools.autoscaling.autoscaling_service_lib.create_autoscaling_lock', autospec=True),
+        mock.patch('paasta_tools.autoscaling.autoscaling_service_lib.load_autoscaler_states', autospec=True,
+                   return_value={('fake-service', 'fake-instance'): mock.sentinel.autoscaler_state}),
+        mock.patch('paasta_tools.autoscaling.autoscaling_service_lib.save_autoscaler_states', autospec=True),
     ) as (
         mock_autoscale_marathon_instance,
         _,
@@ -516,10 +675,66 @@ def test_autoscale_services_happy_path():
         _,
         _,
         _,
+        _,
+        mock_save_autoscaler_states,
     ):
         autoscaling_service_lib.autoscale_services()
         mock_autoscale_marathon_instance.assert_called_once_with(
-            fake_marathon_service_config, mock_marathon_tasks, mock_mesos_tasks)
+            fake_marathon_service_config, mock_marathon_tasks, mock_mesos_tasks, mock.sentinel.autoscaler_state)
+        mock_save_autoscaler_states.assert_called_once_with([mock.sentinel.autoscaler_state])
+
+
+def test_autoscale_services_survives_failing_to_save_states():
+    fake_marathon_service_config = marathon_tools.MarathonServiceConfig(
+        service='fake-service',
+        instance='fake-instance',
+        cluster='fake-cluster',
+        config_dict={'min_instances': 1, 'max_instances': 10, 'desired_state': 'start'},
+        branch_dict={},
+    )
+    mock_mesos_tasks = [{'id': 'fake-service.fake-instance'}]
+    mock_healthcheck_results = mock.Mock(alive=True)
+    mock_marathon_tasks = [mock.Mock(id='fake-service.fake-instance',
+                                     health_check_results=[mock_healthcheck_results])]
+    with contextlib.nested(
+        mock.patch('paasta_tools.autoscaling.autoscaling_service_lib.autoscale_marathon_instance', autospec=True),
+        mock.patch('paasta_tools.autoscaling.autoscaling_service_lib.get_marathon_client', autospec=True,
+                   return_value=mock.Mock(list_tasks=mock.Mock(return_value=mock_marathon_tasks),
+                                          list_apps=mock.Mock(return_value=[]))),
+        mock.patch('paasta_tools.autoscaling.autoscaling_service_lib.get_running_tasks_from_active_frameworks',
+                   autospec=True,
+                   return_value=mock_mesos_tasks),
+        mock.patch('paasta_tools.autoscaling.autoscaling_service_lib.load_system_paasta_config', autospec=True,
+                   return_value=mock.Mock(get_cluster=mock.Mock())),
+        mock.patch('paasta_tools.utils.load_system_paasta_config', autospec=True,
+                   return_value=mock.Mock(get_zk_hosts=mock.Mock())),
+        mock.patch('paasta_tools.autoscaling.autoscaling_service_lib.get_services_for_cluster', autospec=True,
+                   return_value=[('fake-service', 'fake-instance')]),
+        mock.patch('paasta_tools.autoscaling.autoscaling_service_lib.load_marathon_service_config', autospec=True,
+                   return_value=fake_marathon_service_config),
+        mock.patch('paasta_tools.autoscaling.autoscaling_service_lib.load_marathon_config', autospec=True),
+        mock.patch('paasta_tools.utils.KazooClient', autospec=True),
+        mock.patch('paasta_tools.autoscaling.autoscaling_service_lib.create_autoscaling_lock', autospec=True),
+        mock.patch('paasta_tools.autoscaling.autoscaling_service_lib.load_autoscaler_states', autospec=True,
+                   return_value={('fake-service', 'fake-instance'): mock.sentinel.autoscaler_state}),
+        mock.patch('paasta_tools.autoscaling.autoscaling_service_lib.save_autoscaler_states', autospec=True),
+    ) as (
+        mock_autoscale_marathon_instance,
+        _,
+        _,
+        _,
+        _,
+        _,
+        _,
+        _,
+        _,
+        _,
+        _,
+        mock_save_autoscaler_states,
+    ):
+        mock_save_autoscaler_states.side_effect = ConnectionLoss
+        autoscaling_service_lib.autoscale_services()
+        mock_save_autoscaler_states.assert_called_once_with([mock.sentinel.autoscaler_state])
 
 
 def test_autoscale_services_not_healthy():
@@ -549,6 +764,9 @@ def test_autoscale_services_not_healthy():
         mock.patch('paasta_tools.autoscaling.autoscaling_service_lib.load_marathon_config', autospec=True),
         mock.patch('paasta_tools.utils.KazooClient', autospec=True),
         mock.patch('paasta_tools.autoscaling.autoscaling_service_lib.create_autoscaling_lock', autospec=True),
+        mock.patch('paasta_tools.autoscaling.autoscaling_service_lib.load_autoscaler_states', autospec=True,
+                   return_value={('fake-service', 'fake-instance'): mock.sentinel.autoscaler_state}),
+        mock.patch('paasta_tools.autoscaling.autoscaling_service_lib.save_autoscaler_states', autospec=True),
     ) as (
         mock_autoscale_marathon_instance,
         mock_write_to_log,
@@ -561,15 +779,17 @@ def test_autoscale_services_not_healthy():
         _,
         _,
         _,
+        _,
+        mock_save_autoscaler_states,
     ):
 
         # Test missing health_check_results
-        mock_marathon_tasks = [mock.Mock(id='fake-service.fake-instance',
+        mock_marathon_tasks = [mock.Mock(id='fake-service.fake-instance', app_id='/fake-service.fake-instance',
                                          health_check_results=[])]
-        mock_marathon_app = mock.Mock()
+        mock_marathon_app = mock.Mock(id='/fake-service.fake-instance')
         mock_marathon_app.health_checks = ["some-healthcheck-definition"]
         mock_marathon_client.return_value = mock.Mock(list_tasks=mock.Mock(return_value=mock_marathon_tasks),
-                                                      get_app=mock.Mock(return_value=mock_marathon_app))
+                                                      list_apps=mock.Mock(return_value=[mock_marathon_app]))
         autoscaling_service_lib.autoscale_services()
         mock_write_to_log.assert_called_with(config=fake_marathon_service_config,
                                              line="Caught Exception Couldn't find any healthy marathon tasks")
@@ -577,30 +797,64 @@ def test_autoscale_services_not_healthy():
 
         # Test present results but not yet passing
         mock_healthcheck_results = mock.Mock(alive=False)
-        mock_marathon_tasks = [mock.Mock(id='fake-service.fake-instance',
+        mock_marathon_tasks = [mock.Mock(id='fake-service.fake-instance', app_id='/fake-service.fake-instance',
                                          health_check_results=[mock_healthcheck_results])]
-        mock_marathon_app = mock.Mock()
+        mock_marathon_app = mock.Mock(id='/fake-service.fake-instance')
         mock_marathon_app.health_checks = ["some-healthcheck-definition"]
         mock_marathon_client.return_value = mock.Mock(list_tasks=mock.Mock(return_value=mock_marathon_tasks),
-                                                      get_app=mock.Mock(return_value=mock_marathon_app))
+                                                      list_apps=mock.Mock(return_value=[mock_marathon_app]))
         autoscaling_service_lib.autoscale_services()
         mock_write_to_log.assert_called_with(config=fake_marathon_service_config,
                                              line="Caught Exception Couldn't find any healthy marathon tasks")
         assert not mock_autoscale_marathon_instance.called
 
         # Test no healthcheck defined
-        mock_marathon_tasks = [mock.Mock(id='fake-service.fake-instance',
+        mock_marathon_tasks = [mock.Mock(id='fake-service.fake-instance', app_id='/fake-service.fake-instance',
                                          health_check_results=[])]
-        mock_marathon_app = mock.Mock()
+        mock_marathon_app = mock.Mock(id='/fake-service.fake-instance')
         mock_marathon_app.health_checks = []
         mock_marathon_client.return_value = mock.Mock(list_tasks=mock.Mock(return_value=mock_marathon_tasks),
-                                                      get_app=mock.Mock(return_value=mock_marathon_app))
+                                                      list_apps=mock.Mock(return_value=[mock_marathon_app]))
         autoscaling_service_lib.autoscale_services()
         mock_write_to_log.assert_called_with(config=fake_marathon_service_config,
                                              line="Caught Exception Couldn't find any healthy marathon tasks")
         assert mock_autoscale_marathon_instance.called
 
 
+def test_get_autoscaling_task_indexes():
+    mock_app_with_healthchecks = mock.Mock(id='/fake-service.fake-instance.git1.config1',
+                                           health_checks=['some-healthcheck-definition'])
+    mock_app_without_healthchecks = mock.Mock(id='/other-service.other-instance.git2.config2',
+                                              health_checks=[])
+    mock_marathon_client = mock.Mock(list_apps=mock.Mock(return_value=[mock_app_with_healthchecks,
+                                                                       mock_app_without_healthchecks]))
+    healthy_task = mock.Mock(id='fake-service.fake-instance.1', app_id='/fake-service.fake-instance.git1.config1',
+                             health_check_results=[mock.Mock(alive=True)])
+    unhealthy_task = mock.Mock(id='fake-service.fake-instance.2', app_id='/fake-service.fake-instance.git1.config1',
+                               health_check_results=[])
+    unchecked_task = mock.Mock(id='other-service.other-instance.3', app_id='/other-service.other-instance.git2.config2',
+                               health_check_results=[])
+    mesos_tasks = [{'id': 'fake-service.fake-instance.1'},
+                   {'id': 'fake-service.fake-instance.2'},
+                   {'id': 'other-service.other-instance.3'},
+                   {'id': 'unknown-service.unknown-instance.4'}]
+
+    marathon_tasks_by_job_id, mesos_tasks_by_job_id = autoscaling_service_lib.get_autoscaling_task_indexes(
+        marathon_client=mock_marathon_client,
+        all_marathon_tasks=[healthy_task, unhealthy_task, unchecked_task],
+        all_mesos_tasks=mesos_tasks,
+    )
+    assert marathon_tasks_by_job_id == {
+        'fake-service.fake-instance': {'fake-service.fake-instance.1': healthy_task},
+        'other-service.other-instance': {'other-service.other-instance.3': unchecked_task},
+    }
+    assert mesos_tasks_by_job_id == {
+        'fake-service.fake-instance': [{'id': 'fake-service.fake-instance.1'}],
+        'other-service.other-instance': [{'id': 'other-service.other-instance.3'}],
+    }
+    mock_marathon_client.list_apps.assert_called_once_with()
+
+
 def test_autoscale_services_bespoke_doesnt_autoscale():
     fake_marathon_service_config = marathon_tools.MarathonServiceConfig(
         service='fake-service',
@@ -615,7 +869,8 @@ def test_autoscale_services_bespoke_doesnt_autoscale():
     with contextlib.nested(
         mock.patch('paasta_tools.autoscaling.autoscaling_service_lib.autoscale_marathon_instance', autospec=True),
         mock.patch('paasta_tools.autoscaling.autoscaling_service_lib.get_marathon_client', autospec=True,
-                   return_value=mock.Mock(list_tasks=mock.Mock(return_value=mock_marathon_tasks))),
+                   return_value=mock.Mock(list_tasks=mock.Mock(return_value=mock_marathon_tasks),
+                                          list_apps=mock.Mock(return_value=[]))),
         mock.patch('paasta_tools.autoscaling.autoscaling_service_lib.get_running_tasks_from_active_frameworks',
                    autospec=True,
                    return_value=mock_mesos_tasks),
@@ -630,6 +885,9 @@ def test_autoscale_services_bespoke_doesnt_autoscale():
         mock.patch('paasta_tools.autoscaling.autoscaling_service_lib.load_marathon_config', autospec=True),
         mock.patch('paasta_tools.utils.KazooClient', autospec=True),
         mock.patch('paasta_tools.autoscaling.autoscaling_service_lib.create_autoscaling_lock', autospec=True),
+        mock.patch('paasta_tools.autoscaling.autoscaling_service_lib.load_autoscaler_states', autospec=True,
+                   return_value={('fake-service', 'fake-instance'): mock.sentinel.autoscaler_state}),
+        mock.patch('paasta_tools.autoscaling.autoscaling_service_lib.save_autoscaler_states', autospec=True),
     ) as (
         mock_autoscale_marathon_instance,
         _,
@@ -641,6 +899,8 @@ def test_autoscale_services_bespoke_doesnt_autoscale():
         _,
         _,
         _,
+        _,
+        mock_save_autoscaler_states,
     ):
         autoscaling_service_lib.autoscale_services()
         assert not mock_autoscale_marathon_instance.called
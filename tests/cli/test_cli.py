@@ -0,0 +1,139 @@
+# Copyright 2015-2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import argparse
+import contextlib
+
+import mock
+import pytest
+
+from paasta_tools.cli import cli
+from paasta_tools.cli import cmds
+from paasta_tools.cli.utils import modules_in_pkg
+
+
+def get_subparsers_action(parser):
+    subparsers, = [
+        action
+        for action in parser._actions
+        if isinstance(action, argparse._SubParsersAction)
+    ]
+    return subparsers
+
+
+def test_paasta_commands_covers_every_module():
+    assert set(module for _, module, _ in cmds.PAASTA_COMMANDS) == set(modules_in_pkg(cmds))
+
+
+def test_get_argparser_loads_every_command():
+    subparsers = get_subparsers_action(cli.get_argparser())
+    assert set(subparsers.choices) - {'help'} == set(command for command, _, _ in cmds.PAASTA_COMMANDS)
+    helps = dict((action.dest, action.help) for action in subparsers._choices_actions)
+    for command, _, help_text in cmds.PAASTA_COMMANDS:
+        assert helps[command] == help_text
+
+
+def test_get_argparser_only_loads_requested_commands():
+    with mock.patch('paasta_tools.cli.cli.add_subparser', autospec=True) as mock_add_subparser:
+        parser = cli.get_argparser(commands=['restart'])
+    mock_add_subparser.assert_called_once_with('start_stop_restart', mock.ANY)
+    subparsers = get_subparsers_action(parser)
+    # Only the commands of modules that weren't loaded get placeholders
+    assert 'start' not in subparsers.choices
+    assert 'list' in subparsers.choices
+    assert 'local-run' in subparsers.choices
+
+
+def test_get_argparser_placeholders_show_in_help(capsys):
+    parser = cli.get_argparser(commands=[])
+    parser.print_help()
+    output = capsys.readouterr()[0]
+    for command, _, _ in cmds.PAASTA_COMMANDS:
+        assert command in output
+    assert 'Display a list of PaaSTA services' in output
+
+
+def test_get_argparser_placeholder_help_matches_full_help(capsys):
+    cli.get_argparser(commands=[]).print_help()
+    lazy_output = capsys.readouterr()[0]
+    cli.get_argparser().print_help()
+    assert lazy_output == capsys.readouterr()[0]
+
+
+@pytest.mark.parametrize('args,expected', [
+    ([], None),
+    (['list'], 'list'),
+    (['-V'], None),
+    (['--help', 'status', '-s', 'foo'], 'status'),
+])
+def test_get_command_from_args(args, expected):
+    assert cli.get_command_from_args(args) == expected
+
+
+@pytest.mark.parametrize('comp_line,comp_point,expected', [
+    ('paasta ', None, None),
+    ('paasta st', None, None),
+    ('paasta status', None, None),
+    ('paasta status ', None, 'status'),
+    ('paasta status --serv', None, 'status'),
+    ('paasta logs -s foo -c ', None, 'logs'),
+    # Completing the command with the cursor before the rest of the line
+    ('paasta sta -s foo', 10, None),
+    ('paasta status -s foo', 14, 'status'),
+])
+def test_get_command_being_completed(comp_line, comp_point, expected):
+    env = {'COMP_LINE': comp_line}
+    if comp_point is not None:
+        env['COMP_POINT'] = str(comp_point)
+    with mock.patch.dict('os.environ', env):
+        assert cli.get_command_being_completed() == expected
+
+
+def test_parse_args_only_loads_the_command_being_run():
+    with mock.patch('paasta_tools.cli.cli.get_argparser', autospec=True) as mock_get_argparser:
+        cli.parse_args(['list', '--help'])
+    mock_get_argparser.assert_called_once_with(commands=['list'])
+
+
+def test_parse_args_loads_no_command_for_top_level_help():
+    with mock.patch('paasta_tools.cli.cli.get_argparser', autospec=True) as mock_get_argparser:
+        cli.parse_args(['--help'])
+    mock_get_argparser.assert_called_once_with(commands=[])
+
+
+def test_parse_args_loads_the_command_being_completed():
+    with contextlib.nested(
+        mock.patch.dict('os.environ', {'_ARGCOMPLETE': '1', 'COMP_LINE': 'paasta logs -', 'COMP_POINT': '13'}),
+        mock.patch('paasta_tools.cli.cli.get_argparser', autospec=True),
+        mock.patch('paasta_tools.cli.cli.argcomplete.autocomplete', autospec=True),
+    ) as (
+        _,
+        mock_get_argparser,
+        mock_autocomplete,
+    ):
+        cli.parse_args(None)
+    mock_get_argparser.assert_called_once_with(commands=['logs'])
+    mock_autocomplete.assert_called_once_with(mock_get_argparser.return_value)
+
+
+def test_main_runs_a_lazily_loaded_command():
+    with contextlib.nested(
+        mock.patch('paasta_tools.cli.cmds.list.list_paasta_services', autospec=True, return_value=['fake_service']),
+        pytest.raises(SystemExit),
+    ) as (
+        mock_list_paasta_services,
+        excinfo,
+    ):
+        cli.main(['list'])
+    assert not excinfo.value.code
+    assert mock_list_paasta_services.call_count == 1
@@ -26,6 +26,7 @@ try:
     from paasta_tools.cli.cmds import logs
 except ImportError:
     pass
+from paasta_tools import log_archive
 from paasta_tools.cli.cli import parse_args
 from paasta_tools.utils import ANY_CLUSTER
 from paasta_tools.utils import format_log_line
@@ -322,6 +323,99 @@ def test_parse_chronos_log_line_ok():
     assert sorted(logs.parse_chronos_log_line(line, clusters, fake_service)) == sorted(expected)
 
 
+def prefilter_test_json_lines():
+    lines = []
+    for level in ['event', 'debug']:
+        for component in ['deploy', 'build', 'stdout']:
+            for cluster in ['fake_cluster', 'other_cluster', ANY_CLUSTER]:
+                line = format_log_line(level, cluster, 'fake_service', 'main', component, 'a "message" \\ here',
+                                       timestamp='2016-06-08T06:31:52')
+                lines.append(line)
+                # ujson escapes forward slashes and doesn't put spaces after separators
+                lines.append(logs.json.dumps(json.loads(line)))
+    lines.extend([
+        # A needle that only shows up once the JSON is decoded
+        '{"level": "\\u0065vent", "component": "deploy", "cluster": "fake_cluster", "message": "escaped"}',
+        '{"component": "deploy", "cluster": "fake_cluster", "message": "no level"}',
+        '{"level": "event", "component": "deploy", "cluster": "fake_cluster", "message": "event deploy"}',
+        '["event", "deploy", "fake_cluster"]',
+        'i am not json "event" "deploy" "fake_cluster"',
+        '',
+    ])
+    return lines
+
+
+@pytest.mark.parametrize('record_filter,build_prefilter', [
+    (logs.paasta_log_record_passes_filter, logs.build_paasta_log_prefilter),
+    (logs.paasta_app_output_record_passes_filter, logs.build_paasta_app_output_prefilter),
+])
+def test_json_prefilters_match_record_filters(record_filter, build_prefilter):
+    args = (['event'], 'fake_service', ['deploy', 'stdout'], ['fake_cluster'])
+    prefilter = build_prefilter(*args)
+    rejected = 0
+    for line in prefilter_test_json_lines():
+        record = logs.parse_log_record(line)
+        passes = record is not None and record_filter(record, *args)
+        if passes:
+            assert prefilter(line), line
+        elif not prefilter(line):
+            rejected += 1
+    assert rejected > 0
+
+
+@pytest.mark.parametrize('record_filter,build_prefilter,parse_fn', [
+    (logs.marathon_log_record_passes_filter, logs.build_marathon_log_prefilter, logs.parse_marathon_log_line),
+    (logs.chronos_log_record_passes_filter, logs.build_chronos_log_prefilter, logs.parse_chronos_log_line),
+])
+def test_text_prefilters_match_record_filters(record_filter, build_prefilter, parse_fn):
+    args = (['event'], 'fake_service', ['marathon', 'chronos'], ['fake_cluster'])
+    prefilter = build_prefilter(*args)
+    lines = [
+        '2015-07-22T10:38:46-07:00 deploying fake_service.main and fake_service main',
+        '2015-07-22T10:38:46-07:00 deploying other_service.main',
+        # Stripping the escape sequence joins up the job id
+        '2015-07-22T10:38:46-07:00 deploying fake_\x1b[1mservice.main and fake_\x1b[0mservice main',
+        'not a timestamp fake_service.main fake_service main',
+    ]
+    rejected = 0
+    for line in lines:
+        record = logs.parse_log_record(parse_fn(line, args[3], args[1]))
+        passes = record is not None and record_filter(record, *args)
+        if passes:
+            assert prefilter(line), line
+        elif not prefilter(line):
+            rejected += 1
+    assert rejected > 0
+
+
+def test_json_string_needles():
+    assert logs.json_string_needles(['event', 'N/A']) == ['"event"', '"N/A"', '"N\\/A"']
+    assert logs.json_string_needles(['event', 'quo"ted']) == []
+    assert logs.json_string_needles([u'caf\xe9']) == []
+
+
+def test_scribereader_filter_scribe_logs_skips_prefiltered_lines():
+    lines = [
+        format_log_line('event', 'fake_cluster', 'fake_service', 'main', 'deploy', 'kept'),
+        format_log_line('event', 'other_cluster', 'fake_service', 'main', 'deploy', 'prefiltered'),
+    ]
+
+    @contextlib.contextmanager
+    def fake_context():
+        yield iter(lines)
+
+    with contextlib.nested(
+        mock.patch('paasta_tools.cli.cmds.logs.scribereader', autospec=True),
+        mock.patch('paasta_tools.cli.cmds.logs.parse_log_record', autospec=True, side_effect=logs.parse_log_record),
+    ) as (_, mock_parse_log_record):
+        records = list(logs.ScribeLogReader(cluster_map={}).filter_scribe_logs(
+            fake_context(), 'env1', 'stream', ['event'], 'fake_service', ['deploy'], ['fake_cluster'],
+            filter_fn=logs.paasta_log_record_passes_filter, prefilter_fn=logs.build_paasta_log_prefilter,
+        ))
+        mock_parse_log_record.assert_called_once_with(lines[0])
+    assert [record.message for record in records] == ['kept']
+
+
 @pytest.mark.skipif(not scribereader_available, reason='scribereader not available')
 def test_scribe_tail_log_everything():
     env = 'fake_env'
@@ -604,6 +698,113 @@ def test_prettify_log_line_valid_json_requested_level_is_only_event():
     assert parsed_line['level'] not in actual
 
 
+def test_datetime_to_epoch():
+    assert logs.datetime_to_epoch(None) is None
+    assert logs.datetime_to_epoch(datetime.datetime(1970, 1, 1, 0, 1, 0, 500000)) == 60.5
+    assert logs.datetime_to_epoch(isodate.parse_datetime("1970-01-01T01:00:00+01:00")) == 0
+
+
+def test_parse_log_record():
+    line = format_log_line('event', 'fake_cluster', 'fake_service', 'fake_instance', 'deploy', 'fake_message',
+                           timestamp='1970-01-01T00:01:00.500000')
+    assert logs.parse_log_record(line) == logs.LogRecord(
+        timestamp=60.5,
+        level='event',
+        component='deploy',
+        cluster='fake_cluster',
+        instance='fake_instance',
+        message='fake_message',
+        raw_line=line,
+    )
+
+
+def test_parse_log_record_invalid():
+    assert logs.parse_log_record('i am not json') is None
+    assert logs.parse_log_record('["i am not an object"]') is None
+    record = logs.parse_log_record('{"component": "deploy", "timestamp": "not a time"}')
+    assert record.component == 'deploy'
+    assert record.timestamp is None
+    assert record.message is None
+
+
+def test_prettify_log_record_matches_prettify_log_line():
+    line = format_log_line('event', 'fake_cluster', 'fake_service', 'fake_instance', 'deploy', 'fake_message',
+                           timestamp='2015-03-12T21:20:04.602002')
+    record = logs.parse_log_record(line)
+    assert logs.prettify_log_record(record, ['event', 'debug']) == logs.prettify_log_line(line, ['event', 'debug'])
+    assert logs.prettify_timestamp('2015-03-12T21:20:04.602002') in logs.prettify_log_record(record, ['event'])
+
+
+def test_scribereader_filter_scribe_logs_decodes_once():
+    lines = [
+        format_log_line('event', 'fake_cluster', 'fake_service', 'main', 'deploy', 'second',
+                        timestamp='2016-06-08T06:31:53'),
+        format_log_line('event', 'fake_cluster', 'fake_service', 'main', 'deploy', 'first',
+                        timestamp='2016-06-08T06:31:52'),
+        format_log_line('event', 'other_cluster', 'fake_service', 'main', 'deploy', 'filtered',
+                        timestamp='2016-06-08T06:31:51'),
+        'i am not json',
+    ]
+
+    @contextlib.contextmanager
+    def fake_context():
+        yield iter(lines)
+
+    with contextlib.nested(
+        mock.patch('paasta_tools.cli.cmds.logs.scribereader', autospec=True),
+        mock.patch('paasta_tools.cli.cmds.logs.json.loads', autospec=True, side_effect=logs.json.loads),
+    ) as (_, mock_loads):
+        records = list(logs.ScribeLogReader(cluster_map={}).filter_scribe_logs(
+            fake_context(), 'env1', 'stream', ['event'], 'fake_service', ['deploy'], ['fake_cluster'],
+            filter_fn=logs.paasta_log_record_passes_filter,
+        ))
+        assert mock_loads.call_count == len(lines)
+    assert [record.message for record in records] == ['second', 'first']
+
+
+def make_log_record(timestamp, message):
+    return logs.LogRecord(timestamp, 'event', 'deploy', 'fake_cluster', 'main', message, message)
+
+
+def test_merge_log_record_streams():
+    streams = [
+        [make_log_record(1, 'a1'), make_log_record(4, 'a4'), make_log_record(5, 'a5')],
+        [],
+        [make_log_record(2, 'b2'), make_log_record(4, 'b4')],
+        [make_log_record(3, 'c3')],
+    ]
+    merged = logs.merge_log_record_streams(streams)
+    assert [record.message for record in merged] == ['a1', 'b2', 'c3', 'a4', 'b4', 'a5']
+
+
+def test_merge_log_record_streams_is_lazy():
+    def endless_stream():
+        timestamp = 0
+        while True:
+            timestamp += 1
+            yield make_log_record(timestamp, 'endless')
+
+    merged = logs.merge_log_record_streams([endless_stream(), [make_log_record(2.5, 'finite')]])
+    assert [next(merged).message for _ in range(4)] == ['endless', 'endless', 'finite', 'endless']
+
+
+def test_fetch_streams_concurrently():
+    streams = logs.fetch_streams_concurrently([lambda: iter(range(10)), lambda: iter([]), lambda: 'abc'],
+                                              buffer_size=2)
+    assert [list(stream) for stream in streams] == [range(10), [], ['a', 'b', 'c']]
+
+
+def test_fetch_streams_concurrently_reraises():
+    def broken_stream():
+        yield 1
+        raise ValueError('stream went away')
+
+    stream, = logs.fetch_streams_concurrently([broken_stream])
+    assert next(stream) == 1
+    with raises(ValueError):
+        next(stream)
+
+
 def test_scribereader_run_code_over_scribe_envs():
     clusters = ['fake_cluster1', 'fake_cluster2']
     components = ['build', 'deploy', 'monitoring', 'marathon', 'chronos', 'stdout', 'stderr']
@@ -1088,3 +1289,232 @@ def test_pick_default_log_mode():
 
         # Supports tailing , time and line counts. Line counts should be prioritized
         assert logs_by_lines.call_count == 1
+
+
+def write_file_log_lines(path, start, count, cluster='fake_cluster', component='deploy', instance='main'):
+    """Appends count log lines, one second apart starting at start, in the format FileLogWriter writes"""
+    with open(path, 'a') as f:
+        for i in range(count):
+            f.write(format_log_line(
+                level='event',
+                cluster=cluster,
+                service='fake_service',
+                instance=instance,
+                component=component,
+                line='line %d' % i,
+                timestamp=(start + datetime.timedelta(seconds=i)).isoformat(),
+            ) + '\n')
+
+
+def printed_messages(mock_print_log_record):
+    return [call[0][0].message for call in mock_print_log_record.call_args_list]
+
+
+def test_file_log_reader_get_log_paths(tmpdir):
+    for name in ['fake_service-main.log', 'fake_service-canary.log', 'fake_service-main.log.idx',
+                 'other_service-main.log']:
+        tmpdir.join(name).write('')
+    reader = logs.FileLogReader(path_format=str(tmpdir.join('{service}-{instance}.log')))
+    assert reader.get_log_paths('fake_service', ['event'], ['deploy', 'build'], ['fake_cluster']) == [
+        str(tmpdir.join('fake_service-canary.log')),
+        str(tmpdir.join('fake_service-main.log')),
+    ]
+
+
+def test_log_file_index_update_and_search(tmpdir):
+    path = str(tmpdir.join('fake.log'))
+    start = datetime.datetime(2016, 7, 26, 22, 0, 0)
+    write_file_log_lines(path, start, 1000)
+    with open(path, 'rb') as fd:
+        index = logs.LogFileIndex(path, interval=4096)
+        index.update(fd)
+        size = tmpdir.join('fake.log').size()
+        assert len(index.entries) == size // 4096 + 1
+        assert index.entries[0] == (0, '2016-07-26T22:00:00+00:00')
+
+        search_time = logs.pytz.utc.localize(start + datetime.timedelta(seconds=500))
+        fd.seek(index.find_start_offset(search_time))
+        assert logs.parse_log_line_timestamp(fd.readline()) < search_time
+        end_offset = index.find_end_offset(search_time)
+        fd.seek(end_offset)
+        fd.readline()
+        assert logs.parse_log_line_timestamp(fd.readline()) > search_time
+        assert index.find_end_offset(logs.pytz.utc.localize(start + datetime.timedelta(days=1))) is None
+        assert index.find_start_offset(logs.pytz.utc.localize(start)) == 0
+
+
+def test_log_file_index_is_saved_and_extended(tmpdir):
+    path = str(tmpdir.join('fake.log'))
+    start = datetime.datetime(2016, 7, 26, 22, 0, 0)
+    write_file_log_lines(path, start, 200)
+    with open(path, 'rb') as fd:
+        first_index = logs.LogFileIndex(path, interval=1024)
+        first_index.update(fd)
+    assert tmpdir.join('fake.log.idx').check()
+
+    write_file_log_lines(path, start + datetime.timedelta(seconds=200), 200)
+    with open(path, 'rb') as fd:
+        second_index = logs.LogFileIndex(path, interval=1024)
+        second_index.load()
+        assert second_index.entries == first_index.entries
+        with mock.patch('paasta_tools.cli.cmds.logs.parse_log_line_timestamp', autospec=True,
+                        side_effect=logs.parse_log_line_timestamp) as mock_parse_log_line_timestamp:
+            second_index.update(fd)
+            # Only the new part of the file was sampled
+            assert mock_parse_log_line_timestamp.call_count == len(second_index.entries) - len(first_index.entries)
+        fresh_index = logs.LogFileIndex(path + '.fresh', interval=1024)
+        fresh_index.update(fd)
+        assert second_index.entries == fresh_index.entries
+
+
+def test_log_file_index_resets_when_truncated(tmpdir):
+    path = str(tmpdir.join('fake.log'))
+    start = datetime.datetime(2016, 7, 26, 22, 0, 0)
+    write_file_log_lines(path, start, 200)
+    with open(path, 'rb') as fd:
+        logs.LogFileIndex(path, interval=1024).update(fd)
+
+    tmpdir.join('fake.log').write('')
+    write_file_log_lines(path, start + datetime.timedelta(days=1), 10)
+    with open(path, 'rb') as fd:
+        index = logs.LogFileIndex(path, interval=1024)
+        index.load()
+        index.update(fd)
+        fresh_index = logs.LogFileIndex(path + '.fresh', interval=1024)
+        fresh_index.update(fd)
+    assert index.entries[0] == (0, '2016-07-27T22:00:00+00:00')
+    assert index.entries == fresh_index.entries
+
+
+def test_file_log_reader_print_logs_by_time(tmpdir):
+    start = datetime.datetime(2016, 7, 26, 22, 0, 0)
+    write_file_log_lines(str(tmpdir.join('fake_service-main.log')), start, 1000)
+    write_file_log_lines(str(tmpdir.join('fake_service-canary.log')), start, 1000, cluster='other_cluster')
+    reader = logs.FileLogReader(path_format=str(tmpdir.join('{service}-{instance}.log')), index_interval=2048)
+    with mock.patch('paasta_tools.cli.cmds.logs.print_log_record', autospec=True) as mock_print_log:
+        reader.print_logs_by_time(
+            service='fake_service',
+            start_time=logs.pytz.utc.localize(start + datetime.timedelta(seconds=100)),
+            end_time=logs.pytz.utc.localize(start + datetime.timedelta(seconds=200)),
+            levels=['event'],
+            components=['deploy'],
+            clusters=['fake_cluster'],
+            raw_mode=True,
+        )
+    assert printed_messages(mock_print_log) == ['line %d' % i for i in range(101, 200)]
+
+
+def test_file_log_reader_print_last_n_logs(tmpdir):
+    start = datetime.datetime(2016, 7, 26, 22, 0, 0)
+    write_file_log_lines(str(tmpdir.join('fake_service-main.log')), start, 100)
+    write_file_log_lines(str(tmpdir.join('fake_service-main.log')), start + datetime.timedelta(seconds=100), 10,
+                         component='build')
+    write_file_log_lines(str(tmpdir.join('fake_service-canary.log')), start + datetime.timedelta(seconds=0.5), 100,
+                         instance='canary')
+    tmpdir.join('fake_service-empty.log').write('')
+    reader = logs.FileLogReader(path_format=str(tmpdir.join('{service}-{instance}.log')))
+    with mock.patch('paasta_tools.cli.cmds.logs.print_log_record', autospec=True) as mock_print_log:
+        reader.print_last_n_logs(
+            service='fake_service',
+            line_count=4,
+            levels=['event'],
+            components=['deploy'],
+            clusters=['fake_cluster'],
+            raw_mode=True,
+        )
+    assert printed_messages(mock_print_log) == ['line 98', 'line 98', 'line 99', 'line 99']
+    instances = [call[0][0].instance for call in mock_print_log.call_args_list]
+    assert instances == ['main', 'canary', 'main', 'canary']
+    assert all(call[0][0].raw_line.endswith('}\n') for call in mock_print_log.call_args_list)
+
+
+def write_log_archive(tmpdir, start, count, block_lines=50, **kwargs):
+    log_path = str(tmpdir.join('fake_service.log'))
+    write_file_log_lines(log_path, start, count, **kwargs)
+    archiver = log_archive.LogArchiver(str(tmpdir.join('archive')), block_lines=block_lines)
+    with open(log_path) as f:
+        for line in f:
+            archiver.add_line(line)
+    archiver.close()
+    tmpdir.join('fake_service.log').remove()
+
+
+def test_archive_log_reader_print_logs_by_time(tmpdir):
+    # 1000 lines, a second apart, across midnight
+    start = datetime.datetime(2016, 7, 26, 23, 55, 0)
+    write_log_archive(tmpdir, start, 1000)
+    write_log_archive(tmpdir, start, 1000, cluster='other_cluster')
+    reader = logs.ArchiveLogReader(archive_dir=str(tmpdir.join('archive')))
+    with contextlib.nested(
+        mock.patch('paasta_tools.cli.cmds.logs.print_log_record', autospec=True),
+        mock.patch('paasta_tools.log_archive.LogArchive.read_block', autospec=True,
+                   side_effect=log_archive.LogArchive.read_block),
+    ) as (mock_print_log, mock_read_block):
+        reader.print_logs_by_time(
+            service='fake_service',
+            start_time=logs.pytz.utc.localize(start + datetime.timedelta(seconds=280)),
+            end_time=logs.pytz.utc.localize(start + datetime.timedelta(seconds=320)),
+            levels=['event'],
+            components=['deploy'],
+            clusters=['fake_cluster'],
+            raw_mode=True,
+        )
+        # Lines 250-299 are the last block of the first day and 300-349 the first of the next
+        assert [call[0][1]['lines'] for call in mock_read_block.call_args_list] == [50, 50]
+    assert printed_messages(mock_print_log) == ['line %d' % i for i in range(281, 320)]
+
+
+def test_archive_log_reader_print_last_n_logs(tmpdir):
+    start = datetime.datetime(2016, 7, 26, 23, 0, 0)
+    write_log_archive(tmpdir, start, 500)
+    write_log_archive(tmpdir, start + datetime.timedelta(seconds=0.5), 500, instance='canary')
+    write_log_archive(tmpdir, start + datetime.timedelta(seconds=1000), 10, component='build')
+    reader = logs.ArchiveLogReader(archive_dir=str(tmpdir.join('archive')))
+    with contextlib.nested(
+        mock.patch('paasta_tools.cli.cmds.logs.print_log_record', autospec=True),
+        mock.patch('paasta_tools.log_archive.LogArchive.read_block', autospec=True,
+                   side_effect=log_archive.LogArchive.read_block),
+    ) as (mock_print_log, mock_read_block):
+        reader.print_last_n_logs(
+            service='fake_service',
+            line_count=4,
+            levels=['event'],
+            components=['deploy'],
+            clusters=['fake_cluster'],
+            raw_mode=True,
+        )
+        # The newest block of each instance
+        assert mock_read_block.call_count == 2
+    assert printed_messages(mock_print_log) == ['line 498', 'line 498', 'line 499', 'line 499']
+    instances = [call[0][0].instance for call in mock_print_log.call_args_list]
+    assert instances == ['main', 'canary', 'main', 'canary']
+
+
+def test_file_log_reader_tail_logs(tmpdir):
+    start = datetime.datetime(2016, 7, 26, 22, 0, 0)
+    path = str(tmpdir.join('fake_service-main.log'))
+    write_file_log_lines(path, start, 10)
+    reader = logs.FileLogReader(path_format=str(tmpdir.join('{service}-{instance}.log')))
+
+    def fake_sleep(_):
+        if fake_sleep.calls == 0:
+            write_file_log_lines(path, start + datetime.timedelta(seconds=10), 2)
+            write_file_log_lines(str(tmpdir.join('fake_service-canary.log')), start, 1, instance='canary')
+        elif fake_sleep.calls == 1:
+            # rotate the log
+            tmpdir.join('fake_service-main.log').rename(tmpdir.join('fake_service-main.log.1'))
+            write_file_log_lines(path, start + datetime.timedelta(seconds=20), 1, instance='rotated')
+        else:
+            raise KeyboardInterrupt
+        fake_sleep.calls += 1
+    fake_sleep.calls = 0
+
+    with contextlib.nested(
+        mock.patch('paasta_tools.cli.cmds.logs.print_log_record', autospec=True),
+        mock.patch('paasta_tools.cli.cmds.logs.sleep', autospec=True, side_effect=fake_sleep),
+    ) as (mock_print_log, _):
+        reader.tail_logs('fake_service', ['event'], ['deploy'], ['fake_cluster'])
+    assert printed_messages(mock_print_log) == ['line 0', 'line 0', 'line 1', 'line 0']
+    instances = [call[0][0].instance for call in mock_print_log.call_args_list]
+    assert sorted(instances[:3]) == ['canary', 'main', 'main']
+    assert instances[3] == 'rotated'
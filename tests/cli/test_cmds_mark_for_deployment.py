@@ -11,6 +11,8 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+from time import sleep as real_sleep
+
 from bravado.exception import HTTPError
 from mock import ANY
 from mock import Mock
@@ -141,6 +143,8 @@ def mock_status_instance_side_effect(service, instance):
 def test_instances_deployed(mock_get_paasta_api_client, mock__log):
     mock_paasta_api_client = Mock()
     mock_get_paasta_api_client.return_value = mock_paasta_api_client
+    # An older paasta-api, without the batch status endpoint
+    mock_paasta_api_client.service.status_service.side_effect = HTTPError(response=Mock(status_code=404))
     mock_paasta_api_client.service.status_instance.side_effect = mock_status_instance_side_effect
 
     assert mark_for_deployment.instances_deployed('cluster', 'service1', ['instance1'], 'somesha') == 1
@@ -155,7 +159,54 @@ def test_instances_deployed(mock_get_paasta_api_client, mock__log):
     assert mark_for_deployment.instances_deployed('cluster', 'service1', ['instance8'], 'somesha') == 1
 
 
-def instances_deployed_side_effect(cluster, service, instances, git_sha):
+def test_instances_deployed_reuses_the_given_api_client():
+    mock_paasta_api_client = Mock()
+    mock_paasta_api_client.service.status_service.side_effect = HTTPError(response=Mock(status_code=404))
+    mock_paasta_api_client.service.status_instance.side_effect = mock_status_instance_side_effect
+    with patch(
+        'paasta_tools.cli.cmds.mark_for_deployment.client.get_paasta_api_client', autospec=True,
+    ) as mock_get_paasta_api_client:
+        assert mark_for_deployment.instances_deployed(
+            'cluster', 'service1', ['instance1', 'instance2', 'instance7'], 'somesha', api=mock_paasta_api_client,
+        ) == 2
+    assert mock_get_paasta_api_client.call_count == 0
+    assert mock_paasta_api_client.service.status_instance.call_count == 3
+
+
+def test_instances_deployed_uses_the_batch_status_endpoint():
+    instance_statuses = [
+        mock_status_instance_side_effect(service='service1', instance=instance).result()
+        for instance in ['instance1', 'instance3', 'instance7']
+    ]
+    for instance, status in zip(['instance1', 'instance3', 'instance7'], instance_statuses):
+        status.instance = instance
+        status.error_code = None
+    not_deployed_status = Mock(instance='notaninstance', error_code=404, error_message='not found')
+    mock_paasta_api_client = Mock()
+    mock_paasta_api_client.service.status_service.return_value.result.return_value = Mock(
+        instances=instance_statuses + [not_deployed_status],
+    )
+
+    assert mark_for_deployment.instances_deployed(
+        'cluster', 'service1', ['instance1', 'instance3', 'instance7', 'notaninstance', 'missing'], 'somesha',
+        api=mock_paasta_api_client,
+    ) == 2
+    mock_paasta_api_client.service.status_service.assert_called_once_with(service='service1')
+    assert mock_paasta_api_client.service.status_instance.call_count == 0
+
+
+def test_instances_deployed_batch_status_errors():
+    mock_paasta_api_client = Mock()
+    mock_paasta_api_client.service.status_service.side_effect = HTTPError(
+        response=Mock(status_code=500, text='oops'),
+    )
+    assert mark_for_deployment.instances_deployed(
+        'cluster', 'service1', ['instance1'], 'somesha', api=mock_paasta_api_client,
+    ) == 0
+    assert mock_paasta_api_client.service.status_instance.call_count == 0
+
+
+def instances_deployed_side_effect(cluster, service, instances, git_sha, api):
     if instances == ['instance1', 'instance2']:
         return 2
     return 0
@@ -164,8 +215,9 @@ def instances_deployed_side_effect(cluster, service, instances, git_sha):
 @patch('paasta_tools.cli.cmds.mark_for_deployment.get_cluster_instance_map_for_service', autospec=True)
 @patch('paasta_tools.cli.cmds.mark_for_deployment._log', autospec=True)
 @patch('paasta_tools.cli.cmds.mark_for_deployment.instances_deployed', autospec=True)
+@patch('paasta_tools.cli.cmds.mark_for_deployment.client.get_paasta_api_client', autospec=True)
 @patch('time.sleep', autospec=True)
-def test_wait_for_deployment(mock_sleep, mock_instances_deployed, mock__log,
+def test_wait_for_deployment(mock_sleep, mock_get_paasta_api_client, mock_instances_deployed, mock__log,
                              mock_get_cluster_instance_map_for_service):
     mock_cluster_map = {'cluster1': {'instances': ['instance1', 'instance2', 'instance3']}}
     mock_get_cluster_instance_map_for_service.return_value = mock_cluster_map
@@ -180,11 +232,13 @@ def test_wait_for_deployment(mock_sleep, mock_instances_deployed, mock__log,
     mock_instances_deployed.assert_called_with(cluster='cluster1',
                                                service='service',
                                                instances=mock_cluster_map['cluster1']['instances'],
-                                               git_sha='somesha')
+                                               git_sha='somesha',
+                                               api=mock_get_paasta_api_client.return_value)
 
     mock_cluster_map = {'cluster1': {'instances': ['instance1', 'instance2']},
                         'cluster2': {'instances': ['instance1', 'instance2']}}
     mock_get_cluster_instance_map_for_service.return_value = mock_cluster_map
+    mock_sleeper.call_count = 0
     assert mark_for_deployment.wait_for_deployment('service', 'deploy_group_1', 'somesha', '/nail/soa', 1)
 
     mock_cluster_map = {'cluster1': {'instances': ['instance1', 'instance2']},
@@ -193,14 +247,47 @@ def test_wait_for_deployment(mock_sleep, mock_instances_deployed, mock__log,
     mock_sleeper.call_count = 0
     with raises(TimeoutError):
         mark_for_deployment.wait_for_deployment('service', 'deploy_group_1', 'somesha', '/nail/soa', 1)
+    assert mock_cluster_map['cluster1']['deployed'] == 2
+    assert mock_cluster_map['cluster2']['deployed'] == 0
+
+
+@patch('paasta_tools.cli.cmds.mark_for_deployment.get_cluster_instance_map_for_service', autospec=True)
+@patch('paasta_tools.cli.cmds.mark_for_deployment._log', autospec=True)
+@patch('paasta_tools.cli.cmds.mark_for_deployment.instances_deployed', autospec=True)
+@patch('paasta_tools.cli.cmds.mark_for_deployment.client.get_paasta_api_client', autospec=True)
+@patch('time.sleep', autospec=True)
+def test_wait_for_deployment_raises_poller_errors(mock_sleep, mock_get_paasta_api_client, mock_instances_deployed,
+                                                  mock__log, mock_get_cluster_instance_map_for_service):
+    mock_get_cluster_instance_map_for_service.return_value = {'cluster1': {'instances': ['instance1']}}
+    mock_instances_deployed.side_effect = ValueError('boom')
+    mock_sleep.side_effect = MockSleep().mock_sleep_side_effect
+    with raises(ValueError):
+        mark_for_deployment.wait_for_deployment('service', 'deploy_group_1', 'somesha', '/nail/soa', 1)
+
+
+def test_cluster_poller_backs_off_while_nothing_changes():
+    poller = mark_for_deployment.ClusterPoller('cluster1', 'service', ['instance1', 'instance2'], 'somesha',
+                                               stopping=Mock())
+    intervals = []
+    with patch(
+        'paasta_tools.cli.cmds.mark_for_deployment.instances_deployed', autospec=True,
+    ) as mock_instances_deployed:
+        for deployed in [0, 0, 0, 0, 0, 0, 1, 1]:
+            mock_instances_deployed.return_value = deployed
+            poller.poll(api=Mock())
+            intervals.append(poller.interval)
+    assert intervals == [2, 4, 8, 10, 10, 10, 1, 2]
+    assert poller.deployed == 1
 
 
 class MockSleep:
+    """Gives the cluster pollers a moment to run, and times out after a few calls"""
+
     def __init__(self):
         self.call_count = 0
 
     def mock_sleep_side_effect(self, time):
-        if self.call_count == 5:
+        if self.call_count == 20:
             raise TimeoutError()
         self.call_count += 1
-        return
+        real_sleep(0.01)
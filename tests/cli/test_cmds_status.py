@@ -11,8 +11,12 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import threading
+import time
 from StringIO import StringIO
+from subprocess import CalledProcessError
 
+from mock import ANY
 from mock import MagicMock
 from mock import Mock
 from mock import patch
@@ -542,7 +546,9 @@ def test_report_status_handle_none_whitelist(
         instance_whitelist=instance_whitelist,
         system_paasta_config=fake_system_paasta_config,
         verbose=0,
-        use_api_endpoint=False
+        use_api_endpoint=False,
+        output=ANY,
+        stream=False,
     )
     mock_report_status_for_cluster.assert_any_call(
         service=service,
@@ -552,7 +558,9 @@ def test_report_status_handle_none_whitelist(
         instance_whitelist=instance_whitelist,
         system_paasta_config=fake_system_paasta_config,
         verbose=0,
-        use_api_endpoint=False
+        use_api_endpoint=False,
+        output=ANY,
+        stream=False,
     )
     mock_report_status_for_cluster.assert_any_call(
         service=service,
@@ -562,5 +570,140 @@ def test_report_status_handle_none_whitelist(
         instance_whitelist=instance_whitelist,
         system_paasta_config=fake_system_paasta_config,
         verbose=0,
-        use_api_endpoint=False
+        use_api_endpoint=False,
+        output=ANY,
+        stream=False,
+    )
+
+
+def test_report_status_prints_clusters_in_order_whatever_order_they_finish_in(capsys):
+    finished = []
+
+    def fake_report_status_for_cluster(cluster, output, stream, **kwargs):
+        # The first cluster is the slowest
+        if cluster == 'cluster1':
+            while len(finished) < 2:
+                time.sleep(0.01)
+        assert stream is False
+        output.write('status of %s\n' % cluster)
+        finished.append(cluster)
+
+    deploy_pipeline = actual_deployments = ['cluster1.main', 'cluster2.main', 'cluster3.main']
+    with patch(
+        'paasta_tools.cli.cmds.status.report_status_for_cluster', autospec=True,
+        side_effect=fake_report_status_for_cluster,
+    ):
+        report_status(
+            service='fake_service',
+            deploy_pipeline=deploy_pipeline,
+            actual_deployments=actual_deployments,
+            cluster_whitelist=[],
+            instance_whitelist=[],
+            system_paasta_config=utils.SystemPaastaConfig({}, '/fake/config'),
+        )
+    assert finished[-1] == 'cluster1'
+    assert capsys.readouterr()[0].startswith('status of cluster1\nstatus of cluster2\nstatus of cluster3\n')
+
+
+def test_report_status_reports_clusters_that_time_out(capsys):
+    done = threading.Event()
+
+    def fake_report_status_for_cluster(cluster, output, **kwargs):
+        if cluster == 'cluster2':
+            done.wait(5)
+        output.write('status of %s\n' % cluster)
+
+    deploy_pipeline = actual_deployments = ['cluster1.main', 'cluster2.main', 'cluster3.main']
+    with patch(
+        'paasta_tools.cli.cmds.status.report_status_for_cluster', autospec=True,
+        side_effect=fake_report_status_for_cluster,
+    ):
+        report_status(
+            service='fake_service',
+            deploy_pipeline=deploy_pipeline,
+            actual_deployments=actual_deployments,
+            cluster_whitelist=[],
+            instance_whitelist=[],
+            system_paasta_config=utils.SystemPaastaConfig({}, '/fake/config'),
+            cluster_timeout=0.1,
+        )
+    done.set()
+    output = capsys.readouterr()[0]
+    assert output.startswith(
+        'status of cluster1\n'
+        '\n'
+        'cluster: cluster2\n'
+        '    ERROR: timed out after 0.1 seconds getting the status of cluster2\n'
+        'status of cluster3\n'
+    )
+
+
+def test_report_status_doesnt_wait_for_other_clusters_after_one_fails():
+    done = threading.Event()
+
+    def fake_report_status_for_cluster(cluster, output, **kwargs):
+        if cluster == 'cluster1':
+            raise CalledProcessError(1, 'paasta_serviceinit')
+        done.wait(5)
+
+    deploy_pipeline = actual_deployments = ['cluster1.main', 'cluster2.main', 'cluster3.main']
+    with patch(
+        'paasta_tools.cli.cmds.status.report_status_for_cluster', autospec=True,
+        side_effect=fake_report_status_for_cluster,
+    ) as mock_report_status_for_cluster:
+        with raises(CalledProcessError):
+            report_status(
+                service='fake_service',
+                deploy_pipeline=deploy_pipeline,
+                actual_deployments=actual_deployments,
+                cluster_whitelist=[],
+                instance_whitelist=[],
+                system_paasta_config=utils.SystemPaastaConfig({}, '/fake/config'),
+                max_concurrency=1,
+            )
+        done.set()
+    # cluster2 may have started before cluster1's failure was noticed, but
+    # cluster3 was still queued
+    assert 'cluster3' not in [call[1]['cluster'] for call in mock_report_status_for_cluster.call_args_list]
+
+
+@patch('paasta_tools.cli.cmds.status.execute_paasta_serviceinit_on_remote_master', autospec=True)
+def test_report_status_for_cluster_indents_buffered_status_like_streamed_status(
+    mock_execute_paasta_serviceinit_on_remote_master,
+):
+    mock_execute_paasta_serviceinit_on_remote_master.return_value = 'instance: main\nGit sha:    abc123\n'
+    output = StringIO()
+    status.report_status_for_cluster(
+        service='fake_service',
+        cluster='cluster',
+        deploy_pipeline=['cluster.main'],
+        actual_deployments={'cluster.main': 'abc123'},
+        instance_whitelist=[],
+        system_paasta_config=utils.SystemPaastaConfig({}, '/fake/config'),
+        output=output,
+        stream=False,
+    )
+    assert output.getvalue() == (
+        '\n'
+        'cluster: cluster\n'
+        '  instance: main\n'
+        '    Git sha:    abc123\n'
+        '\n'
+    )
+    assert mock_execute_paasta_serviceinit_on_remote_master.call_args[1]['stream'] is False
+
+
+@patch('paasta_tools.cli.cmds.status.paasta_status_on_api_endpoint', autospec=True)
+def test_paasta_status_on_api_endpoints_prints_instances_in_order(mock_paasta_status_on_api_endpoint):
+    def fake_paasta_status_on_api_endpoint(cluster, service, instance, system_paasta_config, verbose, output):
+        if instance == 'main':
+            time.sleep(0.05)
+        output.write('status of %s\n' % instance)
+    mock_paasta_status_on_api_endpoint.side_effect = fake_paasta_status_on_api_endpoint
+
+    output = StringIO()
+    status.paasta_status_on_api_endpoints(
+        'cluster', 'fake_service', ['main', 'canary'], utils.SystemPaastaConfig({}, '/fake/config'),
+        verbose=0, output=output,
     )
+    assert output.getvalue() == 'status of main\nstatus of canary\n'
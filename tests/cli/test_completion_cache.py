@@ -0,0 +1,99 @@
+# Copyright 2015-2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import contextlib
+import os
+import time
+
+import mock
+
+from paasta_tools.cli import completion_cache
+
+
+def test_get_default_cache_dir_uses_xdg_cache_home():
+    with mock.patch.dict('os.environ', {'XDG_CACHE_HOME': '/fake/cache'}):
+        assert completion_cache.get_default_cache_dir() == '/fake/cache/paasta'
+
+
+def test_get_signature(tmpdir):
+    assert completion_cache.get_signature([str(tmpdir), str(tmpdir.join('missing'))]) == [
+        os.stat(str(tmpdir)).st_mtime,
+        None,
+    ]
+
+
+def test_get_computes_and_stores_missing_choices(tmpdir):
+    soa_dir = tmpdir.mkdir('soa')
+    cache = completion_cache.CompletionCache(cache_dir=str(tmpdir.join('cache')))
+    compute_fn = mock.Mock(return_value=set(['a']))
+    assert cache.get('key', compute_fn, [str(soa_dir)]) == ['a']
+    assert cache.get('key', compute_fn, [str(soa_dir)]) == ['a']
+    assert compute_fn.call_count == 1
+    # A new cache object reads what the first one stored
+    assert completion_cache.CompletionCache(cache_dir=str(tmpdir.join('cache'))).get(
+        'key', compute_fn, [str(soa_dir)]) == ['a']
+    assert compute_fn.call_count == 1
+
+
+def test_get_refreshes_changed_choices_in_the_background(tmpdir):
+    soa_dir = tmpdir.mkdir('soa')
+    cache = completion_cache.CompletionCache(cache_dir=str(tmpdir.join('cache')))
+    cache.get('key', lambda: ['old'], [str(soa_dir)])
+    soa_dir.mkdir('new_service')
+    os.utime(str(soa_dir), (0, 0))
+    compute_fn = mock.Mock(return_value=['new'])
+    with mock.patch.object(cache, 'refresh_in_background', autospec=True) as mock_refresh_in_background:
+        assert cache.get('key', compute_fn, [str(soa_dir)]) == ['old']
+    mock_refresh_in_background.assert_called_once_with('key', compute_fn, [str(soa_dir)])
+    assert compute_fn.call_count == 0
+
+    cache.refresh('key', compute_fn, [str(soa_dir)])
+    assert cache.get('key', compute_fn, [str(soa_dir)]) == ['new']
+
+
+def test_get_refreshes_old_choices_in_the_background(tmpdir):
+    soa_dir = tmpdir.mkdir('soa')
+    cache = completion_cache.CompletionCache(cache_dir=str(tmpdir.join('cache')), max_age=60)
+    with mock.patch('paasta_tools.cli.completion_cache.time.time', autospec=True, return_value=1000):
+        cache.get('key', lambda: ['old'], [str(soa_dir)])
+    for now, expected_refreshes in [(1059, 0), (1061, 1)]:
+        with contextlib.nested(
+            mock.patch('paasta_tools.cli.completion_cache.time.time', autospec=True, return_value=now),
+            mock.patch.object(cache, 'refresh_in_background', autospec=True),
+        ) as (
+            _,
+            mock_refresh_in_background,
+        ):
+            assert cache.get('key', lambda: ['new'], [str(soa_dir)]) == ['old']
+        assert mock_refresh_in_background.call_count == expected_refreshes
+
+
+def test_get_works_without_a_writable_cache_dir(tmpdir):
+    soa_dir = tmpdir.mkdir('soa')
+    tmpdir.join('cache').write('not a directory')
+    cache = completion_cache.CompletionCache(cache_dir=str(tmpdir.join('cache')))
+    compute_fn = mock.Mock(return_value=['a'])
+    assert cache.get('key', compute_fn, [str(soa_dir)]) == ['a']
+    assert cache.get('key', compute_fn, [str(soa_dir)]) == ['a']
+    assert compute_fn.call_count == 2
+
+
+def test_refresh_in_background(tmpdir):
+    soa_dir = tmpdir.mkdir('soa')
+    cache = completion_cache.CompletionCache(cache_dir=str(tmpdir.join('cache')))
+    cache.refresh_in_background('key', lambda: ['new'], [str(soa_dir)])
+    for _ in range(100):
+        if 'key' in cache.load():
+            break
+        time.sleep(0.05)
+    assert cache.load()['key']['choices'] == ['new']
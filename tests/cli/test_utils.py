@@ -13,8 +13,12 @@
 # limitations under the License.
 import argparse
 import contextlib
+import os
+import threading
+import time
 from socket import gaierror
 
+import concurrent.futures
 import mock
 from bravado.exception import HTTPError
 from bravado.exception import HTTPNotFound
@@ -54,13 +58,23 @@ def test_find_connectable_master_happy_path(mock_check_ssh_and_sudo_on_master):
         '192.0.2.3',
     ]
     timeout = 6.0
-    mock_check_ssh_and_sudo_on_master.return_value = (True, None)
 
-    actual = utils.find_connectable_master(masters)
-    expected = (masters[0], None)
-    assert mock_check_ssh_and_sudo_on_master.call_count == 1
-    mock_check_ssh_and_sudo_on_master.assert_called_once_with(masters[0], timeout=timeout)
-    assert actual == expected
+    def fake_check_ssh_and_sudo_on_master(master, timeout, ssh_flags):
+        # The first master to answer wins, whatever its place in the list
+        if master != '192.0.2.2':
+            time.sleep(0.2)
+        return (True, None)
+    mock_check_ssh_and_sudo_on_master.side_effect = fake_check_ssh_and_sudo_on_master
+
+    actual = utils.find_connectable_master(masters, ssh_flags='-o fake=flag')
+    assert actual == ('192.0.2.2', None)
+    # The other checks run on, and may not have started yet
+    for _ in range(100):
+        if mock_check_ssh_and_sudo_on_master.call_count == len(masters):
+            break
+        time.sleep(0.01)
+    for master in masters:
+        mock_check_ssh_and_sudo_on_master.assert_any_call(master, timeout=timeout, ssh_flags='-o fake=flag')
 
 
 @patch('paasta_tools.cli.utils.check_ssh_and_sudo_on_master', autospec=True)
@@ -70,25 +84,23 @@ def test_find_connectable_master_one_failure(mock_check_ssh_and_sudo_on_master):
         '192.0.2.2',
         '192.0.2.3',
     ]
-    timeout = 6.0
-    # iter() is a workaround
-    # (http://lists.idyll.org/pipermail/testing-in-python/2013-April/005527.html)
-    # for a bug in mock (http://bugs.python.org/issue17826)
-    create_connection_side_effects = iter([
-        (False, "something bad"),
-        (True, 'unused'),
-        (True, 'unused'),
-    ])
-    mock_check_ssh_and_sudo_on_master.side_effect = create_connection_side_effects
-    mock_check_ssh_and_sudo_on_master.return_value = True
+
+    def fake_check_ssh_and_sudo_on_master(master, timeout, ssh_flags):
+        if master == '192.0.2.1':
+            return (False, "something bad")
+        if master == '192.0.2.3':
+            time.sleep(0.2)
+        return (True, None)
+    mock_check_ssh_and_sudo_on_master.side_effect = fake_check_ssh_and_sudo_on_master
 
     actual = utils.find_connectable_master(masters)
-    assert mock_check_ssh_and_sudo_on_master.call_count == 2
-    mock_check_ssh_and_sudo_on_master.assert_any_call(masters[0], timeout=timeout)
-    mock_check_ssh_and_sudo_on_master.assert_any_call(masters[1], timeout=timeout)
     assert actual == ('192.0.2.2', None)
 
 
+def test_find_connectable_master_no_masters():
+    assert utils.find_connectable_master([]) == (None, None)
+
+
 @patch('paasta_tools.cli.utils.check_ssh_and_sudo_on_master', autospec=True)
 def test_find_connectable_master_all_failures(mock_check_ssh_and_sudo_on_master):
     masters = [
@@ -101,13 +113,29 @@ def test_find_connectable_master_all_failures(mock_check_ssh_and_sudo_on_master)
 
     actual = utils.find_connectable_master(masters)
     assert mock_check_ssh_and_sudo_on_master.call_count == 3
-    mock_check_ssh_and_sudo_on_master.assert_any_call((masters[0]), timeout=timeout)
-    mock_check_ssh_and_sudo_on_master.assert_any_call((masters[1]), timeout=timeout)
-    mock_check_ssh_and_sudo_on_master.assert_any_call((masters[2]), timeout=timeout)
+    mock_check_ssh_and_sudo_on_master.assert_any_call((masters[0]), timeout=timeout, ssh_flags='')
+    mock_check_ssh_and_sudo_on_master.assert_any_call((masters[1]), timeout=timeout, ssh_flags='')
+    mock_check_ssh_and_sudo_on_master.assert_any_call((masters[2]), timeout=timeout, ssh_flags='')
     assert actual[0] is None
     assert 'timeout' in actual[1]
 
 
+def test_shutdown_executor_without_waiting():
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+    unblock = threading.Event()
+    running = executor.submit(unblock.wait)
+    queued = executor.submit(lambda: None)
+    while not running.running():
+        time.sleep(0.01)
+    utils.shutdown_executor_without_waiting(executor, [running, queued])
+    assert queued.cancelled()
+    assert not running.cancelled()
+    # The running call's thread won't be joined at exit
+    assert not set(executor._threads) & set(concurrent.futures.thread._threads_queues)
+    unblock.set()
+    assert running.result(1) is True
+
+
 @patch('paasta_tools.cli.utils._run', autospec=True)
 def test_check_ssh_and_sudo_on_master_check_successful(mock_run):
     master = 'fake_master'
@@ -245,14 +273,15 @@ def test_execute_paasta_serviceinit_status_on_remote_master_happy_path(
     actual = utils.execute_paasta_serviceinit_on_remote_master('status', cluster, service, instancename,
                                                                fake_system_paasta_config)
     mock_calculate_remote_masters.assert_called_once_with(cluster, fake_system_paasta_config)
-    mock_find_connectable_master.assert_called_once_with(remote_masters)
+    mock_find_connectable_master.assert_called_once_with(remote_masters, ssh_flags='')
     mock_run_paasta_serviceinit.assert_called_once_with(
         'status',
         'fake_connectable_master',
         service,
         instancename,
         cluster,
-        False
+        False,
+        ssh_flags='',
     )
     assert actual == mock_run_paasta_serviceinit.return_value
 
@@ -321,8 +350,8 @@ def test_execute_paasta_metastatus_on_remote_master(
 
     actual = utils.execute_paasta_metastatus_on_remote_master(cluster, fake_system_paasta_config, False, [], 0)
     mock_calculate_remote_masters.assert_called_once_with(cluster, fake_system_paasta_config)
-    mock_find_connectable_master.assert_called_once_with(remote_masters)
-    mock_run_paasta_metastatus.assert_called_once_with('fake_connectable_master', False, [], 0)
+    mock_find_connectable_master.assert_called_once_with(remote_masters, ssh_flags='')
+    mock_run_paasta_metastatus.assert_called_once_with('fake_connectable_master', False, [], 0, ssh_flags='')
     assert actual == mock_run_paasta_metastatus.return_value
 
 
@@ -776,3 +805,101 @@ def test_get_container_name():
     mock_task = mock.Mock(slave_id='slave1', executor={'container': 'container1'})
     ret = utils.get_container_name(mock_task)
     assert ret == 'mesos-slave1.container1'
+
+
+def test_get_cached_choices():
+    with mock.patch('paasta_tools.cli.utils.CompletionCache', autospec=True) as mock_completion_cache:
+        mock_get = mock_completion_cache.return_value.get
+        assert utils.get_cached_choices(utils.list_services, soa_dir='/fake/soa') == mock_get.return_value
+        mock_get.assert_called_once_with('/fake/soa:list_services', utils.list_services, ['/fake/soa'])
+
+        mock_get.reset_mock()
+        mock_list_deploy_groups = mock.Mock(__name__='list_deploy_groups')
+        utils.get_cached_choices(mock_list_deploy_groups, service='fake_service', soa_dir='/fake/soa')
+        mock_get.assert_called_once_with(
+            '/fake/soa:list_deploy_groups:fake_service',
+            mock.ANY,
+            ['/fake/soa', '/fake/soa/fake_service'],
+        )
+        mock_get.call_args[0][1]()
+        mock_list_deploy_groups.assert_called_once_with(service='fake_service')
+
+
+def test_cached_choices_completer():
+    with contextlib.nested(
+        mock.patch('paasta_tools.cli.utils.get_cached_choices', autospec=True, return_value=['foo', 'bar']),
+        mock.patch('paasta_tools.cli.utils.guess_service_name', autospec=True, return_value='cwd_service'),
+    ) as (
+        mock_get_cached_choices,
+        _,
+    ):
+        completer = utils.cached_choices_completer(utils.list_services)
+        assert completer(prefix='f', parsed_args=mock.Mock(service='fake_service')) == ['foo']
+        mock_get_cached_choices.assert_called_once_with(utils.list_services)
+
+        completer = utils.cached_choices_completer(utils.list_instances, per_service=True)
+        mock_get_cached_choices.reset_mock()
+        assert completer(prefix='', parsed_args=mock.Mock(service='fake_service')) == ['foo', 'bar']
+        mock_get_cached_choices.assert_called_once_with(utils.list_instances, service='fake_service')
+        mock_get_cached_choices.reset_mock()
+        completer(prefix='', parsed_args=mock.Mock(service=None))
+        mock_get_cached_choices.assert_called_once_with(utils.list_instances, service='cwd_service')
+
+
+def test_get_ssh_flags_without_control_persist():
+    assert utils.get_ssh_flags(SystemPaastaConfig({}, '/fake/config')) == ''
+
+
+def test_get_ssh_flags_with_control_persist(tmpdir):
+    with patch('paasta_tools.cli.utils.tempfile.gettempdir', autospec=True, return_value=str(tmpdir)):
+        flags = utils.get_ssh_flags(SystemPaastaConfig({'ssh_control_persist': 60}, '/fake/config'))
+    control_dir = os.path.join(str(tmpdir), 'paasta-ssh-%d' % os.getuid())
+    assert flags == '-o ControlMaster=auto -o ControlPath=%s/%%r@%%h:%%p -o ControlPersist=60' % control_dir
+    assert os.stat(control_dir).st_mode & 0o777 == 0o700
+
+
+def test_get_ssh_control_dir_refuses_a_shared_directory(tmpdir):
+    control_dir = tmpdir.mkdir('paasta-ssh-%d' % os.getuid())
+    control_dir.chmod(0o777)
+    with patch('paasta_tools.cli.utils.tempfile.gettempdir', autospec=True, return_value=str(tmpdir)):
+        assert utils.get_ssh_control_dir() is None
+        control_dir.chmod(0o700)
+        assert utils.get_ssh_control_dir() == str(control_dir)
+
+
+@patch('paasta_tools.cli.utils._run', autospec=True)
+def test_check_ssh_and_sudo_on_master_with_ssh_flags(mock_run):
+    mock_run.return_value = (0, 'fake_output')
+    assert utils.check_ssh_and_sudo_on_master('fake_master', ssh_flags='-o fake=flag') == (True, None)
+    mock_run.assert_called_once_with('ssh -A -n -o fake=flag fake_master sudo paasta_serviceinit -h', timeout=10)
+
+
+@patch('paasta_tools.cli.utils._run', autospec=True)
+def test_run_paasta_metastatus_with_ssh_flags(mock_run):
+    mock_run.return_value = (0, 'fake_output')
+    utils.run_paasta_metastatus('fake_master', False, [], 0, ssh_flags='-o fake=flag')
+    mock_run.assert_called_once_with('ssh -A -n -o fake=flag fake_master sudo paasta_metastatus', timeout=20)
+
+
+@patch('paasta_tools.cli.utils.find_connectable_master', autospec=True)
+@patch('paasta_tools.cli.utils.calculate_remote_masters', autospec=True)
+@patch('paasta_tools.cli.utils.run_paasta_serviceinit', autospec=True)
+@patch('paasta_tools.cli.utils.get_ssh_flags', autospec=True)
+def test_execute_paasta_serviceinit_on_remote_master_shares_ssh_connections(
+    mock_get_ssh_flags,
+    mock_run_paasta_serviceinit,
+    mock_calculate_remote_masters,
+    mock_find_connectable_master,
+):
+    mock_get_ssh_flags.return_value = '-o ControlMaster=auto'
+    mock_calculate_remote_masters.return_value = (['fake_master'], None)
+    mock_find_connectable_master.return_value = ('fake_master', None)
+    utils.execute_paasta_serviceinit_on_remote_master(
+        'status', 'fake_cluster', 'fake_service', 'main', SystemPaastaConfig({}, '/fake/config'),
+        ignore_ssh_output=True,
+    )
+    mock_find_connectable_master.assert_called_once_with(['fake_master'], ssh_flags='-o ControlMaster=auto')
+    mock_run_paasta_serviceinit.assert_called_once_with(
+        'status', 'fake_master', 'fake_service', 'main', 'fake_cluster', False,
+        ssh_flags='-o LogLevel=QUIET -o ControlMaster=auto',
+    )
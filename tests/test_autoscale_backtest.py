@@ -0,0 +1,132 @@
+# Copyright 2015-2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from StringIO import StringIO
+
+import mock
+from pytest import raises
+
+from paasta_tools import autoscale_backtest
+from paasta_tools import marathon_tools
+
+
+def make_config(**autoscaling):
+    return marathon_tools.MarathonServiceConfig(
+        service='fake-service',
+        instance='fake-instance',
+        cluster='fake-cluster',
+        config_dict={'min_instances': 1, 'max_instances': 20, 'autoscaling': autoscaling},
+        branch_dict={},
+    )
+
+
+def test_read_timeseries():
+    fd = StringIO('timestamp,utilization,instances\n600,0.5,4\n0,1.0,2\n')
+    assert autoscale_backtest.read_timeseries(fd) == [(0.0, 2.0, 2), (600.0, 2.0, 4)]
+
+
+def test_backtest_decision_policy_threshold_scales_up_and_down():
+    samples = [(0, 8.0, 10), (300, 8.0, 10), (600, 1.0, 10), (900, 1.0, 10)]
+    trajectory = autoscale_backtest.backtest_decision_policy(
+        marathon_service_config=make_config(decision_policy='threshold', setpoint=0.5),
+        samples=samples,
+    )
+    assert [instances for _, _, instances in trajectory] == [11, 12, 11, 10]
+    assert trajectory[0][1] == 0.8
+
+
+def test_backtest_decision_policy_respects_limits():
+    samples = [(0, 50.0, 20), (300, 50.0, 20)]
+    trajectory = autoscale_backtest.backtest_decision_policy(
+        marathon_service_config=make_config(decision_policy='threshold'),
+        samples=samples,
+        initial_instances=25,
+    )
+    assert [instances for _, _, instances in trajectory] == [20, 20]
+
+
+def test_backtest_decision_policy_pid_uses_sample_time():
+    samples = [(1470000000, 5.0, 5), (1470000300, 5.0, 5), (1470000600, 5.0, 5)]
+    with mock.patch('paasta_tools.autoscaling.autoscaling_service_lib.datetime', autospec=True) as mock_datetime:
+        trajectory = autoscale_backtest.backtest_decision_policy(
+            marathon_service_config=make_config(decision_policy='pid', setpoint=0.5),
+            samples=samples,
+        )
+        assert not mock_datetime.now.called
+    assert trajectory[-1][2] > 5
+
+
+def test_summarize_trajectory():
+    samples = [(0, 4.0, 4), (3600, 4.0, 4), (7200, 1.0, 4)]
+    trajectory = [(0, 1.0, 4), (3600, 1.0, 8), (7200, 0.25, 8)]
+    summary = autoscale_backtest.summarize_trajectory(samples, trajectory, setpoint=0.5, initial_instances=4)
+    assert summary == {
+        'scaling_events': 1,
+        'instances_churned': 4,
+        'instance_seconds': 12 * 3600.0,
+        'overprovisioned_instance_seconds': 6 * 3600.0,
+        'underprovisioned_instance_seconds': 4 * 3600.0,
+    }
+
+
+def test_summarize_trajectory_counts_scaling_in_the_first_run():
+    samples = [(i * 300, 2.5, 5) for i in range(5)]
+    trajectory = [(i * 300, 0.5, instances) for i, instances in enumerate([6, 6, 5, 4, 3])]
+    summary = autoscale_backtest.summarize_trajectory(samples, trajectory, setpoint=0.5, initial_instances=5)
+    assert summary['scaling_events'] == 4
+    assert summary['instances_churned'] == 4
+
+
+def test_main_reports_policies_it_cant_replay(tmpdir, capsys):
+    timeseries = tmpdir.join('timeseries.csv')
+    timeseries.write('timestamp,utilization,instances\n0,0.5,4\n')
+    with mock.patch('paasta_tools.autoscale_backtest.load_marathon_service_config', autospec=True,
+                    return_value=make_config(decision_policy='bespoke')):
+        with raises(SystemExit) as excinfo:
+            autoscale_backtest.main([str(timeseries), '-s', 'fake-service', '-i', 'fake-instance',
+                                     '-c', 'fake-cluster'])
+    assert excinfo.value.code == 1
+    out, _ = capsys.readouterr()
+    assert "Can't replay the bespoke decision policy" in out
+    assert 'pid' in out
+
+
+def test_build_service_config_overrides():
+    args = autoscale_backtest.parse_args(['fake.csv', '--max-instances', '10', '--setpoint', '0.6'])
+    config = autoscale_backtest.build_service_config(args)
+    assert config.get_max_instances() == 10
+    assert config.get_autoscaling_params()['setpoint'] == 0.6
+
+
+def test_build_service_config_requires_max_instances():
+    args = autoscale_backtest.parse_args(['fake.csv'])
+    with raises(ValueError):
+        autoscale_backtest.build_service_config(args)
+
+
+def test_build_service_config_loads_service_config():
+    args = autoscale_backtest.parse_args(['fake.csv', '-s', 'fake-service', '-i', 'fake-instance',
+                                          '-c', 'fake-cluster', '--min-instances', '3'])
+    with mock.patch('paasta_tools.autoscale_backtest.load_marathon_service_config', autospec=True,
+                    return_value=make_config(decision_policy='threshold')) as mock_load_config:
+        config = autoscale_backtest.build_service_config(args)
+        mock_load_config.assert_called_once_with(
+            service='fake-service',
+            instance='fake-instance',
+            cluster='fake-cluster',
+            load_deployments=False,
+            soa_dir=args.soa_dir,
+        )
+    assert config.get_min_instances() == 3
+    assert config.get_max_instances() == 20
+    assert config.get_autoscaling_params()['decision_policy'] == 'threshold'
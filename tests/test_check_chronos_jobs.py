@@ -138,19 +138,19 @@ def test_sensu_event_for_last_run_state_invalid():
         check_chronos_jobs.sensu_event_for_last_run_state(100)
 
 
-@patch('paasta_tools.check_chronos_jobs.chronos_tools.lookup_chronos_jobs', autospec=True)
-def test_respect_latest_run_after_rerun(mock_lookup_chronos_jobs):
+@patch('paasta_tools.check_chronos_jobs.chronos_tools.lookup_chronos_jobs_by_service_instance', autospec=True)
+def test_respect_latest_run_after_rerun(mock_lookup_chronos_jobs_by_service_instance):
     fake_job = {
         'name': 'service1 test-job',
         'lastSuccess': '2016-07-26T22:00:00+00:00',
         'lastError': '2016-07-26T22:01:00+00:00'
     }
-    mock_lookup_chronos_jobs.side_effect = iter([[
-        fake_job
-    ]])
+    mock_lookup_chronos_jobs_by_service_instance.return_value = {
+        ('service1', 'chronos_job'): [fake_job],
+    }
 
     fake_configured_jobs = [('service1', 'chronos_job')]
-    fake_client = Mock(list=Mock(return_value=[('service1', 'chronos_job')]))
+    fake_client = Mock()
 
     assert check_chronos_jobs.build_service_job_mapping(fake_client, fake_configured_jobs) == {
         ('service1', 'chronos_job'): [(fake_job, chronos_tools.LastRunState.Fail)]
@@ -162,48 +162,45 @@ def test_respect_latest_run_after_rerun(mock_lookup_chronos_jobs):
         'lastSuccess': '2016-07-26T22:12:00+00:00',
     }
     reran_job = chronos_rerun.set_tmp_naming_scheme(reran_job)
-    mock_lookup_chronos_jobs.side_effect = iter([[
-        fake_job,
-        reran_job
-    ]])
+    mock_lookup_chronos_jobs_by_service_instance.return_value = {
+        ('service1', 'chronos_job'): [fake_job, reran_job],
+    }
     assert check_chronos_jobs.build_service_job_mapping(fake_client, fake_configured_jobs) == {
         ('service1', 'chronos_job'): [(reran_job, chronos_tools.LastRunState.Success)]
     }
 
 
-@patch('paasta_tools.check_chronos_jobs.chronos_tools.lookup_chronos_jobs', autospec=True)
-@patch('paasta_tools.check_chronos_jobs.chronos_tools.filter_enabled_jobs', autospec=True)
-def test_build_service_job_mapping(mock_filter_enabled_jobs, mock_lookup_chronos_jobs):
-    # iter() is a workaround
-    # (http://lists.idyll.org/pipermail/testing-in-python/2013-April/005527.html)
-    # for a bug in mock (http://bugs.python.org/issue17826)
+@patch('paasta_tools.check_chronos_jobs.chronos_tools.lookup_chronos_jobs_by_service_instance', autospec=True)
+def test_build_service_job_mapping(mock_lookup_chronos_jobs_by_service_instance):
     services = ['service1', 'service2', 'service3']
     latest_time = '2016-07-26T22:03:00+00:00'
-    fake_jobs = [[
-        {
-            'name': service + ' foo',
-            'lastSuccess': '2016-07-26T22:02:00+00:00'
-        },
-        {
-            'name': service + ' foo',
-            'lastError': latest_time
-        },
-        {
-            'name': service + ' foo'
-        }
-    ] for service in services]
-    mock_lookup_chronos_jobs.side_effect = iter(fake_jobs)
-    mock_filter_enabled_jobs.side_effect = iter([[{}, {}, {}] for x in range(0, 3)])
-
-    fake_configured_jobs = [('service1', 'main'), ('service2', 'main'), ('service3', 'main')]
-    fake_client = Mock(list=Mock(return_value=[('service1', 'main'), ('service2', 'main'), ('service3', 'main')]))
+    mock_lookup_chronos_jobs_by_service_instance.return_value = {
+        (service, 'main'): [
+            {
+                'name': service + ' foo',
+                'lastSuccess': '2016-07-26T22:02:00+00:00'
+            },
+            {
+                'name': service + ' foo',
+                'lastError': latest_time
+            },
+            {
+                'name': service + ' foo'
+            }
+        ] for service in services
+    }
+
+    fake_configured_jobs = [('service1', 'main'), ('service2', 'main'), ('service3', 'main'), ('service4', 'main')]
+    fake_client = Mock()
 
     expected = {
         ('service1', 'main'): [({'name': 'service1 foo', 'lastError': latest_time}, chronos_tools.LastRunState.Fail)],
         ('service2', 'main'): [({'name': 'service2 foo', 'lastError': latest_time}, chronos_tools.LastRunState.Fail)],
         ('service3', 'main'): [({'name': 'service3 foo', 'lastError': latest_time}, chronos_tools.LastRunState.Fail)],
+        ('service4', 'main'): [],
     }
     assert check_chronos_jobs.build_service_job_mapping(fake_client, fake_configured_jobs) == expected
+    mock_lookup_chronos_jobs_by_service_instance.assert_called_once_with(client=fake_client, include_disabled=True)
 
 
 def test_message_for_status_fail():
@@ -407,6 +407,10 @@ def test_format_chronos_job_mesos_verbose(verbosity_level):
         'schedule': 'foo',
     }
     running_tasks = ['slay the nemean lion']
+    scheduler_graph = chronos_tools.ChronosSchedulerGraph("\n".join([
+        "link,my_service my_instance,my_service child",
+        "link,my_service child,other_service grandchild",
+    ]))
     if verbosity_level == 1:
         expected_tail_lines = 0
     elif verbosity_level == 2:
@@ -422,13 +426,28 @@ def test_format_chronos_job_mesos_verbose(verbosity_level):
         mock_status_mesos_tasks_verbose,
         mock_chronos_status_for_job,
     ):
-        actual = chronos_serviceinit.format_chronos_job_status(mock_client, example_job, running_tasks, verbosity_level)
+        actual = chronos_serviceinit.format_chronos_job_status(
+            mock_client, example_job, running_tasks, verbosity_level, scheduler_graph)
     mock_status_mesos_tasks_verbose.assert_called_once_with(
         job_id=example_job['name'],
         get_short_task_id=chronos_serviceinit.get_short_task_id,
         tail_lines=expected_tail_lines,
     )
     assert 'status_mesos_tasks_verbose output' in actual
+    assert 'Dependents:  my_service child,other_service grandchild\n' in actual
+
+
+def test_format_chronos_job_status_fetches_scheduler_graph_when_verbose():
+    example_job = {
+        'name': 'my_service my_instance',
+        'schedule': 'foo',
+    }
+    mock_client = mock.Mock()
+    mock_client.scheduler_graph.return_value = "node,my_service my_instance,fresh,idle"
+    with mock.patch('paasta_tools.chronos_serviceinit.status_mesos_tasks_verbose', autospec=True):
+        actual = chronos_serviceinit.format_chronos_job_status(mock_client, example_job, [], 1)
+    mock_client.scheduler_graph.assert_called_once_with()
+    assert 'Dependents: None\n' in actual
 
 
 def test_status_chronos_jobs_is_deployed():
@@ -447,6 +466,7 @@ def test_status_chronos_jobs_is_deployed():
             autospec=True,
             return_value=[],
         ),
+        mock.patch('paasta_tools.chronos_tools.get_chronos_scheduler_graph', autospec=True),
     ):
         actual = chronos_serviceinit.status_chronos_jobs(
             mock.Mock(),  # Chronos client
@@ -473,6 +493,7 @@ def test_status_chronos_jobs_is_not_deployed():
             autospec=True,
             return_value=[],
         ),
+        mock.patch('paasta_tools.chronos_tools.get_chronos_scheduler_graph', autospec=True),
     ):
         actual = chronos_serviceinit.status_chronos_jobs(
             mock.Mock(),  # Chronos client
@@ -499,6 +520,7 @@ def test_status_chronos_jobs_get_desired_state_human():
             autospec=True,
             return_value=[],
         ),
+        mock.patch('paasta_tools.chronos_tools.get_chronos_scheduler_graph', autospec=True),
     ):
         actual = chronos_serviceinit.status_chronos_jobs(
             mock.Mock(),  # Chronos client
@@ -529,14 +551,20 @@ def test_status_chronos_jobs_multiple_jobs():
             autospec=True,
             return_value=[],
         ),
-    ):
+        mock.patch('paasta_tools.chronos_tools.get_chronos_scheduler_graph', autospec=True),
+    ) as (mock_format_chronos_job_status, _, mock_get_chronos_scheduler_graph):
+        mock_client = mock.Mock()
         actual = chronos_serviceinit.status_chronos_jobs(
-            mock.Mock(),  # Chronos client
+            mock_client,
             jobs,
             complete_job_config,
             verbose,
         )
         assert '\njob_status_output\njob_status_output' in actual
+        mock_get_chronos_scheduler_graph.assert_called_once_with(mock_client)
+        for job in jobs:
+            mock_format_chronos_job_status.assert_any_call(
+                mock_client, job, [], verbose, mock_get_chronos_scheduler_graph.return_value)
 
 
 def test_status_chronos_jobs_get_running_tasks():
@@ -555,7 +583,8 @@ def test_status_chronos_jobs_get_running_tasks():
             autospec=True,
             return_value=[],
         ),
-    ) as (_, mock_get_running_tasks):
+        mock.patch('paasta_tools.chronos_tools.get_chronos_scheduler_graph', autospec=True),
+    ) as (_, mock_get_running_tasks, _):
         chronos_serviceinit.status_chronos_jobs(
             mock.Mock(),  # Chronos client
             jobs,
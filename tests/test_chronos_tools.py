@@ -217,6 +217,29 @@ class TestChronosTools:
             assert not mock_load_deployments_json.called
             assert dict(actual) == dict(self.fake_chronos_job_config)
 
+    def test_load_chronos_job_configs(self):
+        fake_soa_dir = '/tmp/'
+        with contextlib.nested(
+            mock.patch('paasta_tools.chronos_tools.load_deployments_json', autospec=True,),
+            mock.patch('paasta_tools.chronos_tools.read_chronos_jobs_for_service', autospec=True),
+        ) as (
+            mock_load_deployments_json,
+            mock_read_chronos_jobs_for_service,
+        ):
+            mock_load_deployments_json.return_value.get_branch_dict.return_value = self.fake_branch_dict
+            mock_read_chronos_jobs_for_service.return_value = dict(
+                self.fake_config_file, other_job=self.fake_config_file[self.fake_job_name])
+            actual = chronos_tools.load_chronos_job_configs(service=self.fake_service,
+                                                            cluster=self.fake_cluster,
+                                                            soa_dir=fake_soa_dir)
+            mock_load_deployments_json.assert_called_once_with(self.fake_service, soa_dir=fake_soa_dir)
+            mock_read_chronos_jobs_for_service.assert_called_once_with(self.fake_service,
+                                                                       self.fake_cluster,
+                                                                       soa_dir=fake_soa_dir)
+            assert sorted(actual) == sorted([self.fake_job_name, 'bad_job', 'other_job'])
+            assert actual[self.fake_job_name] == self.fake_chronos_job_config
+            assert actual['other_job'].get_instance() == 'other_job'
+
     def test_load_chronos_job_config_unknown_job(self):
         with contextlib.nested(
             mock.patch('paasta_tools.chronos_tools.read_chronos_jobs_for_service', autospec=True),
@@ -1008,6 +1031,43 @@ class TestChronosTools:
         fake_client.scheduler_graph.assert_called_once_with()
         assert status == expected_status
 
+    def test_get_chronos_status_for_job_with_scheduler_graph(self):
+        fake_client = mock.Mock()
+        scheduler_graph = chronos_tools.ChronosSchedulerGraph("node,fake_service fake_instance,fresh,queued")
+        status = chronos_tools.get_chronos_status_for_job(
+            fake_client, 'fake_service', 'fake_instance', scheduler_graph=scheduler_graph)
+        assert status == 'queued'
+        assert not fake_client.scheduler_graph.called
+
+    def test_chronos_scheduler_graph(self):
+        fake_csv = "\n".join([
+            "node,parent_job,success,idle",
+            "node,child_job,success,running",
+            "node,grandchild_job,failure,queued",
+            "node,other_child_job,fresh,idle",
+            "",
+            "link,parent_job,child_job",
+            "link,parent_job,other_child_job",
+            "link,child_job,grandchild_job",
+            "link,other_child_job,grandchild_job",
+        ])
+        scheduler_graph = chronos_tools.ChronosSchedulerGraph(fake_csv)
+        assert scheduler_graph.get_state('child_job') == 'running'
+        assert scheduler_graph.get_state('missing_job') is None
+        assert scheduler_graph.get_descendants('parent_job') == ['child_job', 'other_child_job', 'grandchild_job']
+        assert scheduler_graph.get_descendants('grandchild_job') == []
+
+    def test_chronos_scheduler_graph_descendants_with_cycle(self):
+        scheduler_graph = chronos_tools.ChronosSchedulerGraph("link,a,b\nlink,b,a")
+        assert scheduler_graph.get_descendants('a') == ['b']
+
+    def test_get_chronos_scheduler_graph(self):
+        fake_client = mock.Mock()
+        fake_client.scheduler_graph.return_value = "node,fake_job,fresh,idle"
+        scheduler_graph = chronos_tools.get_chronos_scheduler_graph(fake_client)
+        fake_client.scheduler_graph.assert_called_once_with()
+        assert scheduler_graph.get_state('fake_job') == 'idle'
+
     def test_filter_chronos_jobs_with_no_filters(self):
         fake_jobs = [
             {
@@ -1124,6 +1184,73 @@ class TestChronosTools:
         # The main thing here is that InvalidJobNameError is not raised.
         assert actual == []
 
+    def test_lookup_chronos_jobs_by_service_instance(self):
+        fake_client = mock.Mock()
+        with mock.patch('paasta_tools.chronos_tools.index_chronos_jobs', autospec=True) as mock_index_chronos_jobs:
+            actual = chronos_tools.lookup_chronos_jobs_by_service_instance(
+                client=fake_client,
+                include_disabled=True,
+            )
+            fake_client.list.assert_called_once_with()
+            mock_index_chronos_jobs.assert_called_once_with(
+                jobs=fake_client.list.return_value,
+                include_disabled=True,
+                include_temporary=False,
+            )
+            assert actual == mock_index_chronos_jobs.return_value
+
+    def test_index_chronos_jobs(self):
+        fake_jobs = [
+            {
+                'name': chronos_tools.compose_job_id('fake_service', 'fake_instance'),
+                'disabled': False,
+            },
+            {
+                'name': chronos_tools.compose_job_id('fake_service', 'fake_instance'),
+                'disabled': True,
+            },
+            {
+                'name': '%s-2016-07-26T22:00:00 %s' % (
+                    chronos_tools.TMP_JOB_IDENTIFIER,
+                    chronos_tools.compose_job_id('fake_service', 'fake_instance'),
+                ),
+                'disabled': False,
+            },
+            {
+                'name': chronos_tools.compose_job_id('other_fake_service', 'other_fake_instance'),
+                'disabled': False,
+            },
+            {
+                'name': 'some non-paasta job',
+                'disabled': False,
+            },
+        ]
+        assert chronos_tools.index_chronos_jobs(fake_jobs) == {
+            ('fake_service', 'fake_instance'): [fake_jobs[0]],
+            ('other_fake_service', 'other_fake_instance'): [fake_jobs[3]],
+        }
+        assert chronos_tools.index_chronos_jobs(fake_jobs, include_disabled=True, include_temporary=True) == {
+            ('fake_service', 'fake_instance'): [fake_jobs[0], fake_jobs[1], fake_jobs[2]],
+            ('other_fake_service', 'other_fake_instance'): [fake_jobs[3]],
+        }
+
+    def test_index_chronos_jobs_matches_filter_chronos_jobs(self):
+        fake_jobs = [
+            {'name': chronos_tools.compose_job_id(service, instance), 'disabled': disabled}
+            for service in ('fake_service', 'other_fake_service')
+            for instance in ('main', 'canary')
+            for disabled in (True, False)
+        ]
+        index = chronos_tools.index_chronos_jobs(fake_jobs, include_disabled=False, include_temporary=False)
+        for service, instance in index:
+            assert index[(service, instance)] == chronos_tools.filter_chronos_jobs(
+                jobs=fake_jobs,
+                service=service,
+                instance=instance,
+                include_disabled=False,
+                include_temporary=False,
+            )
+
     def test_create_complete_config(self):
         fake_owner = 'test_team'
         fake_config_hash = 'fake_config_hash'
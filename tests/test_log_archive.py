@@ -0,0 +1,95 @@
+# Copyright 2015-2016 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import datetime
+import json
+
+from paasta_tools import log_archive
+from paasta_tools.utils import format_log_line
+
+
+def make_line(message, timestamp, service='fake_service', level='event', component='deploy', cluster='cluster1'):
+    return format_log_line(level, cluster, service, 'main', component, message, timestamp=timestamp) + '\n'
+
+
+def test_log_archiver_splits_by_service_and_day(tmpdir):
+    archiver = log_archive.LogArchiver(str(tmpdir), block_lines=2)
+    for line in [
+        make_line('day 1 b', '2016-06-08T23:00:00.000002'),
+        make_line('day 1 a', '2016-06-08T23:00:00.000001'),
+        make_line('day 1 c', '2016-06-08T23:59:59'),
+        make_line('day 2 a', '2016-06-09T00:00:00'),
+        make_line('other service', '2016-06-08T23:00:00', service='other_service'),
+        'not json\n',
+        make_line('bad service', '2016-06-08T23:00:00', service='../etc'),
+    ]:
+        archiver.add_line(line)
+    archiver.close()
+    assert archiver.skipped_lines == 2
+
+    archives = log_archive.LogArchive.list_archives(str(tmpdir), 'fake_service')
+    assert [archive.date for archive in archives] == [datetime.date(2016, 6, 8), datetime.date(2016, 6, 9)]
+    day1, day2 = archives
+    assert [block['lines'] for block in day1.blocks] == [2, 1]
+    messages = [json.loads(line)['message'] for block in day1.blocks for line in day1.read_block(block)]
+    assert messages == ['day 1 a', 'day 1 b', 'day 1 c']
+    assert [json.loads(line)['message'] for line in day2.read_block(day2.blocks[0])] == ['day 2 a']
+    assert len(log_archive.LogArchive.list_archives(str(tmpdir), 'other_service')) == 1
+
+
+def test_log_archiver_appends_to_existing_archives(tmpdir):
+    for message in ['first run', 'second run']:
+        archiver = log_archive.LogArchiver(str(tmpdir))
+        archiver.add_line(make_line(message, '2016-06-08T12:00:00'))
+        archiver.close()
+    archive, = log_archive.LogArchive.list_archives(str(tmpdir), 'fake_service')
+    messages = [json.loads(line)['message'] for block in archive.blocks for line in archive.read_block(block)]
+    assert messages == ['first run', 'second run']
+
+
+def test_log_archive_find_blocks(tmpdir):
+    archive = log_archive.LogArchive(str(tmpdir), 'fake_service', datetime.date(2016, 6, 8))
+    archive.blocks = [
+        {'start': 100, 'end': 200, 'levels': ['event'], 'components': ['deploy'], 'clusters': ['cluster1']},
+        {'start': 300, 'end': 400, 'levels': ['debug'], 'components': ['build'], 'clusters': ['cluster2']},
+    ]
+    first, second = archive.blocks
+    assert archive.find_blocks(['event', 'debug'], ['deploy', 'build'], ['cluster1', 'cluster2']) == [first, second]
+    assert archive.find_blocks(['event', 'debug'], ['deploy', 'build'], ['cluster2']) == [second]
+    assert archive.find_blocks(['event'], ['deploy', 'build'], ['cluster1', 'cluster2']) == [first]
+    assert archive.find_blocks(['event'], ['build'], ['cluster1', 'cluster2']) == []
+    assert archive.find_blocks(['event', 'debug'], ['deploy', 'build'], ['cluster1', 'cluster2'],
+                               start_time=250, end_time=350) == [second]
+    assert archive.find_blocks(['event', 'debug'], ['deploy', 'build'], ['cluster1', 'cluster2'],
+                               start_time=201, end_time=299) == []
+
+
+def test_log_archive_list_archives_date_range(tmpdir):
+    archiver = log_archive.LogArchiver(str(tmpdir))
+    for day in range(1, 6):
+        archiver.add_line(make_line('line', '2016-06-0%dT12:00:00' % day))
+    archiver.close()
+    tmpdir.join('fake_service', 'README').write('not an archive')
+    archives = log_archive.LogArchive.list_archives(str(tmpdir), 'fake_service', start_date=datetime.date(2016, 6, 2),
+                                                    end_date=datetime.date(2016, 6, 4))
+    assert [archive.date.day for archive in archives] == [2, 3, 4]
+    assert log_archive.LogArchive.list_archives(str(tmpdir), 'missing_service') == []
+
+
+def test_main_reads_log_files(tmpdir):
+    log_file = tmpdir.join('fake_service.log')
+    log_file.write(make_line('line', '2016-06-08T12:00:00'))
+    archive_dir = tmpdir.join('archive')
+    log_archive.main([str(archive_dir), str(log_file), '--block-lines', '5'])
+    archive, = log_archive.LogArchive.list_archives(str(archive_dir), 'fake_service')
+    assert archive.blocks[0]['lines'] == 1
@@ -15,6 +15,7 @@ import contextlib
 
 import marathon
 import mock
+import pytest
 from marathon import MarathonHttpError
 from marathon.models import MarathonApp
 from pytest import raises
@@ -2598,6 +2599,19 @@ def test_get_app_queue_status():
     assert is_overdue is False
 
 
+@pytest.mark.parametrize('instances,tasks_running,deployments,is_overdue,backoff_seconds,expected', [
+    (3, 3, [], None, None, marathon_tools.MarathonDeployStatus.Running),
+    (3, 1, ['deployment'], None, None, marathon_tools.MarathonDeployStatus.Deploying),
+    (0, 0, [], None, None, marathon_tools.MarathonDeployStatus.Stopped),
+    (3, 1, [], False, 10, marathon_tools.MarathonDeployStatus.Delayed),
+    (3, 1, [], True, 0, marathon_tools.MarathonDeployStatus.Waiting),
+])
+def test_get_marathon_app_deploy_status_from_app(instances, tasks_running, deployments, is_overdue,
+                                                 backoff_seconds, expected):
+    app = mock.Mock(instances=instances, tasks_running=tasks_running, deployments=deployments)
+    assert marathon_tools.get_marathon_app_deploy_status_from_app(app, is_overdue, backoff_seconds) == expected
+
+
 def test_is_task_healthy():
     mock_hcrs = [mock.Mock(alive=False), mock.Mock(alive=False)]
     mock_task = mock.Mock(health_check_results=mock_hcrs)
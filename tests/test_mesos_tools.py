@@ -671,6 +671,22 @@ def test_get_count_running_tasks_on_slave():
         mock_get_mesos_task_count_by_slave.assert_called_with(mock_mesos_state)
 
 
+def test_get_count_running_tasks_by_slave_hostname():
+    with contextlib.nested(
+        mock.patch('paasta_tools.mesos_tools.get_mesos_master', autospec=True),
+        mock.patch('paasta_tools.mesos_tools.get_mesos_task_count_by_slave', autospec=True),
+    ) as (
+        mock_get_master,
+        mock_get_mesos_task_count_by_slave
+    ):
+        mock_slave_counts = [{'task_counts': mock.Mock(count=3, slave={'hostname': 'host1'})},
+                             {'task_counts': mock.Mock(count=0, slave={'hostname': 'host2'})}]
+        mock_get_mesos_task_count_by_slave.return_value = mock_slave_counts
+
+        assert mesos_tools.get_count_running_tasks_by_slave_hostname() == {'host1': 3, 'host2': 0}
+        assert mock_get_master.return_value.state_summary.call_count == 1
+
+
 def mock_getitem(key):
     if key == 'id':
         return 'fakeID'
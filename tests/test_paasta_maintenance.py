@@ -39,6 +39,25 @@ def test_is_safe_to_kill(
     assert paasta_maintenance.is_safe_to_kill('blah')
 
 
+@mock.patch('paasta_tools.paasta_maintenance.get_count_running_tasks_by_slave_hostname', autospec=True)
+@mock.patch('paasta_tools.mesos_maintenance.get_draining_hosts', autospec=True)
+@mock.patch('paasta_tools.mesos_maintenance.get_hosts_past_maintenance_start', autospec=True)
+def test_get_hosts_safe_to_kill(
+    mock_get_hosts_past_maintenance_start,
+    mock_get_draining_hosts,
+    mock_get_count_running_tasks_by_slave_hostname,
+):
+    mock_get_hosts_past_maintenance_start.return_value = ['host1', 'otherhost']
+    mock_get_draining_hosts.return_value = ['host1', 'host2', 'host3']
+    mock_get_count_running_tasks_by_slave_hostname.return_value = {'host2': 0, 'host3': 2, 'host4': 0}
+    assert paasta_maintenance.get_hosts_safe_to_kill(['host1', 'host2', 'host3', 'host4']) == {'host1', 'host2'}
+    assert mock_get_count_running_tasks_by_slave_hostname.call_count == 1
+
+    mock_get_count_running_tasks_by_slave_hostname.reset_mock()
+    assert paasta_maintenance.get_hosts_safe_to_kill(['host1', 'host4']) == {'host1'}
+    assert not mock_get_count_running_tasks_by_slave_hostname.called
+
+
 @mock.patch('paasta_tools.paasta_maintenance.is_hostname_local', autospec=True)
 def test_is_safe_to_drain_rejects_non_localhosts(
     mock_is_hostname_local,
@@ -23,6 +23,7 @@ from paasta_tools import chronos_tools
 from paasta_tools import setup_chronos_job
 from paasta_tools.utils import compose_job_id
 from paasta_tools.utils import NoDeploymentsAvailable
+from paasta_tools.utils import SystemPaastaConfig
 
 
 class TestSetupChronosJob:
@@ -63,6 +64,7 @@ class TestSetupChronosJob:
     fake_docker_registry = 'remote_registry.com'
     fake_args = mock.MagicMock(
         service_instance=compose_job_id(fake_service, fake_instance),
+        all=False,
         soa_dir='no_more',
         verbose=False,
     )
@@ -193,6 +195,183 @@ class TestSetupChronosJob:
                 output=expected_error_msg
             )
 
+    def test_main_all(self):
+        fake_args = mock.MagicMock(
+            service_instance=None,
+            all=True,
+            max_concurrency=3,
+            soa_dir='no_more',
+            verbose=False,
+        )
+        with contextlib.nested(
+            mock.patch('paasta_tools.setup_chronos_job.parse_args', return_value=fake_args, autospec=True),
+            mock.patch('paasta_tools.chronos_tools.load_chronos_config', autospec=True),
+            mock.patch('paasta_tools.chronos_tools.get_chronos_client', return_value=self.fake_client, autospec=True),
+            mock.patch('paasta_tools.setup_chronos_job.load_system_paasta_config', autospec=True),
+            mock.patch('paasta_tools.setup_chronos_job.setup_all_jobs', autospec=True),
+            mock.patch('paasta_tools.setup_chronos_job.setup_job', autospec=True),
+        ) as (
+            _,
+            _,
+            _,
+            load_system_paasta_config_patch,
+            setup_all_jobs_patch,
+            setup_job_patch,
+        ):
+            with raises(SystemExit) as excinfo:
+                setup_chronos_job.main()
+            assert excinfo.value.code == 0
+            setup_all_jobs_patch.assert_called_once_with(
+                client=self.fake_client,
+                system_paasta_config=load_system_paasta_config_patch.return_value,
+                soa_dir='no_more',
+                max_concurrency=3,
+            )
+            assert not setup_job_patch.called
+
+    def test_get_job_to_update(self):
+        complete_job_config = {'name': 'fake_service fake_instance', 'description': 'newhash'}
+        assert setup_chronos_job.get_job_to_update(complete_job_config, []) == complete_job_config
+        assert setup_chronos_job.get_job_to_update(
+            complete_job_config, [{'description': 'oldhash'}]) == complete_job_config
+        assert setup_chronos_job.get_job_to_update(complete_job_config, [{'description': 'newhash'}]) is None
+
+    def test_load_complete_job_configs(self):
+        fake_job_config = mock.Mock()
+
+        def fake_load_chronos_job_configs(service, cluster, soa_dir):
+            if service == 'service_without_deployments':
+                raise NoDeploymentsAvailable
+            if service == 'unreadable_service':
+                raise ValueError('bad yaml')
+            return {'main': fake_job_config, 'parentless': fake_job_config, 'invalid': fake_job_config,
+                    'crashing': fake_job_config}
+
+        def fake_format_complete_config(service, job_name, chronos_job_config, system_paasta_config):
+            if job_name == 'parentless':
+                raise chronos_tools.InvalidParentError
+            if job_name == 'invalid':
+                raise chronos_tools.InvalidChronosConfigError('bad schedule')
+            if job_name == 'crashing':
+                raise KeyError('cmd')
+            return {'name': compose_job_id(service, job_name)}
+
+        fake_system_paasta_config = SystemPaastaConfig({'cluster': self.fake_cluster}, '/fake/config')
+        with contextlib.nested(
+            mock.patch('paasta_tools.chronos_tools.load_chronos_job_configs', autospec=True,
+                       side_effect=fake_load_chronos_job_configs),
+            mock.patch('paasta_tools.chronos_tools.format_complete_config', autospec=True,
+                       side_effect=fake_format_complete_config),
+        ) as (
+            load_chronos_job_configs_patch,
+            format_complete_config_patch,
+        ):
+            actual = setup_chronos_job.load_complete_job_configs(
+                service_instances=[
+                    ('fake_service', 'main'),
+                    ('fake_service', 'missing'),
+                    ('fake_service', 'parentless'),
+                    ('fake_service', 'invalid'),
+                    ('fake_service', 'crashing'),
+                    ('service_without_deployments', 'main'),
+                    ('unreadable_service', 'main'),
+                ],
+                system_paasta_config=fake_system_paasta_config,
+                soa_dir='no_more',
+            )
+            assert actual == [
+                ('fake_service', 'main', fake_job_config, {'name': compose_job_id('fake_service', 'main')}, None),
+                ('fake_service', 'missing', None, None, mock.ANY),
+                ('fake_service', 'invalid', fake_job_config, None, mock.ANY),
+                ('fake_service', 'crashing', fake_job_config, None, mock.ANY),
+                ('service_without_deployments', 'main', None, None, mock.ANY),
+                ('unreadable_service', 'main', None, None, mock.ANY),
+            ]
+            assert 'Could not read chronos configuration file' in actual[1][4]
+            assert 'Invalid chronos configuration' in actual[2][4]
+            assert 'bad schedule' in actual[2][4]
+            assert 'Failed to build the chronos job' in actual[3][4]
+            assert 'No deployment found' in actual[4][4]
+            assert 'bad yaml' in actual[5][4]
+            assert load_chronos_job_configs_patch.call_count == 3
+            for args, _ in format_complete_config_patch.call_args_list:
+                assert args[3] is fake_system_paasta_config
+
+    def test_setup_all_jobs(self):
+        fake_job_config = mock.Mock()
+        up_to_date_job = {'name': 'fake_service up_to_date', 'description': 'samehash'}
+        changed_job = {'name': 'fake_service changed', 'description': 'newhash'}
+        failing_job = {'name': 'fake_service failing', 'description': 'newhash'}
+        loaded = [
+            ('fake_service', 'up_to_date', fake_job_config, up_to_date_job, None),
+            ('fake_service', 'changed', fake_job_config, changed_job, None),
+            ('fake_service', 'failing', fake_job_config, failing_job, None),
+            ('fake_service', 'broken', None, None, 'fake error'),
+        ]
+        existing_jobs = {
+            ('fake_service', 'up_to_date'): [dict(up_to_date_job)],
+            ('fake_service', 'changed'): [{'name': 'fake_service changed', 'description': 'oldhash'}],
+        }
+
+        def fake_bounce_chronos_job(service, instance, cluster, job_to_update, client):
+            if instance == 'failing':
+                raise Exception('chronos is down')
+            return (0, 'ok')
+
+        fake_system_paasta_config = SystemPaastaConfig({'cluster': self.fake_cluster}, '/fake/config')
+        with contextlib.nested(
+            mock.patch('paasta_tools.chronos_tools.get_chronos_jobs_for_cluster', autospec=True),
+            mock.patch('paasta_tools.setup_chronos_job.load_complete_job_configs', autospec=True,
+                       return_value=loaded),
+            mock.patch('paasta_tools.chronos_tools.lookup_chronos_jobs_by_service_instance', autospec=True,
+                       return_value=existing_jobs),
+            mock.patch('paasta_tools.setup_chronos_job.bounce_chronos_job', autospec=True,
+                       side_effect=fake_bounce_chronos_job),
+            mock.patch('paasta_tools.setup_chronos_job.send_event', autospec=True),
+        ) as (
+            get_chronos_jobs_for_cluster_patch,
+            load_complete_job_configs_patch,
+            lookup_patch,
+            bounce_chronos_job_patch,
+            send_event_patch,
+        ):
+            setup_chronos_job.setup_all_jobs(
+                client=self.fake_client,
+                system_paasta_config=fake_system_paasta_config,
+                soa_dir='no_more',
+                max_concurrency=2,
+            )
+            lookup_patch.assert_called_once_with(client=self.fake_client, include_disabled=True)
+            get_chronos_jobs_for_cluster_patch.assert_called_once_with(cluster=self.fake_cluster, soa_dir='no_more')
+            load_complete_job_configs_patch.assert_called_once_with(
+                get_chronos_jobs_for_cluster_patch.return_value, fake_system_paasta_config, 'no_more')
+            jobs_to_update = {
+                call[1]['instance']: call[1]['job_to_update'] for call in bounce_chronos_job_patch.call_args_list
+            }
+            assert jobs_to_update == {
+                'up_to_date': None,
+                'changed': changed_job,
+                'failing': failing_job,
+            }
+            statuses = {
+                call[1]['instance']: call[1]['status'] for call in send_event_patch.call_args_list
+            }
+            assert statuses == {
+                'up_to_date': Status.OK,
+                'changed': Status.OK,
+                'failing': Status.CRITICAL,
+                'broken': Status.CRITICAL,
+            }
+            send_event_patch.assert_any_call(
+                service='fake_service',
+                instance='broken',
+                soa_dir='no_more',
+                status=Status.CRITICAL,
+                output='fake error',
+                job_config=None,
+                cluster=self.fake_cluster,
+            )
+
     def test_setup_job_new_app_with_no_previous_jobs(self):
         fake_existing_jobs = []
         with contextlib.nested(
@@ -362,6 +541,23 @@ class TestSetupChronosJob:
                 soa_dir=fake_soa_dir,
             )
 
+            mock_load_system_paasta_config.reset_mock()
+            setup_chronos_job.send_event(
+                service=self.fake_service,
+                instance=self.fake_instance,
+                soa_dir=fake_soa_dir,
+                status=fake_status,
+                output=fake_output,
+                cluster='other_cluster',
+            )
+            assert not mock_load_system_paasta_config.called
+            mock_load_chronos_job_config.assert_called_with(
+                service=self.fake_service,
+                instance=self.fake_instance,
+                cluster='other_cluster',
+                soa_dir=fake_soa_dir,
+            )
+
     def test_bounce_chronos_job_takes_actions(self):
         fake_job_to_update = {'name': 'job_to_update'}
         with contextlib.nested(
@@ -11,14 +11,19 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import calendar
 import contextlib
 import datetime
+import io
 import json
 import os
 import shutil
 import stat
 import tempfile
+import threading
+import time
 
+import isodate
 import mock
 from pytest import raises
 
@@ -126,11 +131,77 @@ def test_format_log_line_rejects_invalid_components():
         )
 
 
+TIMESTAMPS = [
+    '2016-06-08T06:31:52.706609',
+    '2016-06-08T06:31:52',
+    '2016-02-29T23:59:59.000001',
+    '2016-06-08T06:31:52.706609135Z',
+    '2016-06-08T06:31:52+02:00',
+]
+
+
+def test_parse_log_timestamp_matches_isodate():
+    for timestamp in TIMESTAMPS:
+        assert utils.parse_log_timestamp(timestamp) == isodate.parse_datetime(timestamp)
+
+
+def test_log_timestamp_to_epoch_matches_isodate():
+    for timestamp in TIMESTAMPS:
+        dt = isodate.parse_datetime(timestamp)
+        expected = calendar.timegm(dt.utctimetuple()) + dt.microsecond / 1e6
+        assert utils.log_timestamp_to_epoch(timestamp) == expected
+
+
+def test_log_timestamp_to_epoch_skips_isodate_for_log_line_timestamps():
+    with mock.patch('paasta_tools.utils.isodate', autospec=True) as mock_isodate:
+        assert utils.log_timestamp_to_epoch('1970-01-02T00:00:01.500000') == 86401.5
+        assert utils.log_timestamp_to_epoch(utils.json.loads(utils.format_log_line(
+            'debug', 'fake_cluster', 'fake_service', 'main', 'build', 'fake_line'))['timestamp']) > 0
+        assert mock_isodate.parse_datetime.call_count == 0
+
+
+def test_log_timestamp_to_epoch_invalid():
+    for timestamp in ['2016-13-08T06:31:52', '2016-02-30T06:31:52', '2016-06-08T25:31:52', '2016-06-08 06:31:52',
+                      'not a timestamp']:
+        with raises(ValueError):
+            utils.log_timestamp_to_epoch(timestamp)
+
+
+def test_format_epoch_as_local():
+    epochs = [0, 1465367512.706609, 1465367512.999999, 1478422800, 1478426399.5, 1478426400]
+    original_tz = os.environ.get('TZ')
+    try:
+        # 1478422800 is the start of the hour that repeats when DST ends in Los Angeles
+        for tz in ['UTC', 'America/Los_Angeles', 'Asia/Kolkata']:
+            os.environ['TZ'] = tz
+            time.tzset()
+            utils._local_utc_offsets.clear()
+            for epoch in epochs:
+                expected = datetime.datetime.fromtimestamp(epoch).strftime("%Y-%m-%d %H:%M:%S")
+                assert utils.format_epoch_as_local(epoch) == expected
+    finally:
+        if original_tz is None:
+            del os.environ['TZ']
+        else:
+            os.environ['TZ'] = original_tz
+        time.tzset()
+        utils._local_utc_offsets.clear()
+
+
 def test_ScribeLogWriter_log_raise_on_unknown_level():
     with raises(utils.NoSuchLogLevel):
         utils.ScribeLogWriter().log('fake_service', 'fake_line', 'build', 'BOGUS_LEVEL')
 
 
+def test_ScribeLogWriter_write_uses_timestamp():
+    with mock.patch('paasta_tools.utils.importlib', autospec=True) as mock_importlib:
+        utils.ScribeLogWriter().write('fake_service', 'fake_line', 'build', 'event', 'fake_cluster', 'main',
+                                      '2016-01-01T00:00:00')
+    log_name, formatted_line = mock_importlib.import_module.return_value.log_line.call_args[0]
+    assert log_name == 'stream_paasta_fake_service'
+    assert utils.json.loads(formatted_line)['timestamp'] == '2016-01-01T00:00:00'
+
+
 def test_get_log_name_for_service():
     service = 'foo'
     expected = 'stream_paasta_%s' % service
@@ -752,6 +823,26 @@ def test_DeploymentsJson_read():
         assert actual == fake_json['v1']
 
 
+def test_load_deployments_json_cache(tmpdir):
+    tmpdir.mkdir('fake_service').join('deployments.json').write(json.dumps({'v1': {'a': 1}}))
+    soa_dir = str(tmpdir)
+    deployments_file = os.path.join(soa_dir, 'fake_service', 'deployments.json')
+    utils.enable_deployments_json_cache()
+    try:
+        assert utils.load_deployments_json('fake_service', soa_dir) == {'a': 1}
+        # Changing what's returned doesn't change the cache
+        utils.load_deployments_json('fake_service', soa_dir)['a'] = 2
+        tmpdir.join('fake_service', 'deployments.json').write(json.dumps({'v1': {'a': 3}}))
+        assert utils.load_deployments_json('fake_service', soa_dir) == {'a': 1}
+        utils._deployments_json_cache.pop(deployments_file)
+        assert utils.load_deployments_json('fake_service', soa_dir) == {'a': 3}
+    finally:
+        utils.disable_deployments_json_cache()
+        utils._deployments_json_cache.clear()
+    tmpdir.join('fake_service', 'deployments.json').write(json.dumps({'v1': {'a': 4}}))
+    assert utils.load_deployments_json('fake_service', soa_dir) == {'a': 4}
+
+
 def test_get_docker_url_no_error():
     fake_registry = "im.a-real.vm"
     fake_image = "and-i-can-run:1.0"
@@ -1486,11 +1577,174 @@ class TestFileLogWriter:
             with mock.patch("paasta_tools.utils.format_log_line", return_value=fake_line, autospec=True) as fake_fll:
                 fw.log("service", "line", "component", level="level", cluster="cluster", instance="instance")
 
-            fake_fll.assert_called_once_with("level", "cluster", "service", "instance", "component", "line")
+            fake_fll.assert_called_once_with("level", "cluster", "service", "instance", "component", "line", None)
 
             mock_FileIO.assert_called_once_with("/dev/null", mode=fw.mode, closefd=True)
             fake_file.write.assert_called_once_with("%s\n" % fake_line)
 
+    def test_log_reuses_open_files(self, tmpdir):
+        fw = utils.FileLogWriter(str(tmpdir.join("{service}.log")), max_open_files=1)
+        with mock.patch("paasta_tools.utils.io.FileIO", autospec=True, side_effect=io.FileIO) as mock_FileIO:
+            fw.log("service_a", "line 1", "build")
+            fw.log("service_a", "line 2", "build")
+            assert mock_FileIO.call_count == 1
+            fw.log("service_b", "line 1", "build")
+            fw.log("service_a", "line 3", "build")
+            assert mock_FileIO.call_count == 3
+        assert fw._open_files.keys() == [str(tmpdir.join("service_a.log"))]
+        fw.close()
+        assert fw._open_files == {}
+        messages = [json.loads(line)['message'] for line in tmpdir.join("service_a.log").readlines()]
+        assert messages == ["line 1", "line 2", "line 3"]
+
+    def test_log_reopens_rotated_files(self, tmpdir):
+        path = tmpdir.join("service.log")
+        fw = utils.FileLogWriter(str(path), max_open_files=10)
+        fw.REOPEN_CHECK_INTERVAL = 0
+        fw.log("service", "before rotation", "build")
+        path.rename(tmpdir.join("service.log.1"))
+        fw.log("service", "after rotation", "build")
+        fw.close()
+        assert json.loads(tmpdir.join("service.log.1").read())['message'] == "before rotation"
+        assert json.loads(path.read())['message'] == "after rotation"
+
+    def test_log_buffers_lines_until_flushed(self, tmpdir):
+        path = tmpdir.join("service.log")
+        with mock.patch("paasta_tools.utils.threading.Timer", autospec=True) as mock_Timer:
+            fw = utils.FileLogWriter(str(path), flush_interval=5)
+            fw.log("service", "line 1", "build")
+            fw.log("service", "line 2", "build")
+            assert not path.check()
+            mock_Timer.assert_called_once_with(5, fw.flush)
+
+            with mock.patch.object(fw, "write_to_path", autospec=True,
+                                   side_effect=fw.write_to_path) as mock_write_to_path:
+                # What the timer calls once flush_interval is up
+                fw.flush()
+                assert mock_write_to_path.call_count == 1
+            mock_Timer.return_value.cancel.assert_called_once_with()
+        assert [json.loads(line)['message'] for line in path.readlines()] == ["line 1", "line 2"]
+
+    def test_log_flushes_when_buffer_is_full(self, tmpdir):
+        path = tmpdir.join("service.log")
+        with mock.patch("paasta_tools.utils.threading.Timer", autospec=True):
+            fw = utils.FileLogWriter(str(path), flush_interval=5, max_buffered_bytes=1)
+            fw.log("service", "line 1", "build")
+        assert json.loads(path.read())['message'] == "line 1"
+        assert fw._buffers == {}
+
+    def test_flush_keeps_lines_it_cant_write(self, tmpdir):
+        with mock.patch("paasta_tools.utils.threading.Timer", autospec=True):
+            fw = utils.FileLogWriter(str(tmpdir.join("{service}", "service.log")), flush_interval=5)
+            fw.log("service_a", "line 1", "build")
+            fw.log("service_b", "line 1", "build")
+            fw.log("service_a", "line 2", "build")
+            tmpdir.mkdir("service_b")
+            with raises(IOError):
+                fw.flush()
+            assert json.loads(tmpdir.join("service_b", "service.log").read())['message'] == "line 1"
+            assert fw._buffers.keys() == [str(tmpdir.join("service_a", "service.log"))]
+            assert fw._buffered_bytes == sum(len(line) for line in fw._buffers.values()[0])
+
+            tmpdir.mkdir("service_a")
+            fw.flush()
+        assert [json.loads(line)['message'] for line in tmpdir.join("service_a", "service.log").readlines()] == [
+            "line 1", "line 2"]
+        assert fw._buffers == {}
+        assert fw._buffered_bytes == 0
+
+    def test_close_flushes_buffered_lines(self, tmpdir):
+        path = tmpdir.join("service.log")
+        with mock.patch("paasta_tools.utils.threading.Timer", autospec=True):
+            fw = utils.FileLogWriter(str(path), max_open_files=2, flush_interval=5)
+            fw.log("service", "line 1", "build")
+            fw.close()
+        assert json.loads(path.read())['message'] == "line 1"
+
+
+class TestAsyncLogWriter:
+    def make_writer(self, **kwargs):
+        with contextlib.nested(
+            mock.patch('paasta_tools.utils.get_log_writer_class', autospec=True),
+            mock.patch('paasta_tools.utils.atexit', autospec=True),
+        ) as (mock_get_log_writer_class, mock_atexit):
+            aw = utils.AsyncLogWriter(driver='fake', options={'fake_arg': 'something'}, **kwargs)
+            mock_get_log_writer_class.assert_called_once_with('fake')
+            mock_get_log_writer_class.return_value.assert_called_once_with(fake_arg='something')
+            mock_atexit.register.assert_called_once_with(aw.close)
+        return aw
+
+    def test_log_is_written_in_the_background(self):
+        aw = self.make_writer()
+        echo_threads = []
+        aw.log_writer.echo.side_effect = lambda line, level: echo_threads.append(threading.current_thread())
+        with mock.patch('paasta_tools.utils._now', autospec=True, return_value='fake_timestamp'):
+            aw.log('fake_service', 'fake_line', 'build', level='event', cluster='fake_cluster', instance='main')
+        aw.log_writer.echo.assert_called_once_with('fake_line', 'event')
+        assert echo_threads == [threading.current_thread()]
+        aw.flush()
+        # The line keeps the time it was logged at, not the time it was written
+        aw.log_writer.write.assert_called_once_with('fake_service', 'fake_line', 'build', 'event', 'fake_cluster',
+                                                    'main', 'fake_timestamp')
+        assert not aw.log_writer.log.called
+        aw.close()
+        assert not aw._thread.is_alive()
+
+    def test_log_raises_unknown_levels_to_the_caller(self):
+        aw = self.make_writer()
+        aw.log_writer.echo.side_effect = utils.NoSuchLogLevel
+        with raises(utils.NoSuchLogLevel):
+            aw.log('fake_service', 'bad_line', 'build', level='BOGUS_LEVEL')
+        aw.close()
+        assert not aw.log_writer.write.called
+
+    def test_log_survives_failing_writes(self):
+        aw = self.make_writer()
+        aw.log_writer.write.side_effect = [IOError, None]
+        aw.log('fake_service', 'bad_line', 'build')
+        aw.log('fake_service', 'good_line', 'build')
+        aw.close()
+        assert aw.log_writer.write.call_count == 2
+
+    def test_log_drops_lines_when_full(self):
+        aw = self.make_writer(max_queue_size=1, when_full='drop')
+        unblock = threading.Event()
+        aw.log_writer.write.side_effect = lambda *args: unblock.wait()
+        aw.log('fake_service', 'line 1', 'build')
+        # Wait for the background thread to pick up the first line and block on it
+        while not aw._queue.empty():
+            time.sleep(0.01)
+        aw.log('fake_service', 'line 2', 'build')
+        aw.log('fake_service', 'line 3', 'build')
+        assert aw.dropped_lines == 1
+        unblock.set()
+        aw.close()
+        assert [call[0][1] for call in aw.log_writer.write.call_args_list] == ['line 1', 'line 2']
+
+    def test_close_waits_at_most_flush_timeout(self):
+        aw = self.make_writer(max_queue_size=1, flush_timeout=0.2)
+        unblock = threading.Event()
+        slow_writes = iter([0.15])
+
+        # The first line takes a while to write, and the next one hangs
+        def write(*args):
+            for delay in slow_writes:
+                time.sleep(delay)
+                return
+            unblock.wait()
+        aw.log_writer.write.side_effect = write
+        aw.log('fake_service', 'line 1', 'build')
+        aw.log('fake_service', 'line 2', 'build')
+        start = time.time()
+        aw.close()
+        elapsed = time.time() - start
+        unblock.set()
+        assert 0.15 <= elapsed < 0.3
+
+    def test_rejects_unknown_when_full(self):
+        with raises(ValueError):
+            utils.AsyncLogWriter(driver='null', when_full='explode')
+
 
 def test_deep_merge_dictionaries():
     overrides = {